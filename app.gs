@@ -1,4 +1,7 @@
 // IMPORTANT: Make sure to add GOOGLE_DRIVE_SECURE_TOKEN in Script Properties with the value from your .env file
+// Direct Drive downloads also need SERVICE_ACCOUNT_EMAIL and SERVICE_ACCOUNT_PRIVATE_KEY (the private_key of the
+// service account's JSON key), with the concursos folders shared with that account as a viewer
+// (see DEPLOYMENT_GUIDE.md); without them the application keeps downloading through getFileContent
 
 // The TEMPLATES mapping is no longer needed as template IDs are passed directly from the backend
 // Keeping this commented for backward compatibility reference
@@ -442,6 +445,9 @@ function renameFolder(folderId, newName) {
   }
 }
 
+// Maximum number of operations accepted in a single batch request
+var MAX_BATCH_OPERATIONS = 100;
+
 // Function to handle HTTP requests
 function doPost(e) {
   // Verify secure token using correct property name
@@ -456,40 +462,112 @@ function doPost(e) {
       return createErrorResponse('Invalid token');
     }
     
-    // Route the request to the appropriate function
-    switch (data.action) {
-      case 'createFolder':
-        return handleCreateFolder(data);
-      case 'createNestedFolder':
-        return handleCreateNestedFolder(data);
-      case 'createPostulanteFolder':
-        return handleCreatePostulanteFolder(data);
-      case 'createDocFromTemplate':
-        return handleCreateDocFromTemplate(data);
-      case 'uploadFile':
-        return handleUploadFile(data);
-      case 'getFileContent':
-        return handleGetFileContent(data);
-      case 'addSignatureToPdf':
-        return handleAddSignatureToPdf(data);
-      case 'deleteFile':
-        return handleDeleteFile(data);
-      case 'overwriteFile':
-        return handleOverwriteFile(data);
-      case 'deleteFolder':
-        return handleDeleteFolder(data);
-      case 'renameFolder':
-        return handleRenameFolder(data);
-      case 'sendEmail':
-        return handleSendEmail(data);
-      default:
-        return createErrorResponse(`Unknown action: ${data.action}`);
+    if (data.action === 'batch') {
+      return handleBatch(data);
     }
+    return dispatchAction(data);
   } catch (error) {
     return createErrorResponse(`Error processing request: ${error.toString()}`);
   }
 }
 
+// Route a single action to the appropriate function
+function dispatchAction(data) {
+  switch (data.action) {
+    case 'createFolder':
+      return handleCreateFolder(data);
+    case 'createNestedFolder':
+      return handleCreateNestedFolder(data);
+    case 'createPostulanteFolder':
+      return handleCreatePostulanteFolder(data);
+    case 'createDocFromTemplate':
+      return handleCreateDocFromTemplate(data);
+    case 'uploadFile':
+      return handleUploadFile(data);
+    case 'getFileContent':
+      return handleGetFileContent(data);
+    case 'addSignatureToPdf':
+      return handleAddSignatureToPdf(data);
+    case 'deleteFile':
+      return handleDeleteFile(data);
+    case 'overwriteFile':
+      return handleOverwriteFile(data);
+    case 'deleteFolder':
+      return handleDeleteFolder(data);
+    case 'renameFolder':
+      return handleRenameFolder(data);
+    case 'sendEmail':
+      return handleSendEmail(data);
+    case 'getAccessToken':
+      return handleGetAccessToken(data);
+    default:
+      return createErrorResponse(`Unknown action: ${data.action}`);
+  }
+}
+
+// Run several actions in one request and return the result of each one, in order.
+// A string parameter of the form "$<index>.<field>" is replaced by that field of the
+// result of an earlier operation, so a folder and its subfolders can be created together.
+function handleBatch(data) {
+  var operations = data.operations;
+  if (!Array.isArray(operations)) {
+    throw new Error("Operations list is required.");
+  }
+  if (operations.length > MAX_BATCH_OPERATIONS) {
+    throw new Error("A batch accepts at most " + MAX_BATCH_OPERATIONS + " operations.");
+  }
+  
+  var results = [];
+  for (var i = 0; i < operations.length; i++) {
+    var result;
+    try {
+      var operation = resolveBatchReferences(operations[i], results);
+      if (operation.action === 'batch') {
+        throw new Error("Nested batches are not allowed.");
+      }
+      result = JSON.parse(dispatchAction(operation).getContent());
+    } catch (err) {
+      result = {
+        status: "error",
+        message: err.toString()
+      };
+    }
+    results.push(result);
+    
+    if (result.status !== "success" && data.stopOnError) {
+      for (var j = i + 1; j < operations.length; j++) {
+        results.push({
+          status: "error",
+          message: "Skipped after the failure of operation " + i
+        });
+      }
+      break;
+    }
+  }
+  
+  return createSuccessResponse({
+    results: results
+  });
+}
+
+// Replace "$<index>.<field>" parameters with the results of earlier batch operations
+function resolveBatchReferences(operation, results) {
+  var resolved = {};
+  Object.keys(operation).forEach(function(key) {
+    var value = operation[key];
+    var match = typeof value === 'string' ? value.match(/^\$(\d+)\.(\w+)$/) : null;
+    if (match) {
+      var previous = results[parseInt(match[1], 10)];
+      if (!previous || previous.status !== "success") {
+        throw new Error("Referenced operation " + match[1] + " did not succeed.");
+      }
+      value = previous[match[2]];
+    }
+    resolved[key] = value;
+  });
+  return resolved;
+}
+
 // Response creators
 function createSuccessResponse(data) {
   return ContentService.createTextOutput(JSON.stringify({
@@ -715,6 +793,70 @@ function handleSendEmail(data) {
   return createSuccessResponse(result);
 }
 
+// Read-only scope of the tokens handed to the server, and the cache key they are kept under
+var ACCESS_TOKEN_SCOPE = 'https://www.googleapis.com/auth/drive.readonly';
+var ACCESS_TOKEN_CACHE_KEY = 'drive_readonly_access_token';
+
+// Handler for getting a short-lived OAuth token, used by the server to download file
+// contents directly from the Drive API (streamed, with Range support) instead of base64 JSON.
+// The token is not the script owner's (ScriptApp.getOAuthToken() carries every scope of the
+// script, including writing to Drive and sending mail) but a service account's, limited to
+// drive.readonly: the folders must be shared with SERVICE_ACCOUNT_EMAIL. It is reused until a
+// minute before it expires, and expiresIn is the lifetime it has left.
+function handleGetAccessToken(data) {
+  const cache = CacheService.getScriptCache();
+  const cached = cache.get(ACCESS_TOKEN_CACHE_KEY);
+  if (cached) {
+    const token = JSON.parse(cached);
+    return createSuccessResponse({
+      accessToken: token.accessToken,
+      expiresIn: Math.floor((token.expiresAt - Date.now()) / 1000)
+    });
+  }
+
+  const scriptProperties = PropertiesService.getScriptProperties();
+  const email = scriptProperties.getProperty('SERVICE_ACCOUNT_EMAIL');
+  const privateKey = scriptProperties.getProperty('SERVICE_ACCOUNT_PRIVATE_KEY');
+  if (!email || !privateKey) {
+    throw new Error("SERVICE_ACCOUNT_EMAIL and SERVICE_ACCOUNT_PRIVATE_KEY must be set in Script Properties.");
+  }
+
+  // Exchange a signed JWT for a token of the service account (OAuth 2.0 JWT bearer grant)
+  const now = Math.floor(Date.now() / 1000);
+  const encode = function(bytesOrText) {
+    return Utilities.base64EncodeWebSafe(bytesOrText).replace(/=+$/, '');
+  };
+  const unsigned = encode(JSON.stringify({ alg: 'RS256', typ: 'JWT' })) + '.' + encode(JSON.stringify({
+    iss: email,
+    scope: ACCESS_TOKEN_SCOPE,
+    aud: 'https://oauth2.googleapis.com/token',
+    iat: now,
+    exp: now + 3600
+  }));
+  const signature = Utilities.computeRsaSha256Signature(unsigned, privateKey.replace(/\\n/g, '\n'));
+  const response = UrlFetchApp.fetch('https://oauth2.googleapis.com/token', {
+    method: 'post',
+    payload: {
+      grant_type: 'urn:ietf:params:oauth:grant-type:jwt-bearer',
+      assertion: unsigned + '.' + encode(signature)
+    },
+    muteHttpExceptions: true
+  });
+  if (response.getResponseCode() !== 200) {
+    throw new Error("Error getting the service account token: " + response.getContentText());
+  }
+
+  const result = JSON.parse(response.getContentText());
+  cache.put(ACCESS_TOKEN_CACHE_KEY, JSON.stringify({
+    accessToken: result.access_token,
+    expiresAt: Date.now() + result.expires_in * 1000
+  }), Math.max(result.expires_in - 60, 1));
+  return createSuccessResponse({
+    accessToken: result.access_token,
+    expiresIn: result.expires_in
+  });
+}
+
 // Handler for getting file content
 function handleGetFileContent(data) {
   if (!data.fileId) {
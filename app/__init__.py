@@ -1,5 +1,6 @@
 import os
 import json
+import uuid
 from flask import Flask
 from flask_login import LoginManager
 from flask_migrate import Migrate
@@ -8,9 +9,11 @@ from werkzeug.security import generate_password_hash
 from pathlib import Path
 
 from app.models.models import db, User, init_db_from_json, init_categories_from_json
+from app.helpers.request_metrics import RequestMetrics
 
 login_manager = LoginManager()
 migrate = Migrate()
+request_metrics = RequestMetrics()
 
 def init_app_data(app):
     """Initialize application data like admin user and reference data."""
@@ -42,14 +45,14 @@ def init_app_data(app):
         except Exception as e:
             print(f"Error loading departamentos: {e}")
         
-        # Initialize the database with categorias from JSON
+        # Parse roles_categorias.json once and initialize the database with its categorias
         try:
-            with open(os.path.join(app.root_path, '../roles_categorias.json'), 'r', encoding='utf-8') as f:
-                json_data = json.load(f)
+            from app.helpers.roles_categorias import roles_categorias
+            if roles_categorias.load():
                 # Check if we need to initialize the database (if there are no categorias)
                 from app.models.models import Categoria
                 if Categoria.query.first() is None:
-                    init_categories_from_json(app, json_data)
+                    init_categories_from_json(app, roles_categorias.roles)
         except Exception as e:
             print(f"Error loading categorias: {e}")
             
@@ -79,7 +82,66 @@ def create_app():
     
     # Google Drive Configuration
     app.config['GOOGLE_DRIVE_CVS_FOLDER_ID'] = os.environ.get('GOOGLE_DRIVE_CVS_FOLDER_ID')
-    
+
+    # External API cache configuration (seconds)
+    app.config['ASIGNATURAS_CACHE_TTL'] = int(os.environ.get('ASIGNATURAS_CACHE_TTL', 3600))
+    app.config['ASIGNATURAS_CACHE_STALE_TTL'] = int(os.environ.get('ASIGNATURAS_CACHE_STALE_TTL', 86400))
+    app.config['DEPTO_HEADS_CACHE_TTL'] = int(os.environ.get('DEPTO_HEADS_CACHE_TTL', 3600))
+    app.config['CONSIDERANDOS_CACHE_TTL'] = int(os.environ.get('CONSIDERANDOS_CACHE_TTL', 600))
+
+    # Programas store: freshness of found and not found programas (seconds), how often the
+    # refresh job runs (seconds) and materias fetched and stored per step of the refresh
+    app.config['PROGRAMAS_CACHE_TTL'] = int(os.environ.get('PROGRAMAS_CACHE_TTL', 604800))
+    app.config['PROGRAMAS_NOT_FOUND_TTL'] = int(os.environ.get('PROGRAMAS_NOT_FOUND_TTL', 86400))
+    app.config['PROGRAMAS_REFRESH_INTERVAL'] = int(os.environ.get('PROGRAMAS_REFRESH_INTERVAL', 86400))
+    app.config['PROGRAMAS_REFRESH_BATCH_SIZE'] = int(os.environ.get('PROGRAMAS_REFRESH_BATCH_SIZE', 500))
+
+    # Programas API client (materias per request, concurrent requests, retries of a failed chunk)
+    app.config['PROGRAMAS_API_CHUNK_SIZE'] = int(os.environ.get('PROGRAMAS_API_CHUNK_SIZE', 50))
+    app.config['PROGRAMAS_API_MAX_CONCURRENCY'] = int(os.environ.get('PROGRAMAS_API_MAX_CONCURRENCY', 4))
+    app.config['PROGRAMAS_API_CHUNK_RETRIES'] = int(os.environ.get('PROGRAMAS_API_CHUNK_RETRIES', 1))
+
+    # Background warm-up of the external API caches at worker boot (check interval in seconds)
+    app.config['API_WARMUP_ENABLED'] = os.environ.get('API_WARMUP_ENABLED', 'true').lower() == 'true'
+    app.config['API_WARMUP_INTERVAL'] = int(os.environ.get('API_WARMUP_INTERVAL', 60))
+
+    # Reference data (departamentos, areas, orientaciones, categorías) cache, in seconds;
+    # writes in the same process invalidate it immediately
+    app.config['REFERENCE_DATA_CACHE_TTL'] = int(os.environ.get('REFERENCE_DATA_CACHE_TTL', 300))
+    # Document template configuration cache, in seconds; writes in the same process invalidate it immediately
+    app.config['TEMPLATE_CONFIG_CACHE_TTL'] = int(os.environ.get('TEMPLATE_CONFIG_CACHE_TTL', 300))
+
+    # Local cache of Drive file contents (0 bytes disables it; directory defaults to instance/drive_cache)
+    app.config['DRIVE_FILE_CACHE_MAX_BYTES'] = int(os.environ.get('DRIVE_FILE_CACHE_MAX_BYTES', 512 * 1024 * 1024))
+    app.config['DRIVE_FILE_CACHE_DIR'] = os.environ.get('DRIVE_FILE_CACHE_DIR')
+    app.config['DRIVE_FILE_CACHE_REVALIDATE'] = int(os.environ.get('DRIVE_FILE_CACHE_REVALIDATE', 60))
+
+    # Background job queue configuration (delays in seconds)
+    app.config['JOB_QUEUE_WORKERS'] = int(os.environ.get('JOB_QUEUE_WORKERS', 2))
+    app.config['JOB_QUEUE_POLL_INTERVAL'] = float(os.environ.get('JOB_QUEUE_POLL_INTERVAL', 5))
+    app.config['JOB_QUEUE_RETRY_BASE_DELAY'] = int(os.environ.get('JOB_QUEUE_RETRY_BASE_DELAY', 30))
+    app.config['JOB_QUEUE_RETRY_MAX_DELAY'] = int(os.environ.get('JOB_QUEUE_RETRY_MAX_DELAY', 3600))
+    app.config['JOB_QUEUE_STALE_TIMEOUT'] = int(os.environ.get('JOB_QUEUE_STALE_TIMEOUT', 900))
+
+    # Notification campaign sending (recipients per batch request, concurrent requests, recipients per second)
+    app.config['NOTIFICATION_BATCH_SIZE'] = int(os.environ.get('NOTIFICATION_BATCH_SIZE', 10))
+    app.config['NOTIFICATION_MAX_CONCURRENCY'] = int(os.environ.get('NOTIFICATION_MAX_CONCURRENCY', 4))
+    app.config['NOTIFICATION_RATE_LIMIT'] = float(os.environ.get('NOTIFICATION_RATE_LIMIT', 10))
+
+    # Document signing (stamping worker processes, seconds to wait for a stamp, attempts per signature,
+    # seconds a signer holds a document's signing lease, seconds between checks while another holds it).
+    # The lease must outlast a whole cycle: SIGNING_TIMEOUT plus the Drive download and upload timeouts
+    app.config['SIGNING_PROCESS_WORKERS'] = int(os.environ.get('SIGNING_PROCESS_WORKERS', 2))
+    app.config['SIGNING_TIMEOUT'] = int(os.environ.get('SIGNING_TIMEOUT', 120))
+    app.config['SIGNING_MAX_ATTEMPTS'] = int(os.environ.get('SIGNING_MAX_ATTEMPTS', 3))
+    app.config['SIGNING_LEASE_SECONDS'] = int(os.environ.get('SIGNING_LEASE_SECONDS', 600))
+    app.config['SIGNING_LEASE_POLL_INTERVAL'] = float(os.environ.get('SIGNING_LEASE_POLL_INTERVAL', 0.5))
+
+    # Request instrumentation (slow-request log threshold in ms, requests kept per endpoint)
+    app.config['REQUEST_METRICS_ENABLED'] = os.environ.get('REQUEST_METRICS_ENABLED', 'true').lower() == 'true'
+    app.config['REQUEST_METRICS_SLOW_MS'] = int(os.environ.get('REQUEST_METRICS_SLOW_MS', 1000))
+    app.config['REQUEST_METRICS_WINDOW'] = int(os.environ.get('REQUEST_METRICS_WINDOW', 200))
+
     # Set up database URI with absolute path in instance folder
     if os.environ.get('DATABASE_URI'):
         db_uri = os.environ.get('DATABASE_URI')
@@ -100,6 +162,7 @@ def create_app():
     login_manager.init_app(app)
     login_manager.login_view = 'auth.login'
     migrate.init_app(app, db)
+    request_metrics.init_app(app)
       # Register blueprints
     from app.routes.auth import auth as auth_blueprint
     app.register_blueprint(auth_blueprint)
@@ -111,6 +174,9 @@ def create_app():
     from app.routes.admin_sorteo_config import admin_sorteo_config_bp, init_sorteo_config
     app.register_blueprint(admin_sorteo_config_bp)
     
+    from app.routes.admin_metrics import admin_metrics_bp
+    app.register_blueprint(admin_metrics_bp)
+    
     from app.routes.postulantes import postulantes as postulantes_blueprint
     app.register_blueprint(postulantes_blueprint)
     
@@ -130,12 +196,20 @@ def create_app():
     # Register public blueprint
     from app.routes.public import public as public_blueprint
     app.register_blueprint(public_blueprint)
+    
+    # Register background jobs blueprint and job handlers
+    from app.routes.jobs import jobs_bp
+    app.register_blueprint(jobs_bp)
+    from app.services import job_handlers  # noqa: F401
+    # Keeps the full-text search index in sync with personas, postulantes and concursos
+    from app.services import search_index  # noqa: F401
       # Add context processor for template functions
     from app.helpers.api_services import get_programa_download_url
     @app.context_processor
     def utility_processor():
         return {
-            'get_programa_download_url': get_programa_download_url
+            'get_programa_download_url': get_programa_download_url,
+            'new_idempotency_key': lambda: uuid.uuid4().hex
         }
     
     # Add custom filters for templates
@@ -4,9 +4,9 @@ Contains core functions for generating documents from templates and specific doc
 """
 from datetime import datetime
 from flask_login import current_user
-from app.models.models import db, HistorialEstado, DocumentoConcurso, Concurso, Departamento, TribunalMiembro, DocumentTemplateConfig
+from app.models.models import db, HistorialEstado, DocumentoConcurso, Concurso, TribunalMiembro, DocumentTemplateConfig
 from app.integrations.google_drive import GoogleDriveAPI
-from app.services.placeholder_resolver import get_core_placeholders, replace_text_with_placeholders
+from app.services.placeholder_resolver import get_placeholder_context, compile_template
 import json
 import os
 import traceback
@@ -30,7 +30,7 @@ DOCUMENT_CONFIG_FALLBACK = {
     # Add more document types here with their configurations
 }
 
-def prepare_data_for_document(concurso_id, document_type):
+def prepare_data_for_document(concurso_id, document_type, template_config=None):
     """
     Prepare data for document templates based on document type.
     Uses the centralized placeholder resolver to get consistent data across all documents.
@@ -38,16 +38,20 @@ def prepare_data_for_document(concurso_id, document_type):
     Args:
         concurso_id (int): ID of the concurso
         document_type (str): Type of document to prepare data for
+        template_config (DocumentTemplateConfig, optional): Already loaded configuration for
+                                                            document_type, to avoid querying it again
         
     Returns:
         tuple: (data_dict, error_message) - The data dictionary to use in template or error message
     """
-    concurso = Concurso.query.get(concurso_id)
+    placeholder_context = get_placeholder_context(concurso_id)
+    concurso = placeholder_context.concurso
     if not concurso:
         return None, "Concurso no encontrado"
 
     # Get document configuration from database
-    template_config = DocumentTemplateConfig.query.filter_by(document_type_key=document_type).first()
+    if template_config is None:
+        template_config = DocumentTemplateConfig.query.filter_by(document_type_key=document_type).first()
     
     # If no template found in database, use fallback configuration
     if template_config:
@@ -65,8 +69,8 @@ def prepare_data_for_document(concurso_id, document_type):
         if not tribunal_members:
             return None, 'No hay miembros del tribunal asignados para este concurso.'
     
-    # Get core placeholders from the central resolver
-    placeholders_data = get_core_placeholders(concurso_id)
+    # Get core placeholders from the central resolver (shared with the rest of the request)
+    placeholders_data = placeholder_context.resolve()
     
     # Add any document-type specific placeholders if needed
     if document_type == 'ACTA_CONSTITUCION_TRIBUNAL_REGULAR':
@@ -137,14 +141,17 @@ def generar_documento_desde_template(concurso_id, template_name, doc_tipo, prepa
         
         # If no prepare_data_function is provided, use the default one
         if prepare_data_func is None:
-            prepare_data_func = prepare_data_for_document
-        
-        data, validation_message = prepare_data_func(concurso_id, doc_tipo)
+            data, validation_message = prepare_data_for_document(concurso_id, doc_tipo, template_config=template_config)
+        else:
+            data, validation_message = prepare_data_func(concurso_id, doc_tipo)
         
         # Check if data preparation succeeded
         if not data:
-            return False, validation_message, None        # Use the central placeholder resolver to get all data
-        placeholders_data = get_core_placeholders(concurso_id)
+            return False, validation_message, None
+        
+        # Use the central placeholder resolver to get all data. The request-scoped
+        # context already resolved everything while preparing the data above.
+        placeholders_data = get_placeholder_context(concurso_id).resolve()
         
         # Add committee and council information to placeholders data for template
         # Format committee date
@@ -200,18 +207,6 @@ def generar_documento_desde_template(concurso_id, template_name, doc_tipo, prepa
           # No need to query and process tribunal members again as they're already in the placeholders
         # Just ensure backward compatibility with field names
         
-        # Check if document type requires tribunal members
-        # Get document config from database first, fallback to hardcoded if not found
-        template_config = DocumentTemplateConfig.query.filter_by(document_type_key=doc_tipo).first()
-        
-        if template_config:
-            doc_config = {
-                'requires_tribunal': template_config.requires_tribunal_info,
-                'uses_considerandos_builder': template_config.uses_considerandos_builder
-            }
-        else:
-            doc_config = DOCUMENT_CONFIG_FALLBACK.get(doc_tipo, {'requires_tribunal': True, 'uses_considerandos_builder': False})
-            
         # Map central placeholder fields to legacy field names if they don't exist already
         if 'tribunal_titular' not in data and 'tribunal_titulares_lista' in placeholders_data:
             data['tribunal_titular'] = placeholders_data['tribunal_titulares_lista']
@@ -225,13 +220,16 @@ def generar_documento_desde_template(concurso_id, template_name, doc_tipo, prepa
         # Process considerandos text if provided - replace placeholders with actual values
         if considerandos_text:
             # Use the centralized placeholder resolver to replace placeholders in considerandos
-            processed_considerandos = replace_text_with_placeholders(considerandos_text, placeholders_data)
+            considerandos_template = compile_template(considerandos_text)
+            unknown_keys = considerandos_template.unknown_keys(placeholders_data)
+            if unknown_keys:
+                print(f"Considerandos use unknown placeholders: {', '.join(sorted(unknown_keys))}")
+            processed_considerandos = considerandos_template.render(placeholders_data)
             
             # Add processed considerandos to the main data dictionary
             data['considerandos'] = processed_considerandos        # Add the placeholders directly to template data for direct replacement
         # This ensures backward compatibility with existing templates
-        departamento = Departamento.query.get(concurso.departamento_id) if concurso.departamento_id else None
-        departamento_nombre = departamento.nombre if departamento else ""
+        departamento_nombre = placeholders_data.get('departamento_nombre', '')
         
         # Update template data with any specific template variables needed for compatibility
         for key, value in placeholders_data.items():
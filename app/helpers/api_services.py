@@ -2,10 +2,17 @@
 API service utilities for external API interactions.
 Contains functions for fetching data from external APIs used in the application.
 """
+import base64
+import time
 import requests
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from requests.adapters import HTTPAdapter
 from requests.auth import HTTPBasicAuth, HTTPDigestAuth
+from urllib.parse import urlparse
 import json
 from flask import current_app
+from app.helpers.cache import RefreshingCache
+from app.helpers.request_metrics import current_request_stats
 
 # URL to fetch considerandos options
 CONSIDERANDOS_API_URL = "https://script.google.com/macros/s/AKfycbz48ziHckZ-Ir6_gmXnUZF_S42AapQLnvpjktJXTnSbD1ps1lWimgkrxTzLXyiH_Eorlw/exec"
@@ -18,199 +25,179 @@ PROGRAMAS_API_URL = "https://huayca.crub.uncoma.edu.ar/catedras/1.0/rest/program
 # URL to download a programa file
 PROGRAMA_DOWNLOAD_URL = "https://huayca.crub.uncoma.edu.ar/programas/download/programa/{id_programa}"
 
-def get_considerandos_data(document_type, tipo_concurso=None):
+def fetch_considerandos_catalogue():
     """
-    Fetch considerandos data from the API for a specific document type.
-    This function now only retrieves the actual content of considerandos options,
-    as visibility and uniqueness checks are now handled by DocumentTemplateConfig.
-    
-    Args:
-        document_type (str): Type of document to get considerandos for (e.g., 'RESOLUCION_LLAMADO_TRIBUNAL')
-        tipo_concurso (str, optional): Type of concurso (kept for backward compatibility)
+    Download the considerandos options of every document type.
+    Used as the loader of the considerandos cache.
     
     Returns:
-        dict or None: Dictionary with document information including considerandos,
-                     or None if error or not found
+        list or None: Items as returned by the API, or None if the API call failed
     """
     try:
-        response = requests.get(CONSIDERANDOS_API_URL)
+        response = requests.get(CONSIDERANDOS_API_URL, timeout=30)
         if response.status_code != 200:
             return None
-        
-        data = response.json()
-        for item in data:
-            if item.get('document_type') == document_type:
-                # Return the item with considerandos data
-                return item
-                
-        return None
+        return response.json()
     except Exception as e:
         print(f"Error fetching considerandos data: {str(e)}")
         return None
 
-def get_departamento_heads_data():
+def fetch_departamento_heads():
     """
-    Fetch departamento heads data from the API.
+    Download the departamento heads data.
+    Used as the loader of the departamento heads cache.
     
     Returns:
-        list or None: List of departamento heads or None if error
+        list or None: List of departamento heads or None if the API call failed
     """
     try:
-        response = requests.get(DEPTO_HEADS_API_URL)
+        response = requests.get(DEPTO_HEADS_API_URL, timeout=30)
         if response.status_code != 200:
             return None
-        
         return response.json()
     except Exception as e:
         print(f"Error fetching departamento heads data: {str(e)}")
         return None
 
-def get_asignaturas_from_external_api(departamento, area, orientacion_concurso):
+# Shared copies of the Apps Script datasets, refreshed in the background once stale
+considerandos_cache = RefreshingCache(
+    'considerandos',
+    fetch_considerandos_catalogue,
+    ttl=600,
+    stale_ttl=86400,
+    ttl_config_key='CONSIDERANDOS_CACHE_TTL'
+)
+
+departamento_heads_cache = RefreshingCache(
+    'departamento heads',
+    fetch_departamento_heads,
+    ttl=3600,
+    stale_ttl=86400,
+    ttl_config_key='DEPTO_HEADS_CACHE_TTL'
+)
+
+def get_considerandos_data(document_type, tipo_concurso=None):
     """
-    Fetch and filter asignaturas from external API based on concurso criteria.
+    Get the considerandos data for a specific document type.
+    This function now only retrieves the actual content of considerandos options,
+    as visibility and uniqueness checks are now handled by DocumentTemplateConfig.
+    The options are served from the shared considerandos cache.
     
     Args:
-        departamento (str): Department name to match
-        area (str): Area name to match
-        orientacion_concurso (str): Orientation from the concurso to match
+        document_type (str): Type of document to get considerandos for (e.g., 'RESOLUCION_LLAMADO_TRIBUNAL')
+        tipo_concurso (str, optional): Type of concurso (kept for backward compatibility)
     
     Returns:
-        list: Filtered list of asignaturas matching the criteria
+        dict or None: Dictionary with document information including considerandos,
+                     or None if error or not found
     """
-    result = []
+    for item in considerandos_cache.get() or []:
+        if item.get('document_type') == document_type:
+            # Return the item with considerandos data
+            return item
+    return None
+
+def get_departamento_heads_data():
+    """
+    Get the departamento heads data, served from the shared departamento heads cache.
     
+    Returns:
+        list or None: List of departamento heads or None if it could never be loaded
+    """
+    return departamento_heads_cache.get()
+
+# Key used in the asignaturas index for materias whose orientacion is "sin orientación"
+SIN_ORIENTACION_KEY = "sin orientacion"
+
+def _normalize_accents(text):
+    """Strip the accents the catedras API is inconsistent about (á, é, í, ó, ú)."""
+    return text.replace('á', 'a').replace('é', 'e').replace('í', 'i').replace('ó', 'o').replace('ú', 'u')
+
+def _asignatura_key(departamento, area, orientacion):
+    """
+    Build the normalized index key used to look up asignaturas.
+    
+    Departamento is matched case-insensitively; area and orientacion are also
+    matched without accents. Empty orientaciones, orientaciones containing
+    "orientacion" and "sin orientacion" all map to SIN_ORIENTACION_KEY, which
+    only matches materias marked "sin orientación" in the API.
+    
+    Args:
+        departamento (str): Department name
+        area (str): Area name
+        orientacion (str): Orientation name
+    
+    Returns:
+        tuple: (departamento, area, orientacion) normalized key
+    """
+    departamento_norm = departamento.lower().strip() if departamento else ""
+    area_norm = _normalize_accents(area.lower().strip()) if area else ""
+    orientacion_norm = _normalize_accents(orientacion.lower().strip()) if orientacion else ""
+    
+    if not orientacion_norm or "orientacion" in orientacion_norm:
+        orientacion_norm = SIN_ORIENTACION_KEY
+    
+    return (departamento_norm, area_norm, orientacion_norm)
+
+def build_asignaturas_index(asignaturas):
+    """
+    Index the raw asignaturas catalogue by normalized (depto, area, orientacion).
+    
+    Args:
+        asignaturas (list): Raw list of materias returned by the catedras API
+    
+    Returns:
+        dict: Mapping of normalized key to the list of asignatura dicts to show
+    """
+    index = {}
+    
+    for asignatura in asignaturas:
+        depto_api = asignatura.get('depto', '') or ''
+        area_api = asignatura.get('area', '') or ''
+        orientacion_api = (asignatura.get('orientacion', '') or '').lower().strip()
+        
+        # Only "sin orientación" materias are reachable through SIN_ORIENTACION_KEY;
+        # any other orientacion is indexed under its own normalized name
+        if "sin orientacion" in _normalize_accents(orientacion_api):
+            orientacion_key = SIN_ORIENTACION_KEY
+        else:
+            orientacion_key = _normalize_accents(orientacion_api)
+        
+        key = (depto_api.lower().strip(), _normalize_accents(area_api.lower().strip()), orientacion_key)
+        
+        # Extract relevant fields for the filtered asignatura - no programa data lookup for initial load
+        index.setdefault(key, []).append({
+            'id_materia': asignatura.get('id_materia', ''),
+            'nombre_carrera': asignatura.get('nombre_carrera', ''),
+            'nombre_materia': asignatura.get('nombre_materia', ''),
+            'contenidos_minimos': asignatura.get('contenidos_minimos', ''),
+            'correlativas_para_cursar': asignatura.get('correlativas_para_cursar', ''),
+            'correlativas_para_aprobar': asignatura.get('correlativas_para_aprobar', ''),
+            'depto': asignatura.get('depto', ''),
+            'area': asignatura.get('area', ''),
+            'orientacion': asignatura.get('orientacion', ''),
+            'optativa': (asignatura.get('optativa', '') or '').upper()
+        })
+    
+    return index
+
+def fetch_asignaturas_catalogue():
+    """
+    Download the full asignaturas catalogue and build its lookup index.
+    Used as the loader of the shared asignaturas catalogue cache.
+    
+    Returns:
+        dict or None: Index built by build_asignaturas_index, or None if the API call failed
+    """
     try:
-        # Log input parameters for debugging
-        current_app.logger.info(f"Fetching asignaturas with parameters - departamento: '{departamento}', area: '{area}', orientacion: '{orientacion_concurso}'")
-        
-        # Authenticate and get response
         response = authenticate_catedras_api(ASIGNATURAS_API_URL)
         if not response:
-            return []
+            return None
         
-        # Parse JSON response
-        current_app.logger.info(f"Successfully authenticated to API. Content length: {len(response.text)}")
         asignaturas = response.json()
-        current_app.logger.info(f"Received {len(asignaturas)} asignaturas from API")
-        
-        # Log a few sample items to verify structure
-        if asignaturas and len(asignaturas) > 0:
-            current_app.logger.info(f"Sample item from API: {str(asignaturas[0])[:500]}")
-        
-        # Normalize inputs for comparison
-        departamento_norm = departamento.lower().strip() if departamento else ""
-        area_norm = area.lower().strip() if area else ""
-        orientacion_concurso_norm = orientacion_concurso.lower().strip() if orientacion_concurso else ""
-        
-        current_app.logger.info(f"Normalized search criteria - depto: '{departamento_norm}', area: '{area_norm}', orientacion: '{orientacion_concurso_norm}'")
-        
-        # Debug counter for filtered items
-        skipped_optativa = 0
-        skipped_depto_area = 0
-        skipped_orientacion = 0
-        matched_items = 0
-        
-        # Enable very verbose debugging if the list is empty or small
-        verbose_debug = len(asignaturas) < 50
-        
-        # Filter asignaturas based on criteria
-        for idx, asignatura in enumerate(asignaturas):
-            # Extra verbose debugging for small result sets
-            if verbose_debug:
-                current_app.logger.info(f"Item {idx+1}: {asignatura}")
-            
-            # Regular debug for some items
-            if matched_items < 2 and matched_items + skipped_optativa + skipped_depto_area + skipped_orientacion < 10:
-                current_app.logger.info(f"Checking asignatura: {asignatura.get('nombre_materia', 'N/A')} - depto: '{asignatura.get('depto', 'N/A')}', "
-                                      f"area: '{asignatura.get('area', 'N/A')}', orientacion: '{asignatura.get('orientacion', 'N/A')}', "
-                                      f"optativa: '{asignatura.get('optativa', 'N/A')}'")
-            
-            # No longer skip optativa subjects
-            optativa = asignatura.get('optativa', '').lower().strip()
-            
-            # Match departamento and area (case insensitive)
-            depto_api = asignatura.get('depto', '').lower().strip()
-            area_api = asignatura.get('area', '').lower().strip()
-            
-            # Function to normalize accents for comparison
-            def normalize_text(text):
-                return text.replace('á', 'a').replace('é', 'e').replace('í', 'i').replace('ó', 'o').replace('ú', 'u')
-            
-            # Compare with normalized inputs, including accent-insensitive comparison
-            depto_match = depto_api == departamento_norm
-            
-            # First try direct match for area
-            area_match = area_api == area_norm
-            
-            # If direct match fails, try without accents
-            if not area_match:
-                area_match = normalize_text(area_api) == normalize_text(area_norm)
-                if area_match:
-                    current_app.logger.info(f"Area matched after accent normalization")
-            
-            # Log partial matches
-            if matched_items < 1 and (depto_match or area_match):
-                current_app.logger.info(f"Partial match found - depto_match: {depto_match}, area_match: {area_match}")
-                current_app.logger.info(f"Comparing - API depto: '{depto_api}' vs input: '{departamento_norm}'")
-                current_app.logger.info(f"Comparing - API area: '{area_api}' vs input: '{area_norm}'")
-            
-            if not depto_match or not area_match:
-                skipped_depto_area += 1
-                continue
-            
-            # Handle orientacion matching
-            orientacion_api = asignatura.get('orientacion', '').lower().strip()
-            
-            # Debug orientacion matching
-            current_app.logger.info(f"Matching orientacion: API='{orientacion_api}' vs Input='{orientacion_concurso_norm}'")
-            
-            # Special case: if input orientacion contains "orientacion", is empty, or is "sin orientacion"
-            # then we should only match "sin orientación" in the API
-            if (not orientacion_concurso_norm or
-                "orientacion" in orientacion_concurso_norm or
-                orientacion_concurso_norm == "sin orientacion"):
-                    
-                if "sin orientacion" not in orientacion_api and "sin orientación" not in orientacion_api:
-                    skipped_orientacion += 1
-                    continue
-            # For specific orientations, check exact match or compare with normalized accents
-            elif orientacion_api != orientacion_concurso_norm:
-                # Try matching with normalized accents
-                if normalize_text(orientacion_api) == normalize_text(orientacion_concurso_norm):
-                    current_app.logger.info("Orientation matched after accent normalization")
-                else:
-                    skipped_orientacion += 1
-                    continue
-            
-            matched_items += 1
-            
-            # Debug for matched items
-            current_app.logger.info(f"Match found! - {asignatura.get('nombre_materia', 'N/A')}")
-            
-            # Extract relevant fields for the filtered asignatura - no programa data lookup for initial load
-            result.append({
-                'id_materia': asignatura.get('id_materia', ''),
-                'nombre_carrera': asignatura.get('nombre_carrera', ''),
-                'nombre_materia': asignatura.get('nombre_materia', ''),
-                'contenidos_minimos': asignatura.get('contenidos_minimos', ''),
-                'correlativas_para_cursar': asignatura.get('correlativas_para_cursar', ''),
-                'correlativas_para_aprobar': asignatura.get('correlativas_para_aprobar', ''),
-                'depto': asignatura.get('depto', ''),
-                'area': asignatura.get('area', ''),
-                'orientacion': asignatura.get('orientacion', ''),
-                'optativa': asignatura.get('optativa', '').upper()
-            })
-        
-        # Log filtering results
-        current_app.logger.info(f"Filtering results - total: {len(asignaturas)}, "
-                              f"skipped_optativa: {skipped_optativa}, "
-                              f"skipped_depto_area: {skipped_depto_area}, "
-                              f"skipped_orientacion: {skipped_orientacion}, "
-                              f"matched: {len(result)}")
-                                
-        # Log a few results for validation
-        for i, asig in enumerate(result[:3]):
-            current_app.logger.info(f"Result {i+1}: {asig['nombre_materia']} ({asig['nombre_carrera']})")
+        index = build_asignaturas_index(asignaturas)
+        current_app.logger.info(f"Loaded {len(asignaturas)} asignaturas from API into {len(index)} index entries")
+        return index
     
     except requests.exceptions.Timeout:
         current_app.logger.error("Timeout while connecting to asignaturas API")
@@ -225,50 +212,133 @@ def get_asignaturas_from_external_api(departamento, area, orientacion_concurso):
         import traceback
         current_app.logger.error(traceback.format_exc())
     
-    return result
+    return None
+
+# Shared, indexed copy of the asignaturas catalogue. Fresh for ASIGNATURAS_CACHE_TTL
+# seconds, then served stale for up to ASIGNATURAS_CACHE_STALE_TTL more while it refreshes.
+asignaturas_catalogue_cache = RefreshingCache(
+    'asignaturas',
+    fetch_asignaturas_catalogue,
+    ttl=3600,
+    stale_ttl=86400,
+    ttl_config_key='ASIGNATURAS_CACHE_TTL',
+    stale_ttl_config_key='ASIGNATURAS_CACHE_STALE_TTL'
+)
+
+def get_asignaturas_from_external_api(departamento, area, orientacion_concurso):
+    """
+    Get the asignaturas from the external API that match the concurso criteria.
+    The catalogue is served from the shared asignaturas cache, so this is a
+    dictionary lookup instead of a download and scan on every call.
+    
+    Args:
+        departamento (str): Department name to match
+        area (str): Area name to match
+        orientacion_concurso (str): Orientation from the concurso to match
+    
+    Returns:
+        list: Filtered list of asignaturas matching the criteria
+    """
+    index = asignaturas_catalogue_cache.get()
+    if not index:
+        return []
+    
+    result = index.get(_asignatura_key(departamento, area, orientacion_concurso), [])
+    current_app.logger.debug(f"Found {len(result)} asignaturas for depto '{departamento}', area '{area}', orientacion '{orientacion_concurso}'")
+    
+    # Return copies so callers can annotate results without touching the cache
+    return [dict(asignatura) for asignatura in result]
+
+# Credentials for the catedras API
+CATEDRAS_API_USER = 'usuario1'
+CATEDRAS_API_PASSWORD = 'pdf'
+# Connection pool settings for the shared catedras session
+CATEDRAS_POOL_CONNECTIONS = 4
+CATEDRAS_POOL_MAXSIZE = 10
+
+def _create_catedras_session():
+    """Create the process-wide keep-alive session used for every catedras API call."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=CATEDRAS_POOL_CONNECTIONS, pool_maxsize=CATEDRAS_POOL_MAXSIZE)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+_catedras_session = _create_catedras_session()
+
+# Authentication methods in the order they are tried. The auth objects are shared so
+# Digest auth can reuse the server nonce instead of paying a 401 challenge every call.
+_catedras_auth_methods = {
+    'digest': {'auth': HTTPDigestAuth(CATEDRAS_API_USER, CATEDRAS_API_PASSWORD)},
+    'basic': {'auth': HTTPBasicAuth(CATEDRAS_API_USER, CATEDRAS_API_PASSWORD)},
+    'basic_header': {'headers': {
+        'Authorization': 'Basic ' + base64.b64encode(f'{CATEDRAS_API_USER}:{CATEDRAS_API_PASSWORD}'.encode()).decode('ascii')
+    }},
+}
+_CATEDRAS_AUTH_ORDER = ['digest', 'basic', 'basic_header']
+
+# Host -> name of the authentication method that last worked for it
+_catedras_auth_by_host = {}
+
+def get_catedras_connection_stats():
+    """
+    Get connection reuse counters for the shared catedras session.
+    
+    Returns:
+        dict: Mapping of host to a dict with 'requests', 'connections' (new connections
+              opened), 'reused' (requests served on an existing connection) and 'auth_method'
+    """
+    stats = {}
+    for adapter in set(_catedras_session.adapters.values()):
+        pools = adapter.poolmanager.pools
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            host_stats = stats.setdefault(pool.host, {'requests': 0, 'connections': 0, 'reused': 0})
+            host_stats['requests'] += pool.num_requests
+            host_stats['connections'] += pool.num_connections
+            host_stats['reused'] += max(pool.num_requests - pool.num_connections, 0)
+    
+    for host, host_stats in stats.items():
+        host_stats['auth_method'] = _catedras_auth_by_host.get(host)
+    return stats
 
 def authenticate_catedras_api(url):
     """
     Authenticate with the catedras API using multiple methods if needed.
     
+    Requests go through a shared keep-alive session. The authentication method that
+    worked for a host is remembered and tried first on later calls, so a 401 only
+    costs extra round trips the first time (or after the server changes its auth).
+    
     Args:
         url (str): The API URL to authenticate with
         
     Returns:
         response: The requests response object or None if authentication failed
     """
-    session = requests.Session()
+    host = urlparse(url).hostname
     
     try:
-        # Method 1: Try Digest authentication
-        current_app.logger.info(f"Trying authentication method 1: Digest auth for {url}")
-        response = session.get(
-            url, 
-            auth=HTTPDigestAuth('usuario1', 'pdf'),
-            timeout=15
-        )
-        
-        # If first method fails, try Basic auth
-        if response.status_code == 401:
-            current_app.logger.info("Method 1 (Digest) failed with 401. Trying method 2: Basic auth")
-            response = session.get(
-                url, 
-                auth=HTTPBasicAuth('usuario1', 'pdf'),
-                timeout=15
-            )
+        remembered = _catedras_auth_by_host.get(host)
+        methods = _CATEDRAS_AUTH_ORDER
+        if remembered:
+            methods = [remembered] + [m for m in _CATEDRAS_AUTH_ORDER if m != remembered]
+        
+        response = None
+        for method in methods:
+            current_app.logger.debug(f"Trying {method} authentication for {url}")
+            response = _catedras_session.get(url, timeout=15, **_catedras_auth_methods[method])
             
-            # If Basic auth fails, try the Basic auth header approach
-            if response.status_code == 401:
-                current_app.logger.info("Method 2 (Basic) failed with 401. Trying method 3: Basic auth header")
-                import base64
-                auth_header = base64.b64encode(b'usuario1:pdf').decode('ascii')
-                headers = {'Authorization': f'Basic {auth_header}'}
-                
-                response = session.get(
-                    url,
-                    headers=headers,
-                    timeout=15
-                )
+            if response.status_code != 401:
+                if response.status_code == 200 and remembered != method:
+                    current_app.logger.info(f"Using {method} authentication for catedras API host {host}")
+                    _catedras_auth_by_host[host] = method
+                break
+            
+            current_app.logger.info(f"Authentication method {method} failed with 401 for {host}")
+            _catedras_auth_by_host.pop(host, None)
         
         # Check response status
         if response.status_code != 200:
@@ -292,7 +362,7 @@ def authenticate_catedras_api(url):
 
 def get_programa_by_id_materia(id_materia):
     """
-    Fetch programa information for a specific materia from the API.
+    Get programa information for a specific materia from the programas store.
     
     Args:
         id_materia (int): The ID of the materia to fetch programa for
@@ -304,11 +374,13 @@ def get_programa_by_id_materia(id_materia):
     try:
         current_app.logger.info(f"Fetching programa for materia ID: {id_materia}")
         
-        # Use the new bulk fetching function with a single ID
-        programas_map = get_programas_by_materia_ids([id_materia])
+        # Served from the programas store, which only goes upstream for materias never seen.
+        # Imported here to avoid a circular import
+        from app.services.programas_store import get_programas
+        programas_map = get_programas([id_materia])
         
         if not programas_map:
-            current_app.logger.warning(f"No response received from get_programas_by_materia_ids for ID {id_materia}")
+            current_app.logger.warning(f"No response received from the programas store for ID {id_materia}")
             return {'status': 'error', 'message': 'Error fetching programa', 'id_materia': str(id_materia)}
         
         # Extract the programa for the requested ID
@@ -347,27 +419,107 @@ def get_programa_by_id_materia(id_materia):
 
 def get_programas_by_materia_ids(materia_ids_list):
     """
-    Fetch programa information for multiple materiasIDs in a single API call.
+    Fetch programa information for multiple materia IDs.
+    
+    The IDs are split into chunks of PROGRAMAS_API_CHUNK_SIZE, fetched concurrently
+    (PROGRAMAS_API_MAX_CONCURRENCY requests at a time). The materias of a chunk that failed
+    are retried on their own (PROGRAMAS_API_CHUNK_RETRIES times) and keep an error entry
+    if they still fail, without affecting the other chunks.
     
     Args:
         materia_ids_list (list): List of materia IDs to fetch programas for
     
     Returns:
-        dict: Dictionary mapping each materia ID (as string) to its programa information
-              or to a not_found entry if no programa exists
+        dict: Dictionary mapping each materia ID (as string) to its programa information,
+              to a not_found entry if no programa exists, or to a not_found entry with an
+              'error' key if the API call failed
     """
-    # Initialize the result dictionary
-    final_result = {}
-    
-    # If the input list is empty, return an empty dictionary
-    if not materia_ids_list or len(materia_ids_list) == 0:
+    if not materia_ids_list:
         current_app.logger.info("Empty materia_ids_list provided to get_programas_by_materia_ids")
+        return {}
+    
+    config = current_app.config
+    chunk_size = max(config.get('PROGRAMAS_API_CHUNK_SIZE', 50), 1)
+    max_workers = max(config.get('PROGRAMAS_API_MAX_CONCURRENCY', 4), 1)
+    retries = max(config.get('PROGRAMAS_API_CHUNK_RETRIES', 1), 0)
+    
+    materia_ids_str_list = list(dict.fromkeys(str(mid) for mid in materia_ids_list))
+    chunks = [materia_ids_str_list[start:start + chunk_size]
+              for start in range(0, len(materia_ids_str_list), chunk_size)]
+    
+    if len(chunks) == 1:
+        final_result, timings = _fetch_programas_chunk_with_retries(chunks[0], retries)
+        _report_programas_chunk(1, 1, len(chunks[0]), timings)
         return final_result
     
+    # The worker threads need an app context for the config and the logger
+    app = current_app._get_current_object()
+    
+    def fetch(chunk):
+        with app.app_context():
+            return _fetch_programas_chunk_with_retries(chunk, retries)
+    
+    final_result = {}
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(chunks))) as executor:
+        futures = {executor.submit(fetch, chunk): number for number, chunk in enumerate(chunks, start=1)}
+        for future in as_completed(futures):
+            number = futures[future]
+            chunk_result, timings = future.result()
+            _report_programas_chunk(number, len(chunks), len(chunks[number - 1]), timings)
+            final_result.update(chunk_result)
+    
+    # Keep the order of the requested IDs
+    return {mid: final_result[mid] for mid in materia_ids_str_list if mid in final_result}
+
+def _fetch_programas_chunk_with_retries(materia_ids_str_list, retries):
+    """
+    Fetch a chunk of programas, retrying the materias whose request failed.
+    
+    Returns:
+        tuple: (result dict, list of seconds taken by each attempt)
+    """
+    result = {}
+    timings = []
+    pending = materia_ids_str_list
+    for attempt in range(retries + 1):
+        started = time.perf_counter()
+        fetched = _fetch_programas_chunk(pending)
+        timings.append(time.perf_counter() - started)
+        result.update(fetched)
+        pending = [mid for mid in pending if 'error' in result.get(mid, {'error': 'missing'})]
+        if not pending:
+            break
+        if attempt < retries:
+            current_app.logger.warning(f"Retrying {len(pending)} programas after a failed request")
+    return result, timings
+
+def _report_programas_chunk(number, total, size, timings):
+    """Log the timing of a chunk and add it to the stats of the current request."""
+    current_app.logger.info(
+        f"Programas chunk {number}/{total}: {size} materias in {sum(timings) * 1000:.0f} ms "
+        f"({len(timings)} attempt{'s' if len(timings) > 1 else ''})"
+    )
+    # Requests made from worker threads are not seen by the request instrumentation
+    stats = current_request_stats()
+    if stats is not None and total > 1:
+        host = urlparse(PROGRAMAS_API_URL).hostname
+        for seconds in timings:
+            stats.add_http(host, seconds)
+
+def _fetch_programas_chunk(materia_ids_str_list):
+    """
+    Fetch programa information for a chunk of materia IDs in a single API call.
+    
+    Args:
+        materia_ids_str_list (list): Materia IDs as strings
+    
+    Returns:
+        dict: Same format as get_programas_by_materia_ids
+    """
+    # Initialize the result dictionary
+    final_result = {}
+    
     try:
-        # Convert all IDs to strings for consistent keying and URL parameter formatting
-        materia_ids_str_list = [str(mid) for mid in materia_ids_list]
-        
         # Construct the comma-separated string of IDs for the URL parameter
         ids_param = ",".join(materia_ids_str_list)
         
@@ -443,35 +595,27 @@ def get_programas_by_materia_ids(materia_ids_list):
         
         return final_result
     except requests.exceptions.Timeout:
-        current_app.logger.error(f"Timeout while connecting to programas API for IDs: {ids_param if 'ids_param' in locals() else materia_ids_list}")
-        # Check if materia_ids_str_list exists, otherwise use the original list
-        id_list = materia_ids_str_list if 'materia_ids_str_list' in locals() else materia_ids_list
-        return {str(mid): {'not_found': True, 'id_materia': str(mid), 'error': 'api_timeout'} 
-                for mid in id_list}
+        current_app.logger.error(f"Timeout while connecting to programas API for IDs: {','.join(materia_ids_str_list)}")
+        return {mid: {'not_found': True, 'id_materia': mid, 'error': 'api_timeout'} 
+                for mid in materia_ids_str_list}
                 
     except requests.exceptions.RequestException as e:
         current_app.logger.error(f"Error connecting to programas API: {str(e)}")
-        # Check if materia_ids_str_list exists, otherwise use the original list
-        id_list = materia_ids_str_list if 'materia_ids_str_list' in locals() else materia_ids_list
-        return {str(mid): {'not_found': True, 'id_materia': str(mid), 'error': 'request_exception'} 
-                for mid in id_list}
+        return {mid: {'not_found': True, 'id_materia': mid, 'error': 'request_exception'} 
+                for mid in materia_ids_str_list}
                 
     except json.JSONDecodeError as e:
         current_app.logger.error(f"Invalid JSON response from programas API: {str(e)}")
         if 'response' in locals():
             current_app.logger.error(f"Response content: {response.text[:500]}")
-        # Check if materia_ids_str_list exists, otherwise use the original list
-        id_list = materia_ids_str_list if 'materia_ids_str_list' in locals() else materia_ids_list
-        return {str(mid): {'not_found': True, 'id_materia': str(mid), 'error': 'invalid_json'} 
-                for mid in id_list}
+        return {mid: {'not_found': True, 'id_materia': mid, 'error': 'invalid_json'} 
+                for mid in materia_ids_str_list}
     except Exception as e:
         current_app.logger.error(f"Unexpected error fetching programas: {str(e)}")
         import traceback
         current_app.logger.error(traceback.format_exc())
-        # Check if materia_ids_str_list exists, otherwise use the original list
-        id_list = materia_ids_str_list if 'materia_ids_str_list' in locals() else materia_ids_list
-        return {str(mid): {'not_found': True, 'id_materia': str(mid), 'error': 'unexpected_error'} 
-                for mid in id_list}
+        return {mid: {'not_found': True, 'id_materia': mid, 'error': 'unexpected_error'} 
+                for mid in materia_ids_str_list}
 
 def get_programa_download_url(id_programa):
     """
@@ -0,0 +1,154 @@
+"""
+In-process caching utilities.
+Contains a small TTL cache with stale-while-revalidate refresh used to keep
+slow external datasets (catedras API, Apps Script endpoints) out of the request path.
+"""
+import threading
+import time
+import logging
+
+from flask import current_app, has_app_context
+
+logger = logging.getLogger(__name__)
+
+
+class RefreshingCache:
+    """
+    Process-wide cache for a single value produced by a loader function.
+
+    The value is considered fresh for ``ttl`` seconds. After that, and for up to
+    ``stale_ttl`` additional seconds, the stale value is still served while a
+    background thread reloads it (stale-while-revalidate). Past that window the
+    value is reloaded synchronously. If a reload fails (the loader raises or
+    returns None) the previous value is kept.
+
+    TTLs can be overridden per application through the config keys given in
+    ``ttl_config_key`` and ``stale_ttl_config_key``.
+    """
+
+    def __init__(self, name, loader, ttl=3600, stale_ttl=86400,
+                 ttl_config_key=None, stale_ttl_config_key=None):
+        """
+        Args:
+            name (str): Name used in log messages
+            loader (callable): Function without arguments that returns the value to cache
+            ttl (int): Seconds a loaded value is considered fresh
+            stale_ttl (int): Extra seconds a stale value may be served while it is refreshed
+            ttl_config_key (str, optional): App config key overriding ttl
+            stale_ttl_config_key (str, optional): App config key overriding stale_ttl
+        """
+        self.name = name
+        self.loader = loader
+        self.default_ttl = ttl
+        self.default_stale_ttl = stale_ttl
+        self.ttl_config_key = ttl_config_key
+        self.stale_ttl_config_key = stale_ttl_config_key
+
+        self._value = None
+        self._loaded_at = None
+        self._lock = threading.Lock()
+        self._refreshing = False
+
+    def _config_value(self, key, default):
+        if key and has_app_context():
+            return current_app.config.get(key, default)
+        return default
+
+    @property
+    def ttl(self):
+        return self._config_value(self.ttl_config_key, self.default_ttl)
+
+    @property
+    def stale_ttl(self):
+        return self._config_value(self.stale_ttl_config_key, self.default_stale_ttl)
+
+    @property
+    def age(self):
+        """Seconds since the cached value was loaded, or None if nothing is cached."""
+        if self._loaded_at is None:
+            return None
+        return time.monotonic() - self._loaded_at
+
+    def get(self):
+        """
+        Return the cached value, loading or refreshing it as needed.
+
+        Returns:
+            The cached value, or None if it could never be loaded
+        """
+        age = self.age
+        if age is not None and age < self.ttl:
+            return self._value
+
+        if age is not None and age < self.ttl + self.stale_ttl:
+            self._refresh_in_background()
+            return self._value
+
+        # Nothing usable cached: load synchronously. The lock keeps concurrent
+        # requests from all hitting the upstream at the same time.
+        with self._lock:
+            age = self.age
+            if age is None or age >= self.ttl + self.stale_ttl:
+                self._load()
+        return self._value
+
+    def set(self, value):
+        """Store a value obtained elsewhere (e.g. from a warm-up job)."""
+        self._value = value
+        self._loaded_at = time.monotonic()
+
+    def refresh(self):
+        """
+        Reload the value synchronously.
+
+        Returns:
+            bool: True if a new value was loaded
+        """
+        with self._lock:
+            return self._load()
+
+    def invalidate(self):
+        """Drop the cached value so the next get() reloads it."""
+        with self._lock:
+            self._value = None
+            self._loaded_at = None
+
+    def _load(self):
+        try:
+            value = self.loader()
+        except Exception as e:
+            self._log_error(f"Error loading {self.name} cache: {str(e)}")
+            return False
+
+        if value is None:
+            self._log_error(f"Loader for {self.name} cache returned no data, keeping previous value")
+            return False
+
+        self.set(value)
+        return True
+
+    def _refresh_in_background(self):
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+
+        app = current_app._get_current_object() if has_app_context() else None
+
+        def worker():
+            try:
+                if app is not None:
+                    with app.app_context():
+                        self.refresh()
+                else:
+                    self.refresh()
+            finally:
+                self._refreshing = False
+
+        threading.Thread(target=worker, name=f"{self.name}-refresh", daemon=True).start()
+
+    def _log_error(self, message):
+        if has_app_context():
+            current_app.logger.error(message)
+        else:
+            logger.error(message)
@@ -0,0 +1,240 @@
+"""
+On-disk cache of Google Drive file contents.
+Files are stored as <cache dir>/<file id>/<revision>, where the revision is the Drive
+md5Checksum (or version for Google Docs), and the least recently used files are evicted
+when the cache grows past DRIVE_FILE_CACHE_MAX_BYTES.
+"""
+import hashlib
+import logging
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+
+from flask import current_app, has_app_context
+
+logger = logging.getLogger(__name__)
+
+# Drive IDs and revisions only contain these characters; anything else is dropped from paths
+_UNSAFE_PATH_CHARS = re.compile(r'[^A-Za-z0-9_-]')
+
+# Size of the chunks written to disk while downloading
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
+
+def file_revision(metadata):
+    """
+    Get the revision key of a file from its Drive metadata.
+
+    Args:
+        metadata (dict): Drive file metadata with md5Checksum and/or version
+
+    Returns:
+        str: md5 of the content for binary files, or "v<version>" for Google Docs
+    """
+    if metadata.get('md5Checksum'):
+        return metadata['md5Checksum']
+    return f"v{metadata.get('version', 0)}"
+
+
+class DriveFileCache:
+    """
+    Size-bounded LRU cache of Drive file contents on local disk, shared by the
+    processes that use the same cache directory.
+
+    A cached revision is trusted for DRIVE_FILE_CACHE_REVALIDATE seconds; after that
+    the file's Drive metadata is checked (a small request) before serving it again.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._validated = {}  # file_id -> (revision, checked at)
+        self._size = None  # Total bytes on disk, computed on first use
+
+    # Configuration
+
+    @property
+    def enabled(self):
+        return has_app_context() and current_app.config.get('DRIVE_FILE_CACHE_MAX_BYTES', 0) > 0
+
+    @property
+    def directory(self):
+        return current_app.config.get('DRIVE_FILE_CACHE_DIR') or os.path.join(current_app.instance_path, 'drive_cache')
+
+    @property
+    def max_bytes(self):
+        return current_app.config.get('DRIVE_FILE_CACHE_MAX_BYTES', 0)
+
+    @property
+    def revalidate_after(self):
+        return current_app.config.get('DRIVE_FILE_CACHE_REVALIDATE', 60)
+
+    def _file_dir(self, file_id):
+        return os.path.join(self.directory, _UNSAFE_PATH_CHARS.sub('', file_id))
+
+    def _path(self, file_id, revision):
+        return os.path.join(self._file_dir(file_id), _UNSAFE_PATH_CHARS.sub('', revision))
+
+    # Public API
+
+    def get_path(self, drive_api, file_id):
+        """
+        Get the local path of a file's current content, downloading it on a miss.
+
+        Args:
+            drive_api (GoogleDriveAPI): Client used to check metadata and download
+            file_id (str): The ID of the Drive file
+
+        Returns:
+            str: Path of the cached file
+        """
+        validated = self._validated.get(file_id)
+        if validated and time.time() - validated[1] < self.revalidate_after:
+            path = self._path(file_id, validated[0])
+            if self._touch(path):
+                return path
+
+        revision = file_revision(drive_api.get_file_metadata(file_id))
+        path = self._path(file_id, revision)
+        if not self._touch(path):
+            self._download(drive_api, file_id, path)
+        self._validated[file_id] = (revision, time.time())
+        return path
+
+    def read(self, drive_api, file_id):
+        """
+        Get a file's content as bytes, from the cache when possible.
+
+        Returns:
+            bytes: The file content
+        """
+        with open(self.get_path(drive_api, file_id), 'rb') as f:
+            return f.read()
+
+    def put(self, file_id, content):
+        """
+        Store content that was just uploaded under a file ID, so its first view is a hit.
+
+        Args:
+            file_id (str): The ID of the Drive file
+            content (bytes): The file content
+        """
+        if not self.enabled or not file_id:
+            return
+        try:
+            revision = hashlib.md5(content).hexdigest()
+            path = self._path(file_id, revision)
+            self._write(path, [content])
+            self._validated[file_id] = (revision, time.time())
+        except Exception as e:
+            logger.error(f"Error caching Drive file {file_id}: {str(e)}")
+
+    def invalidate(self, file_id):
+        """Remove every cached revision of a file."""
+        self._validated.pop(file_id, None)
+        if not self.enabled or not file_id:
+            return
+        file_dir = self._file_dir(file_id)
+        removed = self._dir_size(file_dir)
+        shutil.rmtree(file_dir, ignore_errors=True)
+        with self._lock:
+            if self._size is not None:
+                self._size = max(self._size - removed, 0)
+
+    def clear(self):
+        """Remove every cached file."""
+        self._validated.clear()
+        if has_app_context():
+            shutil.rmtree(self.directory, ignore_errors=True)
+        with self._lock:
+            self._size = None
+
+    # Internals
+
+    def _touch(self, path):
+        """Mark a cached file as recently used. Returns False if it is not cached."""
+        try:
+            os.utime(path)
+            return True
+        except OSError:
+            return False
+
+    def _download(self, drive_api, file_id, path):
+        with drive_api.open_file_stream(file_id) as response:
+            self._write(path, response.iter_content(DOWNLOAD_CHUNK_SIZE))
+
+    def _write(self, path, chunks):
+        """Write chunks to a temporary file and move it into place, replacing older revisions."""
+        file_dir = os.path.dirname(path)
+        os.makedirs(file_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=file_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                for chunk in chunks:
+                    f.write(chunk)
+            # Older revisions of the file are obsolete; other writers' temporary files are left alone
+            removed = sum(self._remove(os.path.join(file_dir, name))
+                          for name in os.listdir(file_dir)
+                          if not name.endswith('.tmp') and os.path.join(file_dir, name) != path)
+            written = os.path.getsize(tmp_path)
+            os.replace(tmp_path, path)
+        except Exception:
+            self._remove(tmp_path)
+            raise
+
+        with self._lock:
+            if self._size is None:
+                self._size = self._dir_size(self.directory)
+            else:
+                self._size += written - removed
+            over_limit = self._size > self.max_bytes
+        if over_limit:
+            self._evict()
+
+    def _evict(self):
+        """Delete the least recently used files until the cache is at 90% of its limit."""
+        entries = []
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                file_path = os.path.join(root, name)
+                try:
+                    stat = os.stat(file_path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, file_path))
+
+        total = sum(size for _, size, _ in entries)
+        target = self.max_bytes * 0.9
+        for _, size, file_path in sorted(entries):
+            if total <= target:
+                break
+            total -= self._remove(file_path)
+
+        with self._lock:
+            self._size = total
+
+    @staticmethod
+    def _remove(path):
+        """Remove a file, returning the number of bytes freed."""
+        try:
+            size = os.path.getsize(path)
+            os.remove(path)
+            return size
+        except OSError:
+            return 0
+
+    @staticmethod
+    def _dir_size(directory):
+        total = 0
+        for root, _, names in os.walk(directory):
+            for name in names:
+                try:
+                    total += os.path.getsize(os.path.join(root, name))
+                except OSError:
+                    pass
+        return total
+
+
+drive_file_cache = DriveFileCache()
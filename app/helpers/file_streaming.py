@@ -0,0 +1,67 @@
+"""
+Helpers to stream Google Drive files to the browser in chunks, honoring HTTP Range requests,
+so large documents are never held in memory as a whole.
+"""
+import base64
+import io
+import logging
+
+from flask import Response, request, send_file
+
+from app.helpers.drive_file_cache import drive_file_cache
+from app.integrations.google_drive import AccessTokenUnavailable
+
+logger = logging.getLogger(__name__)
+
+# Size of the chunks passed through from Drive to the client
+STREAM_CHUNK_SIZE = 64 * 1024
+
+# Headers of the Drive response that are forwarded to the client
+PASSTHROUGH_HEADERS = ('Content-Length', 'Content-Range', 'ETag', 'Last-Modified')
+
+def stream_drive_file(drive_api, file_id, mimetype='application/pdf', download_name=None):
+    """
+    Build a streamed response with the content of a Google Drive file.
+    When the local file cache is enabled the file is served from disk; otherwise the
+    Range header of the current request is forwarded to Drive. If the bridge cannot hand
+    out a Drive API token, the file is fetched whole through get_file_content instead.
+    Either way, partial requests from PDF viewers are answered with 206 Partial Content.
+
+    Args:
+        drive_api (GoogleDriveAPI): Client used to open the download
+        file_id (str): The ID of the file to send
+        mimetype (str): MIME type of the response
+        download_name (str, optional): File name for the Content-Disposition header
+
+    Returns:
+        Response: The streamed Flask response
+    """
+    if drive_file_cache.enabled:
+        try:
+            return send_file(drive_file_cache.get_path(drive_api, file_id), mimetype=mimetype,
+                             download_name=download_name, conditional=True)
+        except Exception as e:
+            logger.error(f"Error serving Drive file {file_id} from cache: {str(e)}")
+
+    try:
+        drive_response = drive_api.open_file_stream(file_id, request.headers.get('Range'))
+    except AccessTokenUnavailable as e:
+        logger.warning(f"Serving Drive file {file_id} through the Apps Script bridge: {str(e)}")
+        content = base64.b64decode(drive_api.get_file_content(file_id)['fileData'])
+        return send_file(io.BytesIO(content), mimetype=mimetype, download_name=download_name,
+                         conditional=True)
+
+    headers = {name: drive_response.headers[name] for name in PASSTHROUGH_HEADERS if name in drive_response.headers}
+    headers['Accept-Ranges'] = 'bytes'
+    if download_name:
+        headers['Content-Disposition'] = f'inline; filename="{download_name}"'
+
+    def generate():
+        try:
+            for chunk in drive_response.iter_content(STREAM_CHUNK_SIZE):
+                yield chunk
+        finally:
+            drive_response.close()
+
+    return Response(generate(), status=drive_response.status_code, headers=headers,
+                    mimetype=mimetype, direct_passthrough=True)
@@ -1,5 +1,7 @@
 from PyPDF2 import PdfReader, PdfWriter
+from PyPDF2.generic import ArrayObject, DecodedStreamObject, DictionaryObject, FloatObject, NameObject
 import io
+import uuid
 from reportlab.pdfgen import canvas
 from reportlab.lib.pagesizes import letter
 from reportlab.lib.colors import HexColor
@@ -29,21 +31,146 @@ def convert_byte_array_to_bytes(byte_array):
         logger.error(f"Error converting byte array to bytes: {str(e)}")
         return None
 
-def add_signature_stamp(pdf_content, apellido, nombre, dni, cargo=None, signature_count=0):
-    """Add a signature stamp to the footer of each page in a PDF.
+# Stamps per column, width of a column, distance from the right edge of the page, gap between
+# columns and the least distance from the left edge of the page
+STAMPS_PER_COLUMN = 10
+STAMP_COLUMN_WIDTH = 360
+STAMP_RIGHT_MARGIN = 50
+STAMP_COLUMN_GAP = 20
+STAMP_LEFT_MARGIN = 10
+STAMP_FONT_SIZE = 8
+
+def _stamp_column_width(page_width):
+    """Width of a stamp column: fixed, unless the page is too narrow for it."""
+    return min(STAMP_COLUMN_WIDTH, page_width - STAMP_RIGHT_MARGIN - STAMP_LEFT_MARGIN)
+
+def _stamp_font_size(text_width, page_width):
+    """Font size of a stamp, reduced from STAMP_FONT_SIZE when its text (text_width wide at
+    STAMP_FONT_SIZE) does not fit in a column."""
+    return STAMP_FONT_SIZE * min(1, _stamp_column_width(page_width) / text_width)
+
+def _stamp_position(text_width, page_width, signature_count):
+    """Get the position of a stamp: stacked upwards from the bottom right corner, ten per column.
+    
+    Columns have a fixed width and are right aligned, so the position of a stamp depends only
+    on its number and not on the stamps signed with it. As many columns as fit on the page are
+    placed side by side; once a row of columns is full the next stamps start a new one above it.
+    
+    Args:
+        text_width (float): Width of the text in points, at most the column width
+        page_width (float): Width of the page in points
+        signature_count (int): Number of signatures before this one (0-based)
+        
+    Returns:
+        tuple: (x, y) of the start of the text
+    """
+    column_width = _stamp_column_width(page_width)
+    usable_width = page_width - STAMP_RIGHT_MARGIN - STAMP_LEFT_MARGIN
+    columns = max(1, int((usable_width + STAMP_COLUMN_GAP) // (column_width + STAMP_COLUMN_GAP)))
+    band, stamp = divmod(signature_count, columns * STAMPS_PER_COLUMN)
+    column, row = divmod(stamp, STAMPS_PER_COLUMN)
+    
+    # Each signature will be placed higher than the previous one
+    y_position = 20 + (12 * (band * STAMPS_PER_COLUMN + row))
+    
+    # Every column starts to the left of the previous one
+    right_edge = page_width - STAMP_RIGHT_MARGIN - column * (column_width + STAMP_COLUMN_GAP)
+    return right_edge - text_width, y_position
+
+def _render_signature_stamps(stamps, page_width, page_height):
+    """Render several signature stamps on one blank page of the given size.
+    
+    Args:
+        stamps (list): (stamp_text, signature_count) of each stamp
+        page_width (float): Width of the page in points
+        page_height (float): Height of the page in points
+        
+    Returns:
+        PageObject: A page with only the stamps drawn on it
+    """
+    packet = io.BytesIO()
+    can = canvas.Canvas(packet, pagesize=(page_width, page_height))
+    
+    for stamp_text, signature_count in stamps:
+        # Stamps too long for a column are written smaller
+        font_size = _stamp_font_size(can.stringWidth(stamp_text, "Helvetica", STAMP_FONT_SIZE), page_width)
+        can.setFont("Helvetica", font_size)
+        text_width = can.stringWidth(stamp_text, "Helvetica", font_size)
+        x_position, y_position = _stamp_position(text_width, page_width, signature_count)
+        
+        # Add background for better visibility
+        border_width = text_width + 10
+        border_height = 12
+        
+        # Draw a filled rectangle with light background
+        can.setFillColorRGB(0.95, 0.95, 0.95)  # Light gray background
+        can.rect(x_position - 5, y_position - 2, border_width, border_height, fill=True)
+        
+        # Draw border
+        can.setStrokeColorRGB(0.8, 0.8, 0.8)  # Light gray border
+        can.rect(x_position - 5, y_position - 2, border_width, border_height)
+        
+        # Draw text
+        can.setFillColorRGB(0, 0, 0)  # Black text
+        can.drawString(x_position, y_position, stamp_text)
+    can.save()
+    
+    packet.seek(0)
+    return PdfReader(packet).pages[0]
+
+def _add_stamp_xobject(writer, stamp_page, page_width, page_height):
+    """Add a stamp page to a writer as a Form XObject that every page can reference.
+    
+    Args:
+        writer (PdfWriter): The writer of the output document
+        stamp_page (PageObject): Page with the stamp drawn on it
+        page_width (float): Width of the stamp's bounding box
+        page_height (float): Height of the stamp's bounding box
+        
+    Returns:
+        IndirectObject: Reference to the XObject in the writer
+    """
+    form = DecodedStreamObject()
+    form.set_data(stamp_page.get_contents().get_data())
+    form.update({
+        NameObject('/Type'): NameObject('/XObject'),
+        NameObject('/Subtype'): NameObject('/Form'),
+        NameObject('/BBox'): ArrayObject([FloatObject(0), FloatObject(0), FloatObject(page_width), FloatObject(page_height)]),
+        NameObject('/Resources'): stamp_page['/Resources'].clone(writer),
+    })
+    return writer._add_object(form)
+
+def _stream_reference(writer, data):
+    """Add a content stream with the given data to a writer and return its reference."""
+    stream = DecodedStreamObject()
+    stream.set_data(data)
+    return writer._add_object(stream)
+
+def _stamp_text(signer, timestamp):
+    """Text of a signer's stamp."""
+    if signer.get('cargo'):
+        return (f"Firmado por: {signer['apellido']}, {signer['nombre']} "
+                f"(Cargo: {signer['cargo']}, DNI: {signer['dni']}) - {timestamp}")
+    return f"Firmado por: {signer['apellido']}, {signer['nombre']} (DNI: {signer['dni']}) - {timestamp}"
+
+def add_signature_stamps(pdf_content, signers, signature_count=0):
+    """Add the signature stamps of several signers to the footer of each page in a PDF.
+    
+    The PDF is parsed and written once whatever the number of signers: all the stamps are
+    laid out (stacked, ten per column) on a single overlay, added to the output as one Form
+    XObject that each page references.
     
     Args:
         pdf_content (bytes or str): Either PDF bytes or a comma-separated byte array string
-        apellido (str): Last name of the signer
-        nombre (str): First name of the signer
-        dni (str): DNI of the signer
-        cargo (str, optional): Role or position of the signer. If provided, included in stamp.
-        signature_count (int): Current count of signatures on the document (0-based)
+        signers (list): Dicts with apellido, nombre, dni and optionally cargo, in signing order
+        signature_count (int): Number of signatures the document already has
         
     Returns:
-        bytes: The modified PDF with stamps added
+        bytes: The modified PDF with stamps added, or the original content if stamping failed
     """
-    logger.info(f"Adding signature for {apellido}, {nombre} (DNI: {dni}), signature count: {signature_count}")
+    logger.info(f"Adding {len(signers)} signatures, signature count: {signature_count}")
+    if not signers:
+        return pdf_content
     
     try:
         # Check if input is a string (byte array) and convert if necessary
@@ -62,81 +189,55 @@ def add_signature_stamp(pdf_content, apellido, nombre, dni, cargo=None, signatur
         page = existing_pdf.pages[0]
         page_width = float(page.mediabox.width)
         page_height = float(page.mediabox.height)
-          # Create timestamp
+        # Create timestamp
         timestamp = datetime.now().strftime('%d/%m/%Y %H:%M:%S')
         
-        # Prepare stamp text
-        if cargo:
-            stamp_text = f"Firmado por: {apellido}, {nombre} (Cargo: {cargo}, DNI: {dni}) - {timestamp}"
-        else:
-            stamp_text = f"Firmado por: {apellido}, {nombre} (DNI: {dni}) - {timestamp}"
-        
-        # Metadata to be added to the PDF - note the forward slashes for PDF spec compliance
+        # Metadata to be added to the PDF - note the forward slashes for PDF spec compliance.
+        # It describes the last signer, as if the signatures had been added one at a time
+        last = signers[-1]
         metadata = {
-            '/SignerNombre': nombre,
-            '/SignerApellido': apellido,
-            '/SignerDNI': dni,
+            '/SignerNombre': last['nombre'],
+            '/SignerApellido': last['apellido'],
+            '/SignerDNI': last['dni'],
             '/SignerTimestamp': timestamp,
-            '/SignatureCount': str(signature_count + 1),
+            '/SignatureCount': str(signature_count + len(signers)),
         }
         
         # Add cargo to metadata if provided
-        if cargo:
-            metadata['/SignerCargo'] = cargo
+        if last.get('cargo'):
+            metadata['/SignerCargo'] = last['cargo']
         
-        # Add each page with a stamp
-        for i in range(len(existing_pdf.pages)):
-            # Get the page
-            page = existing_pdf.pages[i]
-            
-            # Create stamp template for this page
-            packet = io.BytesIO()
-            can = canvas.Canvas(packet, pagesize=(page_width, page_height))
-            can.setFont("Helvetica", 8)
+        # Render the stamps once and share them between all pages
+        stamps = [(_stamp_text(signer, timestamp), signature_count + offset) for offset, signer in enumerate(signers)]
+        stamp_page = _render_signature_stamps(stamps, page_width, page_height)
+        stamp_ref = _add_stamp_xobject(output, stamp_page, page_width, page_height)
+        stamp_name = NameObject(f"/FirmaStamp{uuid.uuid4().hex[:8]}")
+        
+        # Shared content streams that isolate the original content and then draw the stamp
+        prefix_ref = _stream_reference(output, b"q\n")
+        suffix_ref = _stream_reference(output, b"\nQ\nq " + stamp_name.encode() + b" Do Q\n")
+        
+        # Add each page with a reference to the stamp
+        for original_page in existing_pdf.pages:
+            page = output.add_page(original_page)
             
-            # Calculate position based on signature count
-            # Each signature will be placed higher than the previous one
-            y_position = 20 + (12 * signature_count)
+            # Register the stamp in the page resources
+            if '/Resources' not in page:
+                page[NameObject('/Resources')] = DictionaryObject()
+            resources = page['/Resources'].get_object()
+            if '/XObject' not in resources:
+                resources[NameObject('/XObject')] = DictionaryObject()
+            resources['/XObject'].get_object()[stamp_name] = stamp_ref
             
-            # Maximum of 10 signatures before wrapping to second column
-            if signature_count >= 10:
-                # Start a second column on the left side
-                column = 1 + (signature_count // 10)
-                row = signature_count % 10
-                y_position = 20 + (12 * row)
-                text_width = can.stringWidth(stamp_text, "Helvetica", 8)
-                x_position = page_width - text_width - 50 - (column * 200)  # Move left for each column
+            # Wrap the original content and append the stamp
+            contents = page.raw_get('/Contents') if '/Contents' in page else None
+            if contents is None:
+                original_contents = []
+            elif isinstance(contents.get_object(), ArrayObject):
+                original_contents = list(contents.get_object())
             else:
-                # Add text at bottom of page
-                text_width = can.stringWidth(stamp_text, "Helvetica", 8)
-                x_position = page_width - text_width - 50  # 50 points from right margin
-            
-            # Add background for better visibility
-            border_width = text_width + 10
-            border_height = 12
-            
-            # Draw a filled rectangle with light background
-            can.setFillColorRGB(0.95, 0.95, 0.95)  # Light gray background
-            can.rect(x_position - 5, y_position - 2, border_width, border_height, fill=True)
-            
-            # Draw border
-            can.setStrokeColorRGB(0.8, 0.8, 0.8)  # Light gray border
-            can.rect(x_position - 5, y_position - 2, border_width, border_height)
-            
-            # Draw text
-            can.setFillColorRGB(0, 0, 0)  # Black text
-            can.drawString(x_position, y_position, stamp_text)
-            can.save()
-            
-            # Move to beginning of the BytesIO buffer
-            packet.seek(0)
-            stamp = PdfReader(packet)
-            
-            # Merge the stamp with the page
-            page.merge_page(stamp.pages[0])
-            
-            # Add page to output
-            output.add_page(page)
+                original_contents = [contents]
+            page[NameObject('/Contents')] = ArrayObject([prefix_ref, *original_contents, suffix_ref])
         
         # Add metadata to the PDF
         output.add_metadata(metadata)
@@ -146,14 +247,31 @@ def add_signature_stamp(pdf_content, apellido, nombre, dni, cargo=None, signatur
         output.write(output_buffer)
         output_buffer.seek(0)
         
-        logger.info(f"Successfully added signature stamp to PDF, output size: {len(output_buffer.getvalue())} bytes")
+        logger.info(f"Successfully added signature stamps to PDF, output size: {len(output_buffer.getvalue())} bytes")
         return output_buffer.getvalue()
         
     except Exception as e:
-        logger.error(f"Error adding signature stamp to PDF: {str(e)}")
+        logger.error(f"Error adding signature stamps to PDF: {str(e)}")
         # Return original content in the same format it was received
         return pdf_content
 
+def add_signature_stamp(pdf_content, apellido, nombre, dni, cargo=None, signature_count=0):
+    """Add a signature stamp to the footer of each page in a PDF.
+    
+    Args:
+        pdf_content (bytes or str): Either PDF bytes or a comma-separated byte array string
+        apellido (str): Last name of the signer
+        nombre (str): First name of the signer
+        dni (str): DNI of the signer
+        cargo (str, optional): Role or position of the signer. If provided, included in stamp.
+        signature_count (int): Current count of signatures on the document (0-based)
+        
+    Returns:
+        bytes: The modified PDF with stamps added
+    """
+    signer = {'apellido': apellido, 'nombre': nombre, 'dni': dni, 'cargo': cargo}
+    return add_signature_stamps(pdf_content, [signer], signature_count=signature_count)
+
 def verify_signed_pdf(pdf_bytes, expected_signers):
     """Verify if a PDF contains signatures from all expected signers.
     
@@ -0,0 +1,46 @@
+"""
+Rate limiting helpers for concursos docentes application.
+"""
+import threading
+import time
+
+class RateLimiter:
+    """
+    Thread-safe token bucket allowing `rate` units per second, with bursts of up to
+    `burst` units. A rate of 0 (or less) disables the limit.
+    """
+
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.burst = burst if burst is not None else max(rate, 1)
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, units=1):
+        """
+        Wait until `units` tokens are available and consume them.
+
+        Args:
+            units (int): Number of tokens to consume (e.g. one per email recipient)
+
+        Returns:
+            float: Seconds spent waiting
+        """
+        if self.rate <= 0:
+            return 0.0
+
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                # Requests larger than the bucket are let through once it is full
+                needed = min(units, self.burst)
+                if self._tokens >= needed:
+                    self._tokens -= units
+                    return waited
+                delay = (needed - self._tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
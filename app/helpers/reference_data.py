@@ -0,0 +1,138 @@
+"""
+Reference data cache for concursos docentes application.
+Keeps an immutable tree of departamentos, areas, orientaciones and categorías in memory,
+with the JSON served to the concurso form dropdowns precomputed, so they do not hit the
+database on every change. The tree is dropped whenever one of those tables is written.
+"""
+import hashlib
+import json
+from collections import namedtuple
+from types import MappingProxyType
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.helpers.cache import RefreshingCache
+from app.models.models import Departamento, Area, Orientacion, Categoria
+
+DepartamentoRef = namedtuple('DepartamentoRef', 'id nombre areas')
+AreaRef = namedtuple('AreaRef', 'id nombre orientaciones')
+OrientacionRef = namedtuple('OrientacionRef', 'id nombre')
+CategoriaRef = namedtuple('CategoriaRef', 'id codigo nombre rol')
+
+# Models whose changes invalidate the cached tree
+REFERENCE_MODELS = (Departamento, Area, Orientacion, Categoria)
+
+class JsonBlob:
+    """A precomputed JSON response body with its ETag."""
+
+    def __init__(self, value):
+        self.body = json.dumps(value, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        self.etag = hashlib.sha1(self.body).hexdigest()
+
+class ReferenceData:
+    """
+    Immutable snapshot of the reference data.
+
+    Attributes:
+        departamentos (tuple): DepartamentoRef, each with its AreaRef and OrientacionRef tuples
+        categorias (tuple): CategoriaRef
+        version (str): Hash of the whole tree, changes whenever any reference row changes
+    """
+
+    def __init__(self, departamentos, categorias):
+        self.departamentos = departamentos
+        self.categorias = categorias
+
+        self.tree_json = JsonBlob({
+            'departamentos': [{
+                'id': depto.id,
+                'nombre': depto.nombre,
+                'areas': [{
+                    'id': area.id,
+                    'nombre': area.nombre,
+                    'orientaciones': [o._asdict() for o in area.orientaciones]
+                } for area in depto.areas]
+            } for depto in departamentos],
+            'categorias': [categoria._asdict() for categoria in categorias]
+        })
+        self.version = self.tree_json.etag
+
+        self._areas_json = MappingProxyType({
+            depto.id: JsonBlob([{'id': area.id, 'nombre': area.nombre} for area in depto.areas])
+            for depto in departamentos
+        })
+        self._orientaciones_json = MappingProxyType({
+            (depto.id, area.nombre): JsonBlob([o._asdict() for o in area.orientaciones])
+            for depto in departamentos for area in depto.areas
+        })
+
+    def areas_json(self, departamento_id):
+        """JsonBlob with the areas of a departamento, or None if it does not exist."""
+        return self._areas_json.get(departamento_id)
+
+    def orientaciones_json(self, departamento_id, area_nombre):
+        """JsonBlob with the orientaciones of an area, or None if the area does not exist."""
+        return self._orientaciones_json.get((departamento_id, area_nombre))
+
+def load_reference_data():
+    """
+    Build the reference data tree from the database, with one query per table.
+
+    Returns:
+        ReferenceData: The loaded snapshot
+    """
+    orientaciones_by_area = {}
+    for orientacion in Orientacion.query.order_by(Orientacion.id).all():
+        orientaciones_by_area.setdefault(orientacion.area_id, []).append(
+            OrientacionRef(orientacion.id, orientacion.nombre)
+        )
+
+    areas_by_departamento = {}
+    for area in Area.query.order_by(Area.id).all():
+        areas_by_departamento.setdefault(area.departamento_id, []).append(
+            AreaRef(area.id, area.nombre, tuple(orientaciones_by_area.get(area.id, ())))
+        )
+
+    departamentos = tuple(
+        DepartamentoRef(depto.id, depto.nombre, tuple(areas_by_departamento.get(depto.id, ())))
+        for depto in Departamento.query.order_by(Departamento.id).all()
+    )
+    categorias = tuple(
+        CategoriaRef(categoria.id, categoria.codigo, categoria.nombre, categoria.rol)
+        for categoria in Categoria.query.order_by(Categoria.id).all()
+    )
+    return ReferenceData(departamentos, categorias)
+
+# Writes in this process invalidate the tree immediately; the TTL bounds how long
+# a write made by another worker process can go unnoticed.
+reference_data_cache = RefreshingCache(
+    'reference data',
+    load_reference_data,
+    ttl=300,
+    stale_ttl=0,
+    ttl_config_key='REFERENCE_DATA_CACHE_TTL'
+)
+
+def get_reference_data():
+    """
+    Get the cached reference data, loading it if needed.
+
+    Returns:
+        ReferenceData: The current snapshot
+    """
+    return reference_data_cache.get()
+
+@event.listens_for(Session, 'after_flush')
+def _track_reference_writes(session, flush_context):
+    if any(isinstance(obj, REFERENCE_MODELS) for obj in (*session.new, *session.dirty, *session.deleted)):
+        session.info['reference_data_changed'] = True
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_after_commit(session):
+    if session.info.pop('reference_data_changed', False):
+        reference_data_cache.invalidate()
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _forget_rolled_back_writes(session, previous_transaction):
+    session.info.pop('reference_data_changed', None)
@@ -0,0 +1,228 @@
+"""
+Request instrumentation for concursos docentes application.
+Counts the SQL statements and outbound HTTP calls made while handling each request,
+reports them in a Server-Timing header, keeps a rolling summary per endpoint and logs
+slow requests.
+"""
+import logging
+import threading
+import time
+from collections import deque
+from urllib.parse import urlparse
+
+from flask import current_app, g, request, has_app_context
+from requests.adapters import HTTPAdapter
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+_hooks_lock = threading.Lock()
+_hooks_installed = False
+
+
+class RequestStats:
+    """SQL and HTTP activity of a single request."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.sql_count = 0
+        self.sql_time = 0.0
+        self.http = {}  # host -> [call count, seconds]
+
+    def add_sql(self, seconds):
+        self.sql_count += 1
+        self.sql_time += seconds
+
+    def add_http(self, host, seconds):
+        calls = self.http.setdefault(host, [0, 0.0])
+        calls[0] += 1
+        calls[1] += seconds
+
+    @property
+    def http_count(self):
+        return sum(count for count, _ in self.http.values())
+
+    @property
+    def http_time(self):
+        return sum(seconds for _, seconds in self.http.values())
+
+
+def current_request_stats():
+    """
+    Get the stats of the request being handled.
+
+    Returns:
+        RequestStats: The stats, or None outside an instrumented request (e.g. in job workers)
+    """
+    if not has_app_context():
+        return None
+    return g.get('_request_stats')
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None and current_request_stats() is not None:
+        context._request_metrics_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, '_request_metrics_started', None)
+    stats = current_request_stats()
+    if started is not None and stats is not None:
+        stats.add_sql(time.perf_counter() - started)
+
+
+_original_adapter_send = HTTPAdapter.send
+
+
+def _instrumented_adapter_send(self, prepared_request, *args, **kwargs):
+    stats = current_request_stats()
+    if stats is None:
+        return _original_adapter_send(self, prepared_request, *args, **kwargs)
+    started = time.perf_counter()
+    try:
+        return _original_adapter_send(self, prepared_request, *args, **kwargs)
+    finally:
+        host = urlparse(prepared_request.url).hostname or 'unknown'
+        stats.add_http(host, time.perf_counter() - started)
+
+
+def _install_hooks():
+    """Hook into every SQLAlchemy engine and every requests adapter, once per process."""
+    global _hooks_installed
+    with _hooks_lock:
+        if _hooks_installed:
+            return
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+        HTTPAdapter.send = _instrumented_adapter_send
+        _hooks_installed = True
+
+
+class RequestMetrics:
+    """
+    Flask extension recording, for every request, the number and duration of SQL
+    statements and outbound HTTP calls (per host) and the total time.
+
+    The figures are sent back in a ``Server-Timing`` header, the last
+    ``REQUEST_METRICS_WINDOW`` requests of each endpoint are kept for summary(),
+    and requests slower than ``REQUEST_METRICS_SLOW_MS`` are logged as warnings.
+    """
+
+    def __init__(self, app=None):
+        self._samples = {}
+        self._totals = {}
+        self._lock = threading.Lock()
+        self.window = 200
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('REQUEST_METRICS_ENABLED', True)
+        app.config.setdefault('REQUEST_METRICS_SLOW_MS', 1000)
+        app.config.setdefault('REQUEST_METRICS_WINDOW', 200)
+        app.extensions['request_metrics'] = self
+        if not app.config['REQUEST_METRICS_ENABLED']:
+            return
+
+        self.window = app.config['REQUEST_METRICS_WINDOW']
+        _install_hooks()
+        app.before_request(self._start_request)
+        app.after_request(self._finish_request)
+
+    def _start_request(self):
+        g._request_stats = RequestStats()
+
+    def _finish_request(self, response):
+        stats = g.pop('_request_stats', None)
+        if stats is None:
+            return response
+        total = time.perf_counter() - stats.started
+
+        response.headers.add('Server-Timing', build_server_timing(stats, total))
+
+        endpoint = request.endpoint or 'unknown'
+        if endpoint != 'static':
+            self.record(endpoint, total, stats)
+
+        if total * 1000 >= current_app.config['REQUEST_METRICS_SLOW_MS']:
+            logger.warning(
+                "Slow request %s %s (%s): %.0f ms, %d SQL statements (%.0f ms), %d HTTP calls (%.0f ms)",
+                request.method, request.path, endpoint, total * 1000, stats.sql_count,
+                stats.sql_time * 1000, stats.http_count, stats.http_time * 1000
+            )
+        return response
+
+    def record(self, endpoint, total, stats):
+        """
+        Add a request to the rolling window of its endpoint.
+
+        Args:
+            endpoint (str): Flask endpoint name
+            total (float): Seconds spent handling the request
+            stats (RequestStats): SQL and HTTP activity of the request
+        """
+        sample = (total, stats.sql_count, stats.sql_time, stats.http_count, stats.http_time)
+        with self._lock:
+            samples = self._samples.get(endpoint)
+            if samples is None:
+                samples = self._samples[endpoint] = deque(maxlen=self.window)
+            samples.append(sample)
+            self._totals[endpoint] = self._totals.get(endpoint, 0) + 1
+
+    def summary(self):
+        """
+        Summarize the recent requests of every endpoint.
+
+        Returns:
+            list: One dict per endpoint, slowest average first, with the number of requests
+                  (in the window and since start-up), total time (avg/p95/max ms) and average
+                  SQL statements, SQL time, HTTP calls and HTTP time
+        """
+        with self._lock:
+            snapshot = {endpoint: list(samples) for endpoint, samples in self._samples.items()}
+            totals = dict(self._totals)
+
+        rows = []
+        for endpoint, samples in snapshot.items():
+            n = len(samples)
+            times = sorted(sample[0] * 1000 for sample in samples)
+            rows.append({
+                'endpoint': endpoint,
+                'requests': n,
+                'total_requests': totals.get(endpoint, n),
+                'avg_ms': round(sum(times) / n, 1),
+                'p95_ms': round(times[min(n - 1, int(n * 0.95))], 1),
+                'max_ms': round(times[-1], 1),
+                'avg_sql_count': round(sum(sample[1] for sample in samples) / n, 1),
+                'max_sql_count': max(sample[1] for sample in samples),
+                'avg_sql_ms': round(sum(sample[2] for sample in samples) * 1000 / n, 1),
+                'avg_http_count': round(sum(sample[3] for sample in samples) / n, 1),
+                'avg_http_ms': round(sum(sample[4] for sample in samples) * 1000 / n, 1),
+            })
+        rows.sort(key=lambda row: row['avg_ms'], reverse=True)
+        return rows
+
+    def reset(self):
+        """Forget every recorded request."""
+        with self._lock:
+            self._samples.clear()
+            self._totals.clear()
+
+
+def build_server_timing(stats, total):
+    """
+    Build a Server-Timing header value for a request.
+
+    Args:
+        stats (RequestStats): SQL and HTTP activity of the request
+        total (float): Seconds spent handling the request
+
+    Returns:
+        str: e.g. 'db;dur=12.5;desc="8 queries", http-drive.google.com;dur=310.2;desc="2 calls", total;dur=340.1'
+    """
+    metrics = [f'db;dur={stats.sql_time * 1000:.1f};desc="{stats.sql_count} queries"']
+    for host, (count, seconds) in sorted(stats.http.items()):
+        metrics.append(f'http-{host};dur={seconds * 1000:.1f};desc="{count} calls"')
+    metrics.append(f'total;dur={total * 1000:.1f}')
+    return ', '.join(metrics)
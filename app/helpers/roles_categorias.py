@@ -0,0 +1,134 @@
+"""
+Registry of the roles and categorías defined in roles_categorias.json.
+Parses the file once, indexes the required documentation by categoría and dedicación,
+and reloads it when the file changes on disk.
+"""
+import json
+import logging
+import os
+import threading
+
+from flask import current_app, has_app_context
+
+logger = logging.getLogger(__name__)
+
+ROLES_CATEGORIAS_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+                                     'roles_categorias.json')
+
+class RolesCategoriasRegistry:
+    """
+    Indexed, read-only view of roles_categorias.json.
+
+    Lookups check the file's modification time and reparse it if it changed, so edits
+    are picked up without restarting the application. If the file cannot be read or
+    parsed, the last good version is kept.
+    """
+
+    def __init__(self, path=ROLES_CATEGORIAS_PATH):
+        self.path = path
+        self._mtime = None
+        self._lock = threading.Lock()
+        self._roles = ()
+        self._categorias = {}
+        self._required_docs = {}
+
+    def load(self):
+        """
+        Parse the file and rebuild the indexes.
+
+        Returns:
+            bool: True if the file was loaded
+        """
+        with self._lock:
+            return self._load()
+
+    def _load(self):
+        mtime = None
+        try:
+            mtime = os.stat(self.path).st_mtime
+            with open(self.path, 'r', encoding='utf-8') as f:
+                roles_data = json.load(f)
+
+            categorias = {}
+            required_docs = {}
+            for rol in roles_data:
+                for cat in rol['categorias']:
+                    categorias[cat['codigo']] = {**cat, 'rol': rol['nombre']}
+                    documentacion = cat.get('documentacionRequerida') or {}
+                    base = tuple(documentacion.get('base', ()))
+                    required_docs[(cat['codigo'], None)] = base
+                    for dedicacion, docs in (documentacion.get('porDedicacion') or {}).items():
+                        required_docs[(cat['codigo'], dedicacion)] = base + tuple(docs)
+        except Exception as e:
+            self._log_error(f"Error loading {self.path}: {str(e)}")
+            if mtime is not None and self._mtime is not None:
+                # Don't retry a broken edit on every lookup, only once the file changes again
+                self._mtime = mtime
+            return False
+
+        self._roles = tuple(roles_data)
+        self._categorias = categorias
+        self._required_docs = required_docs
+        self._mtime = mtime
+        return True
+
+    def _reload_if_changed(self):
+        try:
+            mtime = os.stat(self.path).st_mtime
+        except OSError:
+            mtime = None
+        if mtime == self._mtime or (mtime is None and self._mtime is not None):
+            # Unchanged, or removed after a successful load: keep the last good version
+            return
+        with self._lock:
+            if self._mtime is None or mtime != self._mtime:
+                self._load()
+
+    @property
+    def roles(self):
+        """The parsed list of roles, each with its categorías."""
+        self._reload_if_changed()
+        return self._roles
+
+    def get_categoria(self, codigo):
+        """
+        Get a categoría by its code.
+
+        Args:
+            codigo (str): Categoría code (e.g. 'PTIT')
+
+        Returns:
+            dict: The categoría as defined in the file plus its 'rol', or None if unknown
+        """
+        self._reload_if_changed()
+        return self._categorias.get(codigo)
+
+    def get_categoria_nombre(self, codigo):
+        """Get the name of a categoría, or None if the code is unknown."""
+        categoria = self.get_categoria(codigo)
+        return categoria['nombre'] if categoria else None
+
+    def get_required_documents(self, codigo, dedicacion=None):
+        """
+        Get the documents a postulante must present for a categoría and dedicación.
+
+        Args:
+            codigo (str): Categoría code
+            dedicacion (str, optional): Dedicación (Simple, Parcial, Exclusiva)
+
+        Returns:
+            list: Document type keys, base documents first. Empty if the categoría is unknown.
+        """
+        self._reload_if_changed()
+        docs = self._required_docs.get((codigo, dedicacion))
+        if docs is None:
+            docs = self._required_docs.get((codigo, None), ())
+        return list(docs)
+
+    def _log_error(self, message):
+        if has_app_context():
+            current_app.logger.error(message)
+        else:
+            logger.error(message)
+
+roles_categorias = RolesCategoriasRegistry()
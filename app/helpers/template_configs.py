@@ -0,0 +1,187 @@
+"""
+Document template configuration cache for concursos docentes application.
+Keeps read-only copies of every DocumentTemplateConfig row in memory, keyed by document
+type, together with their tribunal visibility rules compiled into predicates, so pages
+that check what can be done with each document do not query or parse them on every
+view. The copies are dropped whenever a template configuration is written.
+"""
+import json
+from collections import namedtuple
+from types import MappingProxyType
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.helpers.cache import RefreshingCache
+from app.models.models import DocumentTemplateConfig
+
+class TemplateConfigRef(namedtuple('TemplateConfigRef',
+                                   [column.key for column in DocumentTemplateConfig.__table__.columns])):
+    """Read-only copy of a DocumentTemplateConfig, with the same attributes and helpers."""
+    __slots__ = ()
+
+    get_tribunal_visibility_rules = DocumentTemplateConfig.get_tribunal_visibility_rules
+    is_visible_for_concurso_tipo = DocumentTemplateConfig.is_visible_for_concurso_tipo
+
+class DefaultVisibility:
+    """
+    Visibility of documents whose template has no tribunal visibility rules: actas are
+    always visible, other documents once they are pending signature or signed.
+    """
+
+    ALWAYS_VISIBLE = frozenset(('ACTA_CONSTITUCION_TRIBUNAL_REGULAR', 'ACTA_DICTAMEN', 'ACTA_SORTEO'))
+    VISIBLE_ESTADOS = frozenset(('FIRMADO', 'PENDIENTE DE FIRMA'))
+
+    def __call__(self, documento, miembro_tribunal=None):
+        if documento.tipo in self.ALWAYS_VISIBLE:
+            return True
+        if 'acta constitucion tribunal' in documento.tipo.lower().replace('_', ' '):
+            return True
+        return documento.estado in self.VISIBLE_ESTADOS
+
+class RuleVisibility:
+    """
+    Visibility given by a template's rules: for each document estado, the roles and
+    claustros (both must match) of the members who can see it.
+    """
+
+    def __init__(self, rules):
+        # estado -> (visible to someone, allowed roles, allowed claustros); roles and
+        # claustros are None when the estado's rules are malformed
+        self._estados = {}
+        for estado, state_rules in rules.items():
+            if isinstance(state_rules, dict):
+                entry = (bool(state_rules), self._as_set(state_rules.get('roles', [])),
+                         self._as_set(state_rules.get('claustros', [])))
+            else:
+                entry = (bool(state_rules), None, None)
+            self._estados[estado] = entry
+
+    @staticmethod
+    def _as_set(values):
+        return frozenset(values) if isinstance(values, (list, tuple)) else values
+
+    def __call__(self, documento, miembro_tribunal=None):
+        entry = self._estados.get(documento.estado)
+        if entry is None:
+            return False
+        visible, roles, claustros = entry
+        if miembro_tribunal is None:
+            return visible
+        if roles is None:
+            return False
+        try:
+            return miembro_tribunal.rol in roles and miembro_tribunal.claustro in claustros
+        except TypeError:
+            return False
+
+def _never_visible(documento, miembro_tribunal=None):
+    return False
+
+DEFAULT_VISIBILITY = DefaultVisibility()
+
+def compile_visibility_rule(rules_json):
+    """
+    Compile a template's tribunal visibility rules into a predicate.
+
+    Args:
+        rules_json (str): The JSON stored in DocumentTemplateConfig.tribunal_visibility_rules
+
+    Returns:
+        callable: predicate(documento, miembro_tribunal=None) -> bool. Templates without rules
+                  use the default visibility; rules that cannot be parsed hide the document.
+    """
+    if not rules_json:
+        return DEFAULT_VISIBILITY
+    try:
+        rules = json.loads(rules_json)
+    except (json.JSONDecodeError, TypeError):
+        return _never_visible
+    if not isinstance(rules, dict):
+        return _never_visible
+    return RuleVisibility(rules)
+
+class TemplateConfigs:
+    """
+    Immutable snapshot of the document template configurations.
+
+    Attributes:
+        all (tuple): TemplateConfigRef of every configuration, active or not
+        by_key (Mapping): TemplateConfigRef by document_type_key
+    """
+
+    def __init__(self, configs):
+        self.all = configs
+        self.by_key = MappingProxyType({config.document_type_key: config for config in configs})
+        self._visibility = MappingProxyType({
+            config.document_type_key: compile_visibility_rule(config.tribunal_visibility_rules)
+            for config in configs
+        })
+
+    def get(self, document_type_key):
+        """Get the configuration of a document type, or None if it has none."""
+        return self.by_key.get(document_type_key)
+
+    def visibility_rule(self, document_type_key):
+        """Get the compiled tribunal visibility predicate of a document type."""
+        return self._visibility.get(document_type_key, DEFAULT_VISIBILITY)
+
+def load_template_configs():
+    """
+    Load every template configuration in one query.
+
+    Returns:
+        TemplateConfigs: The loaded snapshot
+    """
+    columns = DocumentTemplateConfig.__table__.columns
+    rows = DocumentTemplateConfig.query.with_entities(*columns).order_by(DocumentTemplateConfig.id).all()
+    return TemplateConfigs(tuple(TemplateConfigRef(*row) for row in rows))
+
+# Writes in this process invalidate the snapshot immediately; the TTL bounds how long
+# a write made by another worker process can go unnoticed.
+template_config_cache = RefreshingCache(
+    'document template configs',
+    load_template_configs,
+    ttl=300,
+    stale_ttl=0,
+    ttl_config_key='TEMPLATE_CONFIG_CACHE_TTL'
+)
+
+def get_template_configs():
+    """
+    Get the cached template configurations, loading them if needed.
+
+    Returns:
+        TemplateConfigs: The current snapshot
+    """
+    return template_config_cache.get()
+
+def filter_visible_to_tribunal(documentos, miembro_tribunal=None):
+    """
+    Get the documents a tribunal member can see, in one pass over the compiled rules.
+
+    Args:
+        documentos (iterable): DocumentoConcurso instances
+        miembro_tribunal (TribunalMiembro, optional): The member; if None, the documents
+                                                      visible to at least someone
+
+    Returns:
+        list: The visible documents, in the order given
+    """
+    configs = get_template_configs()
+    rule_for = configs.visibility_rule if configs is not None else (lambda tipo: DEFAULT_VISIBILITY)
+    return [documento for documento in documentos if rule_for(documento.tipo)(documento, miembro_tribunal)]
+
+@event.listens_for(Session, 'after_flush')
+def _track_template_config_writes(session, flush_context):
+    if any(isinstance(obj, DocumentTemplateConfig) for obj in (*session.new, *session.dirty, *session.deleted)):
+        session.info['template_configs_changed'] = True
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_after_commit(session):
+    if session.info.pop('template_configs_changed', False):
+        template_config_cache.invalidate()
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _forget_rolled_back_writes(session, previous_transaction):
+    session.info.pop('template_configs_changed', None)
@@ -1,37 +1,44 @@
 import os
+import re
+import threading
+import time
 import requests
 from datetime import datetime, timezone
 import base64
 import logging
 
+from app.helpers.drive_file_cache import drive_file_cache
+
 # Set up logger for debugging
 logger = logging.getLogger(__name__)
 
+# Drive REST API endpoint used to download file contents directly
+DRIVE_FILES_URL = "https://www.googleapis.com/drive/v3/files"
+
+# Matches batch parameters that reference the result of an earlier operation ("$<index>.<field>")
+BATCH_REFERENCE_PATTERN = re.compile(r'^\$(\d+)\.(\w+)$')
+
+class AccessTokenUnavailable(Exception):
+    """The Apps Script bridge could not hand out a Drive API token (e.g. no service account set up)."""
+
 class GoogleDriveAPI:
+    # Maximum number of operations sent in a single batch request
+    batch_size = 50
+
     def __init__(self):
         self.api_url = "https://script.google.com/macros/s/AKfycbzu1aD_-L822DTVyLgqfqkn5eytgJNkorivbtXAiwlSd2dzqA5PCHyVtA9y5lHAXizu/exec"
         self.secure_token = os.environ.get('GOOGLE_DRIVE_SECURE_TOKEN')
         if not self.secure_token:
             raise ValueError("GOOGLE_DRIVE_SECURE_TOKEN environment variable is not set")
+        self._access_token = None
+        self._access_token_expires = 0
+        self._access_token_lock = threading.Lock()
 
     def create_concurso_folder(self, concurso_id, departamento, area, orientacion, categoria, dedicacion):
-        """Create a folder in Google Drive for a new concurso."""
+        """Create a folder in Google Drive for a new concurso, with its subfolders, in a single request."""
         timestamp = datetime.now(timezone.utc).strftime('%Y%m%d_%H%M%S')
         folder_name = f"{concurso_id}_{departamento}_{area}_{orientacion}_{categoria}_{dedicacion}_{timestamp}"
 
-        response = requests.post(self.api_url, json={
-            'action': 'createFolder',
-            'folderName': folder_name,
-            'token': self.secure_token
-        })
-
-        if response.status_code != 200:
-            raise Exception(f"Error creating Google Drive folder: {response.text}")
-
-        folder_data = response.json()
-        if folder_data.get('status') != 'success':
-            raise Exception(f"Error from Google Drive API: {folder_data.get('message')}")
-        
         # Create subfolders inside the main folder with descriptive names
         subfolders = {
             'borradores': f"borradores_{departamento}_{categoria}_{dedicacion}_{concurso_id}",
@@ -39,26 +46,27 @@ class GoogleDriveAPI:
             'documentos_firmados': f"documentos_firmados_{departamento}_{categoria}_{dedicacion}_{concurso_id}",
             'tribunal': f"tribunal_{departamento}_{categoria}_{dedicacion}_{concurso_id}"
         }
-        
-        subfolder_ids = {}
-        
-        for folder_type, subfolder_name in subfolders.items():
-            subfolder_response = requests.post(self.api_url, json={
+
+        operations = [{'action': 'createFolder', 'folderName': folder_name}]
+        for subfolder_name in subfolders.values():
+            operations.append({
                 'action': 'createNestedFolder',
-                'parentFolderId': folder_data.get('folderId'),
-                'folderName': subfolder_name,
-                'token': self.secure_token
+                'parentFolderId': '$0.folderId',  # ID of the main folder created above
+                'folderName': subfolder_name
             })
-            
-            if subfolder_response.status_code != 200:
-                raise Exception(f"Error creating {folder_type} folder: {subfolder_response.text}")
-                
-            subfolder_data = subfolder_response.json()
+
+        results = self.batch(operations, stop_on_error=True)
+
+        folder_data = results[0]
+        if folder_data.get('status') != 'success':
+            raise Exception(f"Error from Google Drive API: {folder_data.get('message')}")
+
+        subfolder_ids = {}
+        for folder_type, subfolder_data in zip(subfolders, results[1:]):
             if subfolder_data.get('status') != 'success':
                 raise Exception(f"Error from Google Drive API when creating {folder_type} folder: {subfolder_data.get('message')}")
-            
             subfolder_ids[f"{folder_type}FolderId"] = subfolder_data.get('folderId')
-            
+
         # Return all folder IDs
         return {
             'folderId': folder_data.get('folderId'),
@@ -149,6 +157,7 @@ class GoogleDriveAPI:
         if upload_data.get('status') != 'success':
             raise Exception(f"Error from Google Drive API: {upload_data.get('message')}")
 
+        drive_file_cache.put(upload_data.get('fileId'), file_data)
         return upload_data.get('fileId'), upload_data.get('webViewLink')
 
     def get_file_content(self, file_id):
@@ -190,6 +199,116 @@ class GoogleDriveAPI:
             logger.error(f"Error getting file content from Drive: {str(e)}")
             raise
 
+    def _get_access_token(self, refresh=False):
+        """
+        Get a read-only Drive API OAuth token from the Apps Script bridge, reusing it until a
+        minute before the lifetime the bridge reports for it runs out.
+        """
+        with self._access_token_lock:
+            if not refresh and self._access_token and time.time() < self._access_token_expires:
+                return self._access_token
+
+            response = requests.post(self.api_url, json={
+                'action': 'getAccessToken',
+                'token': self.secure_token
+            }, timeout=30)
+
+            if response.status_code != 200:
+                raise AccessTokenUnavailable(f"Error getting Google Drive access token: {response.text}")
+
+            data = response.json()
+            if data.get('status') != 'success':
+                raise AccessTokenUnavailable(f"Error from Google Drive API: {data.get('message')}")
+
+            self._access_token = data.get('accessToken')
+            # Renew the token a minute before it expires
+            self._access_token_expires = time.time() + int(data.get('expiresIn', 3000)) - 60
+            return self._access_token
+
+    def open_file_stream(self, file_id, byte_range=None):
+        """
+        Open a streamed download of a file's content from the Drive API.
+
+        Args:
+            file_id (str): The ID of the file to download
+            byte_range (str, optional): Value of an HTTP Range header (e.g. "bytes=0-1023")
+
+        Returns:
+            requests.Response: Streamed response (status 200, 206 or 416); the caller
+                               must consume it with iter_content and close it
+        """
+        for attempt in range(2):
+            headers = {'Authorization': f"Bearer {self._get_access_token(refresh=attempt > 0)}"}
+            if byte_range:
+                headers['Range'] = byte_range
+
+            response = requests.get(f"{DRIVE_FILES_URL}/{file_id}", params={
+                'alt': 'media',
+                'supportsAllDrives': 'true'
+            }, headers=headers, stream=True, timeout=30)
+
+            if response.status_code == 401 and attempt == 0:
+                # The cached token was revoked or expired early; get a new one
+                response.close()
+                continue
+
+            if response.status_code == 403 and 'fileNotDownloadable' in response.text:
+                # Google Docs have no binary content; export them as PDF (without Range support)
+                response = requests.get(f"{DRIVE_FILES_URL}/{file_id}/export", params={
+                    'mimeType': 'application/pdf'
+                }, headers={'Authorization': headers['Authorization']}, stream=True, timeout=30)
+            break
+
+        if response.status_code not in (200, 206, 416):
+            message = response.text
+            response.close()
+            raise Exception(f"Error downloading file from Google Drive: {message}")
+
+        return response
+
+    def get_file_metadata(self, file_id):
+        """
+        Get a file's metadata from the Drive API.
+
+        Args:
+            file_id (str): The ID of the file
+
+        Returns:
+            dict: id, name, mimeType, size, md5Checksum (binary files only) and version
+        """
+        for attempt in range(2):
+            response = requests.get(f"{DRIVE_FILES_URL}/{file_id}", params={
+                'fields': 'id,name,mimeType,size,md5Checksum,version',
+                'supportsAllDrives': 'true'
+            }, headers={'Authorization': f"Bearer {self._get_access_token(refresh=attempt > 0)}"}, timeout=30)
+            if response.status_code != 401:
+                break
+
+        if response.status_code != 200:
+            raise Exception(f"Error getting file metadata from Google Drive: {response.text}")
+        return response.json()
+
+    def download_file(self, file_id):
+        """
+        Download the whole content of a file as bytes, without the base64 JSON round trip
+        of get_file_content. Served from the local file cache when enabled. Falls back to
+        get_file_content when the bridge cannot hand out an access token.
+
+        Args:
+            file_id (str): The ID of the file to download
+
+        Returns:
+            bytes: The file content
+        """
+        try:
+            if drive_file_cache.enabled:
+                return drive_file_cache.read(self, file_id)
+            with self.open_file_stream(file_id) as response:
+                return response.content
+        except AccessTokenUnavailable as e:
+            logger.warning(f"Downloading {file_id} through the Apps Script bridge: {str(e)}")
+            return base64.b64decode(self.get_file_content(file_id)['fileData'])
+
     def add_signature_to_pdf(self, file_id, nombre, apellido, dni, firma_count=0):
         """
         Add a signature directly to a PDF file in Google Drive.
@@ -261,6 +380,10 @@ class GoogleDriveAPI:
             new_file_id = data.get('fileId')
             web_view_link = data.get('webViewLink')
             logger.info(f"Successfully overwrote file. New file ID: {new_file_id}")
+
+            # The old file is trashed; cache the new content under its new ID
+            drive_file_cache.invalidate(file_id)
+            drive_file_cache.put(new_file_id, base64.b64decode(file_data))
             
             # Return as tuple since that's what's expected by the calling code
             return new_file_id, web_view_link
@@ -289,6 +412,7 @@ class GoogleDriveAPI:
         if delete_data.get('status') != 'success':
             raise Exception(f"Error from Google Drive API: {delete_data.get('message')}")
 
+        drive_file_cache.invalidate(file_id)
         return delete_data.get('success')
 
     def delete_folder(self, folder_id):
@@ -313,6 +437,84 @@ class GoogleDriveAPI:
 
         return delete_data.get('success')
 
+    def batch(self, operations, stop_on_error=False):
+        """
+        Run several Google Drive/Gmail actions with as few HTTP round trips as possible.
+
+        Operations are sent in chunks of batch_size operations per request. A string
+        parameter of the form "$<index>.<field>" is replaced by that field of the result
+        of the operation at that (global) index, which must come earlier in the list.
+
+        Args:
+            operations (list): Dicts with an 'action' key and the parameters of that action
+            stop_on_error (bool): Skip the remaining operations after the first failure
+
+        Returns:
+            list: One result dict per operation, in order, each with a 'status' key
+                  ('success' or 'error') plus the action's data or an error 'message'
+        """
+        results = []
+        for offset in range(0, len(operations), self.batch_size):
+            chunk = [self._prepare_batch_operation(operation, offset, results)
+                     for operation in operations[offset:offset + self.batch_size]]
+
+            if stop_on_error and any(r.get('status') != 'success' for r in results):
+                results.extend({'status': 'error', 'message': 'Skipped after a previous error'} for _ in chunk)
+                continue
+
+            try:
+                response = requests.post(self.api_url, json={
+                    'action': 'batch',
+                    'operations': chunk,
+                    'stopOnError': stop_on_error,
+                    'token': self.secure_token
+                })
+
+                if response.status_code != 200:
+                    raise Exception(f"Error running batch in Google Drive: {response.text}")
+
+                batch_data = response.json()
+                if batch_data.get('status') != 'success':
+                    raise Exception(f"Error from Google Drive API: {batch_data.get('message')}")
+
+                results.extend(batch_data.get('results', []))
+            except Exception as e:
+                logger.error(f"Error running batch of {len(chunk)} operations: {str(e)}")
+                results.extend({'status': 'error', 'message': str(e)} for _ in chunk)
+
+        return results
+
+    def _prepare_batch_operation(self, operation, offset, results):
+        """
+        Make a batch operation relative to its chunk: references to operations of previous
+        chunks are replaced by their values, the others are re-indexed within the chunk.
+        """
+        prepared = {}
+        for key, value in operation.items():
+            match = BATCH_REFERENCE_PATTERN.match(value) if isinstance(value, str) else None
+            if match:
+                index = int(match.group(1))
+                if index < offset:
+                    value = results[index].get(match.group(2))
+                else:
+                    value = f"${index - offset}.{match.group(2)}"
+            prepared[key] = value
+        return prepared
+
+    def delete_folders(self, folder_ids):
+        """
+        Delete several folders from Google Drive in a single request.
+
+        Args:
+            folder_ids (list): IDs of the folders to delete
+
+        Returns:
+            dict: Error message for each folder ID that could not be deleted
+        """
+        results = self.batch([{'action': 'deleteFolder', 'folderId': folder_id} for folder_id in folder_ids])
+        return {folder_id: result.get('message') for folder_id, result in zip(folder_ids, results)
+                if result.get('status') != 'success'}
+
     def get_folder_url(self, folder_id):
         """Get the URL for a Google Drive folder."""
         return f"https://drive.google.com/drive/folders/{folder_id}"
@@ -398,13 +600,7 @@ class GoogleDriveAPI:
             )
         """
         response = requests.post(self.api_url, json={
-            'action': 'sendEmail',
-            'to': to_email,
-            'subject': subject,
-            'htmlBody': html_body,
-            'senderName': sender_name,
-            'attachmentIds': attachment_ids or [],
-            'placeholders': placeholders or {},
+            **self.email_operation(to_email, subject, html_body, sender_name, attachment_ids, placeholders),
             'token': self.secure_token
         })
 
@@ -415,4 +611,23 @@ class GoogleDriveAPI:
         if email_data.get('status') != 'success':
             raise Exception(f"Error from Google API: {email_data.get('message')}")
 
-        return email_data
\ No newline at end of file
+        return email_data
+
+    @staticmethod
+    def email_operation(to_email, subject, html_body, sender_name=None, attachment_ids=None, placeholders=None):
+        """
+        Build the sendEmail action for an email, to send it alone or as part of a batch.
+        Takes the same arguments as send_email.
+
+        Returns:
+            dict: The sendEmail operation
+        """
+        return {
+            'action': 'sendEmail',
+            'to': to_email,
+            'subject': subject,
+            'htmlBody': html_body,
+            'senderName': sender_name,
+            'attachmentIds': attachment_ids or [],
+            'placeholders': placeholders or {}
+        }
@@ -159,10 +159,18 @@ class Concurso(db.Model):
     impugnaciones = db.relationship('Impugnacion', backref='concurso', lazy='dynamic')    
     recusaciones = db.relationship('Recusacion', backref='concurso', lazy='dynamic')
 
+    # Listings are paginated newest first by id (keyset), optionally filtered by one of these columns
+    __table_args__ = (
+        db.Index('ix_concursos_estado_actual_id', 'estado_actual', 'id'),
+        db.Index('ix_concursos_departamento_id_id', 'departamento_id', 'id'),
+        db.Index('ix_concursos_tipo_id', 'tipo', 'id'),
+        db.Index('ix_concursos_creado', 'creado'),
+    )
+
 class TribunalMiembro(db.Model):    
     __tablename__ = 'tribunal_miembros'
     id = db.Column(db.Integer, primary_key=True)
-    concurso_id = db.Column(db.Integer, db.ForeignKey('concursos.id', name='fk_tribunal_miembro_concurso'))
+    concurso_id = db.Column(db.Integer, db.ForeignKey('concursos.id', name='fk_tribunal_miembro_concurso'), index=True)
     persona_id = db.Column(db.Integer, db.ForeignKey('personas.id'), nullable=False)
     rol = db.Column(db.String(50), nullable=False)  # Presidente, Titular, Suplente, Veedor
     claustro = db.Column(db.String(20), nullable=True, default='Docente')  # Docente, Estudiante
@@ -234,6 +242,11 @@ class DocumentoConcurso(db.Model):
     estado = db.Column(db.String(20), default="CREADA")
     creado = db.Column(db.DateTime, default=datetime.utcnow)
     firma_count = db.Column(db.Integer, nullable=False, default=0)
+    # Signing ledger: bumped on every change to the signed file, so a signer working on an
+    # outdated version cannot record its stamps; firmando_hasta is the lease of the signer
+    # currently stamping the file
+    firma_version = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    firmando_hasta = db.Column(db.DateTime, nullable=True)
     # Separate file IDs for borrador and firmado versions
     borrador_file_id = db.Column(db.String(100), nullable=True)  # ID of the draft file in borradores folder
     file_id = db.Column(db.String(100), nullable=True)  # ID of the uploaded/signed file in documentos_firmados folder
@@ -244,9 +257,13 @@ class DocumentoConcurso(db.Model):
                            cascade='all, delete-orphan')
 
     def ya_firmado_por(self, miembro_id):
-        """Check if a tribunal member has already signed this document."""
+        """Check if a tribunal member has already signed (or requested to sign) this document."""
         return any(firma.miembro_id == miembro_id for firma in self.firmas)
 
+    def firma_pendiente_de(self, miembro_id):
+        """Check if a tribunal member's signature is requested but not yet stamped on the file."""
+        return any(firma.miembro_id == miembro_id and not firma.aplicada for firma in self.firmas)
+
     def is_visible_to_tribunal(self, miembro_tribunal=None):
         """
         Determine if this document should be visible to tribunal members based on configuration.
@@ -259,63 +276,10 @@ class DocumentoConcurso(db.Model):
             bool: True if the document should be visible to the tribunal member
         """
         # Import here to avoid circular imports
-        from app.models.models import DocumentTemplateConfig
-        
-        # Get the template configuration for this document type
-        template_config = DocumentTemplateConfig.query.filter_by(document_type_key=self.tipo).first()
-        
-        # If no template configuration is found, fall back to basic visibility rules
-        if not template_config or not template_config.tribunal_visibility_rules:
-            # Document types that are always visible to tribunal members regardless of state
-            always_visible = [
-                'ACTA_CONSTITUCION_TRIBUNAL_REGULAR',
-                'ACTA_DICTAMEN',
-                'ACTA_SORTEO'
-            ]
-            
-            if self.tipo in always_visible:
-                return True
-                
-            # Check if the document type contains "acta constitucion tribunal" (case insensitive)
-            if 'acta constitucion tribunal' in self.tipo.lower().replace('_', ' '):
-                return True
-    
-            # Documents with FIRMADO state are always visible
-            if self.estado == 'FIRMADO':
-                return True
-                
-            # Documents in PENDIENTE DE FIRMA state are visible
-            if self.estado == 'PENDIENTE DE FIRMA':
-                return True
-                
-            # All other documents (typically BORRADOR) are not visible to tribunal
-            return False
-        
-        # Use the configuration-based visibility rules
-        try:
-            rules = json.loads(template_config.tribunal_visibility_rules)
-            
-            # If no rules for the current state, document is not visible
-            if self.estado not in rules:
-                return False
-                
-            # If no miembro_tribunal provided, we can't check role/claustro-specific rules
-            if not miembro_tribunal:
-                # Return True if there are rules for this state, meaning someone should see it
-                return bool(rules.get(self.estado))
-            
-            # Check if the member's role and claustro match the rules
-            state_rules = rules.get(self.estado, {})
-            allowed_roles = state_rules.get('roles', [])
-            allowed_claustros = state_rules.get('claustros', [])
-            
-            # Document is visible if both role and claustro match the rules
-            return (miembro_tribunal.rol in allowed_roles and 
-                    miembro_tribunal.claustro in allowed_claustros)
-                    
-        except (json.JSONDecodeError, AttributeError, TypeError):
-            # In case of any error parsing the rules, fall back to the document being invisible
-            return False
+        from app.helpers.template_configs import filter_visible_to_tribunal
+
+        # The rules of every template are compiled once and cached per process
+        return bool(filter_visible_to_tribunal([self], miembro_tribunal))
 
     def get_friendly_name(self):
         """
@@ -355,11 +319,21 @@ class FirmaDocumento(db.Model):
     documento_id = db.Column(db.Integer, db.ForeignKey('documentos_concurso.id', ondelete='CASCADE'), nullable=False)
     miembro_id = db.Column(db.Integer, db.ForeignKey('tribunal_miembros.id', ondelete='CASCADE'), nullable=False)
     fecha_firma = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    # False while the signature is requested but not yet stamped on the file
+    aplicada = db.Column(db.Boolean, nullable=False, default=True, server_default=db.true())
+    # File uploaded with this signature's stamp while it is not yet recorded as aplicada, so a
+    # retry records that upload instead of stamping the signature again
+    subida_file_id = db.Column(db.String(100), nullable=True)
+    subida_url = db.Column(db.String(255), nullable=True)
     
     # Update relationships with back_populates
     documento_concurso = db.relationship('DocumentoConcurso', back_populates='firmas')
     miembro = db.relationship('TribunalMiembro', back_populates='firmas')
 
+    __table_args__ = (
+        db.UniqueConstraint('documento_id', 'miembro_id', name='uq_firma_documento_miembro'),
+    )
+
 class HistorialEstado(db.Model):
     __tablename__ = 'historial_estados'
     id = db.Column(db.Integer, primary_key=True)
@@ -481,6 +455,8 @@ class NotificationLog(db.Model):
     fecha_envio = db.Column(db.DateTime, default=datetime.utcnow)
     estado_envio = db.Column(db.String(50), nullable=False)  # ENVIADO, FALLIDO
     error_envio = db.Column(db.Text, nullable=True)
+    # Background job that sent the notification, so a retried job skips the recipients already sent
+    job_id = db.Column(db.Integer, db.ForeignKey('background_jobs.id', ondelete='SET NULL'), nullable=True, index=True)
     
     # Relationships    
     campaign = db.relationship('NotificationCampaign', back_populates='logs')
@@ -579,6 +555,96 @@ class SorteoConfig(db.Model):
         db.UniqueConstraint('concurso_tipo', 'categoria_codigo', name='uq_sorteo_config_tipo_categoria'),
     )
 
+class BackgroundJob(db.Model):
+    """
+    A unit of slow work (Drive folders, uploads, emails...) queued to run outside the request.
+    Jobs are picked up by the worker pool in app.services.job_queue.
+    """
+    __tablename__ = 'background_jobs'
+    id = db.Column(db.Integer, primary_key=True)
+    tipo = db.Column(db.String(100), nullable=False, index=True)  # Name of the registered job handler
+    payload_json = db.Column(db.Text, nullable=True)  # JSON stored as text
+    estado = db.Column(db.String(20), nullable=False, default='PENDIENTE', index=True)  # PENDIENTE, EN_PROCESO, COMPLETADO, FALLIDO
+    idempotency_key = db.Column(db.String(255), nullable=True, unique=True)
+    intentos = db.Column(db.Integer, nullable=False, default=0)
+    max_intentos = db.Column(db.Integer, nullable=False, default=5)
+    proximo_intento = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+    resultado_json = db.Column(db.Text, nullable=True)  # JSON stored as text
+    progreso_json = db.Column(db.Text, nullable=True)  # JSON stored as text, reported while the job runs
+    error = db.Column(db.Text, nullable=True)
+    creado = db.Column(db.DateTime, default=datetime.utcnow)
+    iniciado = db.Column(db.DateTime, nullable=True)
+    latido = db.Column(db.DateTime, nullable=True)  # Last sign of life of the running job, refreshed by its progress
+    finalizado = db.Column(db.DateTime, nullable=True)
+    creado_por_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)
+
+    @property
+    def payload(self):
+        """Return the job payload as a Python dictionary."""
+        if not self.payload_json:
+            return {}
+        return json.loads(self.payload_json)
+
+    @payload.setter
+    def payload(self, value):
+        self.payload_json = json.dumps(value)
+
+    @property
+    def resultado(self):
+        """Return the job result as a Python object, or None if there is none."""
+        if not self.resultado_json:
+            return None
+        return json.loads(self.resultado_json)
+
+    @resultado.setter
+    def resultado(self, value):
+        self.resultado_json = json.dumps(value) if value is not None else None
+
+    @property
+    def progreso(self):
+        """Return the last progress reported by the running job, or None."""
+        if not self.progreso_json:
+            return None
+        return json.loads(self.progreso_json)
+
+    def to_dict(self):
+        """Serialize the job status for the JSON status endpoints."""
+        return {
+            'id': self.id,
+            'tipo': self.tipo,
+            'estado': self.estado,
+            'intentos': self.intentos,
+            'max_intentos': self.max_intentos,
+            'proximo_intento': self.proximo_intento.isoformat() if self.proximo_intento else None,
+            'resultado': self.resultado,
+            'progreso': self.progreso,
+            'error': self.error,
+            'creado': self.creado.isoformat() if self.creado else None,
+            'iniciado': self.iniciado.isoformat() if self.iniciado else None,
+            'finalizado': self.finalizado.isoformat() if self.finalizado else None,
+        }
+
+class ProgramaMateria(db.Model):
+    """
+    Local copy of the catedras API programa of a materia, including "not found" answers.
+    Kept up to date by the refrescar_programas job (see app.services.programas_store).
+    """
+    __tablename__ = 'programas_materia'
+    id_materia = db.Column(db.String(20), primary_key=True)
+    encontrado = db.Column(db.Boolean, nullable=False, default=False)
+    datos_json = db.Column(db.Text, nullable=False)  # Entry as returned by get_programas_by_materia_ids, JSON stored as text
+    actualizado = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    vence = db.Column(db.DateTime, nullable=False, index=True)  # When the refresh job fetches it again
+
+    @property
+    def datos(self):
+        """Return the stored entry as a new Python dictionary."""
+        return json.loads(self.datos_json)
+
+    @datos.setter
+    def datos(self, value):
+        self.datos_json = json.dumps(value)
+
 # Function to initialize the database with departments, areas, and orientations from JSON
 def init_db_from_json(app, json_data):
     with app.app_context():
@@ -0,0 +1,43 @@
+"""
+Routes for request metrics in the admin area.
+Shows the rolling per-endpoint summary recorded by the RequestMetrics extension and the
+connection reuse of the shared catedras API session.
+"""
+from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify
+from flask_login import login_required, current_user
+
+from app import request_metrics
+from app.helpers.api_services import get_catedras_connection_stats
+
+# Create Blueprint
+admin_metrics_bp = Blueprint('admin_metrics', __name__, url_prefix='/admin/metrics')
+
+# Access control decorator
+def admin_required(f):
+    def decorated_function(*args, **kwargs):
+        if not current_user.is_authenticated or not current_user.is_admin:
+            flash('No tienes permiso para acceder a esta área.', 'danger')
+            return redirect(url_for('auth.login'))
+        return f(*args, **kwargs)
+    decorated_function.__name__ = f.__name__
+    return decorated_function
+
+@admin_metrics_bp.route('/', methods=['GET'])
+@login_required
+@admin_required
+def index():
+    """Show the per-endpoint request summary, as HTML or as JSON with ?format=json."""
+    summary = request_metrics.summary()
+    if request.args.get('format') == 'json':
+        return jsonify(summary)
+    return render_template('admin/metrics/index.html', summary=summary,
+                           catedras_stats=get_catedras_connection_stats())
+
+@admin_metrics_bp.route('/reset', methods=['POST'])
+@login_required
+@admin_required
+def reset():
+    """Clear the recorded requests."""
+    request_metrics.reset()
+    flash('Métricas reiniciadas.', 'success')
+    return redirect(url_for('admin_metrics.index'))
@@ -5,10 +5,14 @@ from app.integrations.google_drive import GoogleDriveAPI
 from werkzeug.utils import secure_filename
 from datetime import datetime
 from functools import wraps
+from app.services.search_index import search
 
 admin_personas_bp = Blueprint('admin_personas', __name__, url_prefix='/admin/personas')
 drive_api = GoogleDriveAPI()
 
+# Maximum number of personas listed for a search
+PERSONA_SEARCH_LIMIT = 500
+
 def admin_required(f):
     @wraps(f)
     def decorated_function(*args, **kwargs):
@@ -33,8 +37,14 @@ def admin_required(f):
 def list_personas():
     page = request.args.get('page', 1, type=int)
     per_page = request.args.get('per_page', 15, type=int)
-    personas_pagination = Persona.query.order_by(Persona.apellido, Persona.nombre).paginate(page=page, per_page=per_page)
-    return render_template('admin/personas/index.html', personas_pagination=personas_pagination)
+    q = request.args.get('q', '').strip()
+    query = Persona.query
+    if q:
+        # The full-text index finds the matches; the page keeps them in alphabetical order
+        persona_ids = [entity_id for _, entity_id in search(q, ['persona'], limit=PERSONA_SEARCH_LIMIT)]
+        query = query.filter(Persona.id.in_(persona_ids))
+    personas_pagination = query.order_by(Persona.apellido, Persona.nombre).paginate(page=page, per_page=per_page)
+    return render_template('admin/personas/index.html', personas_pagination=personas_pagination, q=q)
 
 @admin_personas_bp.route('/<int:persona_id>/editar', methods=['GET', 'POST'])
 @login_required
@@ -1,9 +1,15 @@
 """
-API routes for fetching programa information.
+API routes for fetching programa information and searching the application data.
 """
 
-from flask import Blueprint, jsonify, current_app, request
-from app.helpers.api_services import get_programa_by_id_materia, get_programa_download_url, get_programas_by_materia_ids
+from flask import Blueprint, jsonify, current_app, request, url_for
+from flask_login import login_required
+from app.helpers.api_services import get_programa_by_id_materia, get_programa_download_url
+from app.services.programas_store import get_programas
+from app.services.search_index import INDEXED_MODELS, search_objects
+
+# Maximum number of results of the search endpoint
+SEARCH_MAX_LIMIT = 50
 
 # Create a blueprint for API routes
 api_bp = Blueprint('api', __name__, url_prefix='/api')
@@ -133,8 +139,8 @@ def get_programas_bulk():
         # Ensure all IDs are converted to strings for consistent handling
         materia_ids_str_list = [str(mid) for mid in materia_ids]
         
-        # Use the new bulk fetch function to get all programas at once
-        programas_data_map = get_programas_by_materia_ids(materia_ids_str_list)
+        # Served from the programas store; only materias never seen before go upstream
+        programas_data_map = get_programas(materia_ids_str_list)
         
         if programas_data_map is None:
             current_app.logger.error("Failed to fetch programas data")
@@ -191,3 +197,60 @@ def get_programas_bulk():
             'message': 'Error al obtener información de programas',
             'manual_url': 'https://huayca.crub.uncoma.edu.ar/programas/'
         }), 500
+
+def _search_result(tipo, obj):
+    """Serialize a search hit for the frontend."""
+    if tipo == 'concurso':
+        return {
+            'tipo': tipo,
+            'id': obj.id,
+            'texto': f"Concurso #{obj.id} - {obj.categoria_nombre or obj.categoria} {obj.dedicacion} - {obj.area}",
+            'expediente': obj.expediente,
+            'url': url_for('concursos.ver', concurso_id=obj.id)
+        }
+    result = {
+        'tipo': tipo,
+        'id': obj.id,
+        'texto': f"{obj.apellido}, {obj.nombre} (DNI {obj.dni})",
+        'nombre': obj.nombre,
+        'apellido': obj.apellido,
+        'dni': obj.dni,
+        'correo': obj.correo
+    }
+    if tipo == 'postulante':
+        result['concurso_id'] = obj.concurso_id
+        result['url'] = url_for('concursos.ver', concurso_id=obj.concurso_id, _anchor='postulantes')
+    else:
+        result['url'] = url_for('admin_personas.edit_persona', persona_id=obj.id)
+    return result
+
+@api_bp.route('/buscar', methods=['GET'])
+@login_required
+def buscar():
+    """
+    API endpoint to search personas, postulantes and concursos by the start of their
+    names, DNI, emails or expedientes, ignoring case and accents.
+
+    Query Parameters:
+        q: Text to search for
+        tipo: Optional, repeatable: persona, postulante or concurso
+        limit: Optional maximum number of results (default 20, at most 50)
+
+    Returns:
+        JSON response with the results ordered by relevance
+    """
+    query = request.args.get('q', '').strip()
+    tipos = request.args.getlist('tipo')
+    unknown = [tipo for tipo in tipos if tipo not in INDEXED_MODELS]
+    if unknown:
+        return jsonify({
+            'status': 'error',
+            'message': f"Tipo de búsqueda desconocido: {', '.join(unknown)}"
+        }), 400
+    limit = max(1, min(request.args.get('limit', 20, type=int), SEARCH_MAX_LIMIT))
+
+    results = [_search_result(tipo, obj) for tipo, obj in search_objects(query, tipos, limit)]
+    return jsonify({
+        'status': 'success',
+        'results': results
+    }), 200
@@ -1,14 +1,29 @@
-from flask import request, jsonify
-from app.models.models import Departamento, Area, Orientacion
+from flask import request, jsonify, abort, Response
 from . import concursos
-from app.helpers.api_services import get_programa_by_id_materia, get_programas_by_materia_ids
+from app.helpers.api_services import get_programa_by_id_materia
+from app.services.programas_store import get_programas
+from app.helpers.reference_data import get_reference_data
+
+def _json_blob_response(blob):
+    """Serve a precomputed JSON blob, answering 304 if the client already has it."""
+    response = Response(blob.body, mimetype='application/json')
+    response.set_etag(blob.etag)
+    # Let browsers keep the blob but always revalidate it with the ETag
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
+@concursos.route('/api/referencia')
+def get_referencia():
+    """API endpoint to fetch the whole departamentos/areas/orientaciones/categorías tree."""
+    return _json_blob_response(get_reference_data().tree_json)
 
 @concursos.route('/api/areas/<int:departamento_id>')
 def get_areas(departamento_id):
     """API endpoint to fetch areas for a given department."""
-    departamento = Departamento.query.get_or_404(departamento_id)
-    areas = Area.query.filter_by(departamento_id=departamento_id).all()
-    return jsonify([{'id': area.id, 'nombre': area.nombre} for area in areas])
+    blob = get_reference_data().areas_json(departamento_id)
+    if blob is None:
+        abort(404)
+    return _json_blob_response(blob)
 
 @concursos.route('/api/orientaciones/<int:departamento_id>')
 def get_orientaciones(departamento_id):
@@ -17,12 +32,10 @@ def get_orientaciones(departamento_id):
     if not area_nombre:
         return jsonify([])
     
-    area = Area.query.filter_by(departamento_id=departamento_id, nombre=area_nombre).first()
-    if not area:
+    blob = get_reference_data().orientaciones_json(departamento_id, area_nombre)
+    if blob is None:
         return jsonify([])
-        
-    orientaciones = Orientacion.query.filter_by(area_id=area.id).all()
-    return jsonify([{'id': o.id, 'nombre': o.nombre} for o in orientaciones])
+    return _json_blob_response(blob)
 
 @concursos.route('/api/programa/<int:id_materia>')
 def get_programa(id_materia):
@@ -43,8 +56,8 @@ def get_programas_bulk():
     if not materia_ids or not isinstance(materia_ids, list):
         return jsonify({"status": "error", "message": "materia_ids must be a non-empty list"})
     
-    # Call the helper function to get all programas
-    programas_info = get_programas_by_materia_ids(materia_ids)
+    # Served from the programas store; only materias never seen before go upstream
+    programas_info = get_programas(materia_ids)
     if not programas_info:
         return jsonify({"status": "error", "message": "Error fetching programas information"})
     
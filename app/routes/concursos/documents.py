@@ -1,10 +1,12 @@
-from flask import redirect, url_for, flash, request, render_template
+from flask import redirect, url_for, flash, request, render_template, current_app
 from flask_login import login_required, current_user
 from datetime import datetime
 from app.models.models import db, Concurso, Departamento, DocumentoConcurso, HistorialEstado, DocumentTemplateConfig
 from app.services.placeholder_resolver import get_core_placeholders
 from app.helpers.api_services import get_considerandos_data, get_departamento_heads_data
 from app.document_generation.document_generator import generar_documento_desde_template
+from app.services.job_queue import enqueue_job
+from app.services.signing import FIRMA_ADMIN_JOB, discard_signatures
 import json
 from . import concursos, drive_api
 
@@ -100,8 +102,9 @@ def considerandos_builder(concurso_id):
     if not template_google_id and request.args.get('template_name'):
         template_google_id = request.args.get('template_name')
     
-    # Get all placeholders from the centralized resolver
-    placeholders = get_core_placeholders(concurso_id)
+    # Only the concurso fields are needed here; the request-scoped placeholder context
+    # keeps them for the document generation that follows on POST
+    placeholders = get_core_placeholders(concurso_id, keys=['descripcion_cargo'])
     
     # Get the cargo description from the placeholders
     descripcion_cargo = placeholders['descripcion_cargo']
@@ -512,12 +515,9 @@ def eliminar_documento_pendiente_firma(concurso_id, documento_id):
             # Implementation for file deletion
             pass
         
-        # Remove all signatures associated with this document
-        for firma in documento.firmas:
-            # Implementation for signature removal
-            pass
-        
-        # Reset firma count
+        # Remove all signatures associated with this document, including the ones being
+        # stamped on the previous file, and reset firma count
+        discard_signatures(documento)
         documento.firma_count = 0
         
         # Update document status back to BORRADOR
@@ -605,12 +605,9 @@ def eliminar_subido(concurso_id, documento_id):
             # Clear the file_id after attempting deletion
             documento.file_id = None
         
-        # Remove all signatures associated with this document
-        if hasattr(documento, 'firmas'):
-            for firma in documento.firmas:
-                db.session.delete(firma)
-        
-        # Reset firma count
+        # Remove all signatures associated with this document, including the ones being
+        # stamped on the previous file, and reset firma count
+        discard_signatures(documento)
         documento.firma_count = 0
         
         # Reset document status to BORRADOR if there's still a draft version
@@ -777,86 +774,22 @@ def admin_firmar_documento(concurso_id, documento_id):
             if not cargo:
                 cargo = 'Administrador'
             
-        # Get the draft document
-        file_data = drive_api.get_file_content(documento.borrador_file_id)
-        if not file_data or 'fileData' not in file_data:
-            flash('No se pudo recuperar el documento para firmar', 'danger')
-            return redirect(url_for('concursos.ver', concurso_id=concurso_id))
-            
-        # Decode base64 fileData
-        import base64
-        file_bytes = base64.b64decode(file_data.get('fileData'))
-        file_name = file_data.get('fileName', f"documento_{documento.id}.pdf")
-        mime_type = file_data.get('mimeType', 'application/pdf')
-        
-        # Handle conversion to PDF if needed
-        if mime_type != 'application/pdf':
-            # If the document is a Google Doc, the API might already return it as PDF
-            if mime_type == 'application/vnd.google-apps.document':
-                # Assuming API already converts to PDF
-                pass
-            else:
-                flash('Solo se pueden firmar documentos en formato PDF', 'danger')
-                return redirect(url_for('concursos.ver', concurso_id=concurso_id))
-                
-        # Add signature to PDF
-        from app.helpers.pdf_utils import add_signature_stamp
+        # Download, stamp and upload in the background; the form's idempotency key avoids
+        # signing twice when the form is resubmitted
+        idempotency_key = request.form.get('idempotency_key')
+        job = enqueue_job(
+            FIRMA_ADMIN_JOB,
+            {
+                'documento_id': documento.id,
+                'firmante': {'nombre': nombre, 'apellido': apellido, 'dni': dni, 'cargo': cargo}
+            },
+            idempotency_key=f"{FIRMA_ADMIN_JOB}:{idempotency_key}" if idempotency_key else None,
+            max_intentos=current_app.config.get('SIGNING_MAX_ATTEMPTS', 3),
+            creado_por_id=current_user.id
+        )
         
-        try:
-            signed_pdf_bytes = add_signature_stamp(
-                file_bytes, 
-                apellido, 
-                nombre, 
-                dni, 
-                cargo=cargo,
-                signature_count=documento.firma_count
-            )
-        except Exception as e:
-            import traceback
-            print(traceback.format_exc())
-            flash(f'Error al firmar el documento: {str(e)}', 'danger')
-            return redirect(url_for('concursos.ver', concurso_id=concurso_id))
-            
-        # Prepare filename for signed document
-        if '.' in file_name:
-            name_part, ext_part = file_name.rsplit('.', 1)
-            signed_file_name = f"{name_part}_firmado_admin.{ext_part}"
-        else:
-            signed_file_name = f"{file_name}_firmado_admin.pdf"
-            
-        # Upload signed document
-        try:
-            file_id, web_view_link = drive_api.upload_document(
-                concurso.documentos_firmados_folder_id,
-                signed_file_name,
-                signed_pdf_bytes,  # Pass bytes directly, not base64 encoded string
-                'application/pdf'
-            )
-            
-            # Update DocumentoConcurso record
-            documento.file_id = file_id
-            documento.url = web_view_link
-            documento.estado = 'FIRMADO'
-            documento.firma_count += 1
-              # Add record to HistorialEstado
-            historial = HistorialEstado(
-                concurso_id=concurso_id,
-                estado='FIRMADO',
-                observaciones=f'Documento {documento.tipo} firmado digitalmente por {nombre} {apellido} (Cargo: {cargo})'
-            )
-            
-            db.session.add(historial)
-            db.session.commit()
-            
-            flash(f'Documento firmado exitosamente por {nombre} {apellido} (Cargo: {cargo})', 'success')
-            return redirect(url_for('concursos.ver', concurso_id=concurso_id))
-            
-        except Exception as e:
-            db.session.rollback()
-            import traceback
-            print(traceback.format_exc())
-            flash(f'Error al subir el documento firmado: {str(e)}', 'danger')
-            return redirect(url_for('concursos.ver', concurso_id=concurso_id))
+        flash(f'El documento se está firmando por {nombre} {apellido} (Cargo: {cargo}). La página se actualizará al terminar.', 'info')
+        return redirect(url_for('concursos.ver', concurso_id=concurso_id, firma_job=job.id))
             
     except Exception as e:
         db.session.rollback()
@@ -1,18 +1,33 @@
-from flask import render_template, redirect, url_for, flash, request
+from flask import render_template, redirect, url_for, flash, request, abort
 from flask_login import login_required, current_user
 from datetime import datetime
-from app.models.models import db, Concurso, Departamento, Area, Orientacion, Categoria, HistorialEstado, DocumentoConcurso, Sustanciacion, TribunalMiembro, Persona
+from app.models.models import db, Concurso, HistorialEstado, Sustanciacion
 from app.services.placeholder_resolver import get_core_placeholders
 from app.helpers.api_services import get_considerandos_data, get_asignaturas_from_external_api
+from app.helpers.reference_data import get_reference_data
+from app.helpers.roles_categorias import roles_categorias
+from app.services.job_queue import enqueue_job
+from app.services.concurso_detail import load_concurso_detail
+from app.services.concurso_listing import ConcursoFilters, load_concurso_page, get_estados
 from . import concursos, drive_api
 
 @concursos.route('/')
 @login_required
 def index():
-    """Display list of all concursos."""
-    # Simply load all concursos, can't use joinedload with dynamic relationship
-    concursos_list = Concurso.query.order_by(Concurso.creado.desc()).all()
-    return render_template('concursos/index.html', concursos=concursos_list)
+    """Display a page of concursos, newest first, with optional filters."""
+    filters = ConcursoFilters.from_args(request.args)
+    page = load_concurso_page(
+        filters,
+        antes=request.args.get('antes', type=int),
+        despues=request.args.get('despues', type=int),
+        with_tribunal=True
+    )
+    return render_template('concursos/index.html',
+                           concursos=page.items,
+                           page=page,
+                           filters=filters,
+                           estados=get_estados(),
+                           departamentos=get_reference_data().departamentos)
 
 @concursos.route('/nuevo', methods=['GET', 'POST'])
 @login_required
@@ -46,24 +61,8 @@ def nuevo():
             expediente = request.form.get('expediente')
             
             # Get categoria name from roles_categorias.json
-            import json
-            import os
+            categoria_nombre = roles_categorias.get_categoria_nombre(categoria)
             
-            # Load roles_categorias.json data
-            json_path = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(__file__)))), 'roles_categorias.json')
-            with open(json_path, 'r', encoding='utf-8') as f:
-                roles_data = json.load(f)
-            
-            # Find categoria name by codigo
-            categoria_nombre = None
-            for rol in roles_data:
-                for cat in rol['categorias']:
-                    if cat['codigo'] == categoria:
-                        categoria_nombre = cat['nombre']
-                        break
-                if categoria_nombre:
-                    break
-                    
             # Handle cierre_inscripcion (optional now)
             cierre_inscripcion_str = request.form.get('cierre_inscripcion')
             cierre_inscripcion = None
@@ -103,31 +102,14 @@ def nuevo():
             )
             db.session.add(concurso)
             db.session.commit()  # Commit to get concurso ID
-              # Create Google Drive folder structure
-            try:
-                # Create concurso folder with subfolders
-                folder_data = drive_api.create_concurso_folder(
-                    concurso_id=concurso.id,
-                    departamento=concurso.departamento_rel.nombre,
-                    area=concurso.area,
-                    orientacion=concurso.orientacion,
-                    categoria=concurso.categoria,
-                    dedicacion=concurso.dedicacion
-                )
-                
-                # Update concurso with folder IDs
-                concurso.drive_folder_id = folder_data.get('folderId')
-                concurso.borradores_folder_id = folder_data.get('borradoresFolderId')
-                concurso.documentos_firmados_folder_id = folder_data.get('documentosFirmadosFolderId')
-                concurso.postulantes_folder_id = folder_data.get('postulantesFolderId')
-                concurso.tribunal_folder_id = folder_data.get('tribunalFolderId')
-                
-                # Complete the database update
-                db.session.commit()
-                
-            except Exception as e:
-                flash(f'Error al crear carpetas en Google Drive: {str(e)}', 'warning')
-                # Continue with the operation even if Drive folders couldn't be created
+            
+            # Create Google Drive folder structure in the background
+            enqueue_job(
+                'crear_carpetas_concurso',
+                {'concurso_id': concurso.id},
+                idempotency_key=f"crear_carpetas_concurso:{concurso.id}",
+                creado_por_id=current_user.id
+            )
             
             # Create history entry
             historial = HistorialEstado(
@@ -138,7 +120,7 @@ def nuevo():
             db.session.add(historial)
             db.session.commit()
             
-            flash('Concurso creado exitosamente.', 'success')
+            flash('Concurso creado exitosamente. Las carpetas en Google Drive se están creando en segundo plano.', 'success')
             return redirect(url_for('concursos.ver', concurso_id=concurso.id))
             
         except Exception as e:
@@ -146,8 +128,9 @@ def nuevo():
             flash(f'Error al crear el concurso: {str(e)}', 'danger')
     
     # Get data for form dropdowns
-    departamentos = Departamento.query.all()
-    categorias = Categoria.query.all()
+    reference_data = get_reference_data()
+    departamentos = reference_data.departamentos
+    categorias = reference_data.categorias
     
     return render_template('concursos/nuevo.html', 
                            departamentos=departamentos,
@@ -157,9 +140,10 @@ def nuevo():
 @login_required
 def ver(concurso_id):
     """View details of a specific concurso."""
-    from app.models.models import DocumentTemplateConfig, NotificationCampaign, NotificationLog, TemaSetTribunal
-    
-    concurso = Concurso.query.get_or_404(concurso_id)
+    detail = load_concurso_detail(concurso_id)
+    if not detail:
+        abort(404)
+    concurso = detail.concurso
     
     # Get asignaturas from external API based on concurso criteria
     asignaturas_externas = []
@@ -170,87 +154,27 @@ def ver(concurso_id):
             orientacion_concurso=concurso.orientacion
         )
     
-    # Get available document types based on configurations in database
-    available_documents = []
-    # Get all active document template configurations
-    template_configs = DocumentTemplateConfig.query.filter_by(is_active=True).all()
-    
-    # Create dictionary of template configs for easy access in template
-    template_configs_dict = {config.document_type_key: config for config in template_configs}
-    
-    # Debug: print information about templates
-    print(f"Found {len(template_configs)} active templates")
-    for template in template_configs:
-        print(f"Template: {template.document_type_key}, Visible for {template.concurso_visibility}, Current concurso tipo: {concurso.tipo}")
-    
-    # Check each template's visibility and uniqueness for this concurso
-    for config in template_configs:
-        # Check if this template is available for this concurso type
-        if not config.is_visible_for_concurso_tipo(concurso.tipo):
-            print(f"Template {config.document_type_key} not visible for concurso tipo {concurso.tipo}")
-            continue
-            
-        # Check uniqueness constraint if applicable
-        if config.is_unique_per_concurso:
-            existing_document = DocumentoConcurso.query.filter_by(
-                concurso_id=concurso_id,
-                tipo=config.document_type_key
-            ).first()
-            
-            if existing_document:
-                # Skip this document type as one already exists
-                continue
-        
-        # Add to available documents
-        available_documents.append({
-            'id': config.document_type_key,
-            'name': config.display_name,
-            'url': url_for('concursos.generar_documento', 
-                         concurso_id=concurso_id, 
-                         document_type_key=config.document_type_key)
-        })
-    
-    # Get all global notification campaigns for the notification panel
-    notification_campaigns = NotificationCampaign.query.order_by(NotificationCampaign.creado_en.desc()).all()
-    
-    # Get logs for this concurso grouped by campaign
-    notification_logs = NotificationLog.query.filter_by(concurso_id=concurso_id).all()    
-    notification_logs_by_campaign = {}
-    for log in notification_logs:
-        if log.campaign_id not in notification_logs_by_campaign:
-            notification_logs_by_campaign[log.campaign_id] = []
-        notification_logs_by_campaign[log.campaign_id].append(log)
-        
-    # Fetch tribunal member topic proposals if a sustanciacion exists
-    temas_por_miembro = {}
-    if concurso.sustanciacion and hasattr(concurso.sustanciacion, 'id'):
-        # Get all topic proposals from tribunal members for this sustanciacion
-        tema_proposals = TemaSetTribunal.query.filter_by(
-            sustanciacion_id=concurso.sustanciacion.id
-        ).all()
-        
-        # Organize by tribunal member for easy access in template
-        for proposal in tema_proposals:
-            temas_por_miembro[proposal.miembro_id] = {
-                'temas': [tema.strip() for tema in proposal.temas_propuestos.split('|') if tema.strip()],
-                'propuesta_cerrada': proposal.propuesta_cerrada,
-                'fecha_propuesta': proposal.fecha_propuesta,
-                'miembro': proposal.miembro  # Include the miembro relationship
-            }
-    
-    # Debug: print what's being passed to the template
-    print(f"Passing {len(available_documents)} available documents to template")
-    for doc in available_documents:
-        print(f"Document: {doc['name']} ({doc['id']}) URL: {doc['url']}")
+    # Document types that can still be generated for this concurso
+    available_documents = [{
+        'id': config.document_type_key,
+        'name': config.display_name,
+        'url': url_for('concursos.generar_documento', 
+                     concurso_id=concurso_id, 
+                     document_type_key=config.document_type_key)
+    } for config in detail.available_document_configs()]
         
     return render_template('concursos/ver.html', 
                       concurso=concurso,
+                      documentos=detail.documentos,
+                      miembros_tribunal=detail.miembros_tribunal,
+                      postulantes=detail.postulantes,
+                      historial_estados=detail.historial_estados,
                       available_documents=available_documents,
-                      template_configs_dict=template_configs_dict,
-                      notification_campaigns=notification_campaigns,
-                      notification_logs_by_campaign=notification_logs_by_campaign,
+                      template_configs_dict=detail.template_configs_dict,
+                      notification_campaigns=detail.notification_campaigns,
+                      notification_counts_by_campaign=detail.notification_counts_by_campaign,
                       asignaturas_externas=asignaturas_externas,
-                      temas_por_miembro=temas_por_miembro)
+                      temas_por_miembro=detail.temas_por_miembro())
 
 @concursos.route('/<int:concurso_id>/editar', methods=['GET', 'POST'])
 @login_required
@@ -352,8 +276,9 @@ def editar(concurso_id):
             db.session.rollback()
     
     # Get data for form dropdowns
-    departamentos = Departamento.query.all()
-    categorias = Categoria.query.all()
+    reference_data = get_reference_data()
+    departamentos = reference_data.departamentos
+    categorias = reference_data.categorias
     
     return render_template('concursos/editar.html', 
                            concurso=concurso,
@@ -367,14 +292,17 @@ def eliminar(concurso_id):
     concurso = Concurso.query.get_or_404(concurso_id)
     
     try:
-        # Delete Google Drive folder if it exists
-        if concurso.drive_folder_id:
-            drive_api.delete_folder(concurso.drive_folder_id)
-          # Delete all related data
+        # Delete the Google Drive folders of the concurso and its postulantes in a single request
+        folder_ids = [concurso.drive_folder_id] if concurso.drive_folder_id else []
+        folder_ids.extend(postulante.drive_folder_id for postulante in concurso.postulantes
+                          if postulante.drive_folder_id)
+        if folder_ids:
+            errores = drive_api.delete_folders(folder_ids)
+            if errores:
+                raise Exception(f"Error al eliminar carpetas en Google Drive: {'; '.join(errores.values())}")
+        
+        # Delete all related data
         concurso.asignaciones_tribunal.delete()
-        for postulante in concurso.postulantes:
-            if postulante.drive_folder_id:
-                drive_api.delete_folder(postulante.drive_folder_id)
         concurso.postulantes.delete()
         concurso.documentos.delete()
         concurso.historial_estados.delete()
@@ -0,0 +1,19 @@
+"""
+Routes for background jobs in concursos docentes application.
+Lets the UI poll the status of the work queued by other routes.
+"""
+from flask import Blueprint, jsonify
+from flask_login import login_required
+
+from app.models.models import db, BackgroundJob
+
+# Initialize blueprint
+jobs_bp = Blueprint('jobs', __name__, url_prefix='/jobs')
+
+@jobs_bp.route('/<int:job_id>', methods=['GET'])
+@login_required
+def estado(job_id):
+    """Return the status of a background job as JSON."""
+    job = db.get_or_404(BackgroundJob, job_id)
+    return jsonify(job.to_dict())
+
@@ -1,9 +1,9 @@
-from flask import Blueprint, render_template, redirect, url_for, flash, request, current_app, jsonify
-from flask_login import login_required
+from flask import Blueprint, render_template, redirect, url_for, flash, request, jsonify
+from flask_login import login_required, current_user
 from app.models.models import db, Concurso, Postulante, DocumentoPostulante, Impugnacion, Categoria
 from app.integrations.google_drive import GoogleDriveAPI
-import os
-import json
+from app.services.job_queue import enqueue_job
+from app.helpers.roles_categorias import roles_categorias
 from datetime import datetime
 import uuid
 from werkzeug.utils import secure_filename
@@ -82,24 +82,16 @@ def agregar(concurso_id):
             db.session.add(postulante)
             db.session.flush()  # To get the postulante ID
             
-            # Create Google Drive folder for the postulante
-            if concurso.postulantes_folder_id:
-                try:
-                    folder_id = drive_api.create_postulante_folder(
-                        concurso.postulantes_folder_id,
-                        postulante.dni,
-                        postulante.apellido,
-                        postulante.nombre,
-                        concurso.categoria,
-                        concurso.dedicacion
-                    )
-                    postulante.drive_folder_id = folder_id
-                except Exception as e:
-                    print(f"Error creating Drive folder: {e}")
-                    flash('El postulante fue creado pero hubo un error al crear su carpeta en Drive.', 'warning')
-            
             db.session.commit()
             
+            # Create Google Drive folder for the postulante in the background
+            enqueue_job(
+                'crear_carpeta_postulante',
+                {'postulante_id': postulante.id},
+                idempotency_key=f"crear_carpeta_postulante:{postulante.id}",
+                creado_por_id=current_user.id
+            )
+            
             flash('Postulante agregado exitosamente.', 'success')
             return redirect(url_for('postulantes.ver', postulante_id=postulante.id))
             
@@ -118,25 +110,7 @@ def ver(postulante_id):
     documentos = DocumentoPostulante.query.filter_by(postulante_id=postulante_id).all()
     
     # Get the documentation requirements for this concurso based on the categoria and dedicacion
-    # Load roles_categorias.json to determine required documents
-    try:
-        with open(os.path.join(current_app.root_path, '../roles_categorias.json'), 'r', encoding='utf-8') as f:
-            categorias_data = json.load(f)
-            
-        required_docs = []
-        for rol in categorias_data:
-            for cat in rol['categorias']:
-                if cat['codigo'] == concurso.categoria:
-                    # Add base documents
-                    required_docs.extend(cat['documentacionRequerida']['base'])
-                    
-                    # Add documents by dedicacion if available
-                    if 'porDedicacion' in cat['documentacionRequerida'] and concurso.dedicacion in cat['documentacionRequerida']['porDedicacion']:
-                        required_docs.extend(cat['documentacionRequerida']['porDedicacion'][concurso.dedicacion])
-                    break
-    except Exception as e:
-        print(f"Error loading required documents: {e}")
-        required_docs = []
+    required_docs = roles_categorias.get_required_documents(concurso.categoria, concurso.dedicacion)
     
     # Create a dictionary to check which documents have been uploaded
     uploaded_docs = {doc.tipo: doc for doc in documentos}
@@ -297,24 +271,7 @@ def agregar_documento(postulante_id):
             flash(f'Error al agregar documento: {str(e)}', 'danger')
     
     # Get the documentation requirements for this concurso
-    try:
-        with open(os.path.join(current_app.root_path, '../roles_categorias.json'), 'r', encoding='utf-8') as f:
-            categorias_data = json.load(f)
-            
-        required_docs = []
-        for rol in categorias_data:
-            for cat in rol['categorias']:
-                if cat['codigo'] == concurso.categoria:
-                    # Add base documents
-                    required_docs.extend(cat['documentacionRequerida']['base'])
-                    
-                    # Add documents by dedicacion if available
-                    if 'porDedicacion' in cat['documentacionRequerida'] and concurso.dedicacion in cat['documentacionRequerida']['porDedicacion']:
-                        required_docs.extend(cat['documentacionRequerida']['porDedicacion'][concurso.dedicacion])
-                    break
-    except Exception as e:
-        print(f"Error loading required documents: {e}")
-        required_docs = []
+    required_docs = roles_categorias.get_required_documents(concurso.categoria, concurso.dedicacion)
     
     # Get all currently uploaded document types
     uploaded_doc_types = [doc.tipo for doc in DocumentoPostulante.query.filter_by(postulante_id=postulante_id).all()]
@@ -1,16 +1,27 @@
 from flask import Blueprint, render_template, redirect, url_for, request
 from app.models.models import Concurso, Categoria
 from app.helpers.api_services import get_asignaturas_from_external_api
+from app.helpers.reference_data import get_reference_data
+from app.services.concurso_listing import ConcursoFilters, load_concurso_page, get_estados
 
 # Create public blueprint
 public = Blueprint('public', __name__, url_prefix='')
 
 @public.route('/')
 def index():
-    """Display list of all active concursos for public viewing."""
-    # Get all concursos ordered by creation date
-    concursos_list = Concurso.query.order_by(Concurso.creado.desc()).all()
-    return render_template('public/index.html', concursos=concursos_list)
+    """Display a page of concursos for public viewing, newest first, with optional filters."""
+    filters = ConcursoFilters.from_args(request.args)
+    page = load_concurso_page(
+        filters,
+        antes=request.args.get('antes', type=int),
+        despues=request.args.get('despues', type=int)
+    )
+    return render_template('public/index.html',
+                           concursos=page.items,
+                           page=page,
+                           filters=filters,
+                           estados=get_estados(),
+                           departamentos=get_reference_data().departamentos)
 
 @public.route('/concurso/<int:concurso_id>')
 def ver_concurso(concurso_id):
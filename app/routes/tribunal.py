@@ -1,21 +1,22 @@
-from flask import Blueprint, render_template, redirect, url_for, flash, request, jsonify, session, send_file
+from flask import Blueprint, render_template, redirect, url_for, flash, request, jsonify, session, current_app, abort
 from flask_login import login_required, current_user
-from app.models.models import db, Concurso, TribunalMiembro, Recusacion, DocumentoTribunal, HistorialEstado, DocumentoConcurso, FirmaDocumento, Persona, Postulante, Sustanciacion
+from app.models.models import db, Concurso, TribunalMiembro, Recusacion, DocumentoTribunal, HistorialEstado, DocumentoConcurso, FirmaDocumento, Persona, Postulante, Sustanciacion, BackgroundJob
 from app.integrations.google_drive import GoogleDriveAPI
-from app.helpers.pdf_utils import add_signature_stamp, verify_signed_pdf
-from app.helpers.api_services import get_asignaturas_from_external_api
+from app.helpers.pdf_utils import verify_signed_pdf
+from app.helpers.file_streaming import stream_drive_file
+from app.helpers.roles_categorias import roles_categorias
+from app.helpers.template_configs import get_template_configs, filter_visible_to_tribunal
+from app.services.tribunal_portal import load_tribunal_assignments, latest_assignment
+from app.services.job_queue import ESTADO_FALLIDO, enqueue_job, retry_job
+from app.services.signing import FIRMA_TRIBUNAL_JOB, request_tribunal_signature, discard_signatures
+from sqlalchemy.orm import contains_eager, selectinload
 from datetime import datetime
 from werkzeug.utils import secure_filename
 from functools import wraps
-import os
-import json
-import base64
-import io
 import random
 import string
 import string
 import random
-import io
 
 tribunal = Blueprint('tribunal', __name__, url_prefix='/tribunal')
 drive_api = GoogleDriveAPI()
@@ -897,30 +898,18 @@ def portal():
     persona_id = session['persona_id']
     persona = Persona.query.get_or_404(persona_id)
     
-    # Get active tribunal memberships
-    miembro = TribunalMiembro.query.filter_by(persona_id=persona_id).order_by(TribunalMiembro.id.desc()).first()
-    if not miembro:
+    # Get every concurso this persona is part of with their assignment, in one query
+    assignments = load_tribunal_assignments(persona_id)
+    latest = latest_assignment(assignments)
+    if not latest:
         flash('No está asignado a ningún tribunal actualmente', 'warning')
         session.pop('persona_id', None)
         return redirect(url_for('tribunal.acceso'))
-      # Get all concursos this persona is part of and their roles
-    concursos = persona.get_concursos()
-    
-    # Get the roles for each concurso to simplify template rendering
-    concurso_roles = {}
-    for concurso in concursos:
-        tribunal_miembro = TribunalMiembro.query.filter_by(
-            persona_id=persona_id, 
-            concurso_id=concurso.id
-        ).first()
-        if tribunal_miembro:
-            concurso_roles[concurso.id] = tribunal_miembro.rol
     
     return render_template('tribunal/portal.html', 
-                          miembro=miembro,
+                          miembro=latest.miembro,
                           persona=persona, 
-                          concursos=concursos,
-                          concurso_roles=concurso_roles)
+                          assignments=assignments)
 
 @tribunal.route('/portal/concurso/<int:concurso_id>')
 def portal_concurso(concurso_id):
@@ -943,13 +932,19 @@ def portal_concurso(concurso_id):
     if not assignment:
         flash('No tiene permisos para ver este concurso', 'danger')
         return redirect(url_for('tribunal.portal'))
-      # Get template configs for document action control
-    from app.models.models import DocumentTemplateConfig, TemaSetTribunal
-    template_configs = DocumentTemplateConfig.query.all()
-    template_configs_dict = {config.document_type_key: config for config in template_configs}
+      # Get template configs for document action control (cached per process)
+    from app.models.models import TemaSetTribunal
+    template_configs_dict = get_template_configs().by_key
+    
+    # Get the documents with their signatures, for the per-document signature checks
+    documentos = DocumentoConcurso.query.filter_by(concurso_id=concurso_id).options(
+        selectinload(DocumentoConcurso.firmas)
+    ).all()
     
     # Get other tribunal members for this concurso
-    miembros = TribunalMiembro.query.filter_by(concurso_id=concurso_id).join(Persona).all()
+    miembros = TribunalMiembro.query.filter_by(concurso_id=concurso_id).join(Persona).options(
+        contains_eager(TribunalMiembro.persona)
+    ).all()
     
     # Get postulantes
     postulantes = concurso.postulantes.all()
@@ -962,15 +957,6 @@ def portal_concurso(concurso_id):
             miembro_id=miembro.id
         ).first()
     
-    # Get asignaturas from external API
-    asignaturas_externas = []
-    if concurso.departamento_rel:
-        asignaturas_externas = get_asignaturas_from_external_api(
-            departamento=concurso.departamento_rel.nombre,
-            area=concurso.area,
-            orientacion_concurso=concurso.orientacion
-        )
-    
     # Ensure role is set properly for template checks
     if 'tribunal_rol' in session:
         miembro.rol = session['tribunal_rol']
@@ -978,10 +964,10 @@ def portal_concurso(concurso_id):
                           miembro=miembro,
                           persona=persona,
                           concurso=concurso,
+                          documentos=filter_visible_to_tribunal(documentos, miembro),
                           miembros=miembros,
                           template_configs_dict=template_configs_dict,
                           postulantes=postulantes,
-                          asignaturas_externas=asignaturas_externas,
                           mi_propuesta=mi_propuesta)
 
 @tribunal.route('/concurso/<int:concurso_id>/documentacion-postulantes')
@@ -1022,28 +1008,8 @@ def documentacion_postulantes(concurso_id):
         if documentos:
             postulantes_with_docs[postulante] = documentos
     
-    # Load roles_categorias.json to determine required documents
-    required_docs = []
-    try:
-        import os
-        import json
-        from flask import current_app
-        
-        with open(os.path.join(current_app.root_path, '../roles_categorias.json'), 'r', encoding='utf-8') as f:
-            categorias_data = json.load(f)
-            
-        for rol in categorias_data:
-            for cat in rol['categorias']:
-                if cat['codigo'] == concurso.categoria:
-                    # Add base documents
-                    required_docs.extend(cat['documentacionRequerida']['base'])
-                    
-                    # Add documents by dedicacion if available
-                    if 'porDedicacion' in cat['documentacionRequerida'] and concurso.dedicacion in cat['documentacionRequerida']['porDedicacion']:
-                        required_docs.extend(cat['documentacionRequerida']['porDedicacion'][concurso.dedicacion])
-                    break
-    except Exception as e:
-        print(f"Error loading required documents: {e}")
+    # Get the documentation requirements for this concurso based on the categoria and dedicacion
+    required_docs = roles_categorias.get_required_documents(concurso.categoria, concurso.dedicacion)
     
     return render_template('tribunal/documentacion_postulantes.html',
                           concurso=concurso,
@@ -1059,8 +1025,6 @@ def ver_documento_postulante(concurso_id, postulante_id, documento_id):
     """Display postulante document content in a viewer."""
     try:
         from app.models.models import DocumentoPostulante
-        import base64
-        import io
         
         # Get concurso, postulante, documento and current tribunal member
         concurso = Concurso.query.get_or_404(concurso_id)
@@ -1086,20 +1050,8 @@ def ver_documento_postulante(concurso_id, postulante_id, documento_id):
         # Extract file ID from Google Drive URL
         file_id = documento.url.split('/')[-2]  # Assuming URL format ends with /file_id/view
         
-        # Get file content from Drive
-        file_content_response = drive_api.get_file_content(file_id)
-        if not file_content_response.get('fileData'):
-            flash('No se pudo obtener el contenido del archivo', 'danger')
-            return redirect(url_for('tribunal.documentacion_postulantes', concurso_id=concurso_id))
-        
-        # Decode base64 content
-        pdf_content = base64.b64decode(file_content_response['fileData'])
-        
-        # Return the PDF content with proper headers
-        return send_file(
-            io.BytesIO(pdf_content),
-            mimetype='application/pdf'
-        )
+        # Stream the file content from Drive, honoring Range requests
+        return stream_drive_file(drive_api, file_id)
         
     except Exception as e:
         flash(f'Error al obtener el documento: {str(e)}', 'danger')
@@ -1169,6 +1121,7 @@ def subir_documento_presidente(concurso_id, documento_id):
         documento.file_id = file_id  # Store the file_id for the uploaded version
         documento.url = web_view_link
         documento.firma_count = 0  # Reset firma count since this is a new document
+        discard_signatures(documento)  # Signatures of the previous file no longer apply
           # Add entry to history
         historial = HistorialEstado(
             concurso=concurso,
@@ -1189,10 +1142,9 @@ def subir_documento_presidente(concurso_id, documento_id):
 @tribunal.route('/<int:concurso_id>/documento/<int:documento_id>/firmar', methods=['POST'])
 @tribunal_login_required
 def firmar_documento(concurso_id, documento_id):
-    """Handle document signing by tribunal members."""
+    """Queue the signing of a document by a tribunal member; the page polls for the result."""
     try:
-        # Get concurso, documento and current tribunal member
-        concurso = Concurso.query.get_or_404(concurso_id)
+        # Get documento and current tribunal member
         documento = DocumentoConcurso.query.get_or_404(documento_id)
         persona_id = session['persona_id']
         miembro = TribunalMiembro.query.filter_by(
@@ -1205,15 +1157,13 @@ def firmar_documento(concurso_id, documento_id):
             flash('El documento no pertenece a este concurso.', 'danger')
             return redirect(url_for('tribunal.portal_concurso', concurso_id=concurso_id))
         
-        # Check if member already signed        if documento.ya_firmado_por(miembro.id):
+        # Check if member already signed
+        if documento.ya_firmado_por(miembro.id) and not documento.firma_pendiente_de(miembro.id):
             flash('Ya ha firmado este documento.', 'danger')
             return redirect(url_for('tribunal.portal_concurso', concurso_id=concurso_id))
             
-        # Get template configuration
-        from app.models.models import DocumentTemplateConfig
-        template_config = DocumentTemplateConfig.query.filter_by(document_type_key=documento.tipo).first()
-        
         # Check if tribunal can sign this document type
+        template_config = get_template_configs().get(documento.tipo)
         if not template_config or not template_config.tribunal_can_sign:
             flash('No tiene permisos para firmar este tipo de documento.', 'danger')
             return redirect(url_for('tribunal.portal_concurso', concurso_id=concurso_id))
@@ -1223,81 +1173,23 @@ def firmar_documento(concurso_id, documento_id):
             flash('El documento no está en estado correcto para ser firmado.', 'danger')
             return redirect(url_for('tribunal.portal_concurso', concurso_id=concurso_id))
         
-        try:
-            # Get the file content from Drive
-            file_content_response = drive_api.get_file_content(documento.file_id)
-            if not file_content_response.get('fileData'):
-                raise Exception("No se pudo obtener el contenido del archivo")
-            
-            # Get the binary content from base64
-            import base64
-            pdf_content = base64.b64decode(file_content_response['fileData'])
-              # Add the signature using the PDF utility
-            pdf_with_stamp = add_signature_stamp(
-                pdf_content,
-                miembro.persona.apellido,
-                miembro.persona.nombre,
-                miembro.persona.dni,
-                documento.firma_count
-            )
-            
-            if not pdf_with_stamp:
-                raise Exception("Error al agregar la firma al PDF")
-            
-            # Convert back to base64 for upload
-            pdf_base64 = base64.b64encode(pdf_with_stamp).decode('utf-8')
-            
-            # Upload back to Drive, replacing the original
-            new_file_id, web_view_link = drive_api.overwrite_file(
-                documento.file_id,
-                pdf_base64
-            )
-            
-            if not new_file_id:
-                raise Exception("Error al guardar el documento firmado")
-            
-            # Update document with new file ID and URL if changed
-            if new_file_id != documento.file_id:
-                documento.file_id = new_file_id
-            if web_view_link:
-                documento.url = web_view_link
-            
-            # Increment signature count
-            documento.firma_count += 1
-            
-            # Add firma record
-            firma = FirmaDocumento(
-                documento_id=documento.id,
-                miembro_id=miembro.id
-            )  # fecha_firma will be set automatically by the default value
-            db.session.add(firma)
-            
-            # If document is not already marked as FIRMADO, update status once all tribunal members have signed
-            if documento.estado != 'FIRMADO':
-                tribunal_titulares = TribunalMiembro.query.filter(
-                    TribunalMiembro.concurso_id == concurso_id,
-                    TribunalMiembro.rol != 'Suplente'
-                ).count()
-                
-                if documento.firma_count >= tribunal_titulares:
-                    documento.estado = 'FIRMADO'
-                    
-                    # Add entry to history
-                    historial = HistorialEstado(
-                        concurso=concurso,
-                        estado="DOCUMENTO_FIRMADO",
-                        observaciones=f"Documento {documento.tipo} completamente firmado"
-                    )
-                    db.session.add(historial)
-            
-            db.session.commit()
-            flash('Documento firmado exitosamente.', 'success')
-            
-        except Exception as e:
-            db.session.rollback()
-            flash(f'Error al firmar el documento: {str(e)}', 'danger')
-            import traceback
-            print(traceback.format_exc())
+        # Record the signature in the ledger and stamp it in the background. A resubmitted
+        # form finds the pending signature and follows the same job
+        firma = request_tribunal_signature(documento, miembro) or FirmaDocumento.query.filter_by(
+            documento_id=documento.id,
+            miembro_id=miembro.id
+        ).first_or_404()
+        job = enqueue_job(
+            FIRMA_TRIBUNAL_JOB,
+            {'documento_id': documento.id, 'miembro_id': miembro.id},
+            idempotency_key=f"{FIRMA_TRIBUNAL_JOB}:{firma.id}",
+            max_intentos=current_app.config.get('SIGNING_MAX_ATTEMPTS', 3)
+        )
+        if job.estado == ESTADO_FALLIDO:
+            # The signature outlived its job (another signer's cycle held it); sign it again
+            job = retry_job(job)
+        flash('Su firma se está procesando. La página se actualizará cuando el documento esté firmado.', 'info')
+        return redirect(url_for('tribunal.portal_concurso', concurso_id=concurso_id, firma_job=job.id))
         
     except Exception as e:
         db.session.rollback()
@@ -1305,6 +1197,19 @@ def firmar_documento(concurso_id, documento_id):
     
     return redirect(url_for('tribunal.portal_concurso', concurso_id=concurso_id))
 
+@tribunal.route('/<int:concurso_id>/firma/<int:job_id>', methods=['GET'])
+@tribunal_login_required
+def estado_firma(concurso_id, job_id):
+    """Return as JSON the status of a signature queued by the current tribunal member."""
+    job = db.get_or_404(BackgroundJob, job_id)
+    miembro = TribunalMiembro.query.filter_by(
+        persona_id=session['persona_id'],
+        concurso_id=concurso_id
+    ).first_or_404()
+    if job.tipo != FIRMA_TRIBUNAL_JOB or job.payload.get('miembro_id') != miembro.id:
+        abort(404)
+    return jsonify(job.to_dict())
+
 @tribunal.route('/<int:concurso_id>/documento/<int:documento_id>/subir', methods=['POST'])
 def subir_acta_firmada(concurso_id, documento_id):
     """Handle tribunal member uploading a signed document. Redirects to subir_documento_presidente."""
@@ -1335,20 +1240,8 @@ def ver_documento(concurso_id, documento_id):
         else:
             file_id = documento.borrador_file_id  # Use the draft version
             
-        # Get file content from Drive
-        file_content_response = drive_api.get_file_content(file_id)
-        if not file_content_response.get('fileData'):
-            raise Exception("No se pudo obtener el contenido del archivo")
-            
-        # Decode base64 content
-        import base64
-        pdf_content = base64.b64decode(file_content_response['fileData'])
-        
-        # Return the PDF content with proper headers
-        return send_file(
-            io.BytesIO(pdf_content),
-            mimetype='application/pdf'
-        )
+        # Stream the file content from Drive, honoring Range requests
+        return stream_drive_file(drive_api, file_id)
         
     except Exception as e:
         flash(f'Error al obtener el documento: {str(e)}', 'danger')
@@ -0,0 +1,82 @@
+"""
+External API warm-up for concursos docentes application.
+A background thread loads the asignaturas, departamento heads and considerandos caches
+when a worker process boots and reloads each one before it goes stale, so requests
+never wait for those downloads.
+"""
+import threading
+
+from app.helpers.api_services import (
+    asignaturas_catalogue_cache, departamento_heads_cache, considerandos_cache
+)
+
+# Caches kept warm, in the order they are loaded at boot
+WARMED_CACHES = (asignaturas_catalogue_cache, departamento_heads_cache, considerandos_cache)
+
+# Reload a cache once this fraction of its TTL has elapsed
+REFRESH_AT_TTL_FRACTION = 0.8
+
+_stop_event = threading.Event()
+_thread = None
+
+def warm_up_caches(app, caches=WARMED_CACHES):
+    """
+    Load every cache that is empty or close to going stale.
+
+    Args:
+        app (Flask): The application whose configuration sets the TTLs
+        caches (iterable): RefreshingCache instances to keep warm
+
+    Returns:
+        list: Names of the caches that were (re)loaded successfully
+    """
+    loaded = []
+    with app.app_context():
+        for cache in caches:
+            age = cache.age
+            if age is not None and age < cache.ttl * REFRESH_AT_TTL_FRACTION:
+                continue
+            try:
+                if cache.refresh():
+                    loaded.append(cache.name)
+            except Exception as e:
+                app.logger.error(f"Error warming up {cache.name} cache: {str(e)}")
+    return loaded
+
+def _warmup_loop(app):
+    """Main loop of the warm-up thread."""
+    interval = app.config.get('API_WARMUP_INTERVAL', 60)
+    while not _stop_event.is_set():
+        loaded = warm_up_caches(app)
+        if loaded:
+            app.logger.info(f"Warmed up external API caches: {', '.join(loaded)}")
+        _stop_event.wait(interval)
+
+def start_api_warmup(app):
+    """
+    Start the warm-up thread for this process, unless API_WARMUP_ENABLED is off.
+
+    Args:
+        app (Flask): The application the caches are loaded for
+
+    Returns:
+        threading.Thread: The started thread, or None if warm-up is disabled
+    """
+    global _thread
+    if not app.config.get('API_WARMUP_ENABLED', True):
+        return None
+    if _thread is not None and _thread.is_alive():
+        return _thread
+
+    _stop_event.clear()
+    _thread = threading.Thread(target=_warmup_loop, args=(app,), name="api-warmup", daemon=True)
+    _thread.start()
+    return _thread
+
+def stop_api_warmup(timeout=None):
+    """Signal the warm-up thread to stop and wait for it."""
+    global _thread
+    _stop_event.set()
+    if _thread is not None:
+        _thread.join(timeout)
+    _thread = None
@@ -0,0 +1,126 @@
+"""
+Concurso detail loader for concursos docentes application.
+Loads everything the concurso detail page shows in a fixed number of queries,
+regardless of the number of documents, tribunal members, postulantes or notifications.
+"""
+from sqlalchemy import func
+from sqlalchemy.orm import joinedload, defer
+
+from app.models.models import (
+    db, Concurso, DocumentoConcurso, TribunalMiembro, Postulante, HistorialEstado,
+    NotificationCampaign, NotificationLog, TemaSetTribunal, DocumentTemplateConfig
+)
+
+class ConcursoDetail:
+    """
+    Everything the concurso detail page needs, loaded up front.
+
+    The collections on Concurso are dynamic relationships that run a new query every
+    time they are iterated, so the page reads these lists instead.
+    """
+
+    def __init__(self, concurso):
+        self.concurso = concurso
+        self.documentos = []
+        self.miembros_tribunal = []
+        self.postulantes = []
+        self.historial_estados = []
+        self.template_configs = []
+        self.notification_campaigns = []
+        self.notification_counts_by_campaign = {}
+        self.tema_proposals = []
+
+    @property
+    def template_configs_dict(self):
+        """Active template configurations keyed by document type."""
+        return {config.document_type_key: config for config in self.template_configs}
+
+    def available_document_configs(self):
+        """
+        Get the template configurations a new document can still be generated from.
+
+        Returns:
+            list: DocumentTemplateConfig instances visible for the concurso tipo whose
+                  unique-per-concurso document does not exist yet
+        """
+        existing_tipos = {documento.tipo for documento in self.documentos}
+        return [
+            config for config in self.template_configs
+            if config.is_visible_for_concurso_tipo(self.concurso.tipo)
+            and not (config.is_unique_per_concurso and config.document_type_key in existing_tipos)
+        ]
+
+    def temas_por_miembro(self):
+        """
+        Organize the tribunal members' topic proposals by member.
+
+        Returns:
+            dict: Mapping miembro_id to a dict with the proposed temas, whether the
+                  proposal is closed, its date and the TribunalMiembro
+        """
+        return {
+            proposal.miembro_id: {
+                'temas': [tema.strip() for tema in proposal.temas_propuestos.split('|') if tema.strip()],
+                'propuesta_cerrada': proposal.propuesta_cerrada,
+                'fecha_propuesta': proposal.fecha_propuesta,
+                'miembro': proposal.miembro
+            }
+            for proposal in self.tema_proposals
+        }
+
+def load_concurso_detail(concurso_id):
+    """
+    Load a concurso with everything shown on its detail page.
+
+    Args:
+        concurso_id (int): ID of the concurso
+
+    Returns:
+        ConcursoDetail: The loaded detail, or None if the concurso does not exist
+    """
+    concurso = Concurso.query.options(
+        joinedload(Concurso.departamento_rel),
+        joinedload(Concurso.sustanciacion)
+    ).filter(Concurso.id == concurso_id).first()
+    if not concurso:
+        return None
+
+    detail = ConcursoDetail(concurso)
+
+    detail.documentos = DocumentoConcurso.query.filter_by(concurso_id=concurso_id).order_by(
+        DocumentoConcurso.creado.desc()
+    ).all()
+
+    detail.miembros_tribunal = TribunalMiembro.query.options(
+        joinedload(TribunalMiembro.persona)
+    ).filter_by(concurso_id=concurso_id).order_by(TribunalMiembro.id).all()
+
+    detail.postulantes = Postulante.query.filter_by(concurso_id=concurso_id).order_by(Postulante.id).all()
+
+    detail.historial_estados = HistorialEstado.query.filter_by(concurso_id=concurso_id).order_by(
+        HistorialEstado.id
+    ).all()
+
+    detail.template_configs = DocumentTemplateConfig.query.filter_by(is_active=True).all()
+
+    # The panel lists every campaign, but never shows their bodies
+    detail.notification_campaigns = NotificationCampaign.query.options(
+        joinedload(NotificationCampaign.creado_por),
+        defer(NotificationCampaign.cuerpo_email_html)
+    ).order_by(NotificationCampaign.creado_en.desc()).all()
+
+    # Count the sent and failed notifications per campaign instead of loading every log with its body
+    counts = db.session.query(
+        NotificationLog.campaign_id, NotificationLog.estado_envio, func.count(NotificationLog.id)
+    ).filter(NotificationLog.concurso_id == concurso_id).group_by(
+        NotificationLog.campaign_id, NotificationLog.estado_envio
+    ).all()
+    for campaign_id, estado_envio, total in counts:
+        detail.notification_counts_by_campaign.setdefault(campaign_id, {})[estado_envio] = total
+
+    if concurso.sustanciacion:
+        detail.tema_proposals = TemaSetTribunal.query.options(
+            joinedload(TemaSetTribunal.miembro).joinedload(TribunalMiembro.persona)
+        ).filter_by(sustanciacion_id=concurso.sustanciacion.id).all()
+
+    return detail
@@ -0,0 +1,202 @@
+"""
+Concurso listing for concursos docentes application.
+Filters the concursos by estado, departamento, tipo and año and pages through them
+newest first with a keyset cursor on the id, so every page costs the same number of
+queries and index lookups no matter how many concursos the archive holds.
+"""
+from datetime import datetime
+
+from sqlalchemy import func
+from sqlalchemy.orm import joinedload
+
+from app.models.models import db, Concurso, TribunalMiembro
+
+# Default number of concursos per page
+PAGE_SIZE = 25
+
+# Query string parameters kept when moving between pages
+FILTER_ARGS = ('estado', 'departamento', 'tipo', 'anio')
+
+TIPOS = ('Regular', 'Interino')
+
+class ConcursoFilters:
+    """
+    Filters of a concurso listing, parsed from the query string.
+
+    Invalid values (e.g. a non numeric departamento) are ignored rather than rejected.
+    """
+
+    def __init__(self, estado=None, departamento_id=None, tipo=None, anio=None):
+        self.estado = estado
+        self.departamento_id = departamento_id
+        self.tipo = tipo
+        self.anio = anio
+
+    @classmethod
+    def from_args(cls, args):
+        """
+        Build the filters from request arguments.
+
+        Args:
+            args (MultiDict): Usually request.args
+
+        Returns:
+            ConcursoFilters: The parsed filters
+        """
+        tipo = args.get('tipo') or None
+        return cls(
+            estado=args.get('estado') or None,
+            departamento_id=args.get('departamento', type=int),
+            tipo=tipo if tipo in TIPOS else None,
+            anio=args.get('anio', type=int)
+        )
+
+    def apply(self, query):
+        """Restrict a Concurso query to the concursos matching the filters."""
+        if self.estado:
+            query = query.filter(Concurso.estado_actual == self.estado)
+        if self.departamento_id:
+            query = query.filter(Concurso.departamento_id == self.departamento_id)
+        if self.tipo:
+            query = query.filter(Concurso.tipo == self.tipo)
+        if self.anio:
+            # A range on creado rather than extract(year) so the index can be used
+            query = query.filter(Concurso.creado >= datetime(self.anio, 1, 1),
+                                 Concurso.creado < datetime(self.anio + 1, 1, 1))
+        return query
+
+    def to_args(self):
+        """The active filters as query string arguments, for url_for()."""
+        args = {
+            'estado': self.estado,
+            'departamento': self.departamento_id,
+            'tipo': self.tipo,
+            'anio': self.anio
+        }
+        return {key: value for key, value in args.items() if value}
+
+    @property
+    def active(self):
+        return bool(self.to_args())
+
+class TribunalSummary:
+    """Number of tribunal members of a concurso and its presidente, if any."""
+
+    def __init__(self, count=0, presidente=None):
+        self.count = count
+        self.presidente = presidente
+
+class ConcursoPage:
+    """
+    One page of a concurso listing.
+
+    Attributes:
+        items (list): Concursos on the page, newest first
+        filters (ConcursoFilters): Filters the page was loaded with
+        next_cursor (int): Value for the ``antes`` argument of the next (older) page, or None
+        prev_cursor (int): Value for the ``despues`` argument of the previous (newer) page, or None
+        tribunal (dict): TribunalSummary by concurso id, only if requested
+    """
+
+    def __init__(self, items, filters, next_cursor=None, prev_cursor=None):
+        self.items = items
+        self.filters = filters
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+        self.tribunal = {}
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_prev(self):
+        return self.prev_cursor is not None
+
+    def next_args(self):
+        """Query string arguments of the next page."""
+        return {**self.filters.to_args(), 'antes': self.next_cursor}
+
+    def prev_args(self):
+        """Query string arguments of the previous page."""
+        return {**self.filters.to_args(), 'despues': self.prev_cursor}
+
+def load_concurso_page(filters, antes=None, despues=None, page_size=PAGE_SIZE, with_tribunal=False):
+    """
+    Load a page of concursos, newest first.
+
+    Args:
+        filters (ConcursoFilters): Filters to apply
+        antes (int, optional): Return the concursos older than this id (next page)
+        despues (int, optional): Return the concursos newer than this id (previous page)
+        page_size (int): Number of concursos per page
+        with_tribunal (bool): Also load the TribunalSummary of each concurso on the page
+
+    Returns:
+        ConcursoPage: The page, with cursors to the neighbouring pages
+    """
+    query = filters.apply(Concurso.query.options(joinedload(Concurso.departamento_rel)))
+
+    # Fetch one extra row to know whether there is another page in that direction
+    if despues is not None:
+        rows = query.filter(Concurso.id > despues).order_by(Concurso.id.asc()).limit(page_size + 1).all()
+        has_more = len(rows) > page_size
+        items = list(reversed(rows[:page_size]))
+        has_newer, has_older = has_more, True
+    else:
+        if antes is not None:
+            query = query.filter(Concurso.id < antes)
+        rows = query.order_by(Concurso.id.desc()).limit(page_size + 1).all()
+        has_older = len(rows) > page_size
+        items = rows[:page_size]
+        has_newer = antes is not None
+
+    page = ConcursoPage(
+        items,
+        filters,
+        next_cursor=items[-1].id if items and has_older else None,
+        prev_cursor=items[0].id if items and has_newer else None
+    )
+    if with_tribunal and items:
+        page.tribunal = load_tribunal_summaries([concurso.id for concurso in items])
+    return page
+
+def load_tribunal_summaries(concurso_ids):
+    """
+    Load the tribunal member count and presidente of several concursos in two queries.
+
+    Args:
+        concurso_ids (list): Concurso ids
+
+    Returns:
+        dict: TribunalSummary by concurso id, for every id given
+    """
+    summaries = {concurso_id: TribunalSummary() for concurso_id in concurso_ids}
+
+    counts = db.session.query(TribunalMiembro.concurso_id, func.count(TribunalMiembro.id)).filter(
+        TribunalMiembro.concurso_id.in_(concurso_ids)
+    ).group_by(TribunalMiembro.concurso_id).all()
+    for concurso_id, count in counts:
+        summaries[concurso_id].count = count
+
+    presidentes = TribunalMiembro.query.options(joinedload(TribunalMiembro.persona)).filter(
+        TribunalMiembro.concurso_id.in_(concurso_ids),
+        TribunalMiembro.rol == 'Presidente'
+    ).order_by(TribunalMiembro.id).all()
+    for miembro in presidentes:
+        if summaries[miembro.concurso_id].presidente is None:
+            summaries[miembro.concurso_id].presidente = miembro
+
+    return summaries
+
+def get_estados():
+    """
+    Get the estados that at least one concurso is in, for the estado filter.
+
+    Returns:
+        list: Estado names, sorted
+    """
+    rows = db.session.query(Concurso.estado_actual).filter(
+        Concurso.estado_actual.isnot(None)
+    ).distinct().order_by(Concurso.estado_actual).all()
+    return [estado for estado, in rows]
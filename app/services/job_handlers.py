@@ -0,0 +1,106 @@
+"""
+Background job handlers for concursos docentes application.
+Slow Google Drive, email and PDF signing operations that routes enqueue instead of running
+in the request, and scheduled refreshes of external API data.
+"""
+from app.models.models import db, Concurso, Postulante, NotificationCampaign
+from app.integrations.google_drive import GoogleDriveAPI
+from app.services.job_queue import job_handler, report_job_progress, get_current_job_id
+from app.services.notification_campaigns import send_campaign
+from app.services.signing import (
+    FIRMA_TRIBUNAL_JOB, FIRMA_ADMIN_JOB, sign_as_tribunal, sign_as_admin, withdraw_pending_signature
+)
+from app.services.programas_store import (
+    REFRESH_JOB, refresh_expired_programas, prefetch_catalogue_programas, schedule_programas_refresh
+)
+
+drive_api = GoogleDriveAPI()
+
+@job_handler('crear_carpetas_concurso')
+def crear_carpetas_concurso(payload):
+    """Create the Google Drive folder structure of a concurso."""
+    concurso = db.session.get(Concurso, payload['concurso_id'])
+    if concurso is None:
+        raise ValueError(f"Concurso {payload['concurso_id']} no encontrado")
+
+    # A previous attempt may have completed before failing to report it
+    if not concurso.drive_folder_id:
+        folder_data = drive_api.create_concurso_folder(
+            concurso_id=concurso.id,
+            departamento=concurso.departamento_rel.nombre,
+            area=concurso.area,
+            orientacion=concurso.orientacion,
+            categoria=concurso.categoria,
+            dedicacion=concurso.dedicacion
+        )
+
+        # Update concurso with folder IDs
+        concurso.drive_folder_id = folder_data.get('folderId')
+        concurso.borradores_folder_id = folder_data.get('borradoresFolderId')
+        concurso.documentos_firmados_folder_id = folder_data.get('documentosFirmadosFolderId')
+        concurso.postulantes_folder_id = folder_data.get('postulantesFolderId')
+        concurso.tribunal_folder_id = folder_data.get('tribunalFolderId')
+        db.session.commit()
+
+    return {'folderId': concurso.drive_folder_id}
+
+@job_handler('crear_carpeta_postulante')
+def crear_carpeta_postulante(payload):
+    """Create the Google Drive folder of a postulante."""
+    postulante = db.session.get(Postulante, payload['postulante_id'])
+    if postulante is None:
+        raise ValueError(f"Postulante {payload['postulante_id']} no encontrado")
+
+    if not postulante.drive_folder_id:
+        concurso = postulante.concurso
+        if not concurso.postulantes_folder_id:
+            # The concurso folders may still be queued; retry later
+            raise ValueError(f"El concurso {concurso.id} no tiene carpeta de postulantes")
+
+        postulante.drive_folder_id = drive_api.create_postulante_folder(
+            concurso.postulantes_folder_id,
+            postulante.dni,
+            postulante.apellido,
+            postulante.nombre,
+            concurso.categoria,
+            concurso.dedicacion
+        )
+        db.session.commit()
+
+    return {'folderId': postulante.drive_folder_id}
+
+@job_handler('enviar_campana')
+def enviar_campana(payload):
+    """Send a notification campaign for a concurso."""
+    concurso = db.session.get(Concurso, payload['concurso_id'])
+    campaign = db.session.get(NotificationCampaign, payload['campaign_id'])
+    if concurso is None or campaign is None:
+        raise ValueError("Concurso o campaña no encontrados")
+
+    return send_campaign(concurso, campaign, drive_api, progress_callback=report_job_progress,
+                         job_id=get_current_job_id())
+
+@job_handler(REFRESH_JOB)
+def refrescar_programas(payload):
+    """Refresh the expired programas, prefetch new catalogue materias and schedule the next run."""
+    try:
+        refreshed = refresh_expired_programas()
+        prefetched = prefetch_catalogue_programas()
+    finally:
+        # Keep the schedule going even if the catedras API is down this time
+        schedule_programas_refresh(next_slot=True)
+    return {'refreshed': refreshed, 'prefetched': prefetched}
+
+def _withdraw_tribunal_signature(payload):
+    """Let the member sign again once the signature job has given up."""
+    withdraw_pending_signature(payload['documento_id'], payload['miembro_id'])
+
+@job_handler(FIRMA_TRIBUNAL_JOB, on_failure=_withdraw_tribunal_signature)
+def firmar_documento_tribunal(payload):
+    """Sign a document on behalf of a tribunal member."""
+    return sign_as_tribunal(payload['documento_id'], payload['miembro_id'], drive_api)
+
+@job_handler(FIRMA_ADMIN_JOB)
+def firmar_documento_admin(payload):
+    """Sign a draft document as an administrator."""
+    return sign_as_admin(payload['documento_id'], payload['firmante'], drive_api)
@@ -0,0 +1,337 @@
+"""
+Background job queue for concursos docentes application.
+Jobs are stored in the database (BackgroundJob) so they survive restarts, and are run
+by a small pool of worker threads with retries, exponential backoff and idempotency keys.
+"""
+import json
+import threading
+import traceback
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+
+from app.models.models import db, BackgroundJob
+
+ESTADO_PENDIENTE = 'PENDIENTE'
+ESTADO_EN_PROCESO = 'EN_PROCESO'
+ESTADO_COMPLETADO = 'COMPLETADO'
+ESTADO_FALLIDO = 'FALLIDO'
+
+# Registered job handlers by tipo, and the functions called when a job of that tipo fails for good
+_handlers = {}
+_failure_handlers = {}
+
+# Set when a job is enqueued so idle workers in this process pick it up immediately
+_wake_event = threading.Event()
+_stop_event = threading.Event()
+_workers = []
+
+# Job being run by the current thread, for report_job_progress
+_current = threading.local()
+
+def job_handler(tipo, on_failure=None):
+    """
+    Register a function as the handler of a job type.
+    The handler receives the job payload (dict) and returns a JSON-serializable result.
+    Raising an exception marks the attempt as failed and schedules a retry.
+
+    Args:
+        tipo (str): Job type name
+        on_failure (callable): Optional function called with the job payload when the job
+                               fails after its last attempt, to undo what it left pending
+    """
+    def decorator(func):
+        _handlers[tipo] = func
+        if on_failure is not None:
+            _failure_handlers[tipo] = on_failure
+        return func
+    return decorator
+
+def enqueue_job(tipo, payload=None, idempotency_key=None, max_intentos=5, creado_por_id=None, run_at=None):
+    """
+    Add a job to the queue.
+
+    If a job with the same idempotency key already exists, that job is returned and no
+    new job is created, so resubmitting the same form does not repeat the work.
+
+    Args:
+        tipo (str): Job type name, as registered with job_handler
+        payload (dict): JSON-serializable arguments for the handler
+        idempotency_key (str): Optional key identifying the operation
+        max_intentos (int): Maximum number of attempts before the job is marked as failed
+        creado_por_id (int): ID of the user that requested the job
+        run_at (datetime): Optional UTC time before which the job is not run (default: now)
+
+    Returns:
+        BackgroundJob: The queued (or previously queued) job
+    """
+    if idempotency_key:
+        existing = BackgroundJob.query.filter_by(idempotency_key=idempotency_key).first()
+        if existing:
+            return existing
+
+    job = BackgroundJob(
+        tipo=tipo,
+        estado=ESTADO_PENDIENTE,
+        idempotency_key=idempotency_key,
+        max_intentos=max_intentos,
+        proximo_intento=run_at or datetime.utcnow(),
+        creado_por_id=creado_por_id
+    )
+    job.payload = payload or {}
+    db.session.add(job)
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # Another request enqueued the same operation concurrently
+        db.session.rollback()
+        existing = BackgroundJob.query.filter_by(idempotency_key=idempotency_key).first()
+        if existing:
+            return existing
+        raise
+
+    _wake_event.set()
+    return job
+
+def retry_job(job):
+    """
+    Queue again a job that failed after all its attempts, keeping its idempotency key, so
+    resubmitting the operation once the cause of the failure is gone runs it again.
+
+    Args:
+        job (BackgroundJob): A job in FALLIDO state
+
+    Returns:
+        BackgroundJob: The job, queued again (or as another request left it)
+    """
+    BackgroundJob.query.filter(
+        BackgroundJob.id == job.id,
+        BackgroundJob.estado == ESTADO_FALLIDO
+    ).update({
+        BackgroundJob.estado: ESTADO_PENDIENTE,
+        BackgroundJob.intentos: 0,
+        BackgroundJob.proximo_intento: datetime.utcnow(),
+        BackgroundJob.error: None,
+        BackgroundJob.finalizado: None
+    }, synchronize_session=False)
+    db.session.commit()
+    _wake_event.set()
+    db.session.refresh(job)
+    return job
+
+def get_retry_delay(intentos):
+    """
+    Get the delay before the next attempt of a job, doubling with every failed attempt.
+
+    Args:
+        intentos (int): Number of attempts made so far
+
+    Returns:
+        timedelta: Delay before the next attempt
+    """
+    base = current_app.config.get('JOB_QUEUE_RETRY_BASE_DELAY', 30)
+    maximum = current_app.config.get('JOB_QUEUE_RETRY_MAX_DELAY', 3600)
+    return timedelta(seconds=min(base * (2 ** max(intentos - 1, 0)), maximum))
+
+def _claim_next_job():
+    """
+    Claim the next due job. The claim is a conditional UPDATE on the job state, so when
+    several workers (or processes) race for the same job only one of them gets it.
+
+    Returns:
+        BackgroundJob: The claimed job, or None if there is no job due
+    """
+    now = datetime.utcnow()
+    candidates = BackgroundJob.query.with_entities(BackgroundJob.id).filter(
+        BackgroundJob.estado == ESTADO_PENDIENTE,
+        BackgroundJob.proximo_intento <= now
+    ).order_by(BackgroundJob.proximo_intento, BackgroundJob.id).limit(10).all()
+
+    for (job_id,) in candidates:
+        claimed = BackgroundJob.query.filter(
+            BackgroundJob.id == job_id,
+            BackgroundJob.estado == ESTADO_PENDIENTE
+        ).update({
+            BackgroundJob.estado: ESTADO_EN_PROCESO,
+            BackgroundJob.iniciado: now,
+            BackgroundJob.latido: now,
+            BackgroundJob.intentos: BackgroundJob.intentos + 1
+        }, synchronize_session=False)
+        db.session.commit()
+        if claimed:
+            return db.session.get(BackgroundJob, job_id)
+    return None
+
+def run_job(job):
+    """
+    Run a claimed job and record its outcome.
+
+    Args:
+        job (BackgroundJob): A job in EN_PROCESO state
+    """
+    handler = _handlers.get(job.tipo)
+    _current.job_id = job.id
+    try:
+        if handler is None:
+            raise ValueError(f"No hay un manejador registrado para el tipo de tarea '{job.tipo}'")
+        resultado = handler(job.payload)
+        job.resultado = resultado
+        job.estado = ESTADO_COMPLETADO
+        job.error = None
+        job.finalizado = datetime.utcnow()
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        job = db.session.get(BackgroundJob, job.id)
+        job.error = f"{str(e)}\n{traceback.format_exc()}"
+        if job.intentos >= job.max_intentos:
+            job.estado = ESTADO_FALLIDO
+            job.finalizado = datetime.utcnow()
+            current_app.logger.error(f"Job {job.id} ({job.tipo}) failed after {job.intentos} attempts: {str(e)}")
+        else:
+            job.estado = ESTADO_PENDIENTE
+            job.proximo_intento = datetime.utcnow() + get_retry_delay(job.intentos)
+            current_app.logger.warning(f"Job {job.id} ({job.tipo}) attempt {job.intentos} failed, retrying at {job.proximo_intento}: {str(e)}")
+        db.session.commit()
+        if job.estado == ESTADO_FALLIDO and job.tipo in _failure_handlers:
+            _run_failure_handler(job)
+    finally:
+        _current.job_id = None
+
+def _run_failure_handler(job):
+    """Call the on_failure function of a job that failed after its last attempt."""
+    try:
+        _failure_handlers[job.tipo](job.payload)
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"Error cleaning up failed job {job.id} ({job.tipo}): {str(e)}")
+
+def report_job_progress(progreso):
+    """
+    Record the progress of the job being run by the current thread, so the status
+    endpoint can show it, and refresh its heartbeat. Does nothing when called outside a job.
+    This commits the current session.
+
+    Args:
+        progreso (dict): JSON-serializable progress information
+    """
+    job_id = getattr(_current, 'job_id', None)
+    if job_id is None:
+        return
+    BackgroundJob.query.filter_by(id=job_id).update(
+        {BackgroundJob.progreso_json: json.dumps(progreso), BackgroundJob.latido: datetime.utcnow()},
+        synchronize_session=False
+    )
+    db.session.commit()
+
+def get_current_job_id():
+    """Get the ID of the job being run by the current thread, or None outside a job."""
+    return getattr(_current, 'job_id', None)
+
+def get_job_progress():
+    """
+    Get the progress last recorded for the job being run by the current thread, including
+    the progress recorded by its previous attempts.
+
+    Returns:
+        dict: The recorded progress, or None outside a job or if none was recorded
+    """
+    job_id = getattr(_current, 'job_id', None)
+    if job_id is None:
+        return None
+    progreso_json = BackgroundJob.query.with_entities(BackgroundJob.progreso_json).filter_by(id=job_id).scalar()
+    return json.loads(progreso_json) if progreso_json else None
+
+def run_pending_jobs(limit=None):
+    """
+    Run the jobs that are currently due, in the calling thread.
+
+    Args:
+        limit (int): Maximum number of jobs to run (all due jobs if None)
+
+    Returns:
+        int: Number of jobs run
+    """
+    count = 0
+    while limit is None or count < limit:
+        job = _claim_next_job()
+        if job is None:
+            break
+        run_job(job)
+        count += 1
+    return count
+
+def requeue_stale_jobs():
+    """
+    Return to the queue the jobs left in EN_PROCESO by a worker that died (e.g. a restart
+    in the middle of a job), i.e. those without a heartbeat for JOB_QUEUE_STALE_TIMEOUT.
+    A long job that keeps reporting its progress is not requeued however long it runs.
+
+    Returns:
+        int: Number of jobs requeued
+    """
+    timeout = current_app.config.get('JOB_QUEUE_STALE_TIMEOUT', 900)
+    limite = datetime.utcnow() - timedelta(seconds=timeout)
+    count = BackgroundJob.query.filter(
+        BackgroundJob.estado == ESTADO_EN_PROCESO,
+        func.coalesce(BackgroundJob.latido, BackgroundJob.iniciado) < limite
+    ).update({BackgroundJob.estado: ESTADO_PENDIENTE}, synchronize_session=False)
+    db.session.commit()
+    return count
+
+def _worker_loop(app):
+    """Main loop of a worker thread."""
+    poll_interval = app.config.get('JOB_QUEUE_POLL_INTERVAL', 5)
+    while not _stop_event.is_set():
+        with app.app_context():
+            try:
+                ran = run_pending_jobs(limit=1)
+            except Exception as e:
+                app.logger.error(f"Error in background job worker: {str(e)}")
+                ran = 0
+            finally:
+                db.session.remove()
+        if not ran:
+            _wake_event.wait(poll_interval)
+            _wake_event.clear()
+
+def start_job_workers(app, count=None):
+    """
+    Start the worker threads that run queued jobs for this process.
+
+    Args:
+        app (Flask): The application the workers run jobs for
+        count (int): Number of worker threads (JOB_QUEUE_WORKERS config by default)
+
+    Returns:
+        list: The started threads
+    """
+    if _workers:
+        return _workers
+
+    if count is None:
+        count = app.config.get('JOB_QUEUE_WORKERS', 2)
+
+    with app.app_context():
+        try:
+            requeued = requeue_stale_jobs()
+            if requeued:
+                app.logger.info(f"Requeued {requeued} interrupted background jobs")
+        except Exception as e:
+            app.logger.error(f"Error requeuing interrupted background jobs: {str(e)}")
+
+    _stop_event.clear()
+    for i in range(count):
+        thread = threading.Thread(target=_worker_loop, args=(app,), name=f"job-worker-{i}", daemon=True)
+        thread.start()
+        _workers.append(thread)
+    return _workers
+
+def stop_job_workers(timeout=None):
+    """Signal the worker threads to stop and wait for them to finish their current job."""
+    _stop_event.set()
+    _wake_event.set()
+    for thread in _workers:
+        thread.join(timeout)
+    _workers.clear()
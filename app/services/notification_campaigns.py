@@ -0,0 +1,362 @@
+"""
+Notification campaign sending service for concursos docentes application.
+Resolves the recipients, attachments and placeholders of a campaign for a concurso
+and sends it concurrently, using a fixed number of queries regardless of the number of recipients.
+"""
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from flask import current_app
+from sqlalchemy import insert, or_
+from sqlalchemy.orm import joinedload
+
+from app.models.models import (
+    db, TribunalMiembro, Persona, Postulante, DocumentoConcurso, NotificationLog
+)
+from app.helpers.api_services import get_departamento_heads_data
+from app.helpers.rate_limiter import RateLimiter
+from app.integrations.google_drive import GoogleDriveAPI
+from app.services.placeholder_resolver import get_placeholder_context, compile_template
+
+def find_placeholder_keys(*texts):
+    """
+    Find the placeholder keys referenced in one or more texts.
+
+    Args:
+        *texts (str): Texts that may contain <<key>> markers
+
+    Returns:
+        set: Placeholder keys found
+    """
+    keys = set()
+    for text in texts:
+        if text:
+            keys.update(compile_template(text).keys)
+    return keys
+
+def resolve_campaign_recipients(concurso, campaign):
+    """
+    Resolve the email addresses a campaign must be sent to for a concurso.
+
+    Args:
+        concurso (Concurso): The concurso the campaign is triggered for
+        campaign (NotificationCampaign): The campaign to send
+
+    Returns:
+        tuple: (recipients, warnings) - dict mapping email to display name (empty string
+               if unknown), and a list of warning messages for the user
+    """
+    recipients = {}
+    warnings = []
+
+    # Extract configuration from destinatarios_json
+    config = campaign.destinatarios_json
+    tribunal_destinatarios = config.get('tribunal_destinatarios', [])
+    otros_roles = config.get('otros_roles_destinatarios', [])
+
+    # Process tribunal members based on role and claustro combinations, with a single query
+    wanted = {(c.get('rol'), c.get('claustro')) for c in tribunal_destinatarios if c.get('rol') and c.get('claustro')}
+    if wanted:
+        miembros = TribunalMiembro.query.options(joinedload(TribunalMiembro.persona)).filter(
+            TribunalMiembro.concurso_id == concurso.id
+        ).all()
+        for m in miembros:
+            if (m.rol, m.claustro) in wanted and m.persona and m.persona.correo:
+                recipients[m.persona.correo] = f"{m.persona.nombre} {m.persona.apellido}"
+
+    # Process other roles to resolve emails
+    if 'postulantes' in otros_roles:
+        postulantes = Postulante.query.filter_by(concurso_id=concurso.id).all()
+        for p in postulantes:
+            if p.correo:
+                recipients[p.correo] = f"{p.nombre} {p.apellido}"
+
+    if 'jefe_departamento' in otros_roles:
+        try:
+            departamento_nombre = concurso.departamento_rel.nombre if concurso.departamento_rel else ""
+            # Get department heads data from API
+            dept_heads_data = get_departamento_heads_data()
+
+            if dept_heads_data:
+                for head in dept_heads_data:
+                    if head.get('departamento') == departamento_nombre:
+                        head_email = head.get('email')
+                        if head_email:
+                            recipients[head_email] = head.get('nombre', 'Jefe de Departamento')
+        except Exception as e:
+            current_app.logger.error(f"Error fetching department heads: {str(e)}")
+            warnings.append(f'Error al obtener datos de jefes de departamento: {str(e)}')
+
+    # Add static emails
+    for email in config.get('emails_estaticos', []):
+        if email and email not in recipients:
+            recipients[email] = ""
+
+    return recipients, warnings
+
+def find_personas_for_recipients(recipients):
+    """
+    Find the Persona of each recipient with a single query.
+    A persona matches by email first, and otherwise by "Nombre Apellido" or
+    "Apellido, Nombre" equal to the recipient display name.
+
+    Args:
+        recipients (dict): Mapping of email to display name
+
+    Returns:
+        dict: Mapping of email to Persona for the recipients that have one
+    """
+    if not recipients:
+        return {}
+
+    emails = list(recipients)
+    names = [name for name in recipients.values() if name]
+
+    conditions = [Persona.correo.in_(emails)]
+    if names:
+        conditions.append((Persona.nombre + ' ' + Persona.apellido).in_(names))
+        conditions.append((Persona.apellido + ', ' + Persona.nombre).in_(names))
+    personas = Persona.query.filter(or_(*conditions)).all()
+
+    by_email = {}
+    by_name = {}
+    for persona in personas:
+        if persona.correo:
+            by_email.setdefault(persona.correo, persona)
+        by_name.setdefault(f"{persona.nombre} {persona.apellido}", persona)
+        by_name.setdefault(f"{persona.apellido}, {persona.nombre}", persona)
+
+    result = {}
+    for email, name in recipients.items():
+        persona = by_email.get(email) or (by_name.get(name) if name else None)
+        if persona:
+            result[email] = persona
+    return result
+
+def collect_campaign_attachments(concurso_id, campaign):
+    """
+    Collect the Drive file IDs to attach to a campaign for a concurso.
+
+    Args:
+        concurso_id (int): ID of the concurso
+        campaign (NotificationCampaign): The campaign to send
+
+    Returns:
+        tuple: (attachment_file_ids, warnings)
+    """
+    attachment_file_ids = []
+    warnings = []
+
+    doc_configs = []
+    for doc_config in campaign.documentos_adjuntos_config or []:
+        if not doc_config.get('tipo') or not doc_config.get('version'):
+            current_app.logger.warning(f"Skipping invalid document config: {doc_config}")
+            continue
+        doc_configs.append(doc_config)
+
+    if doc_configs:
+        current_app.logger.info(f"Getting attachments for document configs: {doc_configs}")
+        try:
+            # Load the documents of every configured type at once; the latest one per type wins
+            tipos = {doc_config['tipo'] for doc_config in doc_configs}
+            documentos = DocumentoConcurso.query.filter(
+                DocumentoConcurso.concurso_id == concurso_id,
+                DocumentoConcurso.tipo.in_(tipos)
+            ).order_by(DocumentoConcurso.id.desc()).all()
+            latest_by_tipo = {}
+            for documento in documentos:
+                latest_by_tipo.setdefault(documento.tipo, documento)
+        except Exception as e:
+            current_app.logger.error(f"Error retrieving document attachments: {str(e)}")
+            warnings.append(f'Error al adjuntar documentos: {str(e)}')
+            latest_by_tipo = {}
+
+        for doc_config in doc_configs:
+            doc_tipo = doc_config['tipo']
+            doc_version = doc_config['version']
+            documento = latest_by_tipo.get(doc_tipo)
+
+            if not documento:
+                current_app.logger.warning(f"No document found for type {doc_tipo} for concurso {concurso_id}")
+                continue
+
+            file_to_attach = None
+            if doc_version == "firmado":
+                if documento.file_id and documento.file_id.strip():
+                    file_to_attach = documento.file_id
+            elif doc_version == "borrador":
+                if documento.borrador_file_id and documento.borrador_file_id.strip():
+                    file_to_attach = documento.borrador_file_id
+
+            if file_to_attach:
+                if file_to_attach not in attachment_file_ids: # Avoid duplicate attachments if configured multiple times
+                    attachment_file_ids.append(file_to_attach)
+            else:
+                current_app.logger.warning(f"No suitable file ID found for {doc_tipo} (version: {doc_version}) for concurso {concurso_id}")
+
+    # Add custom attachment IDs
+    for file_id in campaign.adjuntos_personalizados or []:
+        if file_id and file_id.strip() and file_id.strip() not in attachment_file_ids:
+            attachment_file_ids.append(file_id.strip())
+
+    return attachment_file_ids, warnings
+
+def build_campaign_messages(concurso, campaign, recipients):
+    """
+    Build the final subject, body and placeholders for every recipient of a campaign.
+
+    The concurso-level placeholders are resolved once for the whole campaign (only the
+    field groups the campaign texts reference); each recipient only overlays its own
+    nombre_destinatario.
+
+    Args:
+        concurso (Concurso): The concurso the campaign is triggered for
+        campaign (NotificationCampaign): The campaign to send
+        recipients (dict): Mapping of email to display name
+
+    Returns:
+        list: One dict per recipient with 'email', 'asunto', 'cuerpo' and 'placeholders'
+    """
+    asunto_template = compile_template(campaign.asunto_email or "")
+    cuerpo_template = compile_template(campaign.cuerpo_email_html or "")
+    keys = asunto_template.keys | cuerpo_template.keys
+    base_placeholders = get_placeholder_context(concurso.id).resolve(keys=keys)
+    personas = find_personas_for_recipients(recipients)
+
+    unknown = keys.difference(base_placeholders, {'nombre_destinatario'})
+    if unknown:
+        current_app.logger.warning(
+            f"Campaign {campaign.id} uses unknown placeholders: {', '.join(sorted(unknown))}"
+        )
+
+    messages = []
+    for email, name in recipients.items():
+        placeholders = dict(base_placeholders)
+        persona = personas.get(email)
+        if persona:
+            placeholders['nombre_destinatario'] = f"{persona.nombre} {persona.apellido}"
+        elif name:
+            placeholders['nombre_destinatario'] = name
+
+        messages.append({
+            'email': email,
+            'asunto': asunto_template.render(placeholders),
+            'cuerpo': cuerpo_template.render(placeholders),
+            'placeholders': placeholders,
+        })
+    return messages
+
+def _send_chunk(drive_api, rate_limiter, operations):
+    """Send a chunk of email operations in one batch request, after waiting for the rate limit."""
+    rate_limiter.acquire(len(operations))
+    try:
+        return drive_api.batch(operations)
+    except Exception as e:
+        return [{'status': 'error', 'message': str(e)} for _ in operations]
+
+def send_campaign(concurso, campaign, drive_api, progress_callback=None, job_id=None):
+    """
+    Send a notification campaign for a concurso and log every delivery.
+
+    The emails are sent in chunks of NOTIFICATION_BATCH_SIZE recipients, each chunk in a
+    single batch request, with up to NOTIFICATION_MAX_CONCURRENCY chunks in flight and at
+    most NOTIFICATION_RATE_LIMIT recipients per second. The NotificationLog rows of each
+    chunk are inserted in bulk as soon as the chunk completes. When sent by a background
+    job, the recipients already logged by a previous attempt of the same job are skipped.
+
+    Args:
+        concurso (Concurso): The concurso the campaign is triggered for
+        campaign (NotificationCampaign): The campaign to send
+        drive_api (GoogleDriveAPI): Client used to send the emails
+        progress_callback (callable): Optional function called with a dict with 'total',
+                                      'sent' and 'failed' counts after each chunk
+        job_id (int): ID of the BackgroundJob sending the campaign, if any
+
+    Returns:
+        dict: Summary with 'sent', 'failed', 'attachments' counts and 'warnings' messages
+    """
+    recipients, warnings = resolve_campaign_recipients(concurso, campaign)
+    attachment_file_ids, attachment_warnings = collect_campaign_attachments(concurso.id, campaign)
+    warnings.extend(attachment_warnings)
+
+    progreso = {'total': len(recipients), 'sent': 0, 'failed': 0}
+    if job_id is not None:
+        # A previous attempt of this job may have died after sending some chunks
+        logged = NotificationLog.query.with_entities(
+            NotificationLog.destinatario_email, NotificationLog.estado_envio
+        ).filter(
+            NotificationLog.campaign_id == campaign.id,
+            NotificationLog.concurso_id == concurso.id,
+            NotificationLog.job_id == job_id
+        ).all()
+        for email, estado_envio in logged:
+            if recipients.pop(email, None) is not None:
+                progreso['sent' if estado_envio == 'ENVIADO' else 'failed'] += 1
+
+    messages = build_campaign_messages(concurso, campaign, recipients)
+    operations = [
+        GoogleDriveAPI.email_operation(
+            to_email=message['email'],
+            subject=message['asunto'],
+            html_body=message['cuerpo'],
+            sender_name='Sistema de Concursos Docentes',
+            attachment_ids=attachment_file_ids if attachment_file_ids else None,
+            placeholders=message['placeholders']
+        )
+        for message in messages
+    ]
+
+    config = current_app.config
+    batch_size = max(config.get('NOTIFICATION_BATCH_SIZE', 10), 1)
+    max_workers = max(config.get('NOTIFICATION_MAX_CONCURRENCY', 4), 1)
+    rate_limiter = RateLimiter(config.get('NOTIFICATION_RATE_LIMIT', 10))
+
+    # Committing each chunk expires the ORM objects; keep the IDs to avoid reloading them
+    campaign_id = campaign.id
+    concurso_id = concurso.id
+    attachment_count = len(attachment_file_ids)
+
+    if progress_callback:
+        progress_callback(dict(progreso))
+
+    # The worker threads only make the HTTP requests; the database is written from this thread
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            executor.submit(_send_chunk, drive_api, rate_limiter, operations[start:start + batch_size]): start
+            for start in range(0, len(operations), batch_size)
+        }
+        for future in as_completed(futures):
+            start = futures[future]
+            logs = []
+            for message, result in zip(messages[start:start + batch_size], future.result()):
+                if result.get('status') == 'success':
+                    estado_envio = "ENVIADO"
+                    error_message = None
+                    progreso['sent'] += 1
+                else:
+                    error_message = result.get('message')
+                    current_app.logger.error(f"Error sending notification to {message['email']}: {error_message}")
+                    estado_envio = "FALLIDO"
+                    progreso['failed'] += 1
+
+                logs.append({
+                    'campaign_id': campaign_id,
+                    'concurso_id': concurso_id,
+                    'destinatario_email': message['email'],
+                    'asunto_enviado': message['asunto'],
+                    'cuerpo_enviado_html': message['cuerpo'],
+                    'estado_envio': estado_envio,
+                    'error_envio': error_message,
+                    'job_id': job_id,
+                })
+
+            # Log the notifications of the chunk
+            db.session.execute(insert(NotificationLog), logs)
+            db.session.commit()
+            if progress_callback:
+                progress_callback(dict(progreso))
+
+    return {
+        'sent': progreso['sent'],
+        'failed': progreso['failed'],
+        'attachments': attachment_count,
+        'warnings': warnings,
+    }
@@ -2,10 +2,12 @@
 Placeholder resolver service for concursos docentes application.
 Provides centralized functionality for resolving placeholders across documents and notifications.
 """
+import re
 from datetime import datetime
-from flask import current_app
+from functools import lru_cache
+from flask import current_app, g, has_request_context
 from app.models.models import (
-    Concurso, Departamento, TribunalMiembro, Persona, 
+    Concurso, TribunalMiembro, Persona,
     Postulante, Sustanciacion, DocumentoConcurso
 )
 from app.helpers.api_services import get_departamento_heads_data
@@ -48,236 +50,443 @@ def _format_topic_list(base_title_singular: str, base_title_plural: str, topics_
     
     return formatted_text
 
-def get_core_placeholders(concurso_id, persona_id=None):
+# Matches <<placeholder_key>> markers in document and notification texts
+PLACEHOLDER_PATTERN = re.compile(r'<<(\w+)>>')
+
+# Placeholder keys produced by each lazily-loaded field group of a PlaceholderContext
+PLACEHOLDER_GROUPS = {
+    'concurso': (
+        'id_concurso', 'expediente', 'tipo_concurso', 'area', 'orientacion', 'categoria_codigo',
+        'categoria_nombre', 'dedicacion', 'cant_cargos_numero', 'cant_cargos_texto', 'descripcion_cargo',
+        'departamento_nombre', 'origen_vacante', 'docente_que_genera_vacante', 'licencia', 'tkd',
+        'nro_res_llamado_interino', 'nro_res_llamado_regular', 'nro_res_tribunal_regular',
+        'fecha_actual', 'yyyy', 'fecha_comision_academica', 'fecha_consejo_directivo',
+        'cierre_inscripcion_fecha', 'despacho_comision_academica', 'sesion_consejo_directivo',
+        'despacho_consejo_directivo', 'nombre_concurso_notificacion',
+    ),
+    'departamento_head': (
+        'resp_departamento', 'prefijo_resp_departamento',
+    ),
+    'tribunal': (
+        'tribunal_presidente', 'tribunal_titulares_lista', 'tribunal_suplentes_lista',
+        'tribunal_vocales_lista', 'tribunal_titular_docente_lista', 'tribunal_titular_estudiante_lista',
+        'tribunal_suplente_docente_lista', 'tribunal_suplente_estudiante_lista',
+    ),
+    'postulantes': (
+        'postulantes_lista_completa', 'postulantes_activos_lista',
+    ),
+    'sustanciacion': (
+        'constitucion_fecha', 'constitucion_lugar', 'constitucion_virtual_link', 'sorteo_fecha',
+        'sorteo_lugar', 'sorteo_virtual_link', 'exposicion_fecha', 'exposicion_lugar',
+        'exposicion_virtual_link', 'temas_exposicion', 'temas_todos', 'temas_sorteados',
+    ),
+}
+
+# Reverse lookup: placeholder key -> field group
+_GROUP_BY_KEY = {key: group for group, keys in PLACEHOLDER_GROUPS.items() for key in keys}
+
+class PlaceholderContext:
     """
-    Get a dictionary of resolved placeholders for a concurso and optionally a persona.
-    This is the central function for resolving all placeholders used in templates and notifications.
+    Resolves the placeholders of a single concurso once and keeps them for reuse.
     
-    Args:
-        concurso_id (int): ID of the concurso
-        persona_id (int, optional): ID of a persona (e.g., for recipient-specific placeholders)
-        
-    Returns:
-        dict: Dictionary with placeholder keys and their resolved string values
+    Field groups (tribunal, postulantes, sustanciacion, department head...) are only
+    loaded the first time a placeholder in that group is requested, so a template
+    that only uses concurso fields never queries the tribunal or calls the
+    department-heads API. Use get_placeholder_context() to share one instance
+    across everything that runs during a request.
     """
-    # Initialize the placeholder dictionary
-    placeholders = {}
-    
-    # Get the concurso object
-    concurso = Concurso.query.get(concurso_id)
-    if not concurso:
-        current_app.logger.error(f"Concurso not found with ID {concurso_id}")
-        return placeholders
     
-    # Get departamento data
-    departamento = Departamento.query.get(concurso.departamento_id)
-    departamento_nombre = departamento.nombre if departamento else ""
+    def __init__(self, concurso_id):
+        self.concurso_id = concurso_id
+        self._concurso = None
+        self._concurso_loaded = False
+        self._groups = {}
+        self._personas = {}
     
-    # Get department head information
-    departamento_heads = get_departamento_heads_data()
-    dept_head = None
-    if departamento_heads:
-        # Find matching department head
-        for head in departamento_heads:
-            if head.get('departamento', '').lower() == departamento_nombre.lower():
-                dept_head = head
-                break
+    @property
+    def concurso(self):
+        """The Concurso being resolved, loaded on first access."""
+        if not self._concurso_loaded:
+            self._concurso = Concurso.query.get(self.concurso_id)
+            self._concurso_loaded = True
+            if not self._concurso:
+                current_app.logger.error(f"Concurso not found with ID {self.concurso_id}")
+        return self._concurso
     
-    # Get persona data if provided
-    persona = None
-    if persona_id:
-        persona = Persona.query.get(persona_id)
-    
-    # Current date and year
-    now = datetime.now()
-    current_date = now.strftime("%d/%m/%Y")
-    current_year = str(now.year)
-    
-    # Format the cargo description
-    categoria_nombre = concurso.categoria_nombre or concurso.categoria
+    def invalidate(self, *groups):
+        """
+        Forget resolved field groups so they are loaded again on next use.
+        
+        Args:
+            *groups (str): Names of the groups to forget. If none given, everything is reloaded.
+        """
+        if not groups:
+            self._concurso_loaded = False
+            self._concurso = None
+            self._groups.clear()
+            self._personas.clear()
+            return
+        for group in groups:
+            self._groups.pop(group, None)
     
-    # Format cargo text with all parameters
-    cargo_texto = format_cargos_text(
-        concurso.cant_cargos, 
-        concurso.tipo, 
-        concurso.categoria,
-        categoria_nombre,
-        concurso.dedicacion
-    )
+    def resolve(self, persona_id=None, keys=None):
+        """
+        Get a dictionary of resolved placeholders.
+        
+        Args:
+            persona_id (int, optional): ID of a persona for recipient-specific placeholders
+            keys (iterable, optional): Placeholder keys that are actually needed. Only the
+                                       field groups containing them are loaded. If None,
+                                       every group is resolved.
+        
+        Returns:
+            dict: A new dictionary with placeholder keys and their resolved string values
+        """
+        placeholders = {}
+        if not self.concurso:
+            return placeholders
+        
+        if keys is None:
+            groups = list(PLACEHOLDER_GROUPS)
+        else:
+            groups = [group for group in PLACEHOLDER_GROUPS
+                      if group == 'concurso' or any(_GROUP_BY_KEY.get(key) == group for key in keys)]
+        
+        for group in groups:
+            placeholders.update(self.group(group))
+        
+        # Add persona-specific placeholders if a persona_id was provided
+        if persona_id:
+            placeholders.update(self.persona_placeholders(persona_id))
+        
+        return placeholders
     
-    # Generate full description for the cargo
-    descripcion_cargo = format_descripcion_cargo(
-        concurso.cant_cargos,
-        concurso.tipo,
-        concurso.categoria,
-        categoria_nombre,
-        concurso.dedicacion
-    )
+    def group(self, name):
+        """
+        Get the placeholders of a single field group, loading it if needed.
+        
+        Args:
+            name (str): Group name, one of PLACEHOLDER_GROUPS
+        
+        Returns:
+            dict: Placeholders of the group (shared, do not modify)
+        """
+        if name not in self._groups:
+            builder = getattr(self, f'_build_{name}')
+            self._groups[name] = builder(self.concurso)
+        return self._groups[name]
     
-    # Get tribunal data
-    tribunal_members = concurso.asignaciones_tribunal.all() if hasattr(concurso, 'asignaciones_tribunal') else []
+    def persona_placeholders(self, persona_id):
+        """
+        Get the recipient-specific placeholders for a persona.
+        
+        Args:
+            persona_id (int): ID of the persona
+        
+        Returns:
+            dict: Persona placeholders (empty if the persona does not exist)
+        """
+        if persona_id not in self._personas:
+            persona = Persona.query.get(persona_id)
+            self._personas[persona_id] = (
+                {'nombre_destinatario': f"{persona.nombre} {persona.apellido}"} if persona else {}
+            )
+        return self._personas[persona_id]
     
-    # Initialize tribunal lists
-    tribunal_presidente = ""
-    tribunal_titulares = []
-    tribunal_suplentes = []
-    tribunal_vocales = []
-    tribunal_titular_docente = []
-    tribunal_titular_estudiante = []
-    tribunal_suplente_docente = []
-    tribunal_suplente_estudiante = []
-      # Process tribunal members
-    for miembro in tribunal_members:
-        persona_tribunal = miembro.persona
-        if not persona_tribunal:
-            continue
-        
-        # Format the member string with name and DNI
-        member_str = f"{persona_tribunal.apellido}, {persona_tribunal.nombre} (DNI {persona_tribunal.dni})"
-        
-        if miembro.rol == "Titular" or miembro.rol == "Presidente":
-            tribunal_titulares.append(member_str)
+    def _build_concurso(self, concurso):
+        # Get departamento data
+        departamento = concurso.departamento_rel
+        departamento_nombre = departamento.nombre if departamento else ""
+        
+        # Current date and year
+        now = datetime.now()
+        
+        # Format the cargo description
+        categoria_nombre = concurso.categoria_nombre or concurso.categoria
+        
+        # Format cargo text with all parameters
+        cargo_texto = format_cargos_text(
+            concurso.cant_cargos, 
+            concurso.tipo, 
+            concurso.categoria,
+            categoria_nombre,
+            concurso.dedicacion
+        )
+        
+        # Generate full description for the cargo
+        descripcion_cargo = format_descripcion_cargo(
+            concurso.cant_cargos,
+            concurso.tipo,
+            concurso.categoria,
+            categoria_nombre,
+            concurso.dedicacion
+        )
+        
+        return {
+            # Concurso & General Info
+            'id_concurso': str(concurso.id),
+            'expediente': concurso.expediente or '',
+            'tipo_concurso': concurso.tipo or '',
+            'area': concurso.area or '',
+            'orientacion': concurso.orientacion or '',
+            'categoria_codigo': concurso.categoria or '',
+            'categoria_nombre': categoria_nombre or '',
+            'dedicacion': concurso.dedicacion or '',
+            'cant_cargos_numero': str(concurso.cant_cargos),
+            'cant_cargos_texto': cargo_texto,
+            'descripcion_cargo': descripcion_cargo,
+            'departamento_nombre': departamento_nombre,
+            'origen_vacante': concurso.origen_vacante or '',
+            'docente_que_genera_vacante': concurso.docente_vacante or '',
+            'licencia': concurso.origen_vacante if concurso.origen_vacante == "LICENCIA SIN GOCE DE HABERES" else '',
+            'tkd': concurso.tkd or '',
+            'nro_res_llamado_interino': concurso.nro_res_llamado_interino or '',
+            'nro_res_llamado_regular': concurso.nro_res_llamado_regular or '',
+            'nro_res_tribunal_regular': concurso.nro_res_tribunal_regular or '',
             
-            # Add to the correct claustro list
-            if miembro.claustro == "Docente":
-                tribunal_titular_docente.append(member_str)
-            elif miembro.claustro == "Estudiante":
-                tribunal_titular_estudiante.append(member_str)
+            # Dates
+            'fecha_actual': now.strftime("%d/%m/%Y"),
+            'yyyy': str(now.year),
+            'fecha_comision_academica': '', # These may need to be populated from document-specific data
+            'fecha_consejo_directivo': '',
+            'cierre_inscripcion_fecha': concurso.cierre_inscripcion.strftime("%d/%m/%Y") if concurso.cierre_inscripcion else '',
             
-            # If president, store separately
-            if miembro.rol == "Presidente":
-                tribunal_presidente = member_str
-            else:
-                # If not president but titular, add to vocales
-                tribunal_vocales.append(member_str)
-        else:
-            tribunal_suplentes.append(member_str)
+            # Committee/Council
+            'despacho_comision_academica': '',
+            'sesion_consejo_directivo': '',
+            'despacho_consejo_directivo': '',
             
-            # Add to the correct claustro list
-            if miembro.claustro == "Docente":
-                tribunal_suplente_docente.append(member_str)
-            elif miembro.claustro == "Estudiante":
-                tribunal_suplente_estudiante.append(member_str)
+            # Notification-specific placeholders
+            'nombre_concurso_notificacion': f"Concurso #{concurso.id} - {categoria_nombre}",
+        }
     
-    # Get postulantes data
-    postulantes = Postulante.query.filter_by(concurso_id=concurso_id).all()
-    postulantes_list = []
-    postulantes_activos_list = []
+    def _build_departamento_head(self, concurso):
+        departamento_nombre = self.group('concurso')['departamento_nombre']
+        
+        # Get department head information
+        departamento_heads = get_departamento_heads_data()
+        dept_head = None
+        if departamento_heads:
+            # Find matching department head
+            for head in departamento_heads:
+                if head.get('departamento', '').lower() == departamento_nombre.lower():
+                    dept_head = head
+                    break
+        
+        return {
+            'resp_departamento': dept_head.get('responsable', '') if dept_head else '',
+            'prefijo_resp_departamento': dept_head.get('prefijo', '') if dept_head else '',
+        }
     
-    for postulante in postulantes:
-        # Format postulante string
-        postulante_str = f"{postulante.apellido}, {postulante.nombre} (DNI {postulante.dni})"
-        postulantes_list.append(postulante_str)
-        
-        # Add to active list if not excluded
-        if not postulante.excluido:
-            postulantes_activos_list.append(postulante_str)
+    def _build_tribunal(self, concurso):
+        tribunal_members = concurso.asignaciones_tribunal.all() if hasattr(concurso, 'asignaciones_tribunal') else []
+        
+        # Initialize tribunal lists
+        tribunal_presidente = ""
+        tribunal_titulares = []
+        tribunal_suplentes = []
+        tribunal_vocales = []
+        tribunal_titular_docente = []
+        tribunal_titular_estudiante = []
+        tribunal_suplente_docente = []
+        tribunal_suplente_estudiante = []
+        
+        # Process tribunal members
+        for miembro in tribunal_members:
+            persona_tribunal = miembro.persona
+            if not persona_tribunal:
+                continue
+            
+            # Format the member string with name and DNI
+            member_str = f"{persona_tribunal.apellido}, {persona_tribunal.nombre} (DNI {persona_tribunal.dni})"
+            
+            if miembro.rol == "Titular" or miembro.rol == "Presidente":
+                tribunal_titulares.append(member_str)
+                
+                # Add to the correct claustro list
+                if miembro.claustro == "Docente":
+                    tribunal_titular_docente.append(member_str)
+                elif miembro.claustro == "Estudiante":
+                    tribunal_titular_estudiante.append(member_str)
+                
+                # If president, store separately
+                if miembro.rol == "Presidente":
+                    tribunal_presidente = member_str
+                else:
+                    # If not president but titular, add to vocales
+                    tribunal_vocales.append(member_str)
+            else:
+                tribunal_suplentes.append(member_str)
+                
+                # Add to the correct claustro list
+                if miembro.claustro == "Docente":
+                    tribunal_suplente_docente.append(member_str)
+                elif miembro.claustro == "Estudiante":
+                    tribunal_suplente_estudiante.append(member_str)
+        
+        return {
+            'tribunal_presidente': tribunal_presidente,
+            'tribunal_titulares_lista': '\n'.join(tribunal_titulares),
+            'tribunal_suplentes_lista': '\n'.join(tribunal_suplentes),
+            'tribunal_vocales_lista': '\n'.join(tribunal_vocales),
+            'tribunal_titular_docente_lista': '\n'.join(tribunal_titular_docente),
+            'tribunal_titular_estudiante_lista': '\n'.join(tribunal_titular_estudiante),
+            'tribunal_suplente_docente_lista': '\n'.join(tribunal_suplente_docente),
+            'tribunal_suplente_estudiante_lista': '\n'.join(tribunal_suplente_estudiante),
+        }
     
-    # Get sustanciacion data
-    sustanciacion = Sustanciacion.query.filter_by(concurso_id=concurso_id).first()
+    def _build_postulantes(self, concurso):
+        postulantes = Postulante.query.filter_by(concurso_id=concurso.id).all()
+        postulantes_list = []
+        postulantes_activos_list = []
+        
+        for postulante in postulantes:
+            # Format postulante string
+            postulante_str = f"{postulante.apellido}, {postulante.nombre} (DNI {postulante.dni})"
+            postulantes_list.append(postulante_str)
+            
+            # Add to active list if not excluded
+            if not postulante.excluido:
+                postulantes_activos_list.append(postulante_str)
+        
+        return {
+            'postulantes_lista_completa': '\n'.join(postulantes_list),
+            'postulantes_activos_lista': '\n'.join(postulantes_activos_list),
+        }
     
-    # Build the core placeholders dictionary
-    placeholders.update({
-        # Concurso & General Info
-        'id_concurso': str(concurso.id),
-        'expediente': concurso.expediente or '',
-        'tipo_concurso': concurso.tipo or '',
-        'area': concurso.area or '',
-        'orientacion': concurso.orientacion or '',
-        'categoria_codigo': concurso.categoria or '',
-        'categoria_nombre': categoria_nombre or '',
-        'dedicacion': concurso.dedicacion or '',
-        'cant_cargos_numero': str(concurso.cant_cargos),
-        'cant_cargos_texto': cargo_texto,
-        'descripcion_cargo': descripcion_cargo,
-        'departamento_nombre': departamento_nombre,
-        'origen_vacante': concurso.origen_vacante or '',
-        'docente_que_genera_vacante': concurso.docente_vacante or '',
-        'licencia': concurso.origen_vacante if concurso.origen_vacante == "LICENCIA SIN GOCE DE HABERES" else '',
-        'tkd': concurso.tkd or '',
-        'nro_res_llamado_interino': concurso.nro_res_llamado_interino or '',
-        'nro_res_llamado_regular': concurso.nro_res_llamado_regular or '',
-        'nro_res_tribunal_regular': concurso.nro_res_tribunal_regular or '',
-        
-        # Dates
-        'fecha_actual': current_date,
-        'yyyy': current_year,
-        'fecha_comision_academica': '', # These may need to be populated from document-specific data
-        'fecha_consejo_directivo': '',
-        'cierre_inscripcion_fecha': concurso.cierre_inscripcion.strftime("%d/%m/%Y") if concurso.cierre_inscripcion else '',
-        
-        # Committee/Council
-        'despacho_comision_academica': '',
-        'sesion_consejo_directivo': '',
-        'despacho_consejo_directivo': '',
-        
-        # Department Head
-        'resp_departamento': dept_head.get('responsable', '') if dept_head else '',
-        'prefijo_resp_departamento': dept_head.get('prefijo', '') if dept_head else '',
-        
-        # Tribunal
-        'tribunal_presidente': tribunal_presidente,
-        'tribunal_titulares_lista': '\n'.join(tribunal_titulares),
-        'tribunal_suplentes_lista': '\n'.join(tribunal_suplentes),
-        'tribunal_vocales_lista': '\n'.join(tribunal_vocales),
-        'tribunal_titular_docente_lista': '\n'.join(tribunal_titular_docente),
-        'tribunal_titular_estudiante_lista': '\n'.join(tribunal_titular_estudiante),
-        'tribunal_suplente_docente_lista': '\n'.join(tribunal_suplente_docente),
-        'tribunal_suplente_estudiante_lista': '\n'.join(tribunal_suplente_estudiante),
-        
-        # Postulantes
-        'postulantes_lista_completa': '\n'.join(postulantes_list),
-        'postulantes_activos_lista': '\n'.join(postulantes_activos_list),
-    })
-      # Add Sustanciacion data if available
-    if sustanciacion:
-        placeholders.update({
-            'constitucion_fecha': sustanciacion.constitucion_fecha.strftime("%d/%m/%Y") if sustanciacion.constitucion_fecha else '',
-            'constitucion_lugar': sustanciacion.constitucion_lugar or '',
-            'constitucion_virtual_link': sustanciacion.constitucion_virtual_link or '',
-            'sorteo_fecha': sustanciacion.sorteo_fecha.strftime("%d/%m/%Y") if sustanciacion.sorteo_fecha else '',
-            'sorteo_lugar': sustanciacion.sorteo_lugar or '',
-            'sorteo_virtual_link': sustanciacion.sorteo_virtual_link or '',
-            'exposicion_fecha': sustanciacion.exposicion_fecha.strftime("%d/%m/%Y") if sustanciacion.exposicion_fecha else '',
-            'exposicion_lugar': sustanciacion.exposicion_lugar or '',
-            'exposicion_virtual_link': sustanciacion.exposicion_virtual_link or '',
-            'temas_exposicion': sustanciacion.temas_exposicion or '',
-        })
-        
-        # Add formatted topic lists using the helper function
-        placeholders['temas_todos'] = _format_topic_list(
-            "Tema Propuesto", 
-            "Temas Propuestos", 
-            sustanciacion.temas_exposicion
-        )
+    def _build_sustanciacion(self, concurso):
+        sustanciacion = Sustanciacion.query.filter_by(concurso_id=concurso.id).first()
+        placeholders = {}
         
-        placeholders['temas_sorteados'] = _format_topic_list(
-            "Tema Sorteado", 
-            "Temas Sorteados", 
-            sustanciacion.tema_sorteado
-        )
-    else:
-        # If no sustanciacion data is available, add empty formatted lists
+        if sustanciacion:
+            placeholders.update({
+                'constitucion_fecha': sustanciacion.constitucion_fecha.strftime("%d/%m/%Y") if sustanciacion.constitucion_fecha else '',
+                'constitucion_lugar': sustanciacion.constitucion_lugar or '',
+                'constitucion_virtual_link': sustanciacion.constitucion_virtual_link or '',
+                'sorteo_fecha': sustanciacion.sorteo_fecha.strftime("%d/%m/%Y") if sustanciacion.sorteo_fecha else '',
+                'sorteo_lugar': sustanciacion.sorteo_lugar or '',
+                'sorteo_virtual_link': sustanciacion.sorteo_virtual_link or '',
+                'exposicion_fecha': sustanciacion.exposicion_fecha.strftime("%d/%m/%Y") if sustanciacion.exposicion_fecha else '',
+                'exposicion_lugar': sustanciacion.exposicion_lugar or '',
+                'exposicion_virtual_link': sustanciacion.exposicion_virtual_link or '',
+                'temas_exposicion': sustanciacion.temas_exposicion or '',
+            })
+        
+        # Add formatted topic lists (empty lists if there is no sustanciacion yet)
         placeholders['temas_todos'] = _format_topic_list(
             "Tema Propuesto", 
             "Temas Propuestos", 
-            None
+            sustanciacion.temas_exposicion if sustanciacion else None
         )
         
         placeholders['temas_sorteados'] = _format_topic_list(
             "Tema Sorteado", 
             "Temas Sorteados", 
-            None
+            sustanciacion.tema_sorteado if sustanciacion else None
         )
+        
+        return placeholders
+
+def get_placeholder_context(concurso_id):
+    """
+    Get the PlaceholderContext for a concurso, shared for the current request.
+    
+    Document generation, considerandos and notifications running in the same request
+    all get the same context, so each field group is resolved at most once. Outside
+    a request a new context is returned on every call.
+    
+    Args:
+        concurso_id (int): ID of the concurso
+        
+    Returns:
+        PlaceholderContext: The context for the concurso
+    """
+    if not has_request_context():
+        return PlaceholderContext(concurso_id)
+    
+    contexts = g.setdefault('placeholder_contexts', {})
+    if concurso_id not in contexts:
+        contexts[concurso_id] = PlaceholderContext(concurso_id)
+    return contexts[concurso_id]
+
+def get_core_placeholders(concurso_id, persona_id=None, keys=None):
+    """
+    Get a dictionary of resolved placeholders for a concurso and optionally a persona.
+    This is the central function for resolving all placeholders used in templates and notifications.
+    
+    Args:
+        concurso_id (int): ID of the concurso
+        persona_id (int, optional): ID of a persona (e.g., for recipient-specific placeholders)
+        keys (iterable, optional): Placeholder keys actually needed; only the field groups
+                                   containing them are loaded
+        
+    Returns:
+        dict: Dictionary with placeholder keys and their resolved string values
+    """
+    return get_placeholder_context(concurso_id).resolve(persona_id=persona_id, keys=keys)
+
+class CompiledTemplate:
+    """
+    A text split once into literal chunks and <<key>> markers, so it can be rendered
+    for many sets of values in a single pass.
     
-    # Add Notification-specific placeholders
-    placeholders['nombre_concurso_notificacion'] = f"Concurso #{concurso.id} - {categoria_nombre}"
+    Markers whose key has no value are left in the output unchanged, like
+    replace_text_with_placeholders always did.
+    """
     
-    # Add persona-specific placeholders if a persona_id was provided
-    if persona:
-        placeholders['nombre_destinatario'] = f"{persona.nombre} {persona.apellido}"
+    def __init__(self, text):
+        self.text = text
+        # re.split with one capture group alternates literal, key, literal, key..., literal
+        parts = PLACEHOLDER_PATTERN.split(text)
+        self._literals = tuple(parts[0::2])
+        self._keys = tuple(parts[1::2])
+        self.keys = frozenset(self._keys)
     
-    return placeholders
+    def render(self, placeholder_values_dict):
+        """
+        Render the template with the given values.
+        
+        Args:
+            placeholder_values_dict (dict): Dictionary with placeholder keys and their values.
+                                            None values are rendered as an empty string.
+        
+        Returns:
+            str: Rendered text
+        """
+        if not self._keys:
+            return self.text
+        
+        chunks = [self._literals[0]]
+        for key, literal in zip(self._keys, self._literals[1:]):
+            if key in placeholder_values_dict:
+                value = placeholder_values_dict[key]
+                chunks.append(str(value) if value is not None else "")
+            else:
+                chunks.append(f"<<{key}>>")
+            chunks.append(literal)
+        return "".join(chunks)
+    
+    def unknown_keys(self, placeholder_values_dict):
+        """Keys referenced by the template that have no value (they are rendered verbatim)."""
+        return self.keys.difference(placeholder_values_dict)
+    
+    def unused_keys(self, placeholder_values_dict):
+        """Keys with a value that the template never references."""
+        return set(placeholder_values_dict).difference(self.keys)
+
+@lru_cache(maxsize=256)
+def compile_template(text_content):
+    """
+    Compile a text containing <<key>> placeholders, reusing the compiled form for texts
+    seen before (e.g. the subject and body of a campaign, or a considerandos template).
+    
+    Args:
+        text_content (str): Text content containing placeholders.
+    
+    Returns:
+        CompiledTemplate: The compiled template
+    """
+    return CompiledTemplate(text_content)
 
 def replace_text_with_placeholders(text_content, placeholder_values_dict):
     """
@@ -294,14 +503,4 @@ def replace_text_with_placeholders(text_content, placeholder_values_dict):
     if not text_content:
         return text_content
     
-    result_text = text_content
-    
-    # Replace each placeholder with its corresponding value
-    for key, value in placeholder_values_dict.items():
-        # Ensure value is a string
-        str_value = str(value) if value is not None else ""
-        # Replace placeholders in the format <<key_name>>
-        placeholder = f"<<{key}>>"
-        result_text = result_text.replace(placeholder, str_value)
-    
-    return result_text
+    return compile_template(text_content).render(placeholder_values_dict)
@@ -0,0 +1,194 @@
+"""
+Programas store for concursos docentes application.
+Keeps the catedras API programa of every materia in the database (ProgramaMateria), so
+programa lookups are answered locally and only materias never seen before go upstream.
+A scheduled background job refetches expired entries in bulk and prefetches the
+programas of every materia in the asignaturas catalogue.
+"""
+import time
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy.exc import IntegrityError, OperationalError
+from sqlalchemy.orm import Session
+
+from app.models.models import db, ProgramaMateria
+from app.helpers.api_services import get_programas_by_materia_ids, asignaturas_catalogue_cache
+from app.services.job_queue import enqueue_job
+
+REFRESH_JOB = 'refrescar_programas'
+
+def _ttl(encontrado):
+    """Seconds an entry stays fresh: programas rarely change, a missing one may appear sooner."""
+    if encontrado:
+        return current_app.config.get('PROGRAMAS_CACHE_TTL', 604800)
+    return current_app.config.get('PROGRAMAS_NOT_FOUND_TTL', 86400)
+
+def _is_cacheable(entry):
+    """Transient failures (timeouts, auth errors...) carry an 'error' key and are not stored."""
+    return entry is not None and 'error' not in entry
+
+def _fetch_and_store(materia_ids):
+    """
+    Fetch programas upstream and store the definitive answers, committing every
+    PROGRAMAS_REFRESH_BATCH_SIZE materias (each batch is itself fetched in parallel chunks).
+
+    Args:
+        materia_ids (list): Materia IDs as strings
+
+    Returns:
+        dict: Entries by materia ID, including the transient failures
+    """
+    batch_size = current_app.config.get('PROGRAMAS_REFRESH_BATCH_SIZE', 500)
+    result = {}
+    for start in range(0, len(materia_ids), batch_size):
+        batch = materia_ids[start:start + batch_size]
+        fetched = get_programas_by_materia_ids(batch) or {}
+        result.update(fetched)
+        _store(fetched)
+    return result
+
+def _store(entries):
+    """
+    Insert or update the cacheable entries in the store, in one commit.
+
+    The entries are written in a session of their own, so storing them neither commits nor
+    rolls back the caller's pending changes. If the database cannot take the write (e.g. SQLite
+    locked by another writer), the entries are only served; they are stored on a later lookup
+    or by the refresh job.
+    """
+    now = datetime.utcnow()
+    cacheable = {mid: entry for mid, entry in entries.items() if _is_cacheable(entry)}
+    if not cacheable:
+        return
+
+    with Session(db.engine) as session:
+        existing = {
+            programa.id_materia: programa
+            for programa in session.query(ProgramaMateria).filter(ProgramaMateria.id_materia.in_(list(cacheable))).all()
+        }
+        for mid, entry in cacheable.items():
+            programa = existing.get(mid)
+            if programa is None:
+                programa = ProgramaMateria(id_materia=mid)
+                session.add(programa)
+            programa.encontrado = not entry.get('not_found')
+            programa.datos = entry
+            programa.actualizado = now
+            programa.vence = now + timedelta(seconds=_ttl(programa.encontrado))
+        try:
+            session.commit()
+        except IntegrityError:
+            # Another worker stored the same materias concurrently; its answer is as good as ours
+            session.rollback()
+        except OperationalError as e:
+            session.rollback()
+            current_app.logger.warning(f"Could not store {len(cacheable)} programas: {str(e)}")
+
+def get_programas(materia_ids):
+    """
+    Get the programas of several materias, going upstream only for materias never seen.
+
+    Stored entries are served even when expired; the refresh job fetches those again.
+
+    Args:
+        materia_ids (list): Materia IDs
+
+    Returns:
+        dict: Mapping each materia ID (as string) to its programa or to a not_found entry,
+              in the format of get_programas_by_materia_ids
+    """
+    ids = list(dict.fromkeys(str(mid) for mid in materia_ids))
+    if not ids:
+        return {}
+
+    # Reading the store does not flush the caller's pending changes, which _store leaves alone
+    with db.session.no_autoflush:
+        result = {
+            programa.id_materia: programa.datos
+            for programa in ProgramaMateria.query.filter(ProgramaMateria.id_materia.in_(ids)).all()
+        }
+    unseen = [mid for mid in ids if mid not in result]
+    if unseen:
+        current_app.logger.info(f"Fetching {len(unseen)} unseen programas of {len(ids)} requested")
+        result.update(_fetch_and_store(unseen))
+    return {mid: result[mid] for mid in ids if mid in result}
+
+def refresh_expired_programas(limit=None):
+    """
+    Fetch again the stored programas whose entry has expired.
+
+    Args:
+        limit (int): Maximum number of materias to refresh (all expired ones if None)
+
+    Returns:
+        int: Number of materias refreshed
+    """
+    query = ProgramaMateria.query.with_entities(ProgramaMateria.id_materia).filter(
+        ProgramaMateria.vence <= datetime.utcnow()
+    ).order_by(ProgramaMateria.vence)
+    if limit is not None:
+        query = query.limit(limit)
+    expired = [mid for (mid,) in query.all()]
+    if expired:
+        _fetch_and_store(expired)
+    return len(expired)
+
+def prefetch_catalogue_programas():
+    """
+    Fetch the programas of the materias of the asignaturas catalogue that are not stored yet.
+
+    Returns:
+        int: Number of materias fetched
+    """
+    index = asignaturas_catalogue_cache.get()
+    if not index:
+        return 0
+    catalogue_ids = {
+        str(asignatura['id_materia'])
+        for asignaturas in index.values() for asignatura in asignaturas if asignatura.get('id_materia')
+    }
+    known = {mid for (mid,) in ProgramaMateria.query.with_entities(ProgramaMateria.id_materia).all()}
+    unseen = sorted(catalogue_ids - known)
+    if unseen:
+        _fetch_and_store(unseen)
+    return len(unseen)
+
+def schedule_programas_refresh(next_slot=False):
+    """
+    Queue the programas refresh job for the current (or next) refresh interval.
+
+    The idempotency key is the start of the interval, so every process can call this at
+    boot and the refresh still runs once per interval.
+
+    Args:
+        next_slot (bool): Schedule the run of the next interval instead of the current one
+
+    Returns:
+        BackgroundJob: The queued (or previously queued) job
+    """
+    interval = current_app.config.get('PROGRAMAS_REFRESH_INTERVAL', 86400)
+    slot = int(time.time() // interval) * interval
+    if next_slot:
+        slot += interval
+    run_at = max(datetime.utcnow(), datetime.utcfromtimestamp(slot))
+    return enqueue_job(REFRESH_JOB, {'slot': slot}, idempotency_key=f"{REFRESH_JOB}:{slot}",
+                       max_intentos=3, run_at=run_at)
+
+def start_programas_refresh(app):
+    """
+    Queue the programas refresh of the current interval when a worker process boots.
+    The job schedules the following runs itself.
+
+    Args:
+        app (Flask): The application the job runs for
+
+    Returns:
+        BackgroundJob: The queued (or previously queued) job, or None if it could not be queued
+    """
+    with app.app_context():
+        try:
+            return schedule_programas_refresh()
+        except Exception as e:
+            app.logger.error(f"Error scheduling the programas refresh: {str(e)}")
+            return None
@@ -0,0 +1,292 @@
+"""
+Full-text search index for concursos docentes application.
+Indexes personas, postulantes and concursos in a single table (an FTS5 virtual table on
+SQLite, a tsvector column with a GIN index on PostgreSQL) that is kept in sync on every
+flush, and answers accent-insensitive prefix searches over names, DNI, emails and
+expedientes.
+"""
+import logging
+import re
+import unicodedata
+import weakref
+
+from sqlalchemy import event, inspect, select, text
+from sqlalchemy.orm import Session
+
+from app.models.models import db, Persona, Postulante, Concurso
+
+logger = logging.getLogger(__name__)
+
+SEARCH_TABLE = 'search_index'
+
+# Indexed columns of each model. The document id packs the entity type into the
+# low bits of the row id, so a row can be replaced or deleted through its primary key.
+INDEXED_MODELS = {
+    'persona': (Persona, 1, ('apellido', 'nombre', 'dni', 'correo', 'username')),
+    'postulante': (Postulante, 2, ('apellido', 'nombre', 'dni', 'correo')),
+    'concurso': (Concurso, 3, ('expediente', 'area', 'orientacion', 'categoria', 'categoria_nombre',
+                               'asignaturas', 'docente_vacante')),
+}
+_TYPE_BITS = 4
+_TIPOS_BY_MODEL = {model: tipo for tipo, (model, _, _) in INDEXED_MODELS.items()}
+_TIPOS_BY_CODE = {code: tipo for tipo, (_, code, _) in INDEXED_MODELS.items()}
+
+# Rows inserted per statement when rebuilding the index
+REBUILD_BATCH_SIZE = 1000
+
+_TOKEN_PATTERN = re.compile(r'[^\W_]+')
+
+def normalize(value):
+    """Lowercase a text and strip its accents ('Gómez Núñez' -> 'gomez nunez')."""
+    decomposed = unicodedata.normalize('NFKD', str(value))
+    return ''.join(c for c in decomposed if not unicodedata.combining(c)).casefold()
+
+def tokenize(value):
+    """Split a text into normalized words, dropping punctuation (emails split at '.' and '@')."""
+    return _TOKEN_PATTERN.findall(normalize(value)) if value else []
+
+def doc_id_for(tipo, entity_id):
+    return entity_id * _TYPE_BITS + INDEXED_MODELS[tipo][1]
+
+def document_for(tipo, obj):
+    """
+    Build the indexed text of a persona, postulante or concurso.
+
+    Args:
+        tipo (str): 'persona', 'postulante' or 'concurso'
+        obj: Model instance or row with the indexed columns
+
+    Returns:
+        tuple: (doc_id, text)
+    """
+    columns = INDEXED_MODELS[tipo][2]
+    words = []
+    for column in columns:
+        words.extend(tokenize(getattr(obj, column)))
+    return doc_id_for(tipo, obj.id), ' '.join(words)
+
+class SqliteSearchBackend:
+    """FTS5 virtual table; the document id is the rowid."""
+
+    def exists(self, connection):
+        return connection.execute(
+            text("SELECT 1 FROM sqlite_master WHERE name = :name"), {'name': SEARCH_TABLE}
+        ).first() is not None
+
+    def create(self, connection):
+        # Accents are already stripped by normalize(); remove_diacritics also covers raw queries
+        connection.execute(text(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5("
+            "contenido, tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+        ))
+
+    def drop(self, connection):
+        connection.execute(text(f"DROP TABLE IF EXISTS {SEARCH_TABLE}"))
+
+    def upsert(self, connection, documents):
+        self.delete(connection, [doc_id for doc_id, _ in documents])
+        connection.execute(
+            text(f"INSERT INTO {SEARCH_TABLE} (rowid, contenido) VALUES (:doc_id, :contenido)"),
+            [{'doc_id': doc_id, 'contenido': contenido} for doc_id, contenido in documents]
+        )
+
+    def delete(self, connection, doc_ids):
+        connection.execute(text(f"DELETE FROM {SEARCH_TABLE} WHERE rowid = :doc_id"),
+                           [{'doc_id': doc_id} for doc_id in doc_ids])
+
+    def search(self, connection, tokens, codes, limit):
+        match = ' '.join(f'"{token}"*' for token in tokens)
+        codes_sql = ', '.join(str(code) for code in codes)
+        return connection.execute(text(
+            f"SELECT rowid FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH :match "
+            f"AND rowid % {_TYPE_BITS} IN ({codes_sql}) ORDER BY rank LIMIT :limit"
+        ), {'match': match, 'limit': limit}).scalars().all()
+
+class PostgresSearchBackend:
+    """Plain table with a generated tsvector column and a GIN index."""
+
+    def exists(self, connection):
+        return inspect(connection).has_table(SEARCH_TABLE)
+
+    def create(self, connection):
+        # 'simple' configuration: no stemming or stop words, so prefixes of names match
+        connection.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {SEARCH_TABLE} ("
+            "doc_id BIGINT PRIMARY KEY, contenido TEXT NOT NULL, "
+            "documento TSVECTOR GENERATED ALWAYS AS (to_tsvector('simple', contenido)) STORED)"
+        ))
+        connection.execute(text(
+            f"CREATE INDEX IF NOT EXISTS ix_{SEARCH_TABLE}_documento ON {SEARCH_TABLE} USING GIN (documento)"
+        ))
+
+    def drop(self, connection):
+        connection.execute(text(f"DROP TABLE IF EXISTS {SEARCH_TABLE}"))
+
+    def upsert(self, connection, documents):
+        connection.execute(text(
+            f"INSERT INTO {SEARCH_TABLE} (doc_id, contenido) VALUES (:doc_id, :contenido) "
+            "ON CONFLICT (doc_id) DO UPDATE SET contenido = EXCLUDED.contenido"
+        ), [{'doc_id': doc_id, 'contenido': contenido} for doc_id, contenido in documents])
+
+    def delete(self, connection, doc_ids):
+        connection.execute(text(f"DELETE FROM {SEARCH_TABLE} WHERE doc_id = :doc_id"),
+                           [{'doc_id': doc_id} for doc_id in doc_ids])
+
+    def search(self, connection, tokens, codes, limit):
+        query = ' & '.join(f'{token}:*' for token in tokens)
+        codes_sql = ', '.join(str(code) for code in codes)
+        return connection.execute(text(
+            f"SELECT doc_id FROM {SEARCH_TABLE}, to_tsquery('simple', :query) AS query "
+            f"WHERE documento @@ query AND doc_id % {_TYPE_BITS} IN ({codes_sql}) "
+            "ORDER BY ts_rank(documento, query) DESC, doc_id LIMIT :limit"
+        ), {'query': query, 'limit': limit}).scalars().all()
+
+_BACKENDS = {
+    'sqlite': SqliteSearchBackend(),
+    'postgresql': PostgresSearchBackend(),
+}
+
+# Engines on which the index table is known to exist
+_ready_engines = weakref.WeakKeyDictionary()
+
+def get_backend(connection):
+    """
+    Get the search backend of a connection.
+
+    Returns:
+        The backend, or None if the database is not supported or has no index table
+    """
+    backend = _BACKENDS.get(connection.dialect.name)
+    if backend is None:
+        return None
+    engine = connection.engine
+    if not _ready_engines.get(engine):
+        if not backend.exists(connection):
+            return None
+        _ready_engines[engine] = True
+    return backend
+
+def create_search_index(connection):
+    """
+    Create the index table if it does not exist, and fill it from the existing rows.
+
+    Args:
+        connection (Connection): Connection to create the table on
+
+    Returns:
+        bool: True if the table was created
+    """
+    backend = _BACKENDS.get(connection.dialect.name)
+    if backend is None:
+        logger.warning(f"Full-text search is not supported on {connection.dialect.name}")
+        return False
+    if backend.exists(connection):
+        return False
+    backend.create(connection)
+    _ready_engines[connection.engine] = True
+    rebuild_search_index(connection)
+    return True
+
+def drop_search_index(connection):
+    """Drop the index table."""
+    backend = _BACKENDS.get(connection.dialect.name)
+    if backend is not None:
+        backend.drop(connection)
+    _ready_engines.pop(connection.engine, None)
+
+def rebuild_search_index(connection):
+    """
+    Reindex every persona, postulante and concurso.
+
+    Args:
+        connection (Connection): Connection with the index table
+
+    Returns:
+        int: Number of indexed documents
+    """
+    backend = get_backend(connection)
+    if backend is None:
+        return 0
+    indexed = 0
+    for tipo, (model, _, columns) in INDEXED_MODELS.items():
+        table = model.__table__
+        rows = connection.execute(select(table.c.id, *(table.c[column] for column in columns)))
+        while True:
+            batch = rows.fetchmany(REBUILD_BATCH_SIZE)
+            if not batch:
+                break
+            backend.upsert(connection, [document_for(tipo, row) for row in batch])
+            indexed += len(batch)
+    return indexed
+
+def search(query, tipos=None, limit=20):
+    """
+    Search personas, postulantes and concursos by word prefixes, ignoring case and accents.
+
+    Every word of the query must match the start of an indexed word, so 'gom jua' finds
+    'Juan Gómez'. Results are ordered by relevance.
+
+    Args:
+        query (str): Text typed by the user
+        tipos (iterable, optional): Restrict to these entity types (default: all)
+        limit (int): Maximum number of results
+
+    Returns:
+        list: (tipo, entity id) tuples
+    """
+    tokens = tokenize(query)
+    tipos = tuple(tipos) if tipos else tuple(INDEXED_MODELS)
+    if not tokens or limit <= 0:
+        return []
+
+    connection = db.session.connection()
+    backend = get_backend(connection)
+    if backend is None:
+        return []
+    codes = [INDEXED_MODELS[tipo][1] for tipo in tipos]
+    return [(_TIPOS_BY_CODE[doc_id % _TYPE_BITS], doc_id // _TYPE_BITS)
+            for doc_id in backend.search(connection, tokens, codes, limit)]
+
+def search_objects(query, tipos=None, limit=20):
+    """
+    Search and load the matching objects, with one query per entity type.
+
+    Returns:
+        list: (tipo, instance) tuples ordered by relevance
+    """
+    hits = search(query, tipos, limit)
+    ids_by_tipo = {}
+    for tipo, entity_id in hits:
+        ids_by_tipo.setdefault(tipo, []).append(entity_id)
+
+    loaded = {}
+    for tipo, ids in ids_by_tipo.items():
+        model = INDEXED_MODELS[tipo][0]
+        for obj in model.query.filter(model.id.in_(ids)).all():
+            loaded[(tipo, obj.id)] = obj
+    # Skip hits whose row was deleted by another process since it was indexed
+    return [(tipo, loaded[(tipo, entity_id)]) for tipo, entity_id in hits if (tipo, entity_id) in loaded]
+
+@event.listens_for(db.metadata, 'after_create')
+def _create_after_create_all(target, connection, **kw):
+    create_search_index(connection)
+
+@event.listens_for(db.metadata, 'before_drop')
+def _drop_before_drop_all(target, connection, **kw):
+    drop_search_index(connection)
+
+@event.listens_for(Session, 'after_flush')
+def _index_flushed_rows(session, flush_context):
+    changed = [obj for obj in (*session.new, *session.dirty) if type(obj) in _TIPOS_BY_MODEL]
+    deleted = [obj for obj in session.deleted if type(obj) in _TIPOS_BY_MODEL]
+    if not changed and not deleted:
+        return
+
+    connection = session.connection()
+    backend = get_backend(connection)
+    if backend is None:
+        return
+    if changed:
+        backend.upsert(connection, [document_for(_TIPOS_BY_MODEL[type(obj)], obj) for obj in changed])
+    if deleted:
+        backend.delete(connection, [doc_id_for(_TIPOS_BY_MODEL[type(obj)], obj.id) for obj in deleted])
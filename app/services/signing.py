@@ -0,0 +1,482 @@
+"""
+Document signing service for concursos docentes application.
+Signing a document (download from Drive, stamp every page, upload it back) runs as a
+background job instead of in the request, and the CPU-bound stamping runs in a pool of
+worker processes, so signers at a tribunal session neither hold web workers for the whole
+cycle nor compete with each other for the interpreter lock.
+
+Tribunal signatures go through a ledger: each one is recorded as a pending FirmaDocumento,
+and a single signer at a time (the holder of the document's signing lease) stamps all the
+pending ones in one cycle. The document's firma_version guards the upload and the final
+write, so stamps are never recorded against a file that changed in between, and the upload
+is remembered in the ledger so a cycle that fails after it is not stamped twice.
+"""
+import base64
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import exists, or_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import joinedload
+
+from app.models.models import db, DocumentoConcurso, TribunalMiembro, FirmaDocumento, HistorialEstado
+from app.helpers.pdf_utils import add_signature_stamps
+from app.services.job_queue import get_job_progress, report_job_progress
+
+FIRMA_TRIBUNAL_JOB = 'firmar_documento_tribunal'
+FIRMA_ADMIN_JOB = 'firmar_documento_admin'
+
+# Process pool shared by the job workers of this process, created on first use
+_pool = None
+_pool_lock = threading.Lock()
+
+def _get_pool():
+    """Get the stamping process pool, or None if stamping runs in the calling thread."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            workers = current_app.config.get('SIGNING_PROCESS_WORKERS', 2)
+            if workers <= 0:
+                return None
+            # Spawned (not forked) so the children do not inherit the threads and
+            # database connections of the web process
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+        return _pool
+
+def shutdown_signing_pool(wait=True):
+    """Stop the stamping process pool; it is created again on the next signature."""
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=wait)
+
+def _terminate_signing_pool(pool):
+    """Kill the worker processes of a stamping pool and discard it."""
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    # shutdown() does not stop a running task, so a stuck stamping would keep its worker
+    # busy forever; the other jobs using the pool fail with BrokenProcessPool and are retried
+    for process in list((pool._processes or {}).values()):
+        process.terminate()
+    pool.shutdown(wait=False, cancel_futures=True)
+
+def _run_stamping(func, *args):
+    """Run a stamping function in the process pool (or in this thread if it is disabled)."""
+    pool = _get_pool()
+    if pool is None:
+        return func(*args)
+    try:
+        return pool.submit(func, *args).result(timeout=current_app.config.get('SIGNING_TIMEOUT', 120))
+    except FutureTimeoutError:
+        _terminate_signing_pool(pool)
+        raise
+    except BrokenProcessPool:
+        # A worker process died (e.g. killed by the OS); start a new pool next time
+        shutdown_signing_pool(wait=False)
+        raise
+
+def stamp_pdf_signatures(pdf_bytes, signers, signature_count=0):
+    """
+    Add the stamps of one or more signers to every page of a PDF, in a single pass of the
+    stamping process pool.
+
+    Args:
+        pdf_bytes (bytes): The PDF to sign
+        signers (list): Dicts with apellido, nombre, dni and optionally cargo, in signing order
+        signature_count (int): Number of signatures the document already has
+
+    Returns:
+        bytes: The stamped PDF
+
+    Raises:
+        ValueError: If the PDF could not be stamped
+    """
+    stamped = _run_stamping(add_signature_stamps, pdf_bytes, list(signers), signature_count)
+    # add_signature_stamps returns its input unchanged when stamping fails
+    if not stamped or stamped == pdf_bytes:
+        raise ValueError("Error al agregar las firmas al PDF")
+    return stamped
+
+class StaleSignatureError(Exception):
+    """The document's signed file changed while the pending signatures were being stamped."""
+
+def request_tribunal_signature(documento, miembro):
+    """
+    Record a tribunal member's signature in the ledger as pending; it is stamped on the file
+    by apply_pending_signatures.
+
+    Args:
+        documento (DocumentoConcurso): The document to sign
+        miembro (TribunalMiembro): The signing member
+
+    Returns:
+        FirmaDocumento: The pending signature, or None if the member had already signed
+    """
+    firma = FirmaDocumento(documento_id=documento.id, miembro_id=miembro.id, aplicada=False)
+    db.session.add(firma)
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # Already signed, or the same signature was requested concurrently
+        db.session.rollback()
+        return None
+    return firma
+
+def discard_signatures(documento):
+    """
+    Discard a document's signatures when its file is replaced or removed: its ledger entries
+    are deleted and its version is bumped, in the caller's transaction (not committed), so a
+    signer still stamping the previous file can record neither its upload nor its stamps.
+
+    The version is incremented in SQL rather than from the loaded value, which a lease taken
+    since the document was loaded would already have moved past.
+
+    Args:
+        documento (DocumentoConcurso): The document whose file changes
+    """
+    FirmaDocumento.query.filter_by(documento_id=documento.id).delete(synchronize_session=False)
+    DocumentoConcurso.query.filter(DocumentoConcurso.id == documento.id).update({
+        DocumentoConcurso.firma_version: DocumentoConcurso.firma_version + 1,
+        DocumentoConcurso.firmando_hasta: None
+    }, synchronize_session=False)
+    db.session.expire(documento, ['firmas', 'firma_version', 'firmando_hasta'])
+
+def withdraw_pending_signature(documento_id, miembro_id):
+    """
+    Remove a member's signature from the ledger when its job gave up, so the member can sign
+    again. The signature is kept if it was already uploaded, or while another signer holds the
+    document's lease, since that signer's cycle may be stamping it; it is then recorded (or
+    retried) by that cycle.
+
+    Args:
+        documento_id (int): ID of the DocumentoConcurso
+        miembro_id (int): ID of the TribunalMiembro
+
+    Returns:
+        bool: Whether the pending signature was removed
+    """
+    lease_held = exists().where(
+        DocumentoConcurso.id == documento_id,
+        DocumentoConcurso.firmando_hasta >= datetime.utcnow()
+    )
+    removed = FirmaDocumento.query.filter(
+        FirmaDocumento.documento_id == documento_id,
+        FirmaDocumento.miembro_id == miembro_id,
+        FirmaDocumento.aplicada.is_(False),
+        FirmaDocumento.subida_file_id.is_(None),
+        ~lease_held
+    ).delete(synchronize_session=False)
+    db.session.commit()
+    return bool(removed)
+
+def _pending_firmas(documento_id):
+    return FirmaDocumento.query.filter(
+        FirmaDocumento.documento_id == documento_id,
+        FirmaDocumento.aplicada.is_(False)
+    )
+
+def _claim_signing_lease(documento_id):
+    """
+    Take the document's signing lease. The claim is a conditional UPDATE on the version and
+    the lease, so of several signers racing for the same document only one gets it.
+
+    Returns:
+        int: The document version owned by the lease holder, or None if someone else holds it
+    """
+    now = datetime.utcnow()
+    row = DocumentoConcurso.query.with_entities(DocumentoConcurso.firma_version).filter(
+        DocumentoConcurso.id == documento_id
+    ).first()
+    if row is None:
+        raise ValueError(f"Documento {documento_id} no encontrado")
+    version = row.firma_version
+    lease = timedelta(seconds=current_app.config.get('SIGNING_LEASE_SECONDS', 600))
+    claimed = DocumentoConcurso.query.filter(
+        DocumentoConcurso.id == documento_id,
+        DocumentoConcurso.firma_version == version,
+        or_(DocumentoConcurso.firmando_hasta.is_(None), DocumentoConcurso.firmando_hasta < now)
+    ).update({
+        DocumentoConcurso.firma_version: version + 1,
+        DocumentoConcurso.firmando_hasta: now + lease
+    }, synchronize_session=False)
+    db.session.commit()
+    return version + 1 if claimed else None
+
+def _renew_signing_lease(documento_id, version):
+    """
+    Extend the signing lease for `version`, in the current transaction.
+
+    Raises:
+        StaleSignatureError: If the document changed since the lease was taken
+    """
+    lease = timedelta(seconds=current_app.config.get('SIGNING_LEASE_SECONDS', 600))
+    renewed = DocumentoConcurso.query.filter(
+        DocumentoConcurso.id == documento_id,
+        DocumentoConcurso.firma_version == version
+    ).update({DocumentoConcurso.firmando_hasta: datetime.utcnow() + lease}, synchronize_session=False)
+    if not renewed:
+        raise StaleSignatureError(f"El documento {documento_id} cambió mientras se firmaba")
+
+def _release_signing_lease(documento_id, version):
+    DocumentoConcurso.query.filter(
+        DocumentoConcurso.id == documento_id,
+        DocumentoConcurso.firma_version == version
+    ).update({DocumentoConcurso.firmando_hasta: None}, synchronize_session=False)
+    db.session.commit()
+
+def _upload_stamped_file(documento, version, firmas, drive_api):
+    """
+    Stamp the signatures on the document's file and upload it, recording the upload on the
+    signatures so it is not repeated.
+
+    Returns:
+        tuple: (file_id, web_view_link) of the uploaded file
+    """
+    pdf_content = drive_api.download_file(documento.file_id)
+    if not pdf_content:
+        raise ValueError("No se pudo obtener el contenido del archivo")
+
+    signers = [
+        {'apellido': firma.miembro.persona.apellido, 'nombre': firma.miembro.persona.nombre,
+         'dni': firma.miembro.persona.dni}
+        for firma in firmas
+    ]
+    pdf_with_stamps = stamp_pdf_signatures(pdf_content, signers, signature_count=documento.firma_count)
+
+    # Check that the document did not change and extend the lease before replacing the file,
+    # so a cycle that outlived its lease does not upload over another signer's
+    _renew_signing_lease(documento.id, version)
+    db.session.commit()
+
+    # Upload back to Drive, replacing the original
+    new_file_id, web_view_link = drive_api.overwrite_file(
+        documento.file_id,
+        base64.b64encode(pdf_with_stamps).decode('utf-8')
+    )
+    if not new_file_id:
+        raise ValueError("Error al guardar el documento firmado")
+
+    try:
+        _renew_signing_lease(documento.id, version)
+    except StaleSignatureError:
+        # The document was replaced during the upload; the stamped copy is of no use
+        try:
+            drive_api.delete_file(new_file_id)
+        except Exception as e:
+            current_app.logger.warning(f"Could not delete discarded signed file {new_file_id}: {str(e)}")
+        raise
+    FirmaDocumento.query.filter(FirmaDocumento.id.in_([firma.id for firma in firmas])).update(
+        {FirmaDocumento.subida_file_id: new_file_id, FirmaDocumento.subida_url: web_view_link},
+        synchronize_session=False
+    )
+    db.session.commit()
+    return new_file_id, web_view_link
+
+def _stamp_pending_signatures(documento_id, version, drive_api):
+    """
+    Stamp every pending signature on the document in one download, stamp and upload cycle,
+    while holding the signing lease for `version`, and record them.
+
+    Returns:
+        int: Number of signatures stamped
+    """
+    db.session.expire_all()
+    documento = db.session.get(DocumentoConcurso, documento_id)
+    firmas = _pending_firmas(documento_id).options(
+        joinedload(FirmaDocumento.miembro).joinedload(TribunalMiembro.persona)
+    ).order_by(FirmaDocumento.id).all()
+    if not firmas:
+        _release_signing_lease(documento_id, version)
+        return 0
+    if documento.estado != 'PENDIENTE DE FIRMA' or not documento.file_id:
+        raise ValueError("El documento no está en estado correcto para ser firmado")
+
+    uploaded = [firma for firma in firmas if firma.subida_file_id]
+    if uploaded:
+        # A previous cycle uploaded these stamps and failed before recording them
+        new_file_id, web_view_link = uploaded[0].subida_file_id, uploaded[0].subida_url
+        firmas = [firma for firma in uploaded if firma.subida_file_id == new_file_id]
+    else:
+        new_file_id, web_view_link = _upload_stamped_file(documento, version, firmas, drive_api)
+
+    firma_count = documento.firma_count + len(firmas)
+    values = {
+        DocumentoConcurso.firma_count: firma_count,
+        DocumentoConcurso.firma_version: version + 1,
+        DocumentoConcurso.firmando_hasta: None,
+        DocumentoConcurso.file_id: new_file_id,
+    }
+    if web_view_link:
+        values[DocumentoConcurso.url] = web_view_link
+
+    # Mark the document as signed once all the non-suplente members have signed
+    tribunal_titulares = TribunalMiembro.query.filter(
+        TribunalMiembro.concurso_id == documento.concurso_id,
+        TribunalMiembro.rol != 'Suplente'
+    ).count()
+    firmado = firma_count >= tribunal_titulares
+    if firmado:
+        values[DocumentoConcurso.estado] = 'FIRMADO'
+
+    # Record the stamps only if nobody changed the document since the lease was taken
+    updated = DocumentoConcurso.query.filter(
+        DocumentoConcurso.id == documento_id,
+        DocumentoConcurso.firma_version == version
+    ).update(values, synchronize_session=False)
+    if not updated:
+        raise StaleSignatureError(f"El documento {documento_id} cambió mientras se firmaba")
+
+    FirmaDocumento.query.filter(FirmaDocumento.id.in_([firma.id for firma in firmas])).update(
+        {FirmaDocumento.aplicada: True, FirmaDocumento.fecha_firma: datetime.utcnow(),
+         FirmaDocumento.subida_file_id: None, FirmaDocumento.subida_url: None},
+        synchronize_session=False
+    )
+    if firmado:
+        db.session.add(HistorialEstado(
+            concurso_id=documento.concurso_id,
+            estado="DOCUMENTO_FIRMADO",
+            observaciones=f"Documento {documento.tipo} completamente firmado"
+        ))
+    db.session.commit()
+    return len(firmas)
+
+def apply_pending_signatures(documento_id, drive_api):
+    """
+    Stamp the pending signatures of a document, unless another signer is already doing it.
+
+    The lease holder checks for pending signatures again after releasing the lease, so a
+    signature requested while it was stamping is either picked up by it or by the signer
+    that requested it, and concurrent signers share download, stamp and upload cycles.
+
+    Args:
+        documento_id (int): ID of the DocumentoConcurso
+        drive_api (GoogleDriveAPI): Drive client
+
+    Returns:
+        int: Number of signatures stamped, or None if another signer holds the lease
+    """
+    applied = 0
+    while _pending_firmas(documento_id).count():
+        version = _claim_signing_lease(documento_id)
+        if version is None:
+            return applied or None
+        try:
+            applied += _stamp_pending_signatures(documento_id, version, drive_api)
+        except Exception:
+            db.session.rollback()
+            _release_signing_lease(documento_id, version)
+            raise
+    return applied
+
+def sign_as_tribunal(documento_id, miembro_id, drive_api):
+    """
+    Stamp a tribunal member's pending signature, waiting for the signer that holds the
+    document's lease if its cycle already includes it.
+
+    Args:
+        documento_id (int): ID of the DocumentoConcurso
+        miembro_id (int): ID of the signing TribunalMiembro
+        drive_api (GoogleDriveAPI): Drive client
+
+    Returns:
+        dict: The document's signature count and estado after signing
+    """
+    config = current_app.config
+    deadline = time.monotonic() + config.get('SIGNING_TIMEOUT', 120)
+    while True:
+        apply_pending_signatures(documento_id, drive_api)
+        db.session.expire_all()
+        firma = FirmaDocumento.query.filter_by(documento_id=documento_id, miembro_id=miembro_id).first()
+        if firma is None:
+            raise ValueError("La firma fue descartada porque el documento cambió")
+        if firma.aplicada:
+            documento = db.session.get(DocumentoConcurso, documento_id)
+            return {'firma_count': documento.firma_count, 'estado': documento.estado}
+        if time.monotonic() >= deadline:
+            # The job is retried; the signature stays pending in the ledger
+            raise ValueError("Otro firmante está firmando el documento; se reintentará la firma")
+        time.sleep(config.get('SIGNING_LEASE_POLL_INTERVAL', 0.5))
+
+def _upload_admin_signed_copy(documento, concurso, firmante, drive_api):
+    """Stamp an administrator's signature on a draft and upload it to the signed documents folder."""
+    file_data = drive_api.get_file_content(documento.borrador_file_id)
+    if not file_data or 'fileData' not in file_data:
+        raise ValueError("No se pudo recuperar el documento para firmar")
+    file_name = file_data.get('fileName', f"documento_{documento.id}.pdf")
+    mime_type = file_data.get('mimeType', 'application/pdf')
+    # Google Docs are exported as PDF by the Drive API
+    if mime_type not in ('application/pdf', 'application/vnd.google-apps.document'):
+        raise ValueError("Solo se pueden firmar documentos en formato PDF")
+
+    signed_pdf_bytes = stamp_pdf_signatures(base64.b64decode(file_data['fileData']), [firmante],
+                                            signature_count=documento.firma_count)
+
+    if '.' in file_name:
+        name_part, ext_part = file_name.rsplit('.', 1)
+        signed_file_name = f"{name_part}_firmado_admin.{ext_part}"
+    else:
+        signed_file_name = f"{file_name}_firmado_admin.pdf"
+
+    return drive_api.upload_document(
+        concurso.documentos_firmados_folder_id,
+        signed_file_name,
+        signed_pdf_bytes,
+        'application/pdf'
+    )
+
+def sign_as_admin(documento_id, firmante, drive_api):
+    """
+    Sign a draft document as an administrator, uploading the signed copy to the concurso's
+    signed documents folder.
+
+    Args:
+        documento_id (int): ID of the DocumentoConcurso
+        firmante (dict): nombre, apellido, dni and cargo of the signer
+        drive_api (GoogleDriveAPI): Drive client
+
+    Returns:
+        dict: The signed file ID and URL
+    """
+    documento = db.session.get(DocumentoConcurso, documento_id)
+    if documento is None:
+        raise ValueError(f"Documento {documento_id} no encontrado")
+
+    # A previous attempt may have completed before failing to report it
+    if documento.estado == 'FIRMADO':
+        return {'file_id': documento.file_id, 'url': documento.url}
+    if documento.estado != 'BORRADOR' or not documento.borrador_file_id:
+        raise ValueError("Solo se pueden firmar documentos en estado BORRADOR")
+    concurso = documento.concurso
+    if not concurso.documentos_firmados_folder_id:
+        raise ValueError("El concurso no tiene una carpeta de documentos firmados configurada")
+
+    # A previous attempt may have uploaded the signed copy and failed before committing it;
+    # the upload is recorded as the job's progress so it is not uploaded a second time
+    subida = get_job_progress() or {}
+    if subida.get('file_id'):
+        file_id, web_view_link = subida['file_id'], subida.get('url')
+    else:
+        file_id, web_view_link = _upload_admin_signed_copy(documento, concurso, firmante, drive_api)
+        report_job_progress({'file_id': file_id, 'url': web_view_link})
+
+    nombre, apellido, cargo = firmante['nombre'], firmante['apellido'], firmante['cargo']
+
+    documento.file_id = file_id
+    documento.url = web_view_link
+    documento.estado = 'FIRMADO'
+    documento.firma_count += 1
+    db.session.add(HistorialEstado(
+        concurso_id=concurso.id,
+        estado='FIRMADO',
+        observaciones=f'Documento {documento.tipo} firmado digitalmente por {nombre} {apellido} (Cargo: {cargo})'
+    ))
+    db.session.commit()
+    return {'file_id': file_id, 'url': web_view_link}
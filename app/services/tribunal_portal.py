@@ -0,0 +1,60 @@
+"""
+Tribunal portal loader for concursos docentes application.
+Loads the concursos a persona sits on together with their tribunal assignment in a
+single query, however many tribunals the persona belongs to.
+"""
+from sqlalchemy.orm import contains_eager
+
+from app.models.models import Concurso, TribunalMiembro
+
+class TribunalAssignment:
+    """
+    A concurso and the persona's membership in its tribunal.
+
+    Attributes:
+        concurso (Concurso): The concurso, with its departamento loaded
+        miembro (TribunalMiembro): The persona's assignment in the concurso's tribunal
+    """
+
+    def __init__(self, miembro):
+        self.miembro = miembro
+        self.concurso = miembro.concurso
+
+    @property
+    def rol(self):
+        return self.miembro.rol
+
+    @property
+    def claustro(self):
+        return self.miembro.claustro
+
+    @property
+    def permisos(self):
+        """The member's permission flags in this concurso."""
+        return {
+            'can_add_tema': bool(self.miembro.can_add_tema),
+            'can_upload_file': bool(self.miembro.can_upload_file),
+            'can_sign_file': bool(self.miembro.can_sign_file),
+            'can_view_postulante_docs': bool(self.miembro.can_view_postulante_docs),
+        }
+
+def load_tribunal_assignments(persona_id):
+    """
+    Load every tribunal assignment of a persona with its concurso, in one query.
+
+    Args:
+        persona_id (int): ID of the persona
+
+    Returns:
+        list: TribunalAssignment, newest concurso first
+    """
+    miembros = TribunalMiembro.query.join(TribunalMiembro.concurso).options(
+        contains_eager(TribunalMiembro.concurso).joinedload(Concurso.departamento_rel)
+    ).filter(
+        TribunalMiembro.persona_id == persona_id
+    ).order_by(Concurso.id.desc()).all()
+    return [TribunalAssignment(miembro) for miembro in miembros]
+
+def latest_assignment(assignments):
+    """Get the most recently created assignment, or None if there are none."""
+    return max(assignments, key=lambda assignment: assignment.miembro.id, default=None)
@@ -0,0 +1,47 @@
+// Polls the status of a queued background job (e.g. a document signature) shown in an
+// element with data-job-status-url, and reloads the page at data-job-done-url once it ends
+document.addEventListener('DOMContentLoaded', function() {
+    const container = document.querySelector('[data-job-status-url]');
+    if (!container) {
+        return;
+    }
+
+    const statusUrl = container.dataset.jobStatusUrl;
+    const doneUrl = container.dataset.jobDoneUrl || window.location.pathname;
+    let delay = 1000;
+
+    function showError(message) {
+        container.classList.remove('alert-info');
+        container.classList.add('alert-danger');
+        container.textContent = message;
+    }
+
+    function poll() {
+        fetch(statusUrl, { headers: { 'Accept': 'application/json' } })
+            .then(response => {
+                if (!response.ok) {
+                    throw new Error(`HTTP ${response.status}`);
+                }
+                return response.json();
+            })
+            .then(job => {
+                if (job.estado === 'COMPLETADO') {
+                    window.location.href = doneUrl;
+                } else if (job.estado === 'FALLIDO') {
+                    const error = (job.error || '').split('\n')[0];
+                    showError(`No se pudo completar la operación: ${error}`);
+                } else {
+                    // Back off up to one request every 5 seconds while the job waits or runs
+                    delay = Math.min(delay * 1.5, 5000);
+                    setTimeout(poll, delay);
+                }
+            })
+            .catch(error => {
+                console.error('Error checking job status:', error);
+                delay = Math.min(delay * 2, 10000);
+                setTimeout(poll, delay);
+            });
+    }
+
+    setTimeout(poll, delay);
+});
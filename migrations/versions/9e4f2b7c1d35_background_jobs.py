@@ -0,0 +1,52 @@
+"""Add the background job queue
+
+Revision ID: 9e4f2b7c1d35
+Revises: 
+Create Date: 2026-10-17 16:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9e4f2b7c1d35'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # The table already exists in databases created with db.create_all()
+    if not sa.inspect(op.get_bind()).has_table('background_jobs'):
+        op.create_table('background_jobs',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('tipo', sa.String(length=100), nullable=False),
+        sa.Column('payload_json', sa.Text(), nullable=True),
+        sa.Column('estado', sa.String(length=20), nullable=False),
+        sa.Column('idempotency_key', sa.String(length=255), nullable=True),
+        sa.Column('intentos', sa.Integer(), nullable=False),
+        sa.Column('max_intentos', sa.Integer(), nullable=False),
+        sa.Column('proximo_intento', sa.DateTime(), nullable=False),
+        sa.Column('resultado_json', sa.Text(), nullable=True),
+        sa.Column('progreso_json', sa.Text(), nullable=True),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('creado', sa.DateTime(), nullable=True),
+        sa.Column('iniciado', sa.DateTime(), nullable=True),
+        sa.Column('finalizado', sa.DateTime(), nullable=True),
+        sa.Column('creado_por_id', sa.Integer(), nullable=True),
+        sa.ForeignKeyConstraint(['creado_por_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('idempotency_key')
+        )
+    op.create_index('ix_background_jobs_tipo', 'background_jobs', ['tipo'], unique=False, if_not_exists=True)
+    op.create_index('ix_background_jobs_estado', 'background_jobs', ['estado'], unique=False, if_not_exists=True)
+    op.create_index('ix_background_jobs_proximo_intento', 'background_jobs', ['proximo_intento'], unique=False,
+                    if_not_exists=True)
+
+
+def downgrade():
+    op.drop_index('ix_background_jobs_proximo_intento', table_name='background_jobs', if_exists=True)
+    op.drop_index('ix_background_jobs_estado', table_name='background_jobs', if_exists=True)
+    op.drop_index('ix_background_jobs_tipo', table_name='background_jobs', if_exists=True)
+    op.drop_table('background_jobs')
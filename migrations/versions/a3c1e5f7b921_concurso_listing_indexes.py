@@ -0,0 +1,34 @@
+"""Add indexes for the paginated concurso listings
+
+Revision ID: a3c1e5f7b921
+Revises: 9e4f2b7c1d35
+Create Date: 2026-10-17 17:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'a3c1e5f7b921'
+down_revision = '9e4f2b7c1d35'
+branch_labels = None
+depends_on = None
+
+# Databases created by db.create_all() after this change already have these indexes
+INDEXES = (
+    ('ix_concursos_estado_actual_id', 'concursos', ['estado_actual', 'id']),
+    ('ix_concursos_departamento_id_id', 'concursos', ['departamento_id', 'id']),
+    ('ix_concursos_tipo_id', 'concursos', ['tipo', 'id']),
+    ('ix_concursos_creado', 'concursos', ['creado']),
+    ('ix_tribunal_miembros_concurso_id', 'tribunal_miembros', ['concurso_id']),
+)
+
+
+def upgrade():
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns, if_not_exists=True)
+
+
+def downgrade():
+    for name, table, columns in reversed(INDEXES):
+        op.drop_index(name, table_name=table, if_exists=True)
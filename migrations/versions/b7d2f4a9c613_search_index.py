@@ -0,0 +1,26 @@
+"""Add the full-text search index
+
+Revision ID: b7d2f4a9c613
+Revises: a3c1e5f7b921
+Create Date: 2026-10-17 18:00:00.000000
+
+"""
+from alembic import op
+
+from app.services.search_index import create_search_index, drop_search_index
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7d2f4a9c613'
+down_revision = 'a3c1e5f7b921'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # FTS5 virtual table on SQLite, tsvector + GIN index on PostgreSQL; filled from the existing rows
+    create_search_index(op.get_bind())
+
+
+def downgrade():
+    drop_search_index(op.get_bind())
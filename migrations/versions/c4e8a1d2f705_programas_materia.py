@@ -0,0 +1,36 @@
+"""Add the programas store
+
+Revision ID: c4e8a1d2f705
+Revises: b7d2f4a9c613
+Create Date: 2026-10-17 19:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c4e8a1d2f705'
+down_revision = 'b7d2f4a9c613'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # The table already exists in databases created with db.create_all()
+    if not sa.inspect(op.get_bind()).has_table('programas_materia'):
+        op.create_table('programas_materia',
+        sa.Column('id_materia', sa.String(length=20), nullable=False),
+        sa.Column('encontrado', sa.Boolean(), nullable=False),
+        sa.Column('datos_json', sa.Text(), nullable=False),
+        sa.Column('actualizado', sa.DateTime(), nullable=False),
+        sa.Column('vence', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id_materia')
+        )
+    op.create_index('ix_programas_materia_vence', 'programas_materia', ['vence'], unique=False, if_not_exists=True)
+
+
+def downgrade():
+    op.drop_index('ix_programas_materia_vence', table_name='programas_materia', if_exists=True)
+
+    op.drop_table('programas_materia')
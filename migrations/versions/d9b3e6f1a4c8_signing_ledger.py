@@ -0,0 +1,55 @@
+"""Add the signing ledger columns
+
+Revision ID: d9b3e6f1a4c8
+Revises: c4e8a1d2f705
+Create Date: 2026-10-17 21:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd9b3e6f1a4c8'
+down_revision = 'c4e8a1d2f705'
+branch_labels = None
+depends_on = None
+
+
+def _column_names(inspector, table):
+    return {column['name'] for column in inspector.get_columns(table)}
+
+
+def upgrade():
+    # Databases created by db.create_all() after this change already have these columns
+    inspector = sa.inspect(op.get_bind())
+    documento_columns = _column_names(inspector, 'documentos_concurso')
+    with op.batch_alter_table('documentos_concurso', schema=None) as batch_op:
+        if 'firma_version' not in documento_columns:
+            batch_op.add_column(sa.Column('firma_version', sa.Integer(), nullable=False, server_default='0'))
+        if 'firmando_hasta' not in documento_columns:
+            batch_op.add_column(sa.Column('firmando_hasta', sa.DateTime(), nullable=True))
+
+    firma_columns = _column_names(inspector, 'firmas_documento')
+    firma_constraints = {constraint['name'] for constraint in inspector.get_unique_constraints('firmas_documento')}
+    if 'uq_firma_documento_miembro' not in firma_constraints:
+        # Concurrent signing requests could record the same member twice; keep the first signature
+        op.execute(
+            "DELETE FROM firmas_documento WHERE id NOT IN "
+            "(SELECT MIN(id) FROM firmas_documento GROUP BY documento_id, miembro_id)"
+        )
+    with op.batch_alter_table('firmas_documento', schema=None) as batch_op:
+        if 'aplicada' not in firma_columns:
+            batch_op.add_column(sa.Column('aplicada', sa.Boolean(), nullable=False, server_default=sa.true()))
+        if 'uq_firma_documento_miembro' not in firma_constraints:
+            batch_op.create_unique_constraint('uq_firma_documento_miembro', ['documento_id', 'miembro_id'])
+
+
+def downgrade():
+    with op.batch_alter_table('firmas_documento', schema=None) as batch_op:
+        batch_op.drop_constraint('uq_firma_documento_miembro', type_='unique')
+        batch_op.drop_column('aplicada')
+
+    with op.batch_alter_table('documentos_concurso', schema=None) as batch_op:
+        batch_op.drop_column('firmando_hasta')
+        batch_op.drop_column('firma_version')
@@ -0,0 +1,32 @@
+"""Record the uploads of pending signatures
+
+Revision ID: e2a7c5d9b3f1
+Revises: d9b3e6f1a4c8
+Create Date: 2026-10-17 23:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e2a7c5d9b3f1'
+down_revision = 'd9b3e6f1a4c8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Databases created by db.create_all() after this change already have these columns
+    columns = {column['name'] for column in sa.inspect(op.get_bind()).get_columns('firmas_documento')}
+    with op.batch_alter_table('firmas_documento', schema=None) as batch_op:
+        if 'subida_file_id' not in columns:
+            batch_op.add_column(sa.Column('subida_file_id', sa.String(length=100), nullable=True))
+        if 'subida_url' not in columns:
+            batch_op.add_column(sa.Column('subida_url', sa.String(length=255), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('firmas_documento', schema=None) as batch_op:
+        batch_op.drop_column('subida_url')
+        batch_op.drop_column('subida_file_id')
@@ -0,0 +1,40 @@
+"""Add the job heartbeat and the job of each notification log
+
+Revision ID: f6b1d8e4a2c7
+Revises: e2a7c5d9b3f1
+Create Date: 2026-10-18 00:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f6b1d8e4a2c7'
+down_revision = 'e2a7c5d9b3f1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Databases created by db.create_all() after this change already have these columns
+    inspector = sa.inspect(op.get_bind())
+    if 'latido' not in {column['name'] for column in inspector.get_columns('background_jobs')}:
+        with op.batch_alter_table('background_jobs', schema=None) as batch_op:
+            batch_op.add_column(sa.Column('latido', sa.DateTime(), nullable=True))
+
+    if 'job_id' not in {column['name'] for column in inspector.get_columns('notification_logs')}:
+        with op.batch_alter_table('notification_logs', schema=None) as batch_op:
+            batch_op.add_column(sa.Column('job_id', sa.Integer(), nullable=True))
+            batch_op.create_foreign_key('fk_notification_logs_job_id', 'background_jobs', ['job_id'], ['id'], ondelete='SET NULL')
+    op.create_index('ix_notification_logs_job_id', 'notification_logs', ['job_id'], unique=False, if_not_exists=True)
+
+
+def downgrade():
+    with op.batch_alter_table('notification_logs', schema=None) as batch_op:
+        batch_op.drop_index('ix_notification_logs_job_id')
+        batch_op.drop_constraint('fk_notification_logs_job_id', type_='foreignkey')
+        batch_op.drop_column('job_id')
+
+    with op.batch_alter_table('background_jobs', schema=None) as batch_op:
+        batch_op.drop_column('latido')
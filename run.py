@@ -1,7 +1,18 @@
+import os
 from app import create_app, init_app_data
+from app.services.job_queue import start_job_workers
+from app.services.api_warmup import start_api_warmup
+from app.services.programas_store import start_programas_refresh
 
 app = create_app()
 init_app_data(app)
 
+if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+    # Only the reloader child process serves requests, runs the background jobs, warms up the API caches
+    # and schedules the programas refresh
+    start_job_workers(app)
+    start_api_warmup(app)
+    start_programas_refresh(app)
+
 if __name__ == '__main__':
     app.run(debug=True)
\ No newline at end of file
@@ -0,0 +1,54 @@
+"""
+Benchmark for add_signature_stamp on 1, 50 and 300 page documents, and for stamping a
+whole tribunal with one add_signature_stamps call instead of one call per signer.
+
+Run from the repository root:
+    python tests/benchmark_pdf_stamp.py
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.helpers.pdf_utils import add_signature_stamp, add_signature_stamps
+from tests.fixtures import make_pdf
+
+PAGE_COUNTS = (1, 50, 300)
+REPETITIONS = 3
+# Signers stamped on a 50 page document
+SIGNER_COUNTS = (1, 5, 12)
+
+def main():
+    print(f"{'páginas':>8} {'mejor (s)':>10} {'ms/página':>10} {'entrada':>10} {'salida':>10}")
+    for pages in PAGE_COUNTS:
+        pdf = make_pdf(pages)
+        timings = []
+        for _ in range(REPETITIONS):
+            start = time.perf_counter()
+            signed = add_signature_stamp(pdf, "Pérez", "Juan", "12345678", signature_count=2)
+            timings.append(time.perf_counter() - start)
+        best = min(timings)
+        print(f"{pages:>8} {best:>10.3f} {best * 1000 / pages:>10.2f} {len(pdf):>10} {len(signed):>10}")
+
+    print()
+    print(f"{'firmantes':>9} {'uno a uno (s)':>14} {'en lote (s)':>12}")
+    pdf = make_pdf(50)
+    for count in SIGNER_COUNTS:
+        signers = [{'apellido': f'Jurado{i}', 'nombre': 'Juan', 'dni': str(20000000 + i)} for i in range(count)]
+        sequential, batch = [], []
+        for _ in range(REPETITIONS):
+            start = time.perf_counter()
+            signed = pdf
+            for offset, signer in enumerate(signers):
+                signed = add_signature_stamp(signed, signer['apellido'], signer['nombre'], signer['dni'],
+                                             signature_count=offset)
+            sequential.append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            add_signature_stamps(pdf, signers)
+            batch.append(time.perf_counter() - start)
+        print(f"{count:>9} {min(sequential):>14.3f} {min(batch):>12.3f}")
+
+if __name__ == '__main__':
+    main()
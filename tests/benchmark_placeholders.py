@@ -0,0 +1,65 @@
+"""
+Benchmark for placeholder substitution: the previous per-key str.replace loop against
+the compiled single-pass template, on a campaign-sized subject and body.
+
+Run from the repository root:
+    python tests/benchmark_placeholders.py
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.services.placeholder_resolver import PLACEHOLDER_GROUPS, compile_template, replace_text_with_placeholders
+
+RECIPIENTS = (10, 100, 1000)
+REPETITIONS = 3
+
+def legacy_replace(text_content, placeholder_values_dict):
+    """The previous implementation: one str.replace over the whole text per key."""
+    if not text_content:
+        return text_content
+    result_text = text_content
+    for key, value in placeholder_values_dict.items():
+        str_value = str(value) if value is not None else ""
+        result_text = result_text.replace(f"<<{key}>>", str_value)
+    return result_text
+
+def make_campaign():
+    """Build a subject, an HTML body and a full placeholder dictionary."""
+    keys = [key for group in PLACEHOLDER_GROUPS.values() for key in group]
+    placeholders = {key: f"valor de {key}" for key in keys}
+    asunto = "Concurso <<id_concurso>> - <<categoria_nombre>> - <<departamento_nombre>>"
+    paragraphs = []
+    for i in range(40):
+        key = keys[i % len(keys)]
+        paragraphs.append(f"<p>Estimado/a <<nombre_destinatario>>: párrafo {i} con <<{key}>> y texto de relleno "
+                          f"para que el cuerpo tenga el tamaño de un correo real.</p>")
+    return asunto, "\n".join(paragraphs), placeholders
+
+def time_per_recipient(render, asunto, cuerpo, placeholders, recipients):
+    best = None
+    for _ in range(REPETITIONS):
+        start = time.perf_counter()
+        for i in range(recipients):
+            values = dict(placeholders, nombre_destinatario=f"Destinatario {i}")
+            render(asunto, values)
+            render(cuerpo, values)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def main():
+    asunto, cuerpo, placeholders = make_campaign()
+    assert legacy_replace(cuerpo, placeholders) == replace_text_with_placeholders(cuerpo, placeholders)
+    print(f"{len(placeholders)} placeholders, cuerpo de {len(cuerpo)} caracteres, "
+          f"{len(compile_template(cuerpo).keys)} marcadores distintos")
+    print(f"{'destinatarios':>14} {'anterior (s)':>13} {'compilado (s)':>14} {'mejora':>8}")
+    for recipients in RECIPIENTS:
+        legacy = time_per_recipient(legacy_replace, asunto, cuerpo, placeholders, recipients)
+        compiled = time_per_recipient(replace_text_with_placeholders, asunto, cuerpo, placeholders, recipients)
+        print(f"{recipients:>14} {legacy:>13.4f} {compiled:>14.4f} {legacy / compiled:>7.1f}x")
+
+if __name__ == '__main__':
+    main()
@@ -1,9 +1,15 @@
 """
 Shared mock fixtures for tests
 """
+import io
 import pytest
+from contextlib import contextmanager
 from unittest.mock import patch
 
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfgen import canvas
+from sqlalchemy import event
+
 @pytest.fixture
 def mock_get_core_placeholders():
     """Create a fixture to mock the get_core_placeholders function."""
@@ -59,3 +65,30 @@ def mock_get_core_placeholders():
     # Create the patch
     with patch('app.services.placeholder_resolver.get_core_placeholders', side_effect=mock_function) as mock:
         yield mock
+
+@contextmanager
+def count_selects(engine):
+    """Count the SELECT statements executed on an engine."""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith('SELECT'):
+            statements.append(statement)
+
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+
+def make_pdf(pages):
+    """Build a text PDF with the given number of A4 pages."""
+    buffer = io.BytesIO()
+    can = canvas.Canvas(buffer, pagesize=A4)
+    for page in range(pages):
+        can.setFont("Helvetica", 11)
+        for line in range(40):
+            can.drawString(50, 800 - line * 18, f"Dictamen - página {page + 1}, renglón {line + 1}")
+        can.showPage()
+    can.save()
+    return buffer.getvalue()
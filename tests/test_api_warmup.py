@@ -0,0 +1,44 @@
+"""
+Tests for the external API warm-up.
+"""
+from unittest.mock import patch
+
+from app.helpers.api_services import get_considerandos_data, considerandos_cache
+from app.helpers.cache import RefreshingCache
+from app.services.api_warmup import warm_up_caches
+
+def test_warm_up_loads_empty_and_nearly_stale_caches(app):
+    """Empty caches are loaded; fresh ones are left alone until close to their TTL."""
+    calls = []
+
+    def loader(name):
+        def load():
+            calls.append(name)
+            return [name]
+        return load
+
+    empty = RefreshingCache('empty', loader('empty'), ttl=100)
+    fresh = RefreshingCache('fresh', loader('fresh'), ttl=100)
+    fresh.set(['fresh'])
+    failing = RefreshingCache('failing', lambda: None, ttl=100)
+
+    assert warm_up_caches(app, (empty, fresh, failing)) == ['empty']
+    assert calls == ['empty']
+    assert empty.get() == ['empty']
+
+    with patch('app.services.api_warmup.REFRESH_AT_TTL_FRACTION', 0):
+        assert warm_up_caches(app, (empty, fresh)) == ['empty', 'fresh']
+
+def test_considerandos_are_served_from_cache(app):
+    """Looking up the considerandos of a document type does not call the API once warm."""
+    items = [{'document_type': 'ACTA_CIERRE', 'considerandos': {'a': 'b'}}]
+    with patch('app.helpers.api_services.requests.get') as mock_get:
+        mock_get.return_value.status_code = 200
+        mock_get.return_value.json.return_value = items
+        considerandos_cache.invalidate()
+        warm_up_caches(app, (considerandos_cache,))
+
+        assert get_considerandos_data('ACTA_CIERRE')['considerandos'] == {'a': 'b'}
+        assert get_considerandos_data('OTRO') is None
+        assert mock_get.call_count == 1
+    considerandos_cache.invalidate()
@@ -0,0 +1,63 @@
+"""
+Tests for the indexed asignaturas catalogue cache.
+"""
+import threading
+import time
+from unittest.mock import patch
+
+from app.helpers.api_services import (
+    build_asignaturas_index, get_asignaturas_from_external_api, asignaturas_catalogue_cache
+)
+from app.helpers.cache import RefreshingCache
+
+SAMPLE_CATALOGUE = [
+    {'id_materia': 1, 'nombre_materia': 'Análisis I', 'depto': 'Matemática', 'area': 'Análisis',
+     'orientacion': 'Sin Orientación', 'optativa': 'no'},
+    {'id_materia': 2, 'nombre_materia': 'Topología', 'depto': 'Matemática', 'area': 'Analisis',
+     'orientacion': 'Topología', 'optativa': 'si'},
+    {'id_materia': 3, 'nombre_materia': 'Química General', 'depto': 'Química', 'area': 'General',
+     'orientacion': 'Sin orientacion', 'optativa': 'no'},
+]
+
+def test_index_matches_accent_insensitive_area_and_orientacion(app):
+    """Area and orientacion lookups ignore accents; sin orientación has its own bucket."""
+    with patch.object(asignaturas_catalogue_cache, 'get', return_value=build_asignaturas_index(SAMPLE_CATALOGUE)):
+        sin_orientacion = get_asignaturas_from_external_api('matemática', 'Analisis', '')
+        topologia = get_asignaturas_from_external_api('Matemática', 'Análisis', 'Topologia')
+        otra = get_asignaturas_from_external_api('Matemática', 'Análisis', 'Álgebra')
+
+    assert [a['id_materia'] for a in sin_orientacion] == [1]
+    assert [a['id_materia'] for a in topologia] == [2]
+    assert topologia[0]['optativa'] == 'SI'
+    assert otra == []
+
+def test_refreshing_cache_serves_stale_value_while_refreshing(app):
+    """A stale value is returned immediately and replaced by a background reload."""
+    release = threading.Event()
+    values = iter(['first', 'second'])
+
+    def loader():
+        value = next(values)
+        if value == 'second':
+            release.wait(2)
+        return value
+
+    cache = RefreshingCache('test', loader, ttl=0, stale_ttl=60)
+
+    assert cache.get() == 'first'
+    assert cache.get() == 'first'  # stale, refresh blocked in the background
+    release.set()
+
+    deadline = time.monotonic() + 2
+    while cache._value != 'second' and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert cache._value == 'second'
+
+def test_refreshing_cache_keeps_previous_value_on_failure(app):
+    """A failed reload does not throw away the last good value."""
+    cache = RefreshingCache('test', lambda: 'ok', ttl=0, stale_ttl=0)
+    assert cache.get() == 'ok'
+
+    cache.loader = lambda: None
+    assert cache.refresh() is False
+    assert cache.get() == 'ok'
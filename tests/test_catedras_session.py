@@ -0,0 +1,67 @@
+"""
+Tests for the shared catedras API session and authentication memoization.
+"""
+from unittest.mock import patch, MagicMock
+
+from flask_login import login_user
+
+from app.helpers import api_services
+from app.models.models import User
+from app.routes import admin_metrics
+
+def _response(status_code):
+    response = MagicMock()
+    response.status_code = status_code
+    return response
+
+def test_auth_method_is_remembered_per_host(app):
+    """After Digest fails once, later calls go straight to the method that worked."""
+    api_services._catedras_auth_by_host.clear()
+    calls = []
+
+    def fake_get(url, timeout=None, auth=None, headers=None):
+        calls.append(auth)
+        return _response(200 if isinstance(auth, api_services.HTTPBasicAuth) else 401)
+
+    with patch.object(api_services._catedras_session, 'get', side_effect=fake_get):
+        assert api_services.authenticate_catedras_api('https://catedras.example/rest/materias') is not None
+        assert len(calls) == 2
+
+        calls.clear()
+        assert api_services.authenticate_catedras_api('https://catedras.example/rest/programas') is not None
+        assert len(calls) == 1
+
+    assert api_services._catedras_auth_by_host['catedras.example'] == 'basic'
+    api_services._catedras_auth_by_host.clear()
+
+def test_connection_stats_are_reported_per_host(app):
+    """Connection counters come from the shared session pools."""
+    pool = MagicMock(host='catedras.example', num_requests=5, num_connections=1)
+    pools = MagicMock()
+    pools.keys.return_value = ['key']
+    pools.get.return_value = pool
+    adapter = MagicMock()
+    adapter.poolmanager.pools = pools
+
+    with patch.dict(api_services._catedras_session.adapters, {'https://': adapter, 'http://': adapter}, clear=True):
+        stats = api_services.get_catedras_connection_stats()
+
+    assert stats['catedras.example']['requests'] == 5
+    assert stats['catedras.example']['reused'] == 4
+
+def test_connection_stats_are_shown_on_the_metrics_page(app, db):
+    """The admin metrics page lists the catedras connection counters."""
+    user = User.query.filter_by(username='metricas').first()
+    if not user:
+        user = User(username='metricas', role='admin')
+        db.session.add(user)
+        db.session.commit()
+    stats = {'catedras.example': {'requests': 5, 'connections': 1, 'reused': 4, 'auth_method': 'digest'}}
+
+    with patch.dict(app.config, {'SECRET_KEY': 'test'}), app.test_request_context(), \
+            patch('app.routes.admin_metrics.get_catedras_connection_stats', return_value=stats):
+        login_user(user)
+        html = admin_metrics.index()
+
+    assert 'catedras.example' in html
+    assert 'digest' in html
@@ -0,0 +1,90 @@
+"""
+Tests for the concurso detail loader and the concurso detail page.
+"""
+import random
+from unittest.mock import patch
+
+from flask_login import login_user
+
+from app.models.models import (
+    User, Persona, TribunalMiembro, Postulante, DocumentoConcurso, DocumentTemplateConfig,
+    NotificationCampaign, NotificationLog
+)
+from app.routes.concursos.views import ver
+from app.services.concurso_detail import load_concurso_detail
+from tests.fixtures import count_selects
+
+def _add_rows(session, concurso, campaign, start, count):
+    """Add templates, documents, tribunal members, postulantes and logs to a concurso."""
+    for i in range(start, start + count):
+        tipo = f"DETALLE_DOC_{i}"
+        session.add(DocumentTemplateConfig(google_doc_id=f"doc{i}", document_type_key=tipo,
+                                           display_name=f"Documento {i}"))
+        session.add(DocumentoConcurso(concurso_id=concurso.id, tipo=tipo, estado='BORRADOR'))
+        persona = Persona(dni=f"2{random.randint(1000000, 9999999)}", nombre=f"Miembro{i}",
+                          apellido="Detalle", correo=f"miembro{i}@example.com")
+        session.add(persona)
+        session.flush()
+        session.add(TribunalMiembro(concurso_id=concurso.id, persona_id=persona.id,
+                                    rol="Titular", claustro="Docente"))
+        session.add(Postulante(concurso_id=concurso.id, dni=f"41{i:06d}", nombre=f"Nombre{i}",
+                               apellido=f"Apellido{i}", correo=f"detalle{i}@example.com"))
+        session.add(NotificationLog(campaign_id=campaign.id, concurso_id=concurso.id,
+                                    destinatario_email=f"detalle{i}@example.com", asunto_enviado="Aviso",
+                                    cuerpo_enviado_html="<p>Aviso</p>",
+                                    estado_envio='ENVIADO' if i % 2 else 'FALLIDO'))
+    session.commit()
+
+def _campaign(session):
+    campaign = NotificationCampaign(nombre_campana='Detalle', asunto_email='Aviso',
+                                    cuerpo_email_html='<p>Aviso</p>', destinatarios_config='{}')
+    session.add(campaign)
+    session.commit()
+    return campaign
+
+def _render_ver(app, db, concurso):
+    user = User.query.filter_by(username='detalle').first()
+    if not user:
+        user = User(username='detalle', role='admin')
+        db.session.add(user)
+        db.session.commit()
+    db.session.expire_all()
+    with patch.dict(app.config, {'SECRET_KEY': 'test'}), app.test_request_context(), \
+            count_selects(db.engine) as statements, \
+            patch('app.routes.concursos.views.get_asignaturas_from_external_api', return_value=[]):
+        login_user(user)
+        html = ver(concurso.id)
+    return html, len(statements)
+
+def test_load_concurso_detail(app, db, session, test_concurso):
+    """The loader groups the notification logs and hides already generated unique documents."""
+    campaign = _campaign(session)
+    _add_rows(session, test_concurso, campaign, 0, 3)
+    session.add(DocumentTemplateConfig(google_doc_id="nuevo", document_type_key="DETALLE_NUEVO",
+                                       display_name="Nuevo"))
+    session.commit()
+
+    detail = load_concurso_detail(test_concurso.id)
+
+    assert detail.concurso.id == test_concurso.id
+    assert len(detail.documentos) >= 3
+    assert all(miembro.persona for miembro in detail.miembros_tribunal)
+    assert detail.notification_counts_by_campaign[campaign.id] == {'ENVIADO': 1, 'FALLIDO': 2}
+    available = {config.document_type_key for config in detail.available_document_configs()}
+    assert 'DETALLE_NUEVO' in available
+    assert not available & {'DETALLE_DOC_0', 'DETALLE_DOC_1', 'DETALLE_DOC_2'}
+    assert load_concurso_detail(-1) is None
+
+def test_ver_query_count_does_not_grow_with_rows(app, db, session, test_concurso):
+    """Rendering the detail page does not issue more queries for more templates and documents."""
+    campaign = _campaign(session)
+    _add_rows(session, test_concurso, campaign, 100, 2)
+    _render_ver(app, db, test_concurso)  # warm up
+    small_html, small_queries = _render_ver(app, db, test_concurso)
+
+    _add_rows(session, test_concurso, campaign, 200, 15)
+    large_html, large_queries = _render_ver(app, db, test_concurso)
+
+    assert 'Miembro214' in large_html
+    assert 'Nombre214' in large_html
+    assert large_queries == small_queries
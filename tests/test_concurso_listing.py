@@ -0,0 +1,103 @@
+"""
+Tests for the paginated, filtered concurso listings.
+"""
+from datetime import datetime
+from unittest.mock import patch
+
+from flask_login import login_user
+from werkzeug.datastructures import MultiDict
+
+from app.models.models import User, Departamento, Concurso, Persona, TribunalMiembro
+from app.routes.concursos.views import index
+from app.services.concurso_listing import ConcursoFilters, load_concurso_page
+from tests.fixtures import count_selects
+
+def _departamento_with_concursos(session, nombre, count, con_tribunal=False):
+    """Create a departamento with `count` concursos, alternating tipo and year."""
+    departamento = Departamento(nombre=nombre)
+    session.add(departamento)
+    session.flush()
+    for i in range(count):
+        concurso = Concurso(tipo='Regular' if i % 2 else 'Interino', cerrado_abierto='Abierto',
+                            cant_cargos=1, departamento_id=departamento.id, area='Área',
+                            orientacion='Orientación', categoria='PAD', dedicacion='Simple',
+                            estado_actual='CREADO' if i % 3 else 'SUSTANCIADO',
+                            creado=datetime(2023 + i % 2, 5, 1))
+        session.add(concurso)
+        if con_tribunal:
+            session.flush()
+            presidente = Persona(dni=f"27{concurso.id:06d}", nombre=f"Presidente{i}", apellido="Listado",
+                                 correo=f"listado{concurso.id}@example.com")
+            titular = Persona(dni=f"28{concurso.id:06d}", nombre=f"Titular{i}", apellido="Listado",
+                              correo=f"titular{concurso.id}@example.com")
+            session.add_all([presidente, titular])
+            session.flush()
+            session.add(TribunalMiembro(concurso_id=concurso.id, persona_id=presidente.id, rol='Presidente'))
+            session.add(TribunalMiembro(concurso_id=concurso.id, persona_id=titular.id, rol='Titular'))
+    session.commit()
+    return departamento
+
+def test_filters_from_args_ignore_invalid_values():
+    """Unknown tipos and non numeric ids are ignored."""
+    filters = ConcursoFilters.from_args(MultiDict({'departamento': 'x', 'tipo': 'Otro', 'anio': '2024',
+                                                   'estado': 'CREADO'}))
+    assert filters.departamento_id is None
+    assert filters.tipo is None
+    assert filters.to_args() == {'estado': 'CREADO', 'anio': 2024}
+
+def test_keyset_pages_cover_every_concurso_once(app, db, session):
+    """Following the next cursors visits every matching concurso once, newest first."""
+    departamento = _departamento_with_concursos(session, 'Departamento Paginado', 7)
+    filters = ConcursoFilters(departamento_id=departamento.id)
+
+    seen = []
+    page = load_concurso_page(filters, page_size=3)
+    first_page = page
+    while True:
+        seen.extend(concurso.id for concurso in page.items)
+        if not page.has_next:
+            break
+        page = load_concurso_page(filters, antes=page.next_cursor, page_size=3)
+
+    assert len(seen) == 7
+    assert seen == sorted(seen, reverse=True)
+    assert not first_page.has_prev
+
+    previous = load_concurso_page(filters, despues=page.prev_cursor, page_size=3)
+    assert [concurso.id for concurso in previous.items] == seen[3:6]
+    assert previous.has_prev and previous.has_next
+
+def test_filters_restrict_the_listing(app, db, session):
+    """Tipo, estado and año are combined with the departamento filter."""
+    departamento = _departamento_with_concursos(session, 'Departamento Filtrado', 6)
+
+    page = load_concurso_page(ConcursoFilters(departamento_id=departamento.id, tipo='Regular', anio=2024))
+    assert len(page.items) == 3
+    assert all(c.tipo == 'Regular' and c.creado.year == 2024 for c in page.items)
+
+    page = load_concurso_page(ConcursoFilters(departamento_id=departamento.id, estado='SUSTANCIADO'))
+    assert len(page.items) == 2
+
+def test_index_query_count_does_not_grow_with_concursos(app, db, session):
+    """Rendering the listing issues the same number of queries for a short and a full page."""
+    user = User.query.filter_by(username='listado').first()
+    if not user:
+        user = User(username='listado', role='admin')
+        session.add(user)
+        session.commit()
+
+    def render(departamento):
+        db.session.expire_all()
+        with patch.dict(app.config, {'SECRET_KEY': 'test'}), \
+                app.test_request_context(f'/concursos/?departamento={departamento.id}'), \
+                count_selects(db.engine) as statements:
+            login_user(user)
+            html = index()
+        return html, len(statements)
+
+    pocos, pocos_queries = render(_departamento_with_concursos(session, 'Departamento Pocos', 1, True))
+    muchos, muchos_queries = render(_departamento_with_concursos(session, 'Departamento Muchos', 30, True))
+
+    assert 'Presidente: Presidente0 Listado' in pocos
+    assert 'Anteriores' in muchos
+    assert muchos_queries == pocos_queries
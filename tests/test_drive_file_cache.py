@@ -0,0 +1,84 @@
+"""
+Tests for the on-disk cache of Google Drive file contents.
+"""
+import hashlib
+import os
+from unittest.mock import MagicMock
+
+import pytest
+
+from app.helpers.drive_file_cache import DriveFileCache
+from app.helpers.file_streaming import stream_drive_file
+
+def _drive_api(files):
+    """Fake GoogleDriveAPI serving the given {file_id: bytes} contents."""
+    api = MagicMock()
+    api.get_file_metadata.side_effect = lambda file_id: {'md5Checksum': hashlib.md5(files[file_id]).hexdigest()}
+
+    def open_file_stream(file_id, byte_range=None):
+        response = MagicMock()
+        response.__enter__.return_value = response
+        response.iter_content.return_value = iter([files[file_id]])
+        return response
+    api.open_file_stream.side_effect = open_file_stream
+    return api
+
+@pytest.fixture
+def cache(app, tmp_path, monkeypatch):
+    monkeypatch.setitem(app.config, 'DRIVE_FILE_CACHE_DIR', str(tmp_path))
+    monkeypatch.setitem(app.config, 'DRIVE_FILE_CACHE_MAX_BYTES', 1000)
+    monkeypatch.setitem(app.config, 'DRIVE_FILE_CACHE_REVALIDATE', 60)
+    return DriveFileCache()
+
+def test_repeat_reads_are_served_from_disk(cache):
+    """The content is downloaded once; later reads within the revalidation window skip Drive."""
+    files = {'a': b'%PDF contenido a'}
+    api = _drive_api(files)
+
+    assert cache.read(api, 'a') == files['a']
+    assert cache.read(api, 'a') == files['a']
+    assert api.open_file_stream.call_count == 1
+    assert api.get_file_metadata.call_count == 1
+
+def test_new_revision_is_downloaded_again(cache, app, monkeypatch):
+    """When Drive reports another md5 the new content replaces the cached one."""
+    monkeypatch.setitem(app.config, 'DRIVE_FILE_CACHE_REVALIDATE', 0)
+    files = {'a': b'version 1'}
+    api = _drive_api(files)
+    cache.read(api, 'a')
+
+    files['a'] = b'version 2'
+    assert cache.read(api, 'a') == b'version 2'
+    assert os.listdir(os.path.join(cache.directory, 'a')) == [hashlib.md5(b'version 2').hexdigest()]
+
+def test_least_recently_used_files_are_evicted(cache):
+    """Past the size limit, the least recently used files are deleted."""
+    files = {name: name.encode() * 400 for name in ('a', 'b', 'c')}
+    api = _drive_api(files)
+    cache.read(api, 'a')
+    cache.read(api, 'b')
+    os.utime(cache.get_path(api, 'a'), (0, 0))  # 'a' is the least recently used
+    cache.read(api, 'c')
+
+    assert not os.path.exists(os.path.join(cache.directory, 'a', hashlib.md5(files['a']).hexdigest()))
+    assert os.path.exists(cache.get_path(api, 'c'))
+
+def test_put_and_invalidate(cache):
+    """Uploaded content is served without downloading, and invalidate removes it."""
+    api = _drive_api({})
+    cache.put('nuevo', b'subido')
+    assert cache.read(api, 'nuevo') == b'subido'
+    api.open_file_stream.assert_not_called()
+
+    cache.invalidate('nuevo')
+    assert not os.path.exists(os.path.join(cache.directory, 'nuevo'))
+
+def test_stream_drive_file_serves_ranges_from_cache(app, cache, monkeypatch):
+    """Views go through the cache and support Range requests from disk."""
+    monkeypatch.setattr('app.helpers.file_streaming.drive_file_cache', cache)
+    api = _drive_api({'a': b'0123456789'})
+    with app.test_request_context(headers={'Range': 'bytes=2-5'}):
+        response = stream_drive_file(api, 'a')
+        response.direct_passthrough = False
+        assert response.status_code == 206
+        assert response.get_data() == b'2345'
@@ -0,0 +1,80 @@
+"""
+Tests for streaming Google Drive file downloads.
+"""
+import base64
+from unittest.mock import MagicMock, patch
+
+from app.helpers.file_streaming import stream_drive_file
+from app.integrations.google_drive import GoogleDriveAPI
+
+def _token_response():
+    response = MagicMock(status_code=200)
+    response.json.return_value = {'status': 'success', 'accessToken': 'tok', 'expiresIn': 3000}
+    return response
+
+def _media_response(status_code, body, headers):
+    response = MagicMock(status_code=status_code, headers=headers)
+    response.iter_content.side_effect = lambda size: (body[i:i + size] for i in range(0, len(body), size))
+    return response
+
+def test_stream_drive_file_forwards_range_requests(app, monkeypatch):
+    """A Range request is forwarded to Drive and answered with 206 and the partial content."""
+    monkeypatch.setitem(app.config, 'DRIVE_FILE_CACHE_MAX_BYTES', 0)
+    body = b'%PDF' + b'x' * 200000
+    partial = body[100:1100]
+    media = _media_response(206, partial, {'Content-Range': f'bytes 100-1099/{len(body)}', 'Content-Length': '1000'})
+
+    with patch('app.integrations.google_drive.requests.post', return_value=_token_response()) as mock_post, \
+            patch('app.integrations.google_drive.requests.get', return_value=media) as mock_get:
+        api = GoogleDriveAPI()
+        with app.test_request_context(headers={'Range': 'bytes=100-1099'}):
+            response = stream_drive_file(api, 'file123')
+            assert response.status_code == 206
+            assert response.headers['Content-Range'] == f'bytes 100-1099/{len(body)}'
+            assert response.headers['Accept-Ranges'] == 'bytes'
+            assert b''.join(response.response) == partial
+
+        # A second download reuses the cached access token
+        with app.test_request_context():
+            stream_drive_file(api, 'file123')
+
+    assert mock_post.call_count == 1
+    assert mock_get.call_args_list[0].kwargs['headers'] == {'Authorization': 'Bearer tok', 'Range': 'bytes=100-1099'}
+    assert mock_get.call_args_list[0].kwargs['stream'] is True
+    media.close.assert_called()
+
+def test_open_file_stream_refreshes_revoked_token():
+    """A 401 from Drive gets a new access token and retries once."""
+    unauthorized = MagicMock(status_code=401)
+    ok = MagicMock(status_code=200)
+    with patch('app.integrations.google_drive.requests.post', return_value=_token_response()) as mock_post, \
+            patch('app.integrations.google_drive.requests.get', side_effect=[unauthorized, ok]):
+        assert GoogleDriveAPI().open_file_stream('file123') is ok
+
+    assert mock_post.call_count == 2
+
+def test_files_are_fetched_through_the_bridge_without_an_access_token(app, monkeypatch):
+    """When the bridge cannot hand out a token, files are fetched with getFileContent instead."""
+    monkeypatch.setitem(app.config, 'DRIVE_FILE_CACHE_MAX_BYTES', 0)
+    body = b'%PDF' + b'x' * 2000
+
+    def bridge(url, json, timeout):
+        response = MagicMock(status_code=200)
+        if json['action'] == 'getAccessToken':
+            response.json.return_value = {'status': 'error', 'message': 'SERVICE_ACCOUNT_EMAIL must be set'}
+        else:
+            response.json.return_value = {'status': 'success', 'fileData': base64.b64encode(body).decode(),
+                                          'fileName': 'doc.pdf', 'mimeType': 'application/pdf'}
+        return response
+
+    with patch('app.integrations.google_drive.requests.post', side_effect=bridge), \
+            patch('app.integrations.google_drive.requests.get') as mock_get:
+        api = GoogleDriveAPI()
+        assert api.download_file('file123') == body
+        with app.test_request_context(headers={'Range': 'bytes=100-1099'}):
+            response = stream_drive_file(api, 'file123')
+            response.direct_passthrough = False
+            assert response.status_code == 206
+            assert response.get_data() == body[100:1100]
+
+    mock_get.assert_not_called()
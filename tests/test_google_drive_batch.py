@@ -0,0 +1,57 @@
+"""
+Tests for the batched requests of the GoogleDriveAPI client.
+"""
+from unittest.mock import MagicMock, patch
+
+from app.integrations.google_drive import GoogleDriveAPI
+
+def _fake_apps_script(requests_sent):
+    """Simulate the Apps Script batch action: every operation returns a new folder ID."""
+    def post(url, json=None, **kwargs):
+        requests_sent.append(json)
+        results = []
+        for operation in json['operations']:
+            parent = operation.get('parentFolderId', '')
+            if parent.startswith('$'):
+                index, field = parent[1:].split('.')
+                parent = results[int(index)][field]
+            results.append({'status': 'success', 'folderId': f"{parent}/{operation['folderName']}"})
+        response = MagicMock(status_code=200)
+        response.json.return_value = {'status': 'success', 'results': results}
+        return response
+    return post
+
+def test_create_concurso_folder_uses_one_request():
+    """The concurso folder and its four subfolders are created in a single round trip."""
+    requests_sent = []
+    with patch('app.integrations.google_drive.requests.post', side_effect=_fake_apps_script(requests_sent)):
+        folders = GoogleDriveAPI().create_concurso_folder(7, 'Depto', 'Area', 'Orientacion', 'PAD', 'Simple')
+
+    assert len(requests_sent) == 1
+    assert requests_sent[0]['action'] == 'batch'
+    assert len(requests_sent[0]['operations']) == 5
+    assert folders['tribunalFolderId'].startswith(folders['folderId'] + '/tribunal_')
+
+def test_batch_is_chunked_and_resolves_references_across_chunks():
+    """Large batches are split in chunks; references to earlier chunks are resolved client-side."""
+    requests_sent = []
+    api = GoogleDriveAPI()
+    api.batch_size = 2
+    operations = [{'action': 'createFolder', 'folderName': 'raiz'}]
+    operations += [{'action': 'createNestedFolder', 'parentFolderId': '$0.folderId', 'folderName': f"sub{i}"}
+                   for i in range(3)]
+
+    with patch('app.integrations.google_drive.requests.post', side_effect=_fake_apps_script(requests_sent)):
+        results = api.batch(operations)
+
+    assert len(requests_sent) == 2
+    assert requests_sent[1]['operations'][0]['parentFolderId'] == '/raiz'
+    assert [r['folderId'] for r in results] == ['/raiz', '/raiz/sub0', '/raiz/sub1', '/raiz/sub2']
+
+def test_batch_reports_transport_errors_per_operation():
+    """A failed request marks its operations as failed instead of raising."""
+    response = MagicMock(status_code=500, text='boom')
+    with patch('app.integrations.google_drive.requests.post', return_value=response):
+        results = GoogleDriveAPI().delete_folders(['a', 'b'])
+
+    assert set(results) == {'a', 'b'}
@@ -0,0 +1,119 @@
+"""
+Tests for the background job queue.
+"""
+from datetime import datetime, timedelta
+
+from app.models.models import BackgroundJob
+from app.services.job_queue import enqueue_job, job_handler, run_pending_jobs, requeue_stale_jobs, report_job_progress
+
+calls = []
+latidos = []
+
+@job_handler('test_job')
+def _test_job(payload):
+    calls.append(payload)
+    if payload.get('fail'):
+        raise RuntimeError('fallo temporal')
+    return {'doble': payload['valor'] * 2}
+
+@job_handler('test_job_progreso')
+def _test_job_progreso(payload):
+    job = BackgroundJob.query.filter_by(tipo='test_job_progreso', estado='EN_PROCESO').one()
+    latidos.append(job.latido)
+    report_job_progress({'hecho': 1})
+    return {}
+
+def _cleanup(session, *jobs):
+    session.rollback()
+    for job in jobs:
+        BackgroundJob.query.filter_by(id=job.id).delete()
+    session.commit()
+
+def test_enqueue_job_is_idempotent(session):
+    """Enqueuing twice with the same idempotency key returns the same job."""
+    first = enqueue_job('test_job', {'valor': 1}, idempotency_key='test:idempotente')
+    try:
+        second = enqueue_job('test_job', {'valor': 2}, idempotency_key='test:idempotente')
+        assert second.id == first.id
+        assert BackgroundJob.query.filter_by(idempotency_key='test:idempotente').count() == 1
+    finally:
+        _cleanup(session, first)
+
+def test_run_pending_jobs_stores_result(session):
+    """A due job is run once and its result stored."""
+    calls.clear()
+    job = enqueue_job('test_job', {'valor': 21})
+    try:
+        assert run_pending_jobs() == 1
+        assert run_pending_jobs() == 0
+        session.refresh(job)
+        assert job.estado == 'COMPLETADO'
+        assert job.intentos == 1
+        assert job.resultado == {'doble': 42}
+        assert calls == [{'valor': 21}]
+    finally:
+        _cleanup(session, job)
+
+def test_failed_job_is_retried_with_backoff(app, session):
+    """A failing job is rescheduled with a growing delay and fails after max_intentos."""
+    job = enqueue_job('test_job', {'valor': 1, 'fail': True}, max_intentos=3)
+    try:
+        delays = []
+        for _ in range(3):
+            antes = datetime.utcnow()
+            assert run_pending_jobs() == 1
+            session.refresh(job)
+            if job.estado == 'PENDIENTE':
+                delays.append(job.proximo_intento - antes)
+                # Make the retry due now
+                job.proximo_intento = datetime.utcnow() - timedelta(seconds=1)
+                session.commit()
+
+        assert job.estado == 'FALLIDO'
+        assert job.intentos == 3
+        assert 'fallo temporal' in job.error
+        base = app.config['JOB_QUEUE_RETRY_BASE_DELAY']
+        assert len(delays) == 2
+        assert delays[0] >= timedelta(seconds=base)
+        assert delays[1] >= timedelta(seconds=base * 2)
+    finally:
+        _cleanup(session, job)
+
+def test_requeue_stale_jobs(session):
+    """Jobs left in progress by a dead worker go back to the queue."""
+    job = enqueue_job('test_job', {'valor': 1})
+    try:
+        job.estado = 'EN_PROCESO'
+        job.iniciado = datetime.utcnow() - timedelta(days=1)
+        session.commit()
+        assert requeue_stale_jobs() == 1
+        session.refresh(job)
+        assert job.estado == 'PENDIENTE'
+    finally:
+        _cleanup(session, job)
+
+def test_requeue_stale_jobs_spares_jobs_with_a_heartbeat(app, session):
+    """A long job that keeps reporting progress is not requeued, however long ago it started."""
+    job = enqueue_job('test_job', {'valor': 1})
+    try:
+        job.estado = 'EN_PROCESO'
+        job.iniciado = datetime.utcnow() - timedelta(days=1)
+        job.latido = datetime.utcnow()
+        session.commit()
+        assert requeue_stale_jobs() == 0
+        session.refresh(job)
+        assert job.estado == 'EN_PROCESO'
+    finally:
+        _cleanup(session, job)
+
+def test_progress_refreshes_the_heartbeat(session):
+    """Claiming a job and reporting its progress both refresh its heartbeat."""
+    job = enqueue_job('test_job_progreso')
+    try:
+        assert run_pending_jobs() == 1
+        session.refresh(job)
+        assert latidos[-1] is not None and latidos[-1] >= job.iniciado
+        assert job.latido > latidos[-1]
+        assert job.progreso == {'hecho': 1}
+    finally:
+        _cleanup(session, job)
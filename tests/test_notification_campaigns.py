@@ -0,0 +1,149 @@
+"""
+Tests for the notification campaign sending service.
+"""
+import random
+from unittest.mock import MagicMock, patch
+
+from app.models.models import BackgroundJob, NotificationCampaign, NotificationLog, Persona, Postulante, TribunalMiembro
+from app.services.notification_campaigns import send_campaign
+from tests.fixtures import count_selects
+
+def _campaign(session):
+    campaign = NotificationCampaign(
+        nombre_campana='Aviso',
+        asunto_email='Concurso <<id_concurso>>',
+        cuerpo_email_html='<p>Hola <<nombre_destinatario>>, expediente <<expediente>></p>'
+    )
+    campaign.destinatarios_json = {
+        'tribunal_destinatarios': [{'rol': 'Presidente', 'claustro': 'Docente'}],
+        'otros_roles_destinatarios': ['postulantes'],
+        'emails_estaticos': ['mesa@example.com']
+    }
+    session.add(campaign)
+    session.commit()
+    return campaign
+
+def _add_postulantes(session, concurso, start, count):
+    for i in range(start, start + count):
+        session.add(Postulante(concurso_id=concurso.id, dni=f"40{i:06d}", nombre=f"Nombre{i}",
+                               apellido=f"Apellido{i}", correo=f"postulante{i}@example.com"))
+    session.commit()
+
+def _send(app, db, concurso, campaign, progress_callback=None):
+    drive_api = MagicMock()
+    drive_api.batch.side_effect = lambda operations: [{'status': 'success'} for _ in operations]
+    db.session.expire_all()
+    with app.test_request_context(), count_selects(db.engine) as statements, \
+            patch('app.services.notification_campaigns.get_departamento_heads_data', return_value=[]):
+        result = send_campaign(concurso, campaign, drive_api, progress_callback=progress_callback)
+    return result, drive_api, len(statements)
+
+def test_send_campaign_query_count_does_not_grow_with_recipients(app, db, session, test_concurso):
+    """Sending to more recipients does not issue more SELECT queries."""
+    presidente = Persona(dni=f"2{random.randint(1000000, 9999999)}", nombre="Presidente",
+                         apellido="Campana", correo="presidente.campana@example.com")
+    session.add(presidente)
+    session.commit()
+    session.add(TribunalMiembro(concurso_id=test_concurso.id, persona_id=presidente.id,
+                                rol="Presidente", claustro="Docente"))
+    campaign = _campaign(session)
+
+    try:
+        _add_postulantes(session, test_concurso, 0, 2)
+        _send(app, db, test_concurso, campaign)  # warm up the identity map
+        small, _, small_queries = _send(app, db, test_concurso, campaign)
+
+        _add_postulantes(session, test_concurso, 2, 20)
+        progreso = []
+        large, drive_api, large_queries = _send(app, db, test_concurso, campaign, progress_callback=progreso.append)
+
+        assert small['sent'] == 4  # presidente + 2 postulantes + static email
+        assert large['sent'] == 24
+        assert large_queries == small_queries
+
+        batch_size = app.config['NOTIFICATION_BATCH_SIZE']
+        assert drive_api.batch.call_count == -(-24 // batch_size)
+        assert all(len(call.args[0]) <= batch_size for call in drive_api.batch.call_args_list)
+        assert progreso[0] == {'total': 24, 'sent': 0, 'failed': 0}
+        assert progreso[-1] == {'total': 24, 'sent': 24, 'failed': 0}
+        sent_to = {operation['to']: operation
+                   for call in drive_api.batch.call_args_list for operation in call.args[0]}
+        assert sent_to['presidente.campana@example.com']['htmlBody'].startswith('<p>Hola Presidente Campana')
+        assert f"expediente {test_concurso.expediente}" in sent_to['postulante5@example.com']['htmlBody']
+        assert NotificationLog.query.filter_by(campaign_id=campaign.id).count() == 32
+    finally:
+        session.rollback()
+        NotificationLog.query.filter_by(campaign_id=campaign.id).delete()
+        Postulante.query.filter_by(concurso_id=test_concurso.id).delete()
+        TribunalMiembro.query.filter_by(concurso_id=test_concurso.id).delete()
+        session.delete(campaign)
+        session.delete(presidente)
+        session.commit()
+
+def test_send_campaign_logs_failed_recipients(app, db, session, test_concurso):
+    """Recipients whose email fails are logged as FALLIDO and counted as failed."""
+    campaign = _campaign(session)
+    try:
+        _add_postulantes(session, test_concurso, 0, 3)
+        drive_api = MagicMock()
+        drive_api.batch.side_effect = lambda operations: [
+            {'status': 'error', 'message': 'cuota excedida'} if op['to'] == 'postulante1@example.com'
+            else {'status': 'success'} for op in operations
+        ]
+        with app.test_request_context():
+            result = send_campaign(test_concurso, campaign, drive_api)
+
+        assert result['sent'] == 3  # 2 postulantes + static email
+        assert result['failed'] == 1
+        log = NotificationLog.query.filter_by(campaign_id=campaign.id, destinatario_email='postulante1@example.com').one()
+        assert log.estado_envio == 'FALLIDO'
+        assert log.error_envio == 'cuota excedida'
+    finally:
+        session.rollback()
+        NotificationLog.query.filter_by(campaign_id=campaign.id).delete()
+        Postulante.query.filter_by(concurso_id=test_concurso.id).delete()
+        session.delete(campaign)
+        session.commit()
+
+def test_retried_job_skips_recipients_already_sent(app, db, session, test_concurso):
+    """A campaign job retried after dying midway only sends to the recipients it had not logged."""
+    campaign = _campaign(session)
+    job = BackgroundJob(tipo='enviar_campana')
+    session.add(job)
+    session.commit()
+    try:
+        _add_postulantes(session, test_concurso, 0, 3)
+        session.add(NotificationLog(campaign_id=campaign.id, concurso_id=test_concurso.id, job_id=job.id,
+                                    destinatario_email='postulante0@example.com', asunto_enviado='Aviso',
+                                    cuerpo_enviado_html='<p>Aviso</p>', estado_envio='ENVIADO'))
+        # A log of another run of the campaign does not count
+        session.add(NotificationLog(campaign_id=campaign.id, concurso_id=test_concurso.id,
+                                    destinatario_email='postulante1@example.com', asunto_enviado='Aviso',
+                                    cuerpo_enviado_html='<p>Aviso</p>', estado_envio='ENVIADO'))
+        session.commit()
+        drive_api = MagicMock()
+        drive_api.batch.side_effect = lambda operations: [{'status': 'success'} for _ in operations]
+        with app.test_request_context():
+            result = send_campaign(test_concurso, campaign, drive_api, job_id=job.id)
+
+        sent_to = [op['to'] for call in drive_api.batch.call_args_list for op in call.args[0]]
+        assert 'postulante0@example.com' not in sent_to
+        assert {'postulante1@example.com', 'postulante2@example.com', 'mesa@example.com'} <= set(sent_to)
+        assert result['sent'] == len(sent_to) + 1
+        assert NotificationLog.query.filter_by(job_id=job.id).count() == len(sent_to) + 1
+    finally:
+        session.rollback()
+        NotificationLog.query.filter_by(campaign_id=campaign.id).delete()
+        Postulante.query.filter_by(concurso_id=test_concurso.id).delete()
+        session.delete(campaign)
+        session.delete(job)
+        session.commit()
+
+def test_rate_limiter_spaces_out_requests():
+    """The rate limiter lets a burst through and then waits for new tokens."""
+    from app.helpers.rate_limiter import RateLimiter
+
+    limiter = RateLimiter(rate=100, burst=5)
+    assert limiter.acquire(5) == 0.0
+    assert limiter.acquire(5) > 0.0
+    assert RateLimiter(rate=0).acquire(1000) == 0.0
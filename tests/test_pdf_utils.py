@@ -0,0 +1,136 @@
+"""
+Tests for the PDF signature stamping utilities.
+"""
+import io
+
+import pytest
+from PyPDF2 import PdfReader
+from reportlab.pdfbase.pdfmetrics import stringWidth
+
+from app.helpers.pdf_utils import (add_signature_stamp, add_signature_stamps, verify_signed_pdf,
+                                   _render_signature_stamps, _stamp_font_size, _stamp_position, _stamp_text,
+                                   STAMP_COLUMN_GAP, STAMP_COLUMN_WIDTH, STAMP_FONT_SIZE, STAMP_LEFT_MARGIN,
+                                   STAMP_RIGHT_MARGIN)
+from tests.fixtures import make_pdf
+
+def test_add_signature_stamp_stamps_every_page():
+    """Every page carries every signer's stamp and keeps its original text."""
+    pdf = make_pdf(5)
+    signed = add_signature_stamp(pdf, "Perez", "Juan", "111", signature_count=0)
+    signed = add_signature_stamp(signed, "Gomez", "Ana", "222", cargo="Presidente", signature_count=1)
+
+    reader = PdfReader(io.BytesIO(signed))
+    assert len(reader.pages) == 5
+    for page in reader.pages:
+        text = page.extract_text()
+        assert "Firmado por: Perez, Juan (DNI: 111)" in text
+        assert "Firmado por: Gomez, Ana (Cargo: Presidente, DNI: 222)" in text
+        assert "renglón 1" in text
+    assert reader.metadata['/SignatureCount'] == '2'
+
+    signers = [{'apellido': 'Perez', 'dni': '111'}, {'apellido': 'Gomez', 'dni': '222'}]
+    assert verify_signed_pdf(signed, signers) == (True, [])
+
+def test_add_signature_stamp_shares_the_stamp_between_pages():
+    """The stamp is stored once, so the output grows by a constant, not per page."""
+    small, large = make_pdf(2), make_pdf(40)
+    small_growth = len(add_signature_stamp(small, "Perez", "Juan", "111")) - len(small)
+    large_growth = len(add_signature_stamp(large, "Perez", "Juan", "111")) - len(large)
+
+    # Each extra page only adds a reference to the shared stamp
+    assert large_growth - small_growth < 38 * 200
+
+def test_add_signature_stamps_matches_one_stamp_per_call():
+    """Stamping several signers at once gives the same stamps and metadata as one call each."""
+    pdf = make_pdf(3)
+    signers = [{'apellido': 'Perez', 'nombre': 'Juan', 'dni': '111'},
+               {'apellido': 'Gomez', 'nombre': 'Ana', 'dni': '222', 'cargo': 'Presidente'}]
+
+    batch = PdfReader(io.BytesIO(add_signature_stamps(pdf, signers, signature_count=1)))
+    sequential = pdf
+    for offset, signer in enumerate(signers):
+        sequential = add_signature_stamp(sequential, signer['apellido'], signer['nombre'], signer['dni'],
+                                         cargo=signer.get('cargo'), signature_count=1 + offset)
+    sequential = PdfReader(io.BytesIO(sequential))
+
+    assert len(batch.pages) == 3
+    for batch_page, sequential_page in zip(batch.pages, sequential.pages):
+        for stamp in ("Firmado por: Perez, Juan (DNI: 111)", "Firmado por: Gomez, Ana (Cargo: Presidente, DNI: 222)"):
+            assert stamp in batch_page.extract_text()
+            assert stamp in sequential_page.extract_text()
+    for key in ('/SignatureCount', '/SignerApellido', '/SignerCargo'):
+        assert batch.metadata[key] == sequential.metadata[key]
+    assert batch.metadata['/SignatureCount'] == '3'
+    assert add_signature_stamps(pdf, []) is pdf
+
+def test_add_signature_stamps_wraps_columns_in_one_overlay():
+    """Past ten signatures the stamps wrap into columns, all drawn by a single XObject."""
+    pdf = make_pdf(2)
+    signers = [{'apellido': f'Jurado{i}', 'nombre': 'Firma', 'dni': str(100 + i)} for i in range(12)]
+
+    signed = add_signature_stamps(pdf, signers)
+
+    reader = PdfReader(io.BytesIO(signed))
+    text = reader.pages[1].extract_text()
+    assert all(f"Jurado{i}, Firma" in text for i in range(12))
+    assert len(reader.pages[1]['/Resources']['/XObject']) == 1
+
+    # On a portrait page the eleventh stamp starts a new band above the first ten
+    first_x, first_y = _stamp_position(100, 595, 0)
+    wrapped_x, wrapped_y = _stamp_position(100, 595, 10)
+    assert wrapped_x == first_x
+    assert wrapped_y == first_y + 120
+
+def _stamp_boxes(page_width, count):
+    """Boxes (left, bottom, right, top) drawn around the real stamps of count signers."""
+    signers = [{'apellido': f'Jurado{i}' * (1 + i % 3), 'nombre': 'Firma', 'dni': str(20000000 + i),
+                'cargo': 'Vocal titular'} for i in range(count)]
+    boxes = []
+    for number, signer in enumerate(signers):
+        text = _stamp_text(signer, '17/10/2026 12:00:00')
+        font_size = _stamp_font_size(stringWidth(text, "Helvetica", STAMP_FONT_SIZE), page_width)
+        width = stringWidth(text, "Helvetica", font_size)
+        x, y = _stamp_position(width, page_width, number)
+        boxes.append((x - 5, y - 2, x + width + 5, y + 10))
+    return boxes
+
+def _intersect(a, b):
+    return a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]
+
+@pytest.mark.parametrize('page_width', [612, 595, 842])  # Letter, A4 and landscape A4
+def test_stamps_do_not_overlap(page_width):
+    """No two stamps intersect, whatever the page width and however many there are."""
+    boxes = _stamp_boxes(page_width, 40)
+
+    assert not any(_intersect(boxes[i], boxes[j]) for i in (0, 10, 20) for j in (0, 10, 20) if i < j)
+    assert not any(_intersect(a, b) for i, a in enumerate(boxes) for b in boxes[i + 1:])
+    assert all(STAMP_LEFT_MARGIN - 5 <= left and right <= page_width - STAMP_RIGHT_MARGIN + 5
+               for left, _, right, _ in boxes)
+
+def test_stamp_position_does_not_depend_on_the_batch():
+    """A stamp lands in the same place whether it is signed alone or with others."""
+    signers = [{'apellido': f'Jurado{i}' * (1 + i % 3), 'nombre': 'Firma', 'dni': str(100 + i)} for i in range(12)]
+    stamps = [(_stamp_text(signer, '17/10/2026 12:00:00'), count) for count, signer in enumerate(signers)]
+
+    def positions(page):
+        found = []
+        page.extract_text(visitor_text=lambda text, cm, tm, font, size: text.strip() and found.append(
+            (text.strip(), round(tm[4], 1), round(tm[5], 1))))
+        return found
+
+    together = positions(_render_signature_stamps(stamps, 612, 792))
+    one_at_a_time = [position for stamp in stamps for position in positions(_render_signature_stamps([stamp], 612, 792))]
+    assert len(together) == 12
+    assert together == one_at_a_time
+
+def test_stamp_columns_on_a_wide_page():
+    """On a landscape page the eleventh stamp starts a second column at the bottom."""
+    first_x, first_y = _stamp_position(300, 842, 0)
+    wrapped_x, wrapped_y = _stamp_position(300, 842, 10)
+    assert wrapped_y == first_y
+    assert wrapped_x + 300 == 842 - STAMP_RIGHT_MARGIN - STAMP_COLUMN_WIDTH - STAMP_COLUMN_GAP
+
+def test_long_stamps_are_written_smaller():
+    """A stamp wider than its column is shrunk to fit it."""
+    assert _stamp_font_size(STAMP_COLUMN_WIDTH / 2, 595) == STAMP_FONT_SIZE
+    assert _stamp_font_size(STAMP_COLUMN_WIDTH * 2, 595) == STAMP_FONT_SIZE / 2
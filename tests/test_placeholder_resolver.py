@@ -141,3 +141,23 @@ def test_integration_with_document_generator(monkeypatch, test_concurso):
     assert 'cantCargos' in data
     assert 'codigo' in data
     assert 'nombre' in data
+
+def test_placeholder_context_loads_groups_lazily(app, test_concurso):
+    """Only the field groups referenced by the requested keys are resolved, and only once."""
+    from unittest.mock import patch
+    from app.services.placeholder_resolver import get_placeholder_context
+    
+    with app.test_request_context():
+        context = get_placeholder_context(test_concurso.id)
+        assert get_placeholder_context(test_concurso.id) is context
+        
+        with patch('app.services.placeholder_resolver.get_departamento_heads_data', return_value=[]) as mock_heads:
+            placeholders = context.resolve(keys=['expediente', 'descripcion_cargo'])
+            assert placeholders['expediente'] == test_concurso.expediente
+            assert 'resp_departamento' not in placeholders
+            assert 'tribunal_presidente' not in placeholders
+            assert mock_heads.call_count == 0
+            
+            context.resolve(keys=['resp_departamento'])
+            context.resolve(keys=['resp_departamento'])
+            assert mock_heads.call_count == 1
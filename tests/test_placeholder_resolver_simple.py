@@ -2,7 +2,7 @@
 Simple tests for the placeholder_resolver service without database dependencies.
 """
 import pytest
-from app.services.placeholder_resolver import replace_text_with_placeholders
+from app.services.placeholder_resolver import replace_text_with_placeholders, compile_template
 
 def test_replace_text_with_placeholders():
     """Test that placeholders are correctly replaced in text."""
@@ -48,3 +48,19 @@ def test_replace_text_with_placeholders():
     # Test with None text
     result7 = replace_text_with_placeholders(None, placeholders)
     assert result7 is None
+
+
+def test_compiled_template():
+    """Test that a compiled template renders in one pass and reports its keys."""
+    template = compile_template("<<name>> (<<name>>) works at <<company>> <<unknown>>")
+    placeholders = {'name': 'John', 'company': '<<name>>', 'position': 'Developer'}
+    
+    # Values are inserted as-is, never substituted again
+    assert template.render(placeholders) == "John (John) works at <<name>> <<unknown>>"
+    assert template.keys == {'name', 'company', 'unknown'}
+    assert template.unknown_keys(placeholders) == {'unknown'}
+    assert template.unused_keys(placeholders) == {'position'}
+    
+    # The compiled form is reused for the same text
+    assert compile_template("<<name>> (<<name>>) works at <<company>> <<unknown>>") is template
+    assert compile_template("No placeholders").render(placeholders) == "No placeholders"
@@ -0,0 +1,89 @@
+"""
+Tests for the chunked, concurrent programas bulk fetch.
+"""
+import threading
+from unittest.mock import patch
+from urllib.parse import parse_qs, urlparse
+
+from flask import g
+
+from app.helpers.api_services import get_programas_by_materia_ids
+from app.helpers.request_metrics import RequestStats
+
+class FakeResponse:
+    def __init__(self, programas):
+        self._programas = programas
+
+    def json(self):
+        return self._programas
+
+class FakeProgramasApi:
+    """Answers every materia with a programa; the IDs in `failing` fail `failures` times."""
+
+    def __init__(self, failing=(), failures=1):
+        self.failing = set(failing)
+        self.failures = failures
+        self.requests = []
+        self.threads = set()
+        self._lock = threading.Lock()
+
+    def __call__(self, url):
+        ids = parse_qs(urlparse(url).query)['ids_materia'][0].split(',')
+        with self._lock:
+            self.requests.append(ids)
+            self.threads.add(threading.get_ident())
+            failed = sum(1 for request in self.requests if self.failing & set(request))
+        if self.failing & set(ids) and failed <= self.failures:
+            return None
+        return FakeResponse([{'id_materia': mid, 'id_programa': int(mid) * 10} for mid in ids])
+
+def _fetch(app, materia_ids, api, **config):
+    settings = {'PROGRAMAS_API_CHUNK_SIZE': 10, 'PROGRAMAS_API_MAX_CONCURRENCY': 4,
+                'PROGRAMAS_API_CHUNK_RETRIES': 1, **config}
+    with patch.dict(app.config, settings), \
+            patch('app.helpers.api_services.authenticate_catedras_api', side_effect=api):
+        return get_programas_by_materia_ids(materia_ids)
+
+def test_ids_are_fetched_in_bounded_chunks(app):
+    """Large lists are split into chunks and merged back in the requested order."""
+    api = FakeProgramasApi()
+    materia_ids = list(range(1, 96)) + [5]
+
+    result = _fetch(app, materia_ids, api)
+
+    assert list(result) == [str(mid) for mid in range(1, 96)]
+    assert all(result[str(mid)]['id_programa'] == mid * 10 for mid in range(1, 96))
+    assert sorted(len(ids) for ids in api.requests) == [5] + [10] * 9
+    assert sorted(mid for ids in api.requests for mid in ids) == sorted(str(mid) for mid in range(1, 96))
+
+def test_failed_chunk_is_retried_alone(app):
+    """A failing chunk is retried on its own; the other chunks are fetched once."""
+    api = FakeProgramasApi(failing={'15'}, failures=1)
+
+    result = _fetch(app, range(1, 31), api)
+
+    assert all('error' not in entry for entry in result.values())
+    assert len(api.requests) == 4
+    assert [ids for ids in api.requests if '15' in ids] == [[str(mid) for mid in range(11, 21)]] * 2
+
+def test_chunk_failing_every_attempt_keeps_its_error(app):
+    """Materias of a chunk that keeps failing get error entries; the rest are returned."""
+    api = FakeProgramasApi(failing={'25'}, failures=10)
+
+    result = _fetch(app, range(1, 31), api)
+
+    failed = {mid for mid, entry in result.items() if 'error' in entry}
+    assert failed == {str(mid) for mid in range(21, 31)}
+    assert result['1']['id_programa'] == 10
+    assert len(api.requests) == 2 + 2
+
+def test_chunk_timings_are_reported_to_the_request(app):
+    """The time of each chunk request is added to the current request's HTTP stats."""
+    api = FakeProgramasApi()
+    with app.test_request_context():
+        g._request_stats = RequestStats()
+        _fetch(app, range(1, 41), api)
+        stats = g._request_stats
+
+    assert stats.http_count == 4
+    assert list(stats.http) == ['huayca.crub.uncoma.edu.ar']
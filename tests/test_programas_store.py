@@ -0,0 +1,106 @@
+"""
+Tests for the persistent programas store and its refresh job.
+"""
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+from app.models.models import BackgroundJob, Persona, ProgramaMateria
+from app.services.programas_store import (
+    get_programas, refresh_expired_programas, schedule_programas_refresh, REFRESH_JOB
+)
+
+def _upstream(**overrides):
+    """Fake get_programas_by_materia_ids answering every materia, with optional overrides."""
+    def fetch(materia_ids):
+        return {str(mid): overrides.get(str(mid), {'id_materia': str(mid), 'programa': f'Programa {mid}'})
+                for mid in materia_ids}
+    return fetch
+
+def test_unseen_programas_are_fetched_once(app, session):
+    """The first lookup goes upstream; later ones are answered from the database."""
+    with patch('app.services.programas_store.get_programas_by_materia_ids',
+               side_effect=_upstream()) as upstream:
+        first = get_programas([91001, '91002'])
+        second = get_programas(['91001', '91002', '91003'])
+
+    assert first['91001']['programa'] == 'Programa 91001'
+    assert second.keys() == {'91001', '91002', '91003'}
+    assert [call.args[0] for call in upstream.call_args_list] == [['91001', '91002'], ['91003']]
+
+def test_not_found_and_failed_entries(app, session):
+    """Missing programas expire sooner; transient failures are not stored."""
+    overrides = {'91101': {'not_found': True}, '91102': {'error': 'timeout'}}
+    with patch('app.services.programas_store.get_programas_by_materia_ids',
+               side_effect=_upstream(**overrides)):
+        result = get_programas(['91100', '91101', '91102'])
+
+    assert result['91102'] == {'error': 'timeout'}
+    encontrado = session.get(ProgramaMateria, '91100')
+    no_encontrado = session.get(ProgramaMateria, '91101')
+    assert session.get(ProgramaMateria, '91102') is None
+    assert encontrado.encontrado and not no_encontrado.encontrado
+    assert no_encontrado.vence - no_encontrado.actualizado == timedelta(seconds=app.config['PROGRAMAS_NOT_FOUND_TTL'])
+    assert encontrado.vence - encontrado.actualizado == timedelta(seconds=app.config['PROGRAMAS_CACHE_TTL'])
+
+def test_storing_leaves_the_callers_changes_alone(app, session):
+    """Storing fetched programas neither commits nor discards the caller's pending changes."""
+    persona = Persona(dni='91200', nombre='Pendiente', apellido='Store', correo='91200@example.com')
+    session.add(persona)
+    with patch('app.services.programas_store.get_programas_by_materia_ids', side_effect=_upstream()):
+        get_programas(['91200'])
+
+    assert persona in session.new
+    session.rollback()
+    assert Persona.query.filter_by(dni='91200').first() is None
+    assert session.get(ProgramaMateria, '91200').datos['programa'] == 'Programa 91200'
+
+def test_programas_are_served_when_the_store_is_locked(app, session):
+    """If the database cannot take the write, the fetched programas are still returned."""
+    locked = OperationalError('INSERT INTO programas_materias', {}, Exception('database is locked'))
+    with patch('app.services.programas_store.get_programas_by_materia_ids', side_effect=_upstream()), \
+            patch.object(Session, 'commit', side_effect=locked):
+        result = get_programas(['91300'])
+
+    assert result['91300']['programa'] == 'Programa 91300'
+    assert session.get(ProgramaMateria, '91300') is None
+
+def test_refresh_expired_programas(app, session):
+    """Only expired entries are fetched again, in batches."""
+    with patch('app.services.programas_store.get_programas_by_materia_ids', side_effect=_upstream()):
+        get_programas(['91201', '91202', '91203'])
+    # Expire the entries written by earlier tests too, so they are deterministic here
+    ProgramaMateria.query.update({ProgramaMateria.vence: datetime.utcnow() + timedelta(days=1)})
+    for mid in ('91201', '91202'):
+        session.get(ProgramaMateria, mid).vence = datetime.utcnow() - timedelta(seconds=1)
+    session.commit()
+
+    actualizado = {'91201': {'id_materia': '91201', 'programa': 'Nuevo'}}
+    with patch.dict(app.config, {'PROGRAMAS_REFRESH_BATCH_SIZE': 1}), \
+            patch('app.services.programas_store.get_programas_by_materia_ids',
+                  side_effect=_upstream(**actualizado)) as upstream:
+        assert refresh_expired_programas() == 2
+
+    assert sorted(call.args[0][0] for call in upstream.call_args_list) == ['91201', '91202']
+    assert session.get(ProgramaMateria, '91201').datos['programa'] == 'Nuevo'
+    assert session.get(ProgramaMateria, '91202').vence > datetime.utcnow()
+
+def test_schedule_programas_refresh_once_per_slot(app, session):
+    """Scheduling from several processes queues one job per interval, the next one in the future."""
+    actual = schedule_programas_refresh()
+    otra = schedule_programas_refresh()
+    siguiente = schedule_programas_refresh(next_slot=True)
+    try:
+        assert otra.id == actual.id
+        assert actual.tipo == REFRESH_JOB
+        assert actual.proximo_intento <= datetime.utcnow()
+        assert siguiente.id != actual.id
+        interval = app.config['PROGRAMAS_REFRESH_INTERVAL']
+        assert siguiente.payload['slot'] - actual.payload['slot'] == interval
+        assert siguiente.proximo_intento > datetime.utcnow()
+    finally:
+        session.rollback()
+        BackgroundJob.query.filter(BackgroundJob.id.in_([actual.id, siguiente.id])).delete()
+        session.commit()
@@ -0,0 +1,58 @@
+"""
+Tests for the reference data cache and the dropdown API endpoints.
+"""
+from app.models.models import Area, Orientacion
+from app.helpers.reference_data import get_reference_data, reference_data_cache
+from tests.fixtures import count_selects
+
+def test_reference_tree_is_cached(app, db, session, test_area):
+    """The tree is loaded once and reused until a reference table is written."""
+    reference_data_cache.invalidate()
+    session.add(Orientacion(nombre="Orientación Cacheada", area_id=test_area.id))
+    session.commit()
+
+    data = get_reference_data()
+    depto = next(d for d in data.departamentos if d.id == test_area.departamento_id)
+    area = next(a for a in depto.areas if a.id == test_area.id)
+    assert "Orientación Cacheada" in [o.nombre for o in area.orientaciones]
+
+    with count_selects(db.engine) as statements:
+        assert get_reference_data() is data
+    assert statements == []
+
+def test_reference_tree_is_invalidated_on_write(app, db, session, test_departamento):
+    """Committing a change to a reference table drops the cached tree."""
+    before = get_reference_data()
+    session.add(Area(nombre="Área Nueva", departamento_id=test_departamento.id))
+    session.commit()
+
+    after = get_reference_data()
+    assert after is not before
+    assert after.version != before.version
+    assert "Área Nueva" in after.areas_json(test_departamento.id).body.decode('utf-8')
+
+def test_areas_endpoint_supports_etag(app, db, session, test_area):
+    """The areas endpoint serves a precomputed blob and answers 304 to a matching ETag."""
+    client = app.test_client()
+    response = client.get(f'/concursos/api/areas/{test_area.departamento_id}')
+    assert response.status_code == 200
+    assert {'id': test_area.id, 'nombre': test_area.nombre} in response.get_json()
+    etag = response.headers['ETag']
+
+    response = client.get(f'/concursos/api/areas/{test_area.departamento_id}',
+                          headers={'If-None-Match': etag})
+    assert response.status_code == 304
+
+    assert client.get('/concursos/api/areas/999999').status_code == 404
+
+def test_orientaciones_endpoint(app, db, session, test_area):
+    """Orientaciones are looked up by departamento and area name."""
+    session.add(Orientacion(nombre="Orientación API", area_id=test_area.id))
+    session.commit()
+    client = app.test_client()
+
+    response = client.get(f'/concursos/api/orientaciones/{test_area.departamento_id}',
+                          query_string={'area': test_area.nombre})
+    assert "Orientación API" in [o['nombre'] for o in response.get_json()]
+    assert client.get(f'/concursos/api/orientaciones/{test_area.departamento_id}',
+                      query_string={'area': 'No existe'}).get_json() == []
@@ -0,0 +1,80 @@
+"""
+Tests for the request metrics extension.
+"""
+from unittest.mock import patch
+
+import requests
+from flask import Flask
+from sqlalchemy import create_engine, text
+
+from app.helpers.request_metrics import RequestMetrics
+
+def _fake_send(adapter, prepared_request, *args, **kwargs):
+    response = requests.Response()
+    response.status_code = 200
+    response.url = prepared_request.url
+    response._content = b'{}'
+    return response
+
+def _metrics_app(slow_ms=1000):
+    app = Flask(__name__)
+    app.config['REQUEST_METRICS_SLOW_MS'] = slow_ms
+    metrics = RequestMetrics(app)
+    engine = create_engine('sqlite://')
+
+    @app.route('/trabajo')
+    def trabajo():
+        with engine.connect() as conn:
+            for _ in range(3):
+                conn.execute(text('SELECT 1'))
+        requests.get('https://huayca.example.com/materias')
+        requests.get('https://huayca.example.com/programas')
+        requests.post('https://script.example.com/exec')
+        return 'ok'
+
+    return app, metrics
+
+def test_server_timing_header_counts_sql_and_http():
+    """Every response reports its SQL statements and HTTP calls per host."""
+    app, metrics = _metrics_app()
+    with patch('app.helpers.request_metrics._original_adapter_send', _fake_send):
+        response = app.test_client().get('/trabajo')
+
+    timing = response.headers['Server-Timing']
+    assert 'desc="3 queries"' in timing
+    assert 'http-huayca.example.com;' in timing and 'desc="2 calls"' in timing
+    assert 'http-script.example.com;' in timing and 'desc="1 calls"' in timing
+    assert 'total;dur=' in timing
+
+def test_summary_is_kept_per_endpoint():
+    """The summary aggregates the recent requests of each endpoint."""
+    app, metrics = _metrics_app()
+    client = app.test_client()
+    with patch('app.helpers.request_metrics._original_adapter_send', _fake_send):
+        for _ in range(4):
+            client.get('/trabajo')
+
+    summary = {row['endpoint']: row for row in metrics.summary()}
+    assert summary['trabajo']['requests'] == 4
+    assert summary['trabajo']['avg_sql_count'] == 3
+    assert summary['trabajo']['avg_http_count'] == 3
+
+    metrics.reset()
+    assert metrics.summary() == []
+
+def test_slow_requests_are_logged(caplog):
+    """Requests over the threshold are logged as warnings."""
+    app, metrics = _metrics_app(slow_ms=0)
+    with patch('app.helpers.request_metrics._original_adapter_send', _fake_send), \
+            caplog.at_level('WARNING', logger='app.helpers.request_metrics'):
+        app.test_client().get('/trabajo')
+
+    assert any('Slow request GET /trabajo' in record.getMessage() for record in caplog.records)
+
+def test_no_stats_outside_requests():
+    """SQL and HTTP calls outside a request (e.g. job workers) are not instrumented."""
+    app, metrics = _metrics_app()
+    engine = create_engine('sqlite://')
+    with app.app_context(), engine.connect() as conn:
+        conn.execute(text('SELECT 1'))
+    assert metrics.summary() == []
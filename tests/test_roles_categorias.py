@@ -0,0 +1,54 @@
+"""
+Tests for the roles_categorias.json registry.
+"""
+import json
+import os
+
+from app.helpers.roles_categorias import RolesCategoriasRegistry, roles_categorias
+
+def _write(path, documentos_base, mtime):
+    data = [{
+        'nombre': 'Profesor',
+        'categorias': [{
+            'codigo': 'PTIT',
+            'nombre': 'Profesor Titular',
+            'documentacionRequerida': {
+                'base': documentos_base,
+                'porDedicacion': {'Simple': ['PLAN_IVE_OPCIONAL'], 'Exclusiva': ['PLAN_IVE']}
+            }
+        }]
+    }]
+    path.write_text(json.dumps(data), encoding='utf-8')
+    os.utime(path, (mtime, mtime))
+
+def test_required_documents_by_categoria_and_dedicacion(tmp_path):
+    """Required documents are the base list plus the ones of the dedicacion."""
+    path = tmp_path / 'roles_categorias.json'
+    _write(path, ['DNI', 'CV'], 1000)
+    registry = RolesCategoriasRegistry(str(path))
+
+    assert registry.get_required_documents('PTIT', 'Exclusiva') == ['DNI', 'CV', 'PLAN_IVE']
+    assert registry.get_required_documents('PTIT', 'Parcial') == ['DNI', 'CV']
+    assert registry.get_required_documents('XXXX', 'Simple') == []
+    assert registry.get_categoria_nombre('PTIT') == 'Profesor Titular'
+    assert registry.get_categoria('PTIT')['rol'] == 'Profesor'
+
+def test_reloads_when_file_changes(tmp_path):
+    """Editing the file is picked up on the next lookup; a broken edit keeps the last good version."""
+    path = tmp_path / 'roles_categorias.json'
+    _write(path, ['DNI'], 1000)
+    registry = RolesCategoriasRegistry(str(path))
+    assert registry.get_required_documents('PTIT') == ['DNI']
+
+    _write(path, ['DNI', 'TITULO_UNIVERSITARIO'], 2000)
+    assert registry.get_required_documents('PTIT') == ['DNI', 'TITULO_UNIVERSITARIO']
+
+    path.write_text('{not json', encoding='utf-8')
+    os.utime(path, (3000, 3000))
+    assert registry.get_required_documents('PTIT') == ['DNI', 'TITULO_UNIVERSITARIO']
+
+def test_repository_file_is_indexed():
+    """The registry parses the roles_categorias.json shipped with the application."""
+    docs = roles_categorias.get_required_documents('PTIT', 'Exclusiva')
+    assert 'CV' in docs
+    assert 'PLAN_IVE' in docs
@@ -0,0 +1,81 @@
+"""
+Tests for the full-text search index.
+"""
+from unittest.mock import patch
+
+from flask_login import login_user
+
+from app.models.models import User, Persona, Postulante
+from app.routes.api import buscar
+from app.services.search_index import normalize, tokenize, search, search_objects, rebuild_search_index
+
+def _persona(session, dni, nombre, apellido, correo=None):
+    persona = Persona(dni=dni, nombre=nombre, apellido=apellido, correo=correo)
+    session.add(persona)
+    session.commit()
+    return persona
+
+def test_normalize_strips_accents_and_case():
+    assert normalize('Gómez NÚÑEZ') == 'gomez nunez'
+    assert tokenize('maría.peña@uncoma.edu.ar') == ['maria', 'pena', 'uncoma', 'edu', 'ar']
+
+def test_prefix_search_ignores_accents(app, db, session):
+    """Every word of the query matches the start of an indexed word, accents aside."""
+    persona = _persona(session, '20111222', 'Ángela', 'Ibáñez Zurbriggen', 'angela.ibanez@example.com')
+
+    assert ('persona', persona.id) in search('ibanez ang')
+    assert ('persona', persona.id) in search('IBÁÑ')
+    assert ('persona', persona.id) in search('201112')
+    assert ('persona', persona.id) not in search('ibanez rodolfo')
+    assert search('   ') == []
+
+def test_index_follows_updates_and_deletes(app, db, session):
+    """Updates reindex a row and deletes remove it, in the same transaction."""
+    persona = _persona(session, '20333444', 'Rosendo', 'Quiroga')
+    assert ('persona', persona.id) in search('quiroga', ['persona'])
+
+    persona.apellido = 'Vallejos'
+    session.commit()
+    assert ('persona', persona.id) not in search('quiroga', ['persona'])
+    assert ('persona', persona.id) in search('vallej', ['persona'])
+
+    session.delete(persona)
+    session.commit()
+    assert ('persona', persona.id) not in search('vallej', ['persona'])
+
+def test_search_by_tipo_and_expediente(app, db, session, test_concurso):
+    """Postulantes and concursos are indexed too and can be searched separately."""
+    postulante = Postulante(concurso_id=test_concurso.id, dni='39555666', nombre='Teófilo',
+                            apellido='Yupanqui', correo='teo@example.com')
+    session.add(postulante)
+    session.commit()
+
+    assert [tipo for tipo, _ in search_objects('yupanq')] == ['postulante']
+    assert search('yupanq', ['persona']) == []
+    assert ('concurso', test_concurso.id) in search('TEST-123', ['concurso'])
+
+def test_rebuild_search_index(app, db, session):
+    """Rebuilding reindexes every row."""
+    persona = _persona(session, '20777888', 'Casimira', 'Wenceslao')
+    assert rebuild_search_index(session.connection()) >= 1
+    assert ('persona', persona.id) in search('wences')
+
+def test_buscar_endpoint(app, db, session):
+    """The API returns the matches and rejects unknown types."""
+    persona = _persona(session, '20999000', 'Eulogio', 'Xamena')
+    user = User.query.filter_by(username='buscador').first()
+    if not user:
+        user = User(username='buscador', role='admin')
+        session.add(user)
+        session.commit()
+
+    with patch.dict(app.config, {'SECRET_KEY': 'test'}), app.test_request_context('/api/buscar?q=xamen&tipo=persona'):
+        login_user(user)
+        response, status = buscar()
+    assert status == 200
+    assert response.get_json()['results'][0]['id'] == persona.id
+
+    with patch.dict(app.config, {'SECRET_KEY': 'test'}), app.test_request_context('/api/buscar?q=x&tipo=otro'):
+        login_user(user)
+        response, status = buscar()
+    assert status == 400
@@ -0,0 +1,401 @@
+"""
+Tests for the document signing service and its background jobs.
+"""
+import base64
+import io
+import time
+from datetime import datetime, timedelta
+from unittest.mock import MagicMock, patch
+
+import pytest
+from PyPDF2 import PdfReader
+from flask import session as flask_session
+from werkzeug.exceptions import NotFound
+
+from app.models.models import (
+    BackgroundJob, Concurso, DocumentoConcurso, DocumentTemplateConfig, FirmaDocumento, HistorialEstado, Persona,
+    TribunalMiembro
+)
+from app.routes.tribunal import firmar_documento, estado_firma, subir_documento_presidente
+from app.services import signing
+from app.services.job_queue import enqueue_job, run_pending_jobs
+from app.services.signing import (
+    FIRMA_ADMIN_JOB, stamp_pdf_signatures, shutdown_signing_pool, request_tribunal_signature, apply_pending_signatures, sign_as_tribunal,
+    StaleSignatureError
+)
+from tests.fixtures import make_pdf
+
+def _documento_pendiente(session, departamento, dni):
+    """A concurso with a two member tribunal and a document pending their signatures."""
+    concurso = Concurso(tipo='Regular', cerrado_abierto='Abierto', cant_cargos=1,
+                        departamento_id=departamento.id, area='Área', orientacion='Orientación',
+                        categoria='PAD', dedicacion='Simple')
+    session.add(concurso)
+    session.flush()
+    miembros = []
+    for offset, rol in enumerate(('Presidente', 'Titular')):
+        persona = Persona(dni=f'{dni}{offset}', nombre='Firma', apellido=f'Jurado{offset}',
+                          correo=f'{dni}{offset}@example.com')
+        session.add(persona)
+        session.flush()
+        miembro = TribunalMiembro(concurso_id=concurso.id, persona_id=persona.id, rol=rol,
+                                  claustro='Docente', can_sign_file=True)
+        session.add(miembro)
+        miembros.append(miembro)
+    documento = DocumentoConcurso(concurso_id=concurso.id, tipo='FIRMA_JOB_DOC',
+                                  estado='PENDIENTE DE FIRMA', file_id=f'file-{dni}')
+    session.add(documento)
+    if DocumentTemplateConfig.query.filter_by(document_type_key='FIRMA_JOB_DOC').first() is None:
+        session.add(DocumentTemplateConfig(google_doc_id='firma', document_type_key='FIRMA_JOB_DOC',
+                                           display_name='Firma', tribunal_can_sign=True))
+    session.commit()
+    return documento, miembros
+
+def _fake_drive(pdf):
+    drive = MagicMock()
+    drive.download_file.return_value = pdf
+    drive.overwrite_file.side_effect = lambda file_id, content: (file_id, f'https://drive/{file_id}')
+    return drive
+
+def _sign(app, miembro, documento):
+    """Post the signature form as a tribunal member."""
+    with patch.dict(app.config, {'SECRET_KEY': 'test'}), app.test_request_context(method='POST'):
+        flask_session['persona_id'] = miembro.persona_id
+        return firmar_documento(documento.concurso_id, documento.id)
+
+def _job_of(documento, miembro):
+    firma = FirmaDocumento.query.filter_by(documento_id=documento.id, miembro_id=miembro.id).one()
+    return BackgroundJob.query.filter_by(idempotency_key=f'firmar_documento_tribunal:{firma.id}').one()
+
+def test_stamping_runs_in_the_process_pool(app):
+    """Stamping in a worker process returns the PDF with every signer's stamp."""
+    pdf = make_pdf(3)
+    signers = [{'apellido': 'Perez', 'nombre': 'Juan', 'dni': '111'},
+               {'apellido': 'Gomez', 'nombre': 'Ana', 'dni': '222', 'cargo': 'Presidente'}]
+    try:
+        with patch.dict(app.config, {'SIGNING_PROCESS_WORKERS': 1}):
+            signed = stamp_pdf_signatures(pdf, signers, signature_count=1)
+    finally:
+        shutdown_signing_pool()
+
+    reader = PdfReader(io.BytesIO(signed))
+    text = reader.pages[2].extract_text()
+    assert 'Firmado por: Perez, Juan (DNI: 111)' in text
+    assert 'Firmado por: Gomez, Ana (Cargo: Presidente, DNI: 222)' in text
+    assert reader.metadata['/SignatureCount'] == '3'
+
+def test_stuck_stamping_kills_the_pool(app):
+    """A stamping that exceeds the timeout has its worker process killed."""
+    with patch.dict(app.config, {'SIGNING_PROCESS_WORKERS': 1, 'SIGNING_TIMEOUT': 1}):
+        pool = signing._get_pool()
+        assert pool.submit(abs, -1).result() == 1
+        processes = list(pool._processes.values())
+
+        with pytest.raises(TimeoutError):
+            signing._run_stamping(time.sleep, 60)
+
+        for process in processes:
+            process.join(timeout=10)
+            assert not process.is_alive()
+        # The next signature gets a new pool
+        assert signing._get_pool() is not pool
+    shutdown_signing_pool()
+
+def test_admin_signature_retry_does_not_upload_twice(app, db, session, test_departamento):
+    """A retry after the upload succeeded but the commit failed reuses the uploaded copy."""
+    concurso = Concurso(tipo='Regular', cerrado_abierto='Abierto', cant_cargos=1,
+                        departamento_id=test_departamento.id, area='Área', orientacion='Orientación',
+                        categoria='PAD', dedicacion='Simple', documentos_firmados_folder_id='firmados-27900')
+    session.add(concurso)
+    session.flush()
+    documento = DocumentoConcurso(concurso_id=concurso.id, tipo='FIRMA_ADMIN_DOC', estado='BORRADOR',
+                                  borrador_file_id='borrador-27900')
+    session.add(documento)
+    session.commit()
+    drive = MagicMock()
+    drive.get_file_content.return_value = {'fileData': base64.b64encode(make_pdf(1)).decode(),
+                                           'fileName': 'acta.pdf', 'mimeType': 'application/pdf'}
+    drive.upload_document.return_value = ('firmado-27900', 'https://drive/firmado-27900')
+    firmante = {'nombre': 'Ana', 'apellido': 'Gomez', 'dni': '222', 'cargo': 'Secretaria'}
+    job = enqueue_job(FIRMA_ADMIN_JOB, {'documento_id': documento.id, 'firmante': firmante})
+
+    recorded = []
+    def historial(**kwargs):
+        # The first attempt fails after the upload, before its changes are committed
+        recorded.append(kwargs)
+        if len(recorded) == 1:
+            raise RuntimeError('database unavailable')
+        return HistorialEstado(**kwargs)
+
+    with patch('app.services.job_handlers.drive_api', drive), patch('app.services.signing.HistorialEstado', historial), \
+            patch.dict(app.config, {'SIGNING_PROCESS_WORKERS': 0}):
+        assert run_pending_jobs() == 1
+        session.refresh(job)
+        assert job.estado == 'PENDIENTE'
+        job.proximo_intento = datetime.utcnow()
+        session.commit()
+        assert run_pending_jobs() == 1
+
+    session.refresh(job)
+    session.refresh(documento)
+    assert job.estado == 'COMPLETADO'
+    assert drive.upload_document.call_count == 1
+    assert documento.estado == 'FIRMADO'
+    assert documento.file_id == 'firmado-27900'
+    assert documento.firma_count == 1
+
+def test_tribunal_signature_runs_as_a_job(app, db, session, test_departamento):
+    """The request only queues the signature; the job stamps, uploads and records it."""
+    documento, (presidente, titular) = _documento_pendiente(session, test_departamento, '27100')
+    drive = _fake_drive(make_pdf(2))
+
+    with patch('app.services.job_handlers.drive_api', drive), \
+            patch.dict(app.config, {'SIGNING_PROCESS_WORKERS': 0}):
+        response = _sign(app, presidente, documento)
+        drive.download_file.assert_not_called()
+        assert 'firma_job=' in response.location
+        assert run_pending_jobs() == 1
+
+        _sign(app, titular, documento)
+        assert run_pending_jobs() == 1
+
+    session.refresh(documento)
+    assert documento.firma_count == 2
+    assert documento.estado == 'FIRMADO'
+    assert FirmaDocumento.query.filter_by(documento_id=documento.id).count() == 2
+    uploaded = base64.b64decode(drive.overwrite_file.call_args.args[1])
+    assert 'Firmado por: Jurado1, Firma' in PdfReader(io.BytesIO(uploaded)).pages[0].extract_text()
+
+def test_signature_job_is_not_repeated(app, db, session, test_departamento):
+    """Resubmitting the form or retrying the job does not sign twice."""
+    documento, (presidente, _) = _documento_pendiente(session, test_departamento, '27200')
+    drive = _fake_drive(make_pdf(1))
+
+    with patch('app.services.job_handlers.drive_api', drive), \
+            patch.dict(app.config, {'SIGNING_PROCESS_WORKERS': 0}):
+        _sign(app, presidente, documento)
+        _sign(app, presidente, documento)
+        assert run_pending_jobs() == 1
+
+        job = _job_of(documento, presidente)
+        job.estado = 'PENDIENTE'
+        session.commit()
+        assert run_pending_jobs() == 1
+
+    session.refresh(documento)
+    assert documento.firma_count == 1
+    assert drive.overwrite_file.call_count == 1
+
+def test_signature_status_is_only_visible_to_the_signer(app, db, session, test_departamento):
+    """A tribunal member can poll the status of their own signatures only."""
+    documento, (presidente, titular) = _documento_pendiente(session, test_departamento, '27300')
+    _sign(app, presidente, documento)
+    job = _job_of(documento, presidente)
+
+    with patch.dict(app.config, {'SECRET_KEY': 'test'}), app.test_request_context():
+        flask_session['persona_id'] = presidente.persona_id
+        assert estado_firma(documento.concurso_id, job.id).get_json()['estado'] == 'PENDIENTE'
+
+        flask_session['persona_id'] = titular.persona_id
+        with pytest.raises(NotFound):
+            estado_firma(documento.concurso_id, job.id)
+
+    session.delete(job)
+    session.commit()
+
+def test_concurrent_signatures_share_one_cycle(app, db, session, test_departamento):
+    """Signatures requested together are stamped in one download, stamp and upload cycle."""
+    documento, (presidente, titular) = _documento_pendiente(session, test_departamento, '27400')
+    drive = _fake_drive(make_pdf(2))
+
+    with patch('app.services.job_handlers.drive_api', drive), \
+            patch.dict(app.config, {'SIGNING_PROCESS_WORKERS': 0}):
+        _sign(app, presidente, documento)
+        _sign(app, titular, documento)
+        assert run_pending_jobs() == 2
+
+    assert drive.download_file.call_count == 1
+    assert drive.overwrite_file.call_count == 1
+    session.refresh(documento)
+    assert (documento.firma_count, documento.estado) == (2, 'FIRMADO')
+    assert documento.firmando_hasta is None
+    assert all(firma.aplicada for firma in documento.firmas)
+    reader = PdfReader(io.BytesIO(base64.b64decode(drive.overwrite_file.call_args.args[1])))
+    text = reader.pages[1].extract_text()
+    assert 'Jurado0, Firma' in text and 'Jurado1, Firma' in text
+    assert reader.metadata['/SignatureCount'] == '2'
+
+def test_signer_waits_for_the_lease_holder(app, db, session, test_departamento):
+    """While another signer holds the lease, the signature stays pending and is retried."""
+    documento, (presidente, _) = _documento_pendiente(session, test_departamento, '27500')
+    request_tribunal_signature(documento, presidente)
+    documento.firmando_hasta = datetime.utcnow() + timedelta(minutes=5)
+    session.commit()
+    drive = _fake_drive(make_pdf(1))
+
+    with patch.dict(app.config, {'SIGNING_PROCESS_WORKERS': 0, 'SIGNING_TIMEOUT': 0}):
+        assert apply_pending_signatures(documento.id, drive) is None
+        with pytest.raises(ValueError):
+            sign_as_tribunal(documento.id, presidente.id, drive)
+
+        drive.download_file.assert_not_called()
+        assert documento.firma_pendiente_de(presidente.id)
+
+        # Once the lease expires the next signer takes it over
+        documento.firmando_hasta = datetime.utcnow() - timedelta(seconds=1)
+        session.commit()
+        assert sign_as_tribunal(documento.id, presidente.id, drive)['firma_count'] == 1
+
+def test_stamps_are_not_recorded_on_a_changed_document(app, db, session, test_departamento):
+    """If the document changes during the cycle, the signatures stay pending."""
+    documento, (presidente, _) = _documento_pendiente(session, test_departamento, '27600')
+    request_tribunal_signature(documento, presidente)
+    version = documento.firma_version
+    drive = _fake_drive(make_pdf(1))
+
+    def replaced_meanwhile(file_id, content):
+        # Another request uploads a new file while the stamps are being uploaded
+        with db.engine.begin() as connection:
+            connection.execute(DocumentoConcurso.__table__.update().where(
+                DocumentoConcurso.id == documento.id
+            ).values(firma_version=DocumentoConcurso.firma_version + 1))
+        return file_id, None
+    drive.overwrite_file.side_effect = replaced_meanwhile
+
+    with patch.dict(app.config, {'SIGNING_PROCESS_WORKERS': 0}), pytest.raises(StaleSignatureError):
+        apply_pending_signatures(documento.id, drive)
+
+    session.expire_all()
+    assert documento.firma_count == 0
+    assert documento.firma_version == version + 2
+    assert documento.firma_pendiente_de(presidente.id)
+
+def test_upload_discards_signatures_of_a_document_being_stamped(app, db, session, test_departamento):
+    """A new file uploaded while a signer holds the lease voids that signer's cycle and the ledger."""
+    documento, (presidente, titular) = _documento_pendiente(session, test_departamento, '27700')
+    documento.tipo = 'FIRMA_UPLOAD_DOC'
+    titular.can_upload_file = True
+    session.add(DocumentTemplateConfig(google_doc_id='subida', document_type_key='FIRMA_UPLOAD_DOC',
+                                       display_name='Subida', tribunal_can_sign=True, tribunal_can_upload_signed=True))
+    session.commit()
+    request_tribunal_signature(documento, presidente)
+    version = documento.firma_version
+
+    def claimed_meanwhile(folder_id, file_name, file_data):
+        # A signer takes the lease after the route loaded the document
+        with db.engine.begin() as connection:
+            connection.execute(DocumentoConcurso.__table__.update().where(
+                DocumentoConcurso.id == documento.id
+            ).values(firma_version=DocumentoConcurso.firma_version + 1,
+                     firmando_hasta=datetime.utcnow() + timedelta(minutes=5)))
+        return 'file-27700-nuevo', 'https://drive/file-27700-nuevo'
+    drive = MagicMock()
+    drive.upload_document.side_effect = claimed_meanwhile
+
+    data = {'documento': (io.BytesIO(make_pdf(1)), 'acta.pdf')}
+    with patch('app.routes.tribunal.drive_api', drive), patch.dict(app.config, {'SECRET_KEY': 'test'}), \
+            app.test_request_context(method='POST', data=data):
+        flask_session['persona_id'] = titular.persona_id
+        subir_documento_presidente(documento.concurso_id, documento.id)
+
+    session.expire_all()
+    assert documento.file_id == 'file-27700-nuevo'
+    # The lease holder's version is gone, so it can record neither its upload nor its stamps
+    assert documento.firma_version == version + 2
+    assert documento.firmando_hasta is None
+    assert FirmaDocumento.query.filter_by(documento_id=documento.id).count() == 0
+
+def test_no_upload_once_the_lease_is_lost(app, db, session, test_departamento):
+    """A cycle whose document changed while stamping does not upload its copy."""
+    documento, (presidente, _) = _documento_pendiente(session, test_departamento, '27800')
+    request_tribunal_signature(documento, presidente)
+    drive = _fake_drive(make_pdf(1))
+
+    def taken_over(file_id):
+        # The lease expires during a slow download and another signer takes it
+        with db.engine.begin() as connection:
+            connection.execute(DocumentoConcurso.__table__.update().where(
+                DocumentoConcurso.id == documento.id
+            ).values(firma_version=DocumentoConcurso.firma_version + 1))
+        return make_pdf(1)
+    drive.download_file.side_effect = taken_over
+
+    with patch.dict(app.config, {'SIGNING_PROCESS_WORKERS': 0}), pytest.raises(StaleSignatureError):
+        apply_pending_signatures(documento.id, drive)
+
+    drive.overwrite_file.assert_not_called()
+    session.expire_all()
+    assert documento.firma_pendiente_de(presidente.id)
+
+def test_uploaded_stamps_are_not_stamped_again(app, db, session, test_departamento):
+    """A cycle that fails after its upload is recorded by the retry without stamping again."""
+    documento, (presidente, titular) = _documento_pendiente(session, test_departamento, '27900')
+    request_tribunal_signature(documento, presidente)
+    request_tribunal_signature(documento, titular)
+    drive = _fake_drive(make_pdf(1))
+    drive.overwrite_file.side_effect = lambda file_id, content: (f'{file_id}-firmado', f'https://drive/{file_id}-firmado')
+
+    recorded = []
+    def historial(**kwargs):
+        # The first cycle fails after the upload, before its stamps are committed
+        recorded.append(kwargs)
+        if len(recorded) == 1:
+            raise RuntimeError('database unavailable')
+        return HistorialEstado(**kwargs)
+
+    with patch('app.services.signing.HistorialEstado', historial), \
+            patch.dict(app.config, {'SIGNING_PROCESS_WORKERS': 0}):
+        with pytest.raises(RuntimeError):
+            apply_pending_signatures(documento.id, drive)
+        assert apply_pending_signatures(documento.id, drive) == 2
+
+    assert drive.download_file.call_count == 1
+    assert drive.overwrite_file.call_count == 1
+    session.expire_all()
+    assert (documento.firma_count, documento.estado) == (2, 'FIRMADO')
+    assert documento.file_id == 'file-27900-firmado'
+    assert all(firma.aplicada and firma.subida_file_id is None for firma in documento.firmas)
+
+def test_failed_signature_job_lets_the_member_sign_again(app, db, session, test_departamento):
+    """A signature whose job gave up is withdrawn, so signing again queues a new job."""
+    documento, (presidente, _) = _documento_pendiente(session, test_departamento, '28100')
+    drive = _fake_drive(make_pdf(1))
+    drive.download_file.side_effect = RuntimeError('Drive no disponible')
+
+    with patch('app.services.job_handlers.drive_api', drive), \
+            patch.dict(app.config, {'SIGNING_PROCESS_WORKERS': 0, 'SIGNING_MAX_ATTEMPTS': 1}):
+        _sign(app, presidente, documento)
+        job = _job_of(documento, presidente)
+        assert run_pending_jobs() == 1
+        session.refresh(job)
+        assert job.estado == 'FALLIDO'
+        assert FirmaDocumento.query.filter_by(documento_id=documento.id).count() == 0
+
+        drive.download_file.side_effect = None
+        _sign(app, presidente, documento)
+        assert run_pending_jobs() == 1
+
+    session.refresh(documento)
+    assert documento.firma_count == 1
+
+def test_signing_again_retries_a_failed_job(app, db, session, test_departamento):
+    """A pending signature kept after its job failed is retried when the member signs again."""
+    documento, (presidente, _) = _documento_pendiente(session, test_departamento, '28200')
+    drive = _fake_drive(make_pdf(1))
+
+    with patch('app.services.job_handlers.drive_api', drive), \
+            patch.dict(app.config, {'SIGNING_PROCESS_WORKERS': 0}):
+        _sign(app, presidente, documento)
+        job = _job_of(documento, presidente)
+        job.estado = 'FALLIDO'
+        job.intentos = job.max_intentos
+        session.commit()
+
+        response = _sign(app, presidente, documento)
+        assert f'firma_job={job.id}' in response.location
+        session.refresh(job)
+        assert job.estado == 'PENDIENTE'
+        assert run_pending_jobs() == 1
+
+    session.refresh(documento)
+    assert documento.firma_count == 1
@@ -0,0 +1,129 @@
+"""
+Tests for the tribunal portal loader, the document template configuration cache and
+the compiled tribunal visibility rules.
+"""
+import json
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from flask import session as flask_session
+
+from app.models.models import Concurso, Persona, TribunalMiembro, DocumentTemplateConfig, DocumentoConcurso
+from app.helpers.template_configs import get_template_configs, template_config_cache, filter_visible_to_tribunal
+from app.routes.tribunal import portal, portal_concurso
+from app.services.tribunal_portal import load_tribunal_assignments
+from tests.fixtures import count_selects
+
+def _jurado_with_concursos(session, departamento, dni, count):
+    """Create a persona sitting on `count` tribunals with varying roles."""
+    persona = Persona(dni=dni, nombre='Jurado', apellido='Portal', correo=f'{dni}@example.com')
+    session.add(persona)
+    session.flush()
+    for i in range(count):
+        concurso = Concurso(tipo='Regular', cerrado_abierto='Abierto', cant_cargos=1,
+                            departamento_id=departamento.id, area='Área', orientacion='Orientación',
+                            categoria='PAD', dedicacion='Simple')
+        session.add(concurso)
+        session.flush()
+        session.add(TribunalMiembro(concurso_id=concurso.id, persona_id=persona.id,
+                                    rol='Presidente' if i == 0 else 'Titular',
+                                    claustro='Docente', can_sign_file=bool(i % 2)))
+    session.commit()
+    return persona
+
+def _render(app, db, view, persona):
+    db.session.expire_all()
+    with patch.dict(app.config, {'SECRET_KEY': 'test'}), app.test_request_context(), \
+            count_selects(db.engine) as statements:
+        flask_session['persona_id'] = persona.id
+        html = view()
+    return html, len(statements)
+
+def test_load_tribunal_assignments(app, db, session, test_departamento):
+    """Every assignment comes with its concurso, role and permissions."""
+    persona = _jurado_with_concursos(session, test_departamento, '26100100', 3)
+
+    assignments = load_tribunal_assignments(persona.id)
+
+    assert len(assignments) == 3
+    assert [a.concurso.id for a in assignments] == sorted((a.concurso.id for a in assignments), reverse=True)
+    assert sorted(a.rol for a in assignments) == ['Presidente', 'Titular', 'Titular']
+    assert {a.claustro for a in assignments} == {'Docente'}
+    assert [a.permisos['can_sign_file'] for a in assignments].count(True) == 1
+    assert load_tribunal_assignments(-1) == []
+
+def test_portal_query_count_does_not_grow_with_tribunals(app, db, session, test_departamento):
+    """The portal issues the same number of queries for one tribunal as for dozens."""
+    uno = _jurado_with_concursos(session, test_departamento, '26200200', 1)
+    muchos = _jurado_with_concursos(session, test_departamento, '26300300', 30)
+
+    html_uno, queries_uno = _render(app, db, portal, uno)
+    html_muchos, queries_muchos = _render(app, db, portal, muchos)
+
+    assert 'Presidente' in html_uno
+    assert html_muchos.count('Ver Detalles') == 30
+    assert queries_muchos == queries_uno
+
+def test_portal_concurso_uses_cached_template_configs(app, db, session, test_departamento):
+    """The concurso page reads the template configs from the process cache, not per view."""
+    persona = _jurado_with_concursos(session, test_departamento, '26400400', 1)
+    miembro = TribunalMiembro.query.filter_by(persona_id=persona.id).first()
+    get_template_configs()
+
+    db.session.expire_all()
+    with patch.dict(app.config, {'SECRET_KEY': 'test'}), app.test_request_context(), \
+            count_selects(db.engine) as statements:
+        flask_session['persona_id'] = persona.id
+        flask_session['tribunal_miembro_id'] = miembro.id
+        html = portal_concurso(miembro.concurso_id)
+
+    assert f'Concurso #{miembro.concurso_id}' in html
+    assert not any('document_template_configs' in statement for statement in statements)
+
+def test_template_config_cache_is_invalidated_on_write(app, db, session):
+    """Writing a template configuration drops the cached snapshot."""
+    template_config_cache.invalidate()
+    assert get_template_configs().get('PORTAL_CACHE_DOC') is None
+
+    session.add(DocumentTemplateConfig(google_doc_id='portal', document_type_key='PORTAL_CACHE_DOC',
+                                       display_name='Portal', tribunal_can_sign=True))
+    session.commit()
+
+    config = get_template_configs().get('PORTAL_CACHE_DOC')
+    assert config.tribunal_can_sign
+    assert config.is_visible_for_concurso_tipo('regular')
+    assert config.get_tribunal_visibility_rules() == {}
+
+def test_compiled_visibility_rules(app, db, session, test_concurso):
+    """Compiled rules match role and claustro per estado, and fall back to the defaults."""
+    session.add(DocumentTemplateConfig(
+        google_doc_id='reglas', document_type_key='PORTAL_REGLAS_DOC', display_name='Reglas',
+        tribunal_visibility_rules=json.dumps({
+            'BORRADOR': {'roles': ['Presidente'], 'claustros': ['Docente']},
+            'FIRMADO': {'roles': ['Presidente', 'Titular'], 'claustros': ['Docente', 'Estudiante']}
+        })
+    ))
+    session.add(DocumentTemplateConfig(google_doc_id='rotas', document_type_key='PORTAL_REGLAS_ROTAS',
+                                       display_name='Rotas', tribunal_visibility_rules='{no es json'))
+    session.commit()
+
+    presidente = SimpleNamespace(rol='Presidente', claustro='Docente')
+    estudiante = SimpleNamespace(rol='Titular', claustro='Estudiante')
+    borrador = DocumentoConcurso(concurso_id=test_concurso.id, tipo='PORTAL_REGLAS_DOC', estado='BORRADOR')
+    firmado = DocumentoConcurso(concurso_id=test_concurso.id, tipo='PORTAL_REGLAS_DOC', estado='FIRMADO')
+    roto = DocumentoConcurso(concurso_id=test_concurso.id, tipo='PORTAL_REGLAS_ROTAS', estado='FIRMADO')
+    acta = DocumentoConcurso(concurso_id=test_concurso.id, tipo='ACTA_SORTEO', estado='BORRADOR')
+    sin_config = DocumentoConcurso(concurso_id=test_concurso.id, tipo='SIN_PLANTILLA', estado='BORRADOR')
+    documentos = [borrador, firmado, roto, acta, sin_config]
+
+    assert filter_visible_to_tribunal(documentos, presidente) == [borrador, firmado, acta]
+    assert filter_visible_to_tribunal(documentos, estudiante) == [firmado, acta]
+    assert filter_visible_to_tribunal(documentos) == [borrador, firmado, acta]
+    assert borrador.is_visible_to_tribunal(presidente) and not borrador.is_visible_to_tribunal(estudiante)
+
+    # Evaluating the rules neither queries the configurations nor parses their JSON again
+    with count_selects(db.engine) as statements, patch('app.helpers.template_configs.json.loads') as loads:
+        for _ in range(10):
+            filter_visible_to_tribunal(documentos, presidente)
+    assert statements == []
+    loads.assert_not_called()
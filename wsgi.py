@@ -6,11 +6,19 @@ sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 # Import app factory function and initialize app data
 from app import create_app, init_app_data
+from app.services.job_queue import start_job_workers
+from app.services.api_warmup import start_api_warmup
+from app.services.programas_store import start_programas_refresh
 
 # Create the application instance
 application = create_app()
 init_app_data(application)
 
+# Start the background job workers of this process
+start_job_workers(application)
+start_api_warmup(application)
+start_programas_refresh(application)
+
 # This is the WSGI application referenced by the Apache configuration
 if __name__ == "__main__":
     application.run()